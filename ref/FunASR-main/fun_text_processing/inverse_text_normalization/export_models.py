@@ -2,6 +2,10 @@ import os
 from time import perf_counter
 from argparse import ArgumentParser
 from fun_text_processing.text_normalization.en.graph_utils import generator_main
+from fun_text_processing.inverse_text_normalization.grammar_store import (
+    ITN_LANGUAGES,
+    export_grammars,
+)
 
 
 def parse_args():
@@ -20,6 +24,22 @@ def parse_args():
         default="./",
         type=str,
     )
+    parser.add_argument(
+        "--grammar_store",
+        help="export versioned archives for InverseNormalizer's grammar store instead",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--grammar_dir",
+        help="grammar store directory. Default to $FUN_TEXT_PROCESSING_GRAMMAR_DIR or "
+        "~/.cache/fun_text_processing/itn",
+        default=None,
+        type=str,
+    )
+    parser.add_argument(
+        "--all_languages", help="with --grammar_store, export every language", action="store_true"
+    )
+    parser.add_argument("--overwrite", help="rebuild existing archives", action="store_true")
     return parser.parse_args()
 
 
@@ -115,6 +135,13 @@ def get_grammars(lang: str = "en"):
 if __name__ == "__main__":
     args = parse_args()
 
+    if args.grammar_store:
+        for lang in ITN_LANGUAGES if args.all_languages else [args.language]:
+            start_time = perf_counter()
+            far_file = export_grammars(lang, args.grammar_dir, overwrite=args.overwrite)
+            print(f"{lang}: {far_file} ({round(perf_counter() - start_time, 2)} sec)")
+        raise SystemExit(0)
+
     export_dir = args.export_dir
     os.makedirs(export_dir, exist_ok=True)
     tagger_far_file = os.path.join(export_dir, args.language + "_itn_tagger.far")
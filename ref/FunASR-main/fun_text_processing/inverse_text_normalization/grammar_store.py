@@ -0,0 +1,210 @@
+import ast
+import hashlib
+import importlib
+import logging
+import os
+from functools import lru_cache
+from typing import Tuple
+
+import pynini
+from pynini.export import export
+
+ITN_LANGUAGES = ["de", "en", "es", "fr", "id", "ja", "ko", "pt", "ru", "vi", "zh", "tl"]
+
+# bump when the layout of the compiled archive changes
+STORE_VERSION = 1
+TAGGER_KEY = "tokenize_and_classify"
+VERBALIZER_KEY = "verbalize"
+GRAMMAR_DIR_ENV = "FUN_TEXT_PROCESSING_GRAMMAR_DIR"
+
+_PACKAGE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def default_grammar_dir() -> str:
+    """
+    Directory of the compiled grammar store: $FUN_TEXT_PROCESSING_GRAMMAR_DIR if set,
+    else ~/.cache/fun_text_processing/itn
+    """
+    return os.environ.get(GRAMMAR_DIR_ENV) or os.path.join(
+        os.path.expanduser("~"), ".cache", "fun_text_processing", "itn"
+    )
+
+
+def _grammar_modules(lang: str) -> Tuple[str, str]:
+    """Modules of the tagger and the verbalizer of lang"""
+    package = f"fun_text_processing.inverse_text_normalization.{lang}"
+    return f"{package}.taggers.tokenize_and_classify", f"{package}.verbalizers.verbalize_final"
+
+
+def _module_path(module: str) -> str:
+    """Source file of a fun_text_processing module, None for names that are not modules"""
+    base = os.path.join(_PACKAGE_DIR, *module.split(".")[1:])
+    for path in (base + ".py", os.path.join(base, "__init__.py")):
+        if os.path.isfile(path):
+            return path
+    return None
+
+
+def _imported_modules(path: str):
+    """Yields the fun_text_processing names imported by a source file (modules or members)"""
+    with open(path, "rb") as f:
+        tree = ast.parse(f.read(), path)
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names = [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            names = [node.module] + [f"{node.module}.{alias.name}" for alias in node.names]
+        else:
+            continue
+        for name in names:
+            if name.split(".")[0] == "fun_text_processing":
+                yield name
+
+
+def _grammar_sources(lang: str):
+    """
+    Yields the grammar source files the ITN grammars of lang are built from: every module
+    reachable by imports from the tagger and the verbalizer (e.g. the en taggers used by de
+    and ru), and the data files of each language directory these modules belong to, since
+    the data is loaded relative to the language's utils module.
+    """
+    pending = list(_grammar_modules(lang))
+    modules = set()
+    while pending:
+        path = _module_path(pending.pop())
+        if path is None or path in modules:
+            continue
+        modules.add(path)
+        pending.extend(_imported_modules(path))
+
+    data_roots = set()
+    for path in modules:
+        parts = os.path.relpath(path, _PACKAGE_DIR).split(os.sep)
+        if len(parts) > 2 and parts[0] in ("inverse_text_normalization", "text_normalization"):
+            data_roots.add(os.path.join(_PACKAGE_DIR, parts[0], parts[1]))
+    sources = set(modules)
+    for root in data_roots:
+        for dirpath, dirnames, filenames in os.walk(root):
+            # grammars/ holds exported .far files, not sources
+            dirnames[:] = [d for d in dirnames if d not in ("__pycache__", "grammars")]
+            for filename in filenames:
+                if not filename.endswith((".py", ".pyc", ".far")):
+                    sources.add(os.path.join(dirpath, filename))
+    yield from sorted(sources)
+
+
+def grammar_source_hash(lang: str) -> str:
+    """
+    Hash of the grammar sources of lang and the pynini version, so that editing a
+    grammar or a data file, or upgrading pynini, selects a new archive.
+    """
+    digest = hashlib.sha256(f"{STORE_VERSION}:{pynini.__version__}".encode())
+    for path in _grammar_sources(lang):
+        digest.update(os.path.relpath(path, _PACKAGE_DIR).replace(os.sep, "/").encode())
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+def grammar_far_path(lang: str, grammar_dir: str = None) -> str:
+    """Path of the versioned archive of lang: <grammar_dir>/<lang>_itn_v<version>_<hash>.far"""
+    grammar_dir = grammar_dir or default_grammar_dir()
+    return os.path.join(grammar_dir, f"{lang}_itn_v{STORE_VERSION}_{grammar_source_hash(lang)}.far")
+
+
+def build_grammars(lang: str) -> Tuple["pynini.FstLike", "pynini.FstLike"]:
+    """Builds the tagger and verbalizer graphs of lang in Python (slow, seconds per language)."""
+    if lang not in ITN_LANGUAGES:
+        raise ValueError(f"Unsupported ITN language: {lang}")
+    tagger_module, verbalizer_module = _grammar_modules(lang)
+    tagger = importlib.import_module(tagger_module).ClassifyFst()
+    verbalizer = importlib.import_module(verbalizer_module).VerbalizeFinalFst()
+    return tagger.fst, verbalizer.fst
+
+
+def export_grammars(lang: str, grammar_dir: str = None, overwrite: bool = False) -> str:
+    """
+    Builds the grammars of lang and writes them to the store as one archive.
+
+    Args:
+        lang: ITN language
+        grammar_dir: store directory, default_grammar_dir() if None
+        overwrite: rebuild even if the archive for the current sources exists
+
+    Returns path of the archive
+    """
+    far_file = grammar_far_path(lang, grammar_dir)
+    if os.path.exists(far_file) and not overwrite:
+        return far_file
+    tagger_fst, verbalizer_fst = build_grammars(lang)
+    _write_far(far_file, tagger_fst, verbalizer_fst)
+    _load.cache_clear()
+    return far_file
+
+
+def _write_far(far_file: str, tagger_fst, verbalizer_fst) -> None:
+    os.makedirs(os.path.dirname(far_file), exist_ok=True)
+    # write next to the target and rename, so concurrent workers never read a partial file
+    tmp_file = f"{far_file}.{os.getpid()}.tmp"
+    exporter = export.Exporter(tmp_file)
+    exporter[TAGGER_KEY] = tagger_fst
+    exporter[VERBALIZER_KEY] = verbalizer_fst
+    exporter.close()
+    os.replace(tmp_file, far_file)
+    logging.info(f"ITN grammars are saved to {far_file}.")
+
+
+@lru_cache(maxsize=None)
+def _load(lang: str, grammar_dir: str, build_missing: bool):
+    far_file = grammar_far_path(lang, grammar_dir)
+    if os.path.exists(far_file):
+        far = pynini.Far(far_file, mode="r")
+        logging.info(f"ITN grammars were restored from {far_file}.")
+        return far[TAGGER_KEY], far[VERBALIZER_KEY]
+    if not build_missing:
+        raise FileNotFoundError(
+            f"No compiled ITN grammar for '{lang}' at {far_file}, "
+            f"run export_models.py --language {lang} --grammar_store"
+        )
+    tagger_fst, verbalizer_fst = build_grammars(lang)
+    try:
+        _write_far(far_file, tagger_fst, verbalizer_fst)
+    except OSError as e:
+        logging.warning(f"Could not save ITN grammars to {far_file}: {e}")
+    return tagger_fst, verbalizer_fst
+
+
+def load_grammars(
+    lang: str, grammar_dir: str = None, build_missing: bool = True
+) -> Tuple["pynini.FstLike", "pynini.FstLike"]:
+    """
+    Loads the compiled tagger and verbalizer of lang from the store, once per process.
+
+    Args:
+        lang: ITN language
+        grammar_dir: store directory, default_grammar_dir() if None
+        build_missing: build and save the grammars if the store has no archive for the
+            current sources, otherwise raise FileNotFoundError
+
+    Returns (tagger fst, verbalizer fst)
+    """
+    return _load(lang, os.path.abspath(grammar_dir or default_grammar_dir()), build_missing)
+
+
+class StoredGrammar:
+    """
+    Tagger or verbalizer backed by the grammar store. The fst is loaded on first access
+    and shared by every normalizer of the process. The object itself holds no fst, so
+    joblib or multiprocessing workers unpickle it cheaply and load the archive once.
+    """
+
+    def __init__(self, lang: str, key: str, grammar_dir: str = None, build_missing: bool = True):
+        self.lang = lang
+        self.key = key
+        self.grammar_dir = grammar_dir
+        self.build_missing = build_missing
+
+    @property
+    def fst(self) -> "pynini.FstLike":
+        tagger_fst, verbalizer_fst = load_grammars(self.lang, self.grammar_dir, self.build_missing)
+        return tagger_fst if self.key == TAGGER_KEY else verbalizer_fst
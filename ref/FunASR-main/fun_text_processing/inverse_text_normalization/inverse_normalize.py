@@ -5,6 +5,12 @@ from argparse import ArgumentParser
 from time import perf_counter
 from typing import List
 
+from fun_text_processing.inverse_text_normalization.grammar_store import (
+    TAGGER_KEY,
+    VERBALIZER_KEY,
+    StoredGrammar,
+    export_grammars,
+)
 from fun_text_processing.text_normalization.data_loader_utils import load_file, write_file
 from fun_text_processing.text_normalization.normalize import Normalizer
 from fun_text_processing.text_normalization.token_parser import TokenParser
@@ -19,6 +25,10 @@ class InverseNormalizer(Normalizer):
         lang: language specifying the ITN
         cache_dir: path to a dir with .far grammar file. Set to None to avoid using cache.
         overwrite_cache: set to True to overwrite .far files
+        use_grammar_store: without cache_dir, load the precompiled grammars of the language
+            from the grammar store on first use (built and saved there if missing)
+        grammar_dir: grammar store directory, see grammar_store.default_grammar_dir()
+        cache_size: number of verbalized token sequences and token serializations memoized
     """
 
     def __init__(
@@ -28,7 +38,22 @@ class InverseNormalizer(Normalizer):
         overwrite_cache: bool = False,
         enable_standalone_number: bool = True,
         enable_0_to_9: bool = True,
+        use_grammar_store: bool = True,
+        grammar_dir: str = None,
+        cache_size: int = 10000,
     ):
+        self.init_cache(cache_size)
+        self.parser = TokenParser()
+        self.lang = lang
+        self.convert_number = enable_standalone_number
+        self.enable_0_to_9 = enable_0_to_9
+
+        if use_grammar_store and (cache_dir is None or cache_dir == "None"):
+            if overwrite_cache:
+                export_grammars(lang, grammar_dir, overwrite=True)
+            self.tagger = StoredGrammar(lang, TAGGER_KEY, grammar_dir)
+            self.verbalizer = StoredGrammar(lang, VERBALIZER_KEY, grammar_dir)
+            return
 
         if lang == "en":
             from fun_text_processing.inverse_text_normalization.en.taggers.tokenize_and_classify import (
@@ -123,10 +148,6 @@ class InverseNormalizer(Normalizer):
 
         self.tagger = ClassifyFst(cache_dir=cache_dir, overwrite_cache=overwrite_cache)
         self.verbalizer = VerbalizeFinalFst()
-        self.parser = TokenParser()
-        self.lang = lang
-        self.convert_number = enable_standalone_number
-        self.enable_0_to_9 = enable_0_to_9
 
     def inverse_normalize_list(self, texts: List[str], verbose=False) -> List[str]:
         """
@@ -189,6 +210,15 @@ def parse_args():
         default=None,
         type=str,
     )
+    parser.add_argument(
+        "--grammar_dir",
+        help="path to the compiled grammar store, used when --cache_dir is not set",
+        default=None,
+        type=str,
+    )
+    parser.add_argument(
+        "--use_grammar_store", type=str, default="True", help="load grammars from the store"
+    )
     parser.add_argument(
         "--enable_standalone_number", type=str, default="True", help="enable standalone number"
     )
@@ -208,10 +238,16 @@ if __name__ == "__main__":
             overwrite_cache=args.overwrite_cache,
             enable_standalone_number=str2bool(args.enable_standalone_number),
             enable_0_to_9=str2bool(args.enable_0_to_9),
+            use_grammar_store=str2bool(args.use_grammar_store, True),
+            grammar_dir=args.grammar_dir,
         )
     else:
         inverse_normalizer = InverseNormalizer(
-            lang=args.language, cache_dir=args.cache_dir, overwrite_cache=args.overwrite_cache
+            lang=args.language,
+            cache_dir=args.cache_dir,
+            overwrite_cache=args.overwrite_cache,
+            use_grammar_store=str2bool(args.use_grammar_store, True),
+            grammar_dir=args.grammar_dir,
         )
     print(f"Time to generate graph: {round(perf_counter() - start_time, 2)} sec")
 
@@ -5,7 +5,7 @@ from argparse import ArgumentParser
 from collections import OrderedDict
 from math import factorial
 from time import perf_counter
-from typing import Dict, List, Union
+from typing import Dict, Iterator, List, Tuple, Union
 
 import pynini
 import regex
@@ -28,6 +28,36 @@ except (ModuleNotFoundError, ImportError) as e:
     NLP_AVAILABLE = False
 
 SPACE_DUP = re.compile(" {2,}")
+# splits after CJK sentence-final punctuation, which is not followed by a space
+CJK_SENTENCE_END = re.compile("(?<=[。！？；])")
+
+
+class LRUCache:
+    """
+    Mapping that keeps at most maxsize entries, dropping the least recently used.
+
+    Args:
+        maxsize: maximum number of entries
+    """
+
+    def __init__(self, maxsize: int = 10000):
+        self.maxsize = maxsize
+        self.data = OrderedDict()
+
+    def get(self, key, default=None):
+        if key not in self.data:
+            return default
+        self.data.move_to_end(key)
+        return self.data[key]
+
+    def put(self, key, value):
+        self.data[key] = value
+        self.data.move_to_end(key)
+        if len(self.data) > self.maxsize:
+            self.data.popitem(last=False)
+
+    def __len__(self):
+        return len(self.data)
 
 
 class Normalizer:
@@ -43,8 +73,15 @@ class Normalizer:
         whitelist: path to a file with whitelist replacements
         post_process: WFST-based post processing, e.g. to remove extra spaces added during TN.
             Note: punct_post_process flag in normalize() supports all languages.
+        cache_size: number of verbalized token sequences and token serializations memoized
     """
 
+    # field permutations tried per token before it is reported as not verbalizable
+    max_permutations = 729
+    # longer inputs are split into sentences and normalized one by one
+    max_input_words = 500
+    max_input_chars = 2000
+
     def __init__(
         self,
         input_case: str,
@@ -55,8 +92,10 @@ class Normalizer:
         whitelist: str = None,
         lm: bool = False,
         post_process: bool = True,
+        cache_size: int = 10000,
     ):
         assert input_case in ["lower_cased", "cased"]
+        self.init_cache(cache_size)
 
         self.post_processor = None
 
@@ -199,6 +238,18 @@ class Normalizer:
         ]
         return normalized_lines
 
+    def init_cache(self, cache_size: int = 10000):
+        """
+        Creates the LRU memos used by normalize(): tagged token sequence -> verbalized text,
+        and tagged token -> field order the verbalizer accepts. They live as long as the
+        normalizer, so repeated tokens across calls skip the verbalizer and permutation search.
+
+        Args:
+            cache_size: maximum number of entries of each memo
+        """
+        self._verbalize_cache = LRUCache(cache_size)
+        self._token_cache = LRUCache(cache_size)
+
     def _estimate_number_of_permutations_in_nested_dict(
         self, token_group: Dict[str, Union[OrderedDict, str, bool]]
     ) -> int:
@@ -285,7 +336,13 @@ class Normalizer:
 
         Returns: spoken form
         """
-        if len(text.split()) > 500:
+        if len(text.split()) > self.max_input_words or len(text) > self.max_input_chars:
+            pieces = self.split_long_text(text)
+            if len(pieces) > 1:
+                return "".join(
+                    self.normalize(piece, verbose, punct_pre_process, punct_post_process) + sep
+                    for piece, sep in pieces
+                ).strip()
             print(
                 "WARNING! Your input is too long and could take a long time to normalize."
                 "Use split_text_into_sentences() to make the input shorter and then call normalize_list()."
@@ -309,17 +366,7 @@ class Normalizer:
         split_tokens = self._split_tokens_to_reduce_number_of_permutations(tokens)
         output = ""
         for s in split_tokens:
-            tags_reordered = self.generate_permutations(s)
-            verbalizer_lattice = None
-            for tagged_text in tags_reordered:
-                tagged_text = pynini.escape(tagged_text)
-
-                verbalizer_lattice = self.find_verbalizer(tagged_text)
-                if verbalizer_lattice.num_states() != 0:
-                    break
-            if verbalizer_lattice is None:
-                raise ValueError(f"No permutations were generated from tokens {s}")
-            output += " " + self.select_verbalizer(verbalizer_lattice)
+            output += " " + self.verbalize_tokens(s)
         output = SPACE_DUP.sub(" ", output[1:])
 
         if self.lang == "en" and hasattr(self, "post_processor"):
@@ -356,6 +403,105 @@ class Normalizer:
         sentences = regex.split(split_pattern, text)
         return sentences
 
+    def split_long_text(self, text: str) -> List[Tuple[str, str]]:
+        """
+        Splits text into sentences with split_text_into_sentences(), then after CJK
+        sentence-final punctuation.
+
+        Args:
+            text: text
+
+        Returns list of (sentence, separator) pairs; joining them restores the text up to
+            whitespace between sentences
+        """
+        pieces = []
+        sentences = self.split_text_into_sentences(text)
+        for i, sentence in enumerate(sentences):
+            parts = [part for part in CJK_SENTENCE_END.split(sentence) if part]
+            for j, part in enumerate(parts):
+                last = j == len(parts) - 1
+                pieces.append((part, " " if last and i < len(sentences) - 1 else ""))
+        return pieces
+
+    def verbalize_tokens(self, tokens: List[dict]) -> str:
+        """
+        Verbalizes a sequence of tagged tokens, with the result of the permutation search of
+        generate_permutations() but without enumerating it: every token is serialized in parse
+        order (or in the order memoized for it), and only if the verbalizer rejects the sequence
+        are the field permutations of each token tried on their own, at most max_permutations
+        per token. The verbalizer accepts a sequence iff it accepts each token, so the first
+        accepted permutation of each token gives the first accepted sequence.
+
+        Args:
+            tokens: list of dictionaries
+
+        Returns: verbalized text
+        """
+        canonical = [next(self._iter_permute(token)) for token in tokens]
+        tagged_text = "".join(self._token_cache.get(c, c) for c in canonical)
+        output = self._verbalize_cache.get(tagged_text)
+        if output is not None:
+            return output
+
+        lattice = self.find_verbalizer(pynini.escape(tagged_text))
+        if lattice.num_states() == 0:
+            reordered = "".join(
+                self._find_token_permutation(token, c) for token, c in zip(tokens, canonical)
+            )
+            lattice = self.find_verbalizer(pynini.escape(reordered))
+        output = self.select_verbalizer(lattice)
+        self._verbalize_cache.put(tagged_text, output)
+        return output
+
+    def _find_token_permutation(self, token: dict, canonical: str) -> str:
+        """
+        Returns the first serialization of token, in generate_permutations() order, that the
+        verbalizer accepts, trying at most max_permutations
+        """
+        cached = self._token_cache.get(canonical)
+        if cached is not None:
+            return cached
+        if len(list(itertools.islice(self._iter_permute(token), 2))) == 1:
+            # nothing to reorder
+            return canonical
+        for option in itertools.islice(self._iter_permute(token), self.max_permutations):
+            if self.find_verbalizer(pynini.escape(option)).num_states() != 0:
+                self._token_cache.put(canonical, option)
+                return option
+        raise ValueError(
+            f"No permutation of token {token} within the first {self.max_permutations} "
+            f"could be verbalized"
+        )
+
+    def _iter_permute(self, d: OrderedDict) -> Iterator[str]:
+        """
+        Lazily yields the serializations of _permute(d), in the same order
+
+        Args:
+            d: (nested) dictionary of key value pairs
+        """
+        if PRESERVE_ORDER_KEY in d.keys():
+            d_permutations = [d.items()]
+        else:
+            d_permutations = itertools.permutations(d.items())
+        for perm in d_permutations:
+            yield from self._iter_serialize(list(perm), "")
+
+    def _iter_serialize(self, items: list, prefix: str) -> Iterator[str]:
+        if not items:
+            yield prefix
+            return
+        k, v = items[0]
+        if isinstance(v, str):
+            yield from self._iter_serialize(items[1:], prefix + f'{k}: "{v}" ')
+        elif isinstance(v, OrderedDict):
+            for rec in self._iter_permute(v):
+                yield from self._iter_serialize(items[1:], prefix + f" {k} {{ " + rec + " } ")
+        elif isinstance(v, bool):
+            yield from self._iter_serialize(items[1:], prefix + f"{k}: true ")
+        else:
+            raise ValueError()
+
     def _permute(self, d: OrderedDict) -> List[str]:
         """
         Creates reorderings of dictionary elements and serializes as strings
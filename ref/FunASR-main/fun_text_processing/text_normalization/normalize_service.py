@@ -0,0 +1,197 @@
+import itertools
+import multiprocessing
+import os
+from argparse import ArgumentParser
+from collections import deque
+from functools import partial
+from time import perf_counter
+from typing import Callable, Iterable, Iterator, List
+
+# normalizer of a worker process, inherited from the parent with fork or built by the initializer
+_worker_normalizer = None
+
+
+def _init_worker(factory: Callable):
+    global _worker_normalizer
+    if _worker_normalizer is None:
+        _worker_normalizer = factory()
+
+
+def _normalize_chunk(texts: List[str], kwargs: dict) -> List[str]:
+    return [_worker_normalizer.normalize(text, **kwargs) for text in texts]
+
+
+def _preload(normalizer) -> None:
+    """Touches every grammar, so lazily loaded ones are in memory before workers fork"""
+    for name in ("tagger", "verbalizer", "post_processor"):
+        graph = getattr(normalizer, name, None)
+        if graph is not None:
+            graph.fst
+
+
+class NormalizerPool:
+    """
+    Long-lived pool of worker processes normalizing a stream of sentences with a Normalizer or
+    InverseNormalizer. Grammars are loaded once per pool, not per batch: with the fork start
+    method the normalizer is built in the parent and inherited copy-on-write; otherwise (spawn,
+    e.g. on Windows) every worker calls the factory once, which is fast when the grammars come
+    from the compiled grammar store.
+
+    Args:
+        factory: picklable callable returning the normalizer, e.g.
+            functools.partial(InverseNormalizer, lang="zh")
+        n_jobs: number of worker processes, -1 for all CPUs
+        chunk_size: sentences sent to a worker at a time
+        max_pending: chunks in flight before the input iterator is read further (backpressure),
+            default 2 * n_jobs
+        start_method: multiprocessing start method, default "fork" where available
+    """
+
+    def __init__(
+        self,
+        factory: Callable,
+        n_jobs: int = -1,
+        chunk_size: int = 16,
+        max_pending: int = None,
+        start_method: str = None,
+    ):
+        if n_jobs < 1:
+            n_jobs = os.cpu_count() or 1
+        if start_method is None:
+            methods = multiprocessing.get_all_start_methods()
+            start_method = "fork" if "fork" in methods else methods[0]
+        self.n_jobs = n_jobs
+        self.chunk_size = max(1, chunk_size)
+        self.max_pending = max_pending or 2 * n_jobs
+        self.start_method = start_method
+
+        global _worker_normalizer
+        if start_method == "fork":
+            _worker_normalizer = factory()
+            _preload(_worker_normalizer)
+        try:
+            context = multiprocessing.get_context(start_method)
+            self._pool = context.Pool(n_jobs, initializer=_init_worker, initargs=(factory,))
+        finally:
+            # the parent keeps no reference once the workers hold their copy
+            _worker_normalizer = None
+
+    def imap(
+        self,
+        texts: Iterable[str],
+        verbose: bool = False,
+        punct_pre_process: bool = False,
+        punct_post_process: bool = False,
+    ) -> Iterator[str]:
+        """
+        Normalizes a stream of sentences, yielding results in input order as soon as they are
+        done. At most max_pending chunks are in flight, so texts may be a lazy iterator over an
+        input larger than memory.
+
+        Args:
+            texts: iterable of input strings
+            verbose: whether to print intermediate meta information
+            punct_pre_process: whether to do punctuation pre processing
+            punct_post_process: whether to do punctuation post processing
+
+        Returns iterator over the normalized strings
+        """
+        kwargs = dict(
+            verbose=verbose,
+            punct_pre_process=punct_pre_process,
+            punct_post_process=punct_post_process,
+        )
+        texts = iter(texts)
+        pending = deque()
+        while True:
+            chunk = list(itertools.islice(texts, self.chunk_size))
+            if chunk:
+                pending.append(self._pool.apply_async(_normalize_chunk, (chunk, kwargs)))
+            if pending and (not chunk or len(pending) >= self.max_pending):
+                yield from pending.popleft().get()
+            elif not chunk:
+                return
+
+    def normalize_list(self, texts: List[str], **kwargs) -> List[str]:
+        """
+        Normalizes a list of sentences, see imap()
+
+        Returns list of normalized strings
+        """
+        return list(self.imap(texts, **kwargs))
+
+    def close(self) -> None:
+        """Stops the workers after the submitted chunks are done"""
+        self._pool.close()
+        self._pool.join()
+
+    def terminate(self) -> None:
+        """Stops the workers immediately"""
+        self._pool.terminate()
+        self._pool.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.terminate()
+
+
+def parse_args():
+    parser = ArgumentParser()
+    parser.add_argument(
+        "--input_file", help="input file path, one sentence per line", required=True
+    )
+    parser.add_argument("--output_file", help="output file path", required=True)
+    parser.add_argument(
+        "--mode", help="inverse (ITN) or text normalization", choices=["itn", "tn"], default="itn"
+    )
+    parser.add_argument("--language", help="language", default="zh", type=str)
+    parser.add_argument(
+        "--input_case",
+        help="input capitalization for TN",
+        choices=["lower_cased", "cased"],
+        default="cased",
+    )
+    parser.add_argument(
+        "--n_jobs", help="number of worker processes, -1 for all CPUs", default=-1, type=int
+    )
+    parser.add_argument(
+        "--chunk_size", help="sentences sent to a worker at a time", default=16, type=int
+    )
+    parser.add_argument(
+        "--grammar_dir",
+        help="compiled ITN grammar store, see grammar_store.py",
+        default=None,
+        type=str,
+    )
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.mode == "itn":
+        from fun_text_processing.inverse_text_normalization.inverse_normalize import (
+            InverseNormalizer,
+        )
+
+        factory = partial(InverseNormalizer, lang=args.language, grammar_dir=args.grammar_dir)
+    else:
+        from fun_text_processing.text_normalization.normalize import Normalizer
+
+        factory = partial(Normalizer, input_case=args.input_case, lang=args.language)
+
+    start_time = perf_counter()
+    with NormalizerPool(factory, n_jobs=args.n_jobs, chunk_size=args.chunk_size) as pool:
+        print(f"Time to start {pool.n_jobs} workers: {round(perf_counter() - start_time, 2)} sec")
+        count = 0
+        with open(args.input_file, encoding="utf-8") as fin, open(
+            args.output_file, "w", encoding="utf-8"
+        ) as fout:
+            for line in pool.imap(line.rstrip("\n") for line in fin):
+                fout.write(line + "\n")
+                count += 1
+    print(f"- Normalized {count} sentences in {round(perf_counter() - start_time, 2)} sec")
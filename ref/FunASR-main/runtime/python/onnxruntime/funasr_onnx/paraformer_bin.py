@@ -4,7 +4,7 @@
 
 import os.path
 from pathlib import Path
-from typing import List, Union, Tuple
+from typing import Iterator, List, Union, Tuple
 import json
 
 import copy
@@ -21,6 +21,7 @@ from .utils.utils import (
     read_yaml,
 )
 from .utils.postprocess_utils import sentence_postprocess, sentence_postprocess_sentencepiece
+from .utils.batching import plan_length_buckets
 from .utils.frontend import WavFrontend
 from .utils.timestamp_utils import time_stamp_lfr6_onnx
 from .utils.utils import pad_list
@@ -44,6 +45,8 @@ class Paraformer:
         quantize: bool = False,
         intra_op_num_threads: int = 4,
         cache_dir: str = None,
+        batch_size_s: float = 0,
+        batch_size_threshold_s: float = 60,
         **kwargs,
     ):
         if not Path(model_dir).exists():
@@ -85,6 +88,8 @@ class Paraformer:
             model_file, device_id, intra_op_num_threads=intra_op_num_threads
         )
         self.batch_size = batch_size
+        self.batch_size_s = batch_size_s
+        self.batch_size_threshold_s = batch_size_threshold_s
         self.plot_timestamp_to = plot_timestamp_to
         if "predictor_bias" in config["model_conf"].keys():
             self.pred_bias = config["model_conf"]["predictor_bias"]
@@ -96,55 +101,91 @@ class Paraformer:
             self.language = None
 
     def __call__(self, wav_content: Union[str, np.ndarray, List[str]], **kwargs) -> List:
+        batch_size_s = kwargs.get("batch_size_s", self.batch_size_s)
+        if batch_size_s:
+            asr_res = []
+            for index, res in self.infer_bucketed(wav_content, **kwargs):
+                asr_res.extend([None] * (index + 1 - len(asr_res)))
+                asr_res[index] = res
+            return asr_res
+
         waveform_list = self.load_data(wav_content, self.frontend.opts.frame_opts.samp_freq)
         waveform_nums = len(waveform_list)
         asr_res = []
         for beg_idx in range(0, waveform_nums, self.batch_size):
-
             end_idx = min(waveform_nums, beg_idx + self.batch_size)
-            feats, feats_len = self.extract_feat(waveform_list[beg_idx:end_idx])
-            try:
-                outputs = self.infer(feats, feats_len)
-                am_scores, valid_token_lens = outputs[0], outputs[1]
-                if len(outputs) == 4:
-                    # for BiCifParaformer Inference
-                    us_alphas, us_peaks = outputs[2], outputs[3]
-                else:
-                    us_alphas, us_peaks = None, None
-            except ONNXRuntimeError:
-                # logging.warning(traceback.format_exc())
-                logging.warning("input wav is silence or noise")
-                preds = [""]
+            asr_res.extend(self.infer_batch(waveform_list[beg_idx:end_idx]))
+        return asr_res
+
+    def infer_bucketed(
+        self, wav_content: Union[str, np.ndarray, List[str]], **kwargs
+    ) -> Iterator[Tuple[int, dict]]:
+        """Length-bucketed batch inference, yielding (input index, result) per finished batch.
+
+        Inputs are sorted by duration and packed so that each batch's padded duration stays
+        within batch_size_s seconds; inputs of at least batch_size_threshold_s seconds run
+        alone. Results arrive shortest batch first; the index restores the input order.
+        """
+        fs = self.frontend.opts.frame_opts.samp_freq
+        batch_size_s = kwargs.get("batch_size_s", self.batch_size_s) or 300
+        threshold_s = kwargs.get("batch_size_threshold_s", self.batch_size_threshold_s)
+        waveform_list = self.load_data(wav_content, fs)
+        batches = plan_length_buckets(
+            [len(waveform) for waveform in waveform_list],
+            int(batch_size_s * fs),
+            int(threshold_s * fs) if threshold_s else None,
+        )
+        for batch in batches:
+            results = self.infer_batch([waveform_list[i] for i in batch])
+            if len(results) != len(batch):
+                # onnxruntime rejected the batch (silence or noise)
+                results = [{"preds": ""} for _ in batch]
+            for index, res in zip(batch, results):
+                yield index, res
+
+    def infer_batch(self, waveform_list: List[np.ndarray]) -> List[dict]:
+        asr_res = []
+        feats, feats_len = self.extract_feat(waveform_list)
+        try:
+            outputs = self.infer(feats, feats_len)
+            am_scores, valid_token_lens = outputs[0], outputs[1]
+            if len(outputs) == 4:
+                # for BiCifParaformer Inference
+                us_alphas, us_peaks = outputs[2], outputs[3]
             else:
-                preds = self.decode(am_scores, valid_token_lens)
-                if us_peaks is None:
-                    for pred in preds:
-                        if self.language == "en-bpe":
-                            pred = sentence_postprocess_sentencepiece(pred)
-                        else:
-                            pred = sentence_postprocess(pred)
-                        asr_res.append({"preds": pred})
-                else:
-                    for pred, us_peaks_ in zip(preds, us_peaks):
-                        raw_tokens = pred
-                        timestamp, timestamp_raw = time_stamp_lfr6_onnx(
-                            us_peaks_, copy.copy(raw_tokens)
-                        )
-                        text_proc, timestamp_proc, _ = sentence_postprocess(
-                            raw_tokens, timestamp_raw
-                        )
-                        # logging.warning(timestamp)
-                        if len(self.plot_timestamp_to):
-                            self.plot_wave_timestamp(
-                                waveform_list[0], timestamp, self.plot_timestamp_to
-                            )
-                        asr_res.append(
-                            {
-                                "preds": text_proc,
-                                "timestamp": timestamp_proc,
-                                "raw_tokens": raw_tokens,
-                            }
+                us_alphas, us_peaks = None, None
+        except ONNXRuntimeError:
+            # logging.warning(traceback.format_exc())
+            logging.warning("input wav is silence or noise")
+            preds = [""]
+        else:
+            preds = self.decode(am_scores, valid_token_lens)
+            if us_peaks is None:
+                for pred in preds:
+                    if self.language == "en-bpe":
+                        pred = sentence_postprocess_sentencepiece(pred)
+                    else:
+                        pred = sentence_postprocess(pred)
+                    asr_res.append({"preds": pred})
+            else:
+                for pred, us_peaks_ in zip(preds, us_peaks):
+                    raw_tokens = pred
+                    timestamp, timestamp_raw = time_stamp_lfr6_onnx(
+                        us_peaks_, copy.copy(raw_tokens)
+                    )
+                    text_proc, timestamp_proc, _ = sentence_postprocess(raw_tokens, timestamp_raw)
+                    # logging.warning(timestamp)
+                    if len(self.plot_timestamp_to):
+                        self.plot_wave_timestamp(
+                            waveform_list[0], timestamp, self.plot_timestamp_to
                         )
+                    asr_res.append(
+                        {
+                            "preds": text_proc,
+                            "timestamp": timestamp_proc,
+                            "raw_tokens": raw_tokens,
+                        }
+                    )
         return asr_res
 
     def plot_wave_timestamp(self, wav, text_timestamp, dest):
@@ -220,13 +261,10 @@ class Paraformer:
 
     @staticmethod
     def pad_feats(feats: List[np.ndarray], max_feat_len: int) -> np.ndarray:
-        def pad_feat(feat: np.ndarray, cur_len: int) -> np.ndarray:
-            pad_width = ((0, max_feat_len - cur_len), (0, 0))
-            return np.pad(feat, pad_width, "constant", constant_values=0)
-
-        feat_res = [pad_feat(feat, feat.shape[0]) for feat in feats]
-        feats = np.array(feat_res).astype(np.float32)
-        return feats
+        feats_pad = np.zeros((len(feats), max_feat_len, feats[0].shape[1]), dtype=np.float32)
+        for i, feat in enumerate(feats):
+            feats_pad[i, : feat.shape[0]] = feat
+        return feats_pad
 
     def infer(self, feats: np.ndarray, feats_len: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
         outputs = self.ort_infer([feats, feats_len])
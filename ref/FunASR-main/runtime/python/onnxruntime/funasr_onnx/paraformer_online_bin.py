@@ -18,6 +18,7 @@ from .utils.utils import (
     read_yaml,
 )
 from .utils.postprocess_utils import sentence_postprocess
+from .utils.cif import cif_integrate
 from .utils.frontend import WavFrontendOnline, SinusoidalPositionEncoderOnline
 
 logging = get_logger()
@@ -281,11 +282,6 @@ class Paraformer:
 
     def cif_search(self, hidden, alphas, cache=None):
         batch_size, len_time, hidden_size = hidden.shape
-        token_length = []
-        list_fires = []
-        list_frames = []
-        cache_alphas = []
-        cache_hiddens = []
         alphas[:, : self.chunk_size[0]] = 0.0
         alphas[:, sum(self.chunk_size[:2]) :] = 0.0
         if cache is not None and "cif_alphas" in cache and "cif_hidden" in cache:
@@ -298,50 +294,10 @@ class Paraformer:
             hidden = np.concatenate((hidden, tail_hidden), axis=1)
             alphas = np.concatenate((alphas, tail_alphas), axis=1)
 
-        len_time = alphas.shape[1]
-        for b in range(batch_size):
-            integrate = 0.0
-            frames = np.zeros(hidden_size).astype(np.float32)
-            list_frame = []
-            list_fire = []
-            for t in range(len_time):
-                alpha = alphas[b][t]
-                if alpha + integrate < self.cif_threshold:
-                    integrate += alpha
-                    list_fire.append(integrate)
-                    frames += alpha * hidden[b][t]
-                else:
-                    frames += (self.cif_threshold - integrate) * hidden[b][t]
-                    list_frame.append(frames)
-                    integrate += alpha
-                    list_fire.append(integrate)
-                    integrate -= self.cif_threshold
-                    frames = integrate * hidden[b][t]
-
-            cache_alphas.append(integrate)
-            if integrate > 0.0:
-                cache_hiddens.append(frames / integrate)
-            else:
-                cache_hiddens.append(frames)
-
-            token_length.append(len(list_frame))
-            list_fires.append(list_fire)
-            list_frames.append(list_frame)
-
-        max_token_len = max(token_length)
-        list_ls = []
-        for b in range(batch_size):
-            pad_frames = np.zeros((max_token_len - token_length[b], hidden_size)).astype(np.float32)
-            if token_length[b] == 0:
-                list_ls.append(pad_frames)
-            else:
-                list_ls.append(np.concatenate((list_frames[b], pad_frames), axis=0))
-
-        cache["cif_alphas"] = np.stack(cache_alphas, axis=0)
-        cache["cif_alphas"] = np.expand_dims(cache["cif_alphas"], axis=0)
-        cache["cif_hidden"] = np.stack(cache_hiddens, axis=0)
-        cache["cif_hidden"] = np.expand_dims(cache["cif_hidden"], axis=0)
-
-        return np.stack(list_ls, axis=0).astype(np.float32), np.stack(token_length, axis=0).astype(
-            np.int32
+        acoustic_embeds, token_length, cache_alphas, cache_hidden = cif_integrate(
+            hidden, alphas, self.cif_threshold
         )
+        if cache is not None:
+            cache["cif_alphas"] = cache_alphas
+            cache["cif_hidden"] = cache_hidden
+        return acoustic_embeds, token_length
@@ -0,0 +1,33 @@
+# -*- encoding: utf-8 -*-
+# Copyright FunASR (https://github.com/alibaba-damo-academy/FunASR). All Rights Reserved.
+#  MIT License  (https://opensource.org/licenses/MIT)
+
+from typing import List, Sequence
+
+
+def plan_length_buckets(
+    lengths: Sequence[int], batch_budget: int, single_threshold: int = None
+) -> List[List[int]]:
+    """Group item indices into batches of similar length, shortest first.
+
+    Items are sorted by length and a batch keeps growing while its padded size
+    (longest item * item count) stays within batch_budget, the same rule as
+    AutoModel.inference_with_vad with batch_size_s. Items of at least
+    single_threshold run in a batch of their own. Every batch holds at least one
+    item, so an item longer than the budget still gets decoded.
+
+    Returns lists of original indices; batches are in ascending length order.
+    """
+    order = sorted(range(len(lengths)), key=lambda i: lengths[i])
+    batches = []
+    batch = []
+    for i in order:
+        length = lengths[i]
+        alone = single_threshold is not None and length >= single_threshold
+        if batch and (alone or length * (len(batch) + 1) > batch_budget):
+            batches.append(batch)
+            batch = []
+        batch.append(i)
+    if batch:
+        batches.append(batch)
+    return batches
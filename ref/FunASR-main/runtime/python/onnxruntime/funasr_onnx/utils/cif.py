@@ -0,0 +1,87 @@
+# -*- encoding: utf-8 -*-
+# Copyright FunASR (https://github.com/alibaba-damo-academy/FunASR). All Rights Reserved.
+#  MIT License  (https://opensource.org/licenses/MIT)
+
+from typing import Tuple
+
+import numpy as np
+
+
+def cif_fire_points(alphas: np.ndarray, threshold: float) -> Tuple[np.ndarray, np.ndarray]:
+    """Locate CIF fire frames for a (batch, time) alphas array.
+
+    Returns (fires, integrate): a bool mask of the frames where a token fires and
+    the integrated weight left over after each frame. Matches the sequential
+    search, which fires at most once per frame and carries the remainder.
+    """
+    if alphas.size == 0 or alphas.max() <= threshold:
+        # at most one boundary per frame: the fire count is floor(cumsum / threshold)
+        csum = np.cumsum(alphas, axis=1, dtype=np.float64)
+        fired = np.floor(csum / threshold)
+        integrate = np.maximum(csum - fired * threshold, 0.0)
+        fires = np.empty(alphas.shape, dtype=bool)
+        fires[:, :1] = fired[:, :1] > 0
+        np.greater(fired[:, 1:], fired[:, :-1], out=fires[:, 1:])
+        return fires, integrate
+
+    # an alpha above the threshold crosses several boundaries but fires once,
+    # so walk the time axis (still vectorised over the batch)
+    fires = np.empty(alphas.shape, dtype=bool)
+    integrate = np.empty(alphas.shape)
+    acc = np.zeros(alphas.shape[0])
+    for t in range(alphas.shape[1]):
+        acc = acc + alphas[:, t].astype(np.float64)
+        fires[:, t] = acc >= threshold
+        acc = acc - threshold * fires[:, t]
+        integrate[:, t] = acc
+    return fires, integrate
+
+
+def cif_integrate(
+    hidden: np.ndarray, alphas: np.ndarray, threshold: float
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Continuous integrate-and-fire over a batch of encoder frames.
+
+    Args:
+        hidden: (batch, time, dim) encoder output, cached frame first if any.
+        alphas: (batch, time) predictor weights.
+        threshold: CIF firing threshold.
+
+    Returns:
+        embeds: (batch, max_tokens, dim) float32 acoustic embeddings, zero padded.
+        token_num: (batch,) int32 number of fired tokens.
+        cache_alphas: (batch, 1) float32 weight integrated since the last fire.
+        cache_hidden: (batch, 1, dim) float32 mean hidden of that remainder, so that
+            prepending both to the next chunk resumes the search.
+    """
+    batch_size, len_time, hidden_size = hidden.shape
+    fires, integrate = cif_fire_points(alphas, threshold)
+    token_num = fires.sum(axis=1)
+    max_tokens = int(token_num.max()) if batch_size else 0
+
+    # every frame feeds the token being integrated; a fire frame completes it with
+    # (threshold - carried weight) and starts the next one with its remainder
+    prev_integrate = np.zeros_like(integrate)
+    prev_integrate[:, 1:] = integrate[:, :-1]
+    token_idx = (np.cumsum(fires, axis=1) - fires)[:, None, :]
+    current = np.where(fires, threshold - prev_integrate, alphas)[:, None, :]
+    carried = np.where(fires, integrate, 0.0)[:, None, :]
+    tokens = np.arange(max_tokens + 1)[None, :, None]
+    weights = np.where(tokens == token_idx, current, 0.0)
+    weights += np.where(tokens == token_idx + 1, carried, 0.0)
+    frames = np.matmul(weights.astype(np.float32), hidden)
+
+    batch_idx = np.arange(batch_size)
+    cache_alphas = integrate[:, -1] if len_time else np.zeros(batch_size)
+    cache_hidden = frames[batch_idx, token_num]
+    remain = cache_alphas > 0.0
+    cache_hidden[remain] /= cache_alphas[remain, None]
+
+    embeds = frames[:, :max_tokens]
+    embeds[np.arange(max_tokens)[None, :] >= token_num[:, None]] = 0.0
+    return (
+        embeds,
+        token_num.astype(np.int32),
+        cache_alphas.astype(np.float32)[:, None],
+        cache_hidden[:, None, :],
+    )
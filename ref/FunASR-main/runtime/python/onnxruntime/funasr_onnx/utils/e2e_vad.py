@@ -7,6 +7,7 @@ from typing import List, Tuple, Dict, Any
 
 import math
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
 
 
 class VadStateMachine(Enum):
@@ -101,10 +102,12 @@ class VADXOptions:
 
 
 class E2EVadSpeechBufWithDoa(object):
+    """Output segment record; audio is accounted as a sample count, never copied."""
+
     def __init__(self):
         self.start_ms = 0
         self.end_ms = 0
-        self.buffer = []
+        self.sample_num = 0
         self.contain_seg_start_point = False
         self.contain_seg_end_point = False
         self.doa = 0
@@ -112,7 +115,7 @@ class E2EVadSpeechBufWithDoa(object):
     def Reset(self):
         self.start_ms = 0
         self.end_ms = 0
-        self.buffer = []
+        self.sample_num = 0
         self.contain_seg_start_point = False
         self.contain_seg_end_point = False
         self.doa = 0
@@ -204,6 +207,33 @@ class WindowDetector(object):
         return int(self.frame_size_ms)
 
 
+def running_noise_average(decibel: np.ndarray, init: float, frame_num: int) -> np.ndarray:
+    """Running noise average after each noise frame, in closed form.
+
+    Vectorises x_k = (d_k + x_{k-1} * (frame_num - 1)) / frame_num, where the first frame
+    replaces the -100 dB initial value. x_k = a^k * (x_0 + (1 - a) * sum_j d_j * a^-j) with
+    a = (frame_num - 1) / frame_num; evaluated in short blocks so a^-j stays well conditioned.
+    """
+    out = np.empty(len(decibel))
+    if len(decibel) == 0:
+        return out
+    prev = init
+    start = 0
+    if prev < -99.9:
+        out[0] = prev = decibel[0]
+        start = 1
+    a = (frame_num - 1) / frame_num
+    if a == 0:
+        out[start:] = decibel[start:]
+        return out
+    for beg in range(start, len(decibel), 64):
+        d = decibel[beg : beg + 64]
+        powers = a ** np.arange(1, len(d) + 1)
+        out[beg : beg + len(d)] = powers * (prev + (1 - a) * np.cumsum(d / powers))
+        prev = out[beg + len(d) - 1]
+    return out
+
+
 class E2EVadModel:
     """
     Author: Speech Lab of DAMO Academy, Alibaba Group
@@ -213,6 +243,7 @@ class E2EVadModel:
 
     def __init__(self, vad_post_args: Dict[str, Any]):
         super(E2EVadModel, self).__init__()
+        self.vad_post_args = vad_post_args
         self.vad_opts = VADXOptions(**vad_post_args)
         self.windows_detector = WindowDetector(
             self.vad_opts.window_size_ms,
@@ -248,10 +279,12 @@ class E2EVadModel:
         self.scores = None
         self.idx_pre_chunk = 0
         self.max_time_out = False
-        self.decibel = []
+        self.decibel = np.empty(0, dtype=np.float32)
+        self.decibel_len = 0
         self.data_buf_size = 0
         self.data_buf_all_size = 0
         self.waveform = None
+        self.batch_vads = []
         self.ResetDetection()
 
     def AllResetDetection(self):
@@ -281,7 +314,8 @@ class E2EVadModel:
         self.scores = None
         self.idx_pre_chunk = 0
         self.max_time_out = False
-        self.decibel = []
+        self.decibel = np.empty(0, dtype=np.float32)
+        self.decibel_len = 0
         self.data_buf_size = 0
         self.data_buf_all_size = 0
         self.waveform = None
@@ -306,16 +340,23 @@ class E2EVadModel:
             self.data_buf_size = self.data_buf_all_size
         else:
             self.data_buf_all_size += len(self.waveform[0])
-        for offset in range(
-            0, self.waveform.shape[1] - frame_sample_length + 1, frame_shift_length
-        ):
-            self.decibel.append(
-                10
-                * math.log10(
-                    np.square((self.waveform[0][offset : offset + frame_sample_length])).sum()
-                    + 0.000001
-                )
-            )
+        waveform = self.waveform[0]
+        if len(waveform) < frame_sample_length:
+            return
+        # strided (frames, frame_sample_length) view over the waveform, no copy
+        frames = sliding_window_view(waveform, frame_sample_length)[::frame_shift_length]
+        energy = np.einsum("ij,ij->i", frames, frames)
+        self.AppendDecibel(10 * np.log10(energy + 0.000001))
+
+    def AppendDecibel(self, decibel: np.ndarray) -> None:
+        end = self.decibel_len + len(decibel)
+        if end > len(self.decibel):
+            # grow geometrically so streaming calls append in amortised O(1)
+            grown = np.empty(max(end, 2 * len(self.decibel)), dtype=np.float32)
+            grown[: self.decibel_len] = self.decibel[: self.decibel_len]
+            self.decibel = grown
+        self.decibel[self.decibel_len : end] = decibel
+        self.decibel_len = end
 
     def ComputeScores(self, scores: np.ndarray) -> None:
         # scores = self.encoder(feats, in_cache)  # return B * T * D
@@ -323,15 +364,12 @@ class E2EVadModel:
         self.frm_cnt += scores.shape[1]  # count total frames
         self.scores = scores
 
-    def PopDataBufTillFrame(self, frame_idx: int) -> None:  # need check again
-        while self.data_buf_start_frame < frame_idx:
-            if self.data_buf_size >= int(
+    def PopDataBufTillFrame(self, frame_idx: int) -> None:
+        if self.data_buf_start_frame < frame_idx:
+            self.data_buf_start_frame = frame_idx
+            self.data_buf_size = self.data_buf_all_size - self.data_buf_start_frame * int(
                 self.vad_opts.frame_in_ms * self.vad_opts.sample_rate / 1000
-            ):
-                self.data_buf_start_frame += 1
-                self.data_buf_size = self.data_buf_all_size - self.data_buf_start_frame * int(
-                    self.vad_opts.frame_in_ms * self.vad_opts.sample_rate / 1000
-                )
+            )
 
     def PopDataToOutputBuf(
         self,
@@ -368,7 +406,6 @@ class E2EVadModel:
         cur_seg = self.output_data_buf[-1]
         if cur_seg.end_ms != start_frm * self.vad_opts.frame_in_ms:
             print("warning\n")
-        out_pos = len(cur_seg.buffer)  # cur_seg.buff现在没做任何操作
         data_to_pop = 0
         if end_point_is_sent_end:
             data_to_pop = expected_sample_number
@@ -382,12 +419,8 @@ class E2EVadModel:
             expected_sample_number = self.data_buf_size
 
         cur_seg.doa = 0
-        for sample_cpy_out in range(0, data_to_pop):
-            # cur_seg.buffer[out_pos ++] = data_buf_.back();
-            out_pos += 1
-        for sample_cpy_out in range(data_to_pop, expected_sample_number):
-            # cur_seg.buffer[out_pos++] = data_buf_.back()
-            out_pos += 1
+        # samples are only counted: data_to_pop from the buffer, padded up to expected_sample_number
+        cur_seg.sample_num += max(data_to_pop, expected_sample_number)
         if cur_seg.end_ms != start_frm * self.vad_opts.frame_in_ms:
             print("Something wrong with the VAD algorithm\n")
         self.data_buf_start_frame += frm_cnt
@@ -408,6 +441,13 @@ class E2EVadModel:
         self.latest_confirmed_speech_frame = valid_frame
         self.PopDataToOutputBuf(valid_frame, 1, False, False, False)
 
+    def OnVoiceDetectedRange(self, start_frame: int, end_frame: int) -> None:
+        """OnVoiceDetected for every frame in [start_frame, end_frame) with a single pop."""
+        if start_frame >= end_frame:
+            return
+        self.latest_confirmed_speech_frame = end_frame - 1
+        self.PopDataToOutputBuf(start_frame, end_frame - start_frame, False, False, False)
+
     def OnVoiceStart(self, start_frame: int, fake_result: bool = False) -> None:
         if self.vad_opts.do_start_point_detection:
             pass
@@ -423,8 +463,7 @@ class E2EVadModel:
             self.PopDataToOutputBuf(self.confirmed_start_frame, 1, True, False, False)
 
     def OnVoiceEnd(self, end_frame: int, fake_result: bool, is_last_frame: bool) -> None:
-        for t in range(self.latest_confirmed_speech_frame + 1, end_frame):
-            self.OnVoiceDetected(t)
+        self.OnVoiceDetectedRange(self.latest_confirmed_speech_frame + 1, end_frame)
         if self.vad_opts.do_end_point_detection:
             pass
         if self.confirmed_end_frame != -1:
@@ -450,53 +489,65 @@ class E2EVadModel:
             vad_latency += int(self.vad_opts.lookback_time_start_point / self.vad_opts.frame_in_ms)
         return vad_latency
 
-    def GetFrameState(self, t: int) -> FrameState:
-        frame_state = FrameState.kFrameStateInvalid
-        cur_decibel = self.decibel[t]
-        cur_snr = cur_decibel - self.noise_average_decibel
-        # for each frame, calc log posterior probability of each state
-        if cur_decibel < self.vad_opts.decibel_thres:
-            frame_state = FrameState.kFrameStateSil
-            self.DetectOneFrame(frame_state, t, False)
-            return frame_state
-
-        sum_score = 0.0
-        noise_prob = 0.0
-        assert len(self.sil_pdf_ids) == self.vad_opts.silence_pdf_num
-        if len(self.sil_pdf_ids) > 0:
-            assert len(self.scores) == 1  # 只支持batch_size = 1的测试
-            sil_pdf_scores = [
-                self.scores[0][t - self.idx_pre_chunk][sil_pdf_id]
-                for sil_pdf_id in self.sil_pdf_ids
+    @staticmethod
+    def GetBatchFrameStates(vads: List["E2EVadModel"]) -> List[Tuple]:
+        """Classify the current score block of every model in one NumPy pass.
+
+        All models must hold a block of the same size (one row each of a batch).
+        Returns (is_speech, low_decibel, probs) per model: boolean arrays, where
+        low_decibel frames are below decibel_thres and never reach the score
+        comparison, and probs is (noise_prob, speech_prob, score) when
+        output_frame_probs is set, else None. The running noise average of each
+        model is updated.
+        """
+        head = vads[0]
+        opts = head.vad_opts
+        block = opts.nn_eval_block_size
+        beg = head.frm_cnt - block
+        assert len(head.sil_pdf_ids) == opts.silence_pdf_num
+        decibel = np.stack([vad.decibel[beg : vad.frm_cnt] for vad in vads]).astype(np.float64)
+        scores = np.concatenate(
+            [
+                vad.scores[:, beg - vad.idx_pre_chunk : vad.frm_cnt - vad.idx_pre_chunk]
+                for vad in vads
             ]
-            sum_score = sum(sil_pdf_scores)
-            noise_prob = math.log(sum_score) * self.vad_opts.speech_2_noise_ratio
-            total_score = 1.0
-            sum_score = total_score - sum_score
-        speech_prob = math.log(sum_score)
-        if self.vad_opts.output_frame_probs:
-            frame_prob = E2EVadFrameProb()
-            frame_prob.noise_prob = noise_prob
-            frame_prob.speech_prob = speech_prob
-            frame_prob.score = sum_score
-            frame_prob.frame_id = t
-            self.frame_probs.append(frame_prob)
-        if math.exp(speech_prob) >= math.exp(noise_prob) + self.speech_noise_thres:
-            if cur_snr >= self.vad_opts.snr_thres and cur_decibel >= self.vad_opts.decibel_thres:
-                frame_state = FrameState.kFrameStateSpeech
-            else:
-                frame_state = FrameState.kFrameStateSil
-        else:
-            frame_state = FrameState.kFrameStateSil
-            if self.noise_average_decibel < -99.9:
-                self.noise_average_decibel = cur_decibel
+        )
+        low = decibel < opts.decibel_thres
+        with np.errstate(divide="ignore"):
+            if len(head.sil_pdf_ids) > 0:
+                sum_score = scores[:, :, head.sil_pdf_ids].sum(axis=-1)
+                noise_prob = np.log(sum_score.astype(np.float64)) * opts.speech_2_noise_ratio
+                sum_score = 1.0 - sum_score
             else:
-                self.noise_average_decibel = (
-                    cur_decibel
-                    + self.noise_average_decibel * (self.vad_opts.noise_frame_num_used_for_snr - 1)
-                ) / self.vad_opts.noise_frame_num_used_for_snr
-
-        return frame_state
+                sum_score = np.zeros(decibel.shape, dtype=np.float32)
+                noise_prob = np.zeros(decibel.shape)
+            speech_prob = np.log(sum_score.astype(np.float64))
+        score_speech = np.exp(speech_prob) >= np.exp(noise_prob) + head.speech_noise_thres
+        noise = ~score_speech & ~low
+
+        results = []
+        for b, vad in enumerate(vads):
+            # the noise average only moves on noise frames, so its value before every frame is
+            # a forward fill of the running average over the noise frames seen so far
+            init = vad.noise_average_decibel
+            averages = running_noise_average(
+                decibel[b][noise[b]], init, opts.noise_frame_num_used_for_snr
+            )
+            before = np.full(decibel.shape[1], init)
+            if len(averages) > 0:
+                seen = np.cumsum(noise[b]) - noise[b]
+                before[seen > 0] = averages[seen[seen > 0] - 1]
+            is_speech = score_speech[b] & (decibel[b] - before >= opts.snr_thres) & ~low[b]
+            if len(averages) > 0:
+                vad.noise_average_decibel = float(averages[-1])
+            probs = None
+            if opts.output_frame_probs:
+                probs = (noise_prob[b], speech_prob[b], sum_score[b])
+            results.append((is_speech, low[b], probs))
+        return results
+
+    def GetFrameStates(self) -> Tuple:
+        return E2EVadModel.GetBatchFrameStates([self])[0]
 
     def __call__(
         self,
@@ -506,6 +557,8 @@ class E2EVadModel:
         max_end_sil: int = 800,
         online: bool = False,
     ):
+        if score.shape[0] > 1:
+            return self.CallBatch(score, waveform, is_final, max_end_sil, online)
         self.max_end_sil_frame_cnt_thresh = max_end_sil - self.vad_opts.speech_to_sil_time_thres
         self.waveform = waveform  # compute decibel for each frame
         self.ComputeDecibel()
@@ -515,65 +568,112 @@ class E2EVadModel:
         else:
             self.DetectLastFrames()
         segments = []
-        for batch_num in range(0, score.shape[0]):  # only support batch_size = 1 now
-            segment_batch = []
-            if len(self.output_data_buf) > 0:
-                for i in range(self.output_data_buf_offset, len(self.output_data_buf)):
-                    if online:
-                        if not self.output_data_buf[i].contain_seg_start_point:
-                            continue
-                        if not self.next_seg and not self.output_data_buf[i].contain_seg_end_point:
-                            continue
-                        start_ms = self.output_data_buf[i].start_ms if self.next_seg else -1
-                        if self.output_data_buf[i].contain_seg_end_point:
-                            end_ms = self.output_data_buf[i].end_ms
-                            self.next_seg = True
-                            self.output_data_buf_offset += 1
-                        else:
-                            end_ms = -1
-                            self.next_seg = False
-                    else:
-                        if not is_final and (
-                            not self.output_data_buf[i].contain_seg_start_point
-                            or not self.output_data_buf[i].contain_seg_end_point
-                        ):
-                            continue
-                        start_ms = self.output_data_buf[i].start_ms
-                        end_ms = self.output_data_buf[i].end_ms
-                        self.output_data_buf_offset += 1
-                    segment = [start_ms, end_ms]
-                    segment_batch.append(segment)
-
-            if segment_batch:
-                segments.append(segment_batch)
+        segment_batch = self.CollectSegments(is_final, online)
+        if segment_batch:
+            segments.append(segment_batch)
         if is_final:
             # reset class variables and clear the dict for the next query
             self.AllResetDetection()
         return segments
 
-    def DetectCommonFrames(self) -> int:
+    def CallBatch(
+        self,
+        score: np.ndarray,
+        waveform: np.ndarray,
+        is_final: bool,
+        max_end_sil: int,
+        online: bool,
+    ) -> List[List[List[int]]]:
+        """Run a batch of utterances (one row of score/waveform each).
+
+        Frame classification runs over the whole batch at once; every row keeps its own
+        state machine in a per-row E2EVadModel. Returns one segment list per row.
+        """
+        if len(self.batch_vads) != score.shape[0]:
+            self.batch_vads = [E2EVadModel(self.vad_post_args) for _ in range(score.shape[0])]
+        for b, vad in enumerate(self.batch_vads):
+            vad.max_end_sil_frame_cnt_thresh = max_end_sil - vad.vad_opts.speech_to_sil_time_thres
+            vad.waveform = waveform[b : b + 1]
+            vad.ComputeDecibel()
+            vad.ComputeScores(score[b : b + 1])
+        active = [
+            vad
+            for vad in self.batch_vads
+            if vad.vad_state_machine != VadStateMachine.kVadInStateEndPointDetected
+        ]
+        frame_states = E2EVadModel.GetBatchFrameStates(active) if active else []
+        for vad, states in zip(active, frame_states):
+            if not is_final:
+                vad.DetectCommonFrames(states)
+            else:
+                vad.DetectLastFrames(states)
+        segments = [vad.CollectSegments(is_final, online) for vad in self.batch_vads]
+        if is_final:
+            self.batch_vads = []
+        return segments
+
+    def CollectSegments(self, is_final: bool, online: bool) -> List[List[int]]:
+        segment_batch = []
+        if len(self.output_data_buf) > 0:
+            for i in range(self.output_data_buf_offset, len(self.output_data_buf)):
+                if online:
+                    if not self.output_data_buf[i].contain_seg_start_point:
+                        continue
+                    if not self.next_seg and not self.output_data_buf[i].contain_seg_end_point:
+                        continue
+                    start_ms = self.output_data_buf[i].start_ms if self.next_seg else -1
+                    if self.output_data_buf[i].contain_seg_end_point:
+                        end_ms = self.output_data_buf[i].end_ms
+                        self.next_seg = True
+                        self.output_data_buf_offset += 1
+                    else:
+                        end_ms = -1
+                        self.next_seg = False
+                else:
+                    if not is_final and (
+                        not self.output_data_buf[i].contain_seg_start_point
+                        or not self.output_data_buf[i].contain_seg_end_point
+                    ):
+                        continue
+                    start_ms = self.output_data_buf[i].start_ms
+                    end_ms = self.output_data_buf[i].end_ms
+                    self.output_data_buf_offset += 1
+                segment = [start_ms, end_ms]
+                segment_batch.append(segment)
+        return segment_batch
+
+    def DetectCommonFrames(self, frame_states: Tuple = None) -> int:
         if self.vad_state_machine == VadStateMachine.kVadInStateEndPointDetected:
             return 0
-        for i in range(self.vad_opts.nn_eval_block_size - 1, -1, -1):
-            frame_state = FrameState.kFrameStateInvalid
-            frame_state = self.GetFrameState(self.frm_cnt - 1 - i)
-            self.DetectOneFrame(frame_state, self.frm_cnt - 1 - i, False)
+        self.DetectFrames(frame_states or self.GetFrameStates(), False)
         self.idx_pre_chunk += self.scores.shape[1]
         return 0
 
-    def DetectLastFrames(self) -> int:
+    def DetectLastFrames(self, frame_states: Tuple = None) -> int:
         if self.vad_state_machine == VadStateMachine.kVadInStateEndPointDetected:
             return 0
-        for i in range(self.vad_opts.nn_eval_block_size - 1, -1, -1):
-            frame_state = FrameState.kFrameStateInvalid
-            frame_state = self.GetFrameState(self.frm_cnt - 1 - i)
-            if i != 0:
-                self.DetectOneFrame(frame_state, self.frm_cnt - 1 - i, False)
-            else:
-                self.DetectOneFrame(frame_state, self.frm_cnt - 1, True)
-
+        self.DetectFrames(frame_states or self.GetFrameStates(), True)
         return 0
 
+    def DetectFrames(self, frame_states: Tuple, is_final: bool) -> None:
+        """Feed a classified block through the sequential start/end point state machine."""
+        is_speech, low, probs = frame_states
+        beg = self.frm_cnt - len(is_speech)
+        last = len(is_speech) - 1
+        for i, (speech, low_decibel) in enumerate(zip(is_speech.tolist(), low.tolist())):
+            frame_state = FrameState.kFrameStateSpeech if speech else FrameState.kFrameStateSil
+            if low_decibel:
+                # low-energy frames are detected once on classification and once more below
+                self.DetectOneFrame(frame_state, beg + i, False)
+            elif probs is not None:
+                frame_prob = E2EVadFrameProb()
+                frame_prob.noise_prob = float(probs[0][i])
+                frame_prob.speech_prob = float(probs[1][i])
+                frame_prob.score = float(probs[2][i])
+                frame_prob.frame_id = beg + i
+                self.frame_probs.append(frame_prob)
+            self.DetectOneFrame(frame_state, beg + i, is_final and i == last)
+
     def DetectOneFrame(
         self, cur_frm_state: FrameState, cur_frm_idx: int, is_final_frame: bool
     ) -> None:
@@ -598,11 +698,9 @@ class E2EVadModel:
                 )
                 self.OnVoiceStart(start_frame)
                 self.vad_state_machine = VadStateMachine.kVadInStateInSpeechSegment
-                for t in range(start_frame + 1, cur_frm_idx + 1):
-                    self.OnVoiceDetected(t)
+                self.OnVoiceDetectedRange(start_frame + 1, cur_frm_idx + 1)
             elif self.vad_state_machine == VadStateMachine.kVadInStateInSpeechSegment:
-                for t in range(self.latest_confirmed_speech_frame + 1, cur_frm_idx):
-                    self.OnVoiceDetected(t)
+                self.OnVoiceDetectedRange(self.latest_confirmed_speech_frame + 1, cur_frm_idx)
                 if (
                     cur_frm_idx - self.confirmed_start_frame + 1
                     > self.vad_opts.max_single_segment_time / frm_shift_in_ms
@@ -659,8 +757,8 @@ class E2EVadModel:
                         > self.vad_opts.max_start_silence_time
                     )
                 ) or (is_final_frame and self.number_end_time_detected == 0):
-                    for t in range(self.lastest_confirmed_silence_frame + 1, cur_frm_idx):
-                        self.OnSilenceDetected(t)
+                    if self.lastest_confirmed_silence_frame + 1 < cur_frm_idx:
+                        self.OnSilenceDetected(cur_frm_idx - 1)
                     self.OnVoiceStart(0, True)
                     self.OnVoiceEnd(0, True, False)
                     self.vad_state_machine = VadStateMachine.kVadInStateEndPointDetected
@@ -5,6 +5,7 @@ import copy
 from functools import lru_cache
 
 import numpy as np
+from numpy.lib.stride_tricks import as_strided
 import kaldi_native_fbank as knf
 
 root_dir = Path(__file__).resolve().parent
@@ -47,44 +48,73 @@ class WavFrontend:
 
         if self.cmvn_file:
             self.cmvn = load_cmvn(self.cmvn_file)
+            self.cmvn_f32 = self.cmvn.astype(np.float32)
         self.fbank_fn = None
         self.fbank_beg_idx = 0
+        self.fbank_feats = None
         self.reset_status()
 
-    def fbank(self, waveform: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
-        waveform = waveform * (1 << 15)
+    def accept_waveform(self, fbank_fn: knf.OnlineFbank, waveform: np.ndarray) -> None:
+        """Feed samples to kaldi-native-fbank as one contiguous float32 buffer.
+
+        The binding converts any sequence element by element; a memoryview over a float32
+        array is the cheapest sequence it accepts (no waveform.tolist() round trip).
+        """
+        samples = np.asarray(waveform, dtype=np.float32) * (1 << 15)
+        fbank_fn.accept_waveform(self.opts.frame_opts.samp_freq, memoryview(samples))
+
+    @staticmethod
+    def read_frames(fbank_fn: knf.OnlineFbank, beg: int, end: int, out: np.ndarray) -> None:
+        """Copy frames [beg, end) into the float32 rows out[: end - beg]."""
+        for i in range(beg, end):
+            out[i - beg] = fbank_fn.get_frame(i)
+
+    def fbank(self, waveform: np.ndarray, out: np.ndarray = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Offline fbank; `out` is an optional preallocated (>= frames, num_bins) float32 buffer."""
         fbank_fn = knf.OnlineFbank(self.opts)
-        fbank_fn.accept_waveform(self.opts.frame_opts.samp_freq, waveform.tolist())
+        self.accept_waveform(fbank_fn, waveform)
         frames = fbank_fn.num_frames_ready
-        mat = np.empty([frames, self.opts.mel_opts.num_bins])
-        for i in range(frames):
-            mat[i, :] = fbank_fn.get_frame(i)
-        feat = mat.astype(np.float32)
-        feat_len = np.array(mat.shape[0]).astype(np.int32)
+        if out is None or out.shape[0] < frames:
+            out = np.empty([frames, self.opts.mel_opts.num_bins], dtype=np.float32)
+        feat = out[:frames]
+        self.read_frames(fbank_fn, 0, frames, feat)
+        feat_len = np.array(frames).astype(np.int32)
         return feat, feat_len
 
     def fbank_online(self, waveform: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
-        waveform = waveform * (1 << 15)
-        # self.fbank_fn = knf.OnlineFbank(self.opts)
-        self.fbank_fn.accept_waveform(self.opts.frame_opts.samp_freq, waveform.tolist())
+        """Streaming fbank; returns all frames since reset_status(), reading only new ones."""
+        self.accept_waveform(self.fbank_fn, waveform)
         frames = self.fbank_fn.num_frames_ready
-        mat = np.empty([frames, self.opts.mel_opts.num_bins])
-        for i in range(self.fbank_beg_idx, frames):
-            mat[i, :] = self.fbank_fn.get_frame(i)
-        # self.fbank_beg_idx += (frames-self.fbank_beg_idx)
-        feat = mat.astype(np.float32)
-        feat_len = np.array(mat.shape[0]).astype(np.int32)
+        if frames > self.fbank_feats.shape[0]:
+            # frames already emitted are never rewritten, so earlier results stay valid
+            grown = np.empty(
+                [max(frames, 2 * self.fbank_feats.shape[0]), self.opts.mel_opts.num_bins],
+                dtype=np.float32,
+            )
+            grown[: self.fbank_beg_idx] = self.fbank_feats[: self.fbank_beg_idx]
+            self.fbank_feats = grown
+        self.read_frames(
+            self.fbank_fn, self.fbank_beg_idx, frames, self.fbank_feats[self.fbank_beg_idx :]
+        )
+        # release emitted frames inside kaldi-native-fbank, frame indices stay absolute
+        self.fbank_fn.pop(frames - self.fbank_beg_idx)
+        self.fbank_beg_idx = frames
+        feat = self.fbank_feats[:frames]
+        feat_len = np.array(frames).astype(np.int32)
         return feat, feat_len
 
     def reset_status(self):
         self.fbank_fn = knf.OnlineFbank(self.opts)
         self.fbank_beg_idx = 0
+        self.fbank_feats = np.empty([0, self.opts.mel_opts.num_bins], dtype=np.float32)
 
     def lfr_cmvn(self, feat: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
         if self.lfr_m != 1 or self.lfr_n != 1:
             feat = self.apply_lfr(feat, self.lfr_m, self.lfr_n)
-
-        if self.cmvn_file:
+            if self.cmvn_file:
+                # the LFR output is a fresh float32 array, normalise it in place
+                feat = self.apply_cmvn(feat, out=feat)
+        elif self.cmvn_file:
             feat = self.apply_cmvn(feat)
 
         feat_len = np.array(feat.shape[0]).astype(np.int32)
@@ -92,36 +122,43 @@ class WavFrontend:
 
     @staticmethod
     def apply_lfr(inputs: np.ndarray, lfr_m: int, lfr_n: int) -> np.ndarray:
-        LFR_inputs = []
-
-        T = inputs.shape[0]
-        T_lfr = int(np.ceil(T / lfr_n))
-        left_padding = np.tile(inputs[0], ((lfr_m - 1) // 2, 1))
-        inputs = np.vstack((left_padding, inputs))
-        T = T + (lfr_m - 1) // 2
-        for i in range(T_lfr):
-            if lfr_m <= T - i * lfr_n:
-                LFR_inputs.append((inputs[i * lfr_n : i * lfr_n + lfr_m]).reshape(1, -1))
-            else:
-                # process last LFR frame
-                num_padding = lfr_m - (T - i * lfr_n)
-                frame = inputs[i * lfr_n :].reshape(-1)
-                for _ in range(num_padding):
-                    frame = np.hstack((frame, inputs[-1]))
+        T_lfr = int(np.ceil(inputs.shape[0] / lfr_n))
+        return stack_lfr_frames(inputs, lfr_m, lfr_n, T_lfr, (lfr_m - 1) // 2)
 
-                LFR_inputs.append(frame)
-        LFR_outputs = np.vstack(LFR_inputs).astype(np.float32)
-        return LFR_outputs
-
-    def apply_cmvn(self, inputs: np.ndarray) -> np.ndarray:
+    def apply_cmvn(self, inputs: np.ndarray, out: np.ndarray = None) -> np.ndarray:
         """
-        Apply CMVN with mvn data
+        Apply CMVN with mvn data, broadcasting the (dim,) mean/var rows over all frames.
+
+        The result is float32 and written into `out` when given (may be `inputs` itself).
         """
-        frame, dim = inputs.shape
-        means = np.tile(self.cmvn[0:1, :dim], (frame, 1))
-        vars = np.tile(self.cmvn[1:2, :dim], (frame, 1))
-        inputs = (inputs + means) * vars
-        return inputs
+        dim = inputs.shape[-1]
+        out = np.add(inputs, self.cmvn_f32[0, :dim], out=out, dtype=np.float32)
+        return np.multiply(out, self.cmvn_f32[1, :dim], out=out)
+
+
+def stack_lfr_frames(
+    inputs: np.ndarray, lfr_m: int, lfr_n: int, T_lfr: int, left_padding: int = 0
+) -> np.ndarray:
+    """Low frame rate stacking: output i concatenates lfr_m frames starting at i * lfr_n.
+
+    `left_padding` copies of the first frame are prepended, and windows running past the
+    end repeat the last frame. The windows are a strided view over the edge-padded input,
+    copied once into the (T_lfr, lfr_m * dim) float32 result.
+    """
+    dim = inputs.shape[1]
+    if T_lfr <= 0:
+        return np.empty((0, lfr_m * dim), dtype=np.float32)
+    need = (T_lfr - 1) * lfr_n + lfr_m
+    right_padding = max(0, need - left_padding - inputs.shape[0])
+    if left_padding or right_padding:
+        inputs = np.pad(inputs, ((left_padding, right_padding), (0, 0)), mode="edge")
+    inputs = np.ascontiguousarray(inputs[:need])
+    item = inputs.itemsize
+    windows = as_strided(
+        inputs, shape=(T_lfr, lfr_m * dim), strides=(lfr_n * dim * item, item), writeable=False
+    )
+    return windows.astype(np.float32)
+
 
 @lru_cache()
 def load_cmvn(cmvn_file: Union[str, Path]) -> np.ndarray:
@@ -191,30 +228,20 @@ class WavFrontendOnline(WavFrontend):
         Apply lfr with data
         """
 
-        LFR_inputs = []
         T = inputs.shape[0]  # include the right context
         T_lfr = int(
             np.ceil((T - (lfr_m - 1) // 2) / lfr_n)
         )  # minus the right context: (lfr_m - 1) // 2
         splice_idx = T_lfr
-        for i in range(T_lfr):
-            if lfr_m <= T - i * lfr_n:
-                LFR_inputs.append((inputs[i * lfr_n : i * lfr_n + lfr_m]).reshape(1, -1))
-            else:  # process last LFR frame
-                if is_final:
-                    num_padding = lfr_m - (T - i * lfr_n)
-                    frame = (inputs[i * lfr_n :]).reshape(-1)
-                    for _ in range(num_padding):
-                        frame = np.hstack((frame, inputs[-1]))
-                    LFR_inputs.append(frame)
-                else:
-                    # update splice_idx and break the circle
-                    splice_idx = i
-                    break
+        if not is_final:
+            # only full windows are emitted; the rest waits in the splice cache
+            full = (T - lfr_m) // lfr_n + 1 if T >= lfr_m else 0
+            splice_idx = min(T_lfr, full)
+            T_lfr = splice_idx
+        LFR_outputs = stack_lfr_frames(inputs, lfr_m, lfr_n, T_lfr)
         splice_idx = min(T - 1, splice_idx * lfr_n)
         lfr_splice_cache = inputs[splice_idx:, :]
-        LFR_outputs = np.vstack(LFR_inputs)
-        return LFR_outputs.astype(np.float32), lfr_splice_cache, splice_idx
+        return LFR_outputs, lfr_splice_cache, splice_idx
 
     @staticmethod
     def compute_frame_num(
@@ -255,15 +282,11 @@ class WavFrontendOnline(WavFrontend):
                         )
                     ]
                 )
-                waveform = waveform * (1 << 15)
-
-                self.fbank_fn.accept_waveform(self.opts.frame_opts.samp_freq, waveform.tolist())
+                self.accept_waveform(self.fbank_fn, waveform)
                 frames = self.fbank_fn.num_frames_ready
-                mat = np.empty([frames, self.opts.mel_opts.num_bins])
-                for i in range(frames):
-                    mat[i, :] = self.fbank_fn.get_frame(i)
-                feat = mat.astype(np.float32)
-                feat_len = np.array(mat.shape[0]).astype(np.int32)
+                feat = np.empty([frames, self.opts.mel_opts.num_bins], dtype=np.float32)
+                self.read_frames(self.fbank_fn, 0, frames, feat)
+                feat_len = np.array(frames).astype(np.int32)
                 feats.append(feat)
                 feats_lens.append(feat_len)
 
@@ -292,7 +315,9 @@ class WavFrontendOnline(WavFrontend):
                 mat, self.lfr_splice_cache[i], lfr_splice_frame_idx = self.apply_lfr(
                     mat, self.lfr_m, self.lfr_n, is_final
                 )
-            if self.cmvn_file is not None:
+                if self.cmvn_file is not None:
+                    mat = self.apply_cmvn(mat, out=mat)
+            elif self.cmvn_file is not None:
                 mat = self.apply_cmvn(mat)
             feat_length = mat.shape[0]
             feats.append(mat)
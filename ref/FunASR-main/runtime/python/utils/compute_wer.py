@@ -1,9 +1,30 @@
+import argparse
+import itertools
+import multiprocessing
 import os
-import numpy as np
 import sys
+from collections import deque
+
+import numpy as np
+
+# upper bound of the (hyp + 1) * (ref + 1) cells of a batch scored at once
+MAX_BATCH_CELLS = 2_000_000
+MAX_BATCH_SIZE = 256
+CHUNK_SIZE = 1000
+
+OP_CORRECT, OP_SUB, OP_INS, OP_DEL = 0, 1, 2, 3
 
 
-def compute_wer(ref_file, hyp_file, cer_detail_file):
+def compute_wer(ref_file, hyp_file, cer_detail_file, n_jobs=1, streaming=False):
+    """
+    Scores hyp_file against ref_file ("<key> <token> <token> ..." per line) and writes the
+    per-utterance breakdown and the totals to cer_detail_file.
+
+    Args:
+        n_jobs: number of scoring processes, -1 for all CPUs
+        streaming: read both files line by line instead of loading them into dicts; both
+            files must be sorted by key (e.g. LC_ALL=C sort)
+    """
     rst = {
         "Wrd": 0,
         "Corr": 0,
@@ -17,23 +38,18 @@ def compute_wer(ref_file, hyp_file, cer_detail_file):
         "wrong_sentences": 0,
     }
 
-    hyp_dict = {}
-    ref_dict = {}
-    with open(hyp_file, "r") as hyp_reader:
-        for line in hyp_reader:
-            key = line.strip().split()[0]
-            value = line.strip().split()[1:]
-            hyp_dict[key] = value
-    with open(ref_file, "r") as ref_reader:
-        for line in ref_reader:
-            key = line.strip().split()[0]
-            value = line.strip().split()[1:]
-            ref_dict[key] = value
+    if streaming:
+        items = read_sorted_pairs(hyp_file, ref_file)
+    else:
+        hyp_dict = read_text(hyp_file)
+        ref_dict = read_text(ref_file)
+        items = ((key, hyp_dict[key], ref_dict.get(key)) for key in hyp_dict)
 
+    num_hyp = 0
     cer_detail_writer = open(cer_detail_file, "w")
-    for hyp_key in hyp_dict:
-        if hyp_key in ref_dict:
-            out_item = compute_wer_by_line(hyp_dict[hyp_key], ref_dict[hyp_key])
+    for hyp_key, hyp, ref, out_item in score_items(items, n_jobs):
+        num_hyp += 1
+        if out_item is not None:
             rst["Wrd"] += out_item["nwords"]
             rst["Corr"] += out_item["cor"]
             rst["wrong_words"] += out_item["wrong"]
@@ -44,8 +60,8 @@ def compute_wer(ref_file, hyp_file, cer_detail_file):
             if out_item["wrong"] > 0:
                 rst["wrong_sentences"] += 1
             cer_detail_writer.write(hyp_key + print_cer_detail(out_item) + "\n")
-            cer_detail_writer.write("ref:" + "\t" + "".join(ref_dict[hyp_key]) + "\n")
-            cer_detail_writer.write("hyp:" + "\t" + "".join(hyp_dict[hyp_key]) + "\n")
+            cer_detail_writer.write("ref:" + "\t" + "".join(ref) + "\n")
+            cer_detail_writer.write("hyp:" + "\t" + "".join(hyp) + "\n")
 
     if rst["Wrd"] > 0:
         rst["Err"] = round(rst["wrong_words"] * 100 / rst["Wrd"], 2)
@@ -81,85 +97,202 @@ def compute_wer(ref_file, hyp_file, cer_detail_file):
     )
     cer_detail_writer.write(
         "Scored "
-        + str(len(hyp_dict))
+        + str(num_hyp)
         + " sentences, "
-        + str(len(hyp_dict) - rst["Snt"])
+        + str(num_hyp - rst["Snt"])
         + " not present in hyp."
         + "\n"
     )
+    cer_detail_writer.close()
+
+
+def parse_line(line):
+    fields = line.strip().split()
+    if not fields:
+        return None, None
+    return fields[0], fields[1:]
+
+
+def read_text(text_file):
+    text_dict = {}
+    with open(text_file, "r") as reader:
+        for line in reader:
+            key, value = parse_line(line)
+            if key is not None:
+                text_dict[key] = value
+    return text_dict
+
+
+def iter_text(text_file):
+    """Yields (key, tokens) of a text file sorted by key, checking the order."""
+    last_key = None
+    with open(text_file, "r") as reader:
+        for line in reader:
+            key, value = parse_line(line)
+            if key is None:
+                continue
+            if last_key is not None and key <= last_key:
+                raise ValueError(
+                    f"{text_file} is not sorted by key ({last_key} before {key}), "
+                    "sort it with LC_ALL=C sort or score without streaming"
+                )
+            last_key = key
+            yield key, value
+
+
+def read_sorted_pairs(hyp_file, ref_file):
+    """
+    Merges two key-sorted text files, holding one line of each in memory.
+    Yields (key, hyp, ref) in hyp order, ref is None for keys missing from ref_file.
+    """
+    refs = iter_text(ref_file)
+    ref_key, ref = next(refs, (None, None))
+    for key, hyp in iter_text(hyp_file):
+        while ref_key is not None and ref_key < key:
+            ref_key, ref = next(refs, (None, None))
+        yield key, hyp, ref if ref_key == key else None
+    # read to the end, so an unsorted ref_file is reported instead of missing matches
+    for _ in refs:
+        pass
 
 
 def compute_wer_by_line(hyp, ref):
-    hyp = list(map(lambda x: x.lower(), hyp))
-    ref = list(map(lambda x: x.lower(), ref))
+    return compute_wer_batch([hyp], [ref])[0]
 
-    len_hyp = len(hyp)
-    len_ref = len(ref)
 
-    cost_matrix = np.zeros((len_hyp + 1, len_ref + 1), dtype=np.int16)
+def compute_wer_batch(hyps, refs):
+    """
+    Levenshtein alignment of a batch of (hyp, ref) token lists.
 
-    ops_matrix = np.zeros((len_hyp + 1, len_ref + 1), dtype=np.int8)
+    The cost matrices of the batch are filled one hyp row at a time with numpy: the diagonal
+    and vertical moves are elementwise, and the horizontal moves within a row are a running
+    minimum. Ties between substitution, insertion and deletion are broken in that order, and
+    the backtrace walks all utterances in lockstep, so the counts match the cell by cell
+    search.
 
-    for i in range(len_hyp + 1):
-        cost_matrix[i][0] = i
-    for j in range(len_ref + 1):
-        cost_matrix[0][j] = j
+    Returns a list of {"nwords", "cor", "wrong", "ins", "del", "sub"} dicts.
+    """
+    batch_size = len(hyps)
+    vocab = {}
+    hyps = [[vocab.setdefault(w.lower(), len(vocab)) for w in hyp] for hyp in hyps]
+    refs = [[vocab.setdefault(w.lower(), len(vocab)) for w in ref] for ref in refs]
+    len_hyp = np.array([len(hyp) for hyp in hyps], dtype=np.int64)
+    len_ref = np.array([len(ref) for ref in refs], dtype=np.int64)
+    max_hyp = int(len_hyp.max()) if batch_size else 0
+    max_ref = int(len_ref.max()) if batch_size else 0
 
-    for i in range(1, len_hyp + 1):
-        for j in range(1, len_ref + 1):
-            if hyp[i - 1] == ref[j - 1]:
-                cost_matrix[i][j] = cost_matrix[i - 1][j - 1]
-            else:
-                substitution = cost_matrix[i - 1][j - 1] + 1
-                insertion = cost_matrix[i - 1][j] + 1
-                deletion = cost_matrix[i][j - 1] + 1
+    # different paddings never match
+    hyp_ids = np.full((batch_size, max_hyp), -1, dtype=np.int64)
+    ref_ids = np.full((batch_size, max_ref), -2, dtype=np.int64)
+    for b in range(batch_size):
+        hyp_ids[b, : len_hyp[b]] = hyps[b]
+        ref_ids[b, : len_ref[b]] = refs[b]
 
-                compare_val = [substitution, insertion, deletion]
+    ops_matrix = np.zeros((batch_size, max_hyp + 1, max_ref + 1), dtype=np.int8)
+    steps = np.arange(max_ref + 1, dtype=np.int64)
+    prev = np.broadcast_to(steps, (batch_size, max_ref + 1)).copy()
+    cost = np.empty_like(prev)
+    for i in range(1, max_hyp + 1):
+        match = hyp_ids[:, i - 1, None] == ref_ids
+        substitution = prev[:, :-1] + 1
+        insertion = prev[:, 1:] + 1
+        cost[:, 0] = i
+        np.minimum(np.where(match, prev[:, :-1], substitution), insertion, out=cost[:, 1:])
+        # deletions: cost[j] = min over k <= j of cost[k] + (j - k)
+        cost -= steps
+        np.minimum.accumulate(cost, axis=1, out=cost)
+        cost += steps
+        ops = np.where(insertion == cost[:, 1:], OP_INS, OP_DEL)
+        ops[substitution == cost[:, 1:]] = OP_SUB
+        ops[match] = OP_CORRECT
+        ops_matrix[:, i, 1:] = ops
+        prev, cost = cost, prev
 
-                min_val = min(compare_val)
-                operation_idx = compare_val.index(min_val) + 1
-                cost_matrix[i][j] = min_val
-                ops_matrix[i][j] = operation_idx
+    i, j = len_hyp.copy(), len_ref.copy()
+    counts = np.zeros((4, batch_size), dtype=np.int64)
+    active = np.flatnonzero((i > 0) & (j > 0))
+    while active.size:
+        op = ops_matrix[active, i[active], j[active]]
+        counts[op, active] += 1
+        i[active] -= op != OP_DEL
+        j[active] -= op != OP_INS
+        active = active[(i[active] > 0) & (j[active] > 0)]
+    # the rest of the hyp are insertions, the rest of the ref deletions
+    counts[OP_INS] += i
+    counts[OP_DEL] += j
 
-    match_idx = []
-    i = len_hyp
-    j = len_ref
-    rst = {"nwords": len_ref, "cor": 0, "wrong": 0, "ins": 0, "del": 0, "sub": 0}
-    while i >= 0 or j >= 0:
-        i_idx = max(0, i)
-        j_idx = max(0, j)
+    cor, sub, ins, dele = counts.tolist()
+    return [
+        {
+            "nwords": int(len_ref[b]),
+            "cor": cor[b],
+            "wrong": sub[b] + ins[b] + dele[b],
+            "ins": ins[b],
+            "del": dele[b],
+            "sub": sub[b],
+        }
+        for b in range(batch_size)
+    ]
 
-        if ops_matrix[i_idx][j_idx] == 0:  # correct
-            if i - 1 >= 0 and j - 1 >= 0:
-                match_idx.append((j - 1, i - 1))
-                rst["cor"] += 1
 
-            i -= 1
-            j -= 1
+def score_pairs(pairs):
+    """Scores (hyp, ref) pairs in length-sorted batches of bounded size, in input order."""
+    order = sorted(range(len(pairs)), key=lambda k: (len(pairs[k][1]), len(pairs[k][0])))
+    results = [None] * len(pairs)
+    batch = []
+    max_hyp = max_ref = 0
+    for k in order + [None]:
+        if k is not None:
+            hyp_cells = max(max_hyp, len(pairs[k][0])) + 1
+            ref_cells = max(max_ref, len(pairs[k][1])) + 1
+            fits = (len(batch) + 1) * hyp_cells * ref_cells <= MAX_BATCH_CELLS
+        if batch and (k is None or not fits or len(batch) == MAX_BATCH_SIZE):
+            scored = compute_wer_batch([pairs[b][0] for b in batch], [pairs[b][1] for b in batch])
+            for b, out_item in zip(batch, scored):
+                results[b] = out_item
+            batch = []
+            max_hyp = max_ref = 0
+        if k is not None:
+            batch.append(k)
+            max_hyp = max(max_hyp, len(pairs[k][0]))
+            max_ref = max(max_ref, len(pairs[k][1]))
+    return results
 
-        elif ops_matrix[i_idx][j_idx] == 2:  # insert
-            i -= 1
-            rst["ins"] += 1
 
-        elif ops_matrix[i_idx][j_idx] == 3:  # delete
-            j -= 1
-            rst["del"] += 1
+def score_items(items, n_jobs=1, chunk_size=CHUNK_SIZE):
+    """
+    Scores an iterable of (key, hyp, ref) and yields (key, hyp, ref, out_item) in input
+    order, out_item is None when ref is None. With n_jobs != 1 chunks are scored by a
+    process pool, with at most 2 * n_jobs chunks in flight so the input is read lazily.
+    """
+    if n_jobs < 1:
+        n_jobs = os.cpu_count() or 1
+    items = iter(items)
+    chunks = iter(lambda: list(itertools.islice(items, chunk_size)), [])
 
-        elif ops_matrix[i_idx][j_idx] == 1:  # substitute
-            i -= 1
-            j -= 1
-            rst["sub"] += 1
+    def merge(chunk, scored):
+        scored = iter(scored)
+        for key, hyp, ref in chunk:
+            yield key, hyp, ref, None if ref is None else next(scored)
 
-        if i < 0 and j >= 0:
-            rst["del"] += 1
-        elif j < 0 and i >= 0:
-            rst["ins"] += 1
+    def pairs_of(chunk):
+        return [(hyp, ref) for _, hyp, ref in chunk if ref is not None]
 
-    match_idx.reverse()
-    wrong_cnt = cost_matrix[len_hyp][len_ref]
-    rst["wrong"] = wrong_cnt
+    if n_jobs == 1:
+        for chunk in chunks:
+            yield from merge(chunk, score_pairs(pairs_of(chunk)))
+        return
 
-    return rst
+    with multiprocessing.Pool(n_jobs) as pool:
+        pending = deque()
+        for chunk in chunks:
+            pending.append((chunk, pool.apply_async(score_pairs, (pairs_of(chunk),))))
+            if len(pending) >= 2 * n_jobs:
+                chunk, result = pending.popleft()
+                yield from merge(chunk, result.get())
+        while pending:
+            chunk, result = pending.popleft()
+            yield from merge(chunk, result.get())
 
 
 def print_cer_detail(rst):
@@ -183,11 +316,20 @@ def print_cer_detail(rst):
 
 
 if __name__ == "__main__":
-    if len(sys.argv) != 4:
-        print("usage : python compute-wer.py test.ref test.hyp test.wer")
+    parser = argparse.ArgumentParser(usage="python compute-wer.py test.ref test.hyp test.wer")
+    parser.add_argument("ref_file")
+    parser.add_argument("hyp_file")
+    parser.add_argument("cer_detail_file")
+    parser.add_argument("--nj", type=int, default=1, help="scoring processes, -1 for all CPUs")
+    parser.add_argument(
+        "--streaming",
+        action="store_true",
+        help="score key-sorted files line by line instead of loading them into memory",
+    )
+    if len(sys.argv) < 4:
+        parser.print_usage()
         sys.exit(0)
-
-    ref_file = sys.argv[1]
-    hyp_file = sys.argv[2]
-    cer_detail_file = sys.argv[3]
-    compute_wer(ref_file, hyp_file, cer_detail_file)
+    args = parser.parse_args()
+    compute_wer(
+        args.ref_file, args.hyp_file, args.cer_detail_file, n_jobs=args.nj, streaming=args.streaming
+    )
@@ -0,0 +1,67 @@
+"""Per-connection audio ring buffer for funasr_wss_server.py.
+
+Audio is addressed by absolute byte offset since the start of the stream, so
+VAD pre-roll, the current speech segment and the pending streaming chunk are
+just (begin, end) offsets into one preallocated buffer instead of lists of
+small bytes objects. Memory per connection is fixed by the capacity.
+"""
+
+
+class AudioRingBuffer:
+    """Fixed-capacity byte ring buffer addressed by absolute stream offset."""
+
+    def __init__(self, capacity):
+        if capacity <= 0:
+            raise ValueError(f"capacity must be positive: {capacity}")
+        self.capacity = capacity
+        self._buf = bytearray(capacity)
+        self.start = 0  # oldest offset still held
+        self.end = 0  # offset after the newest byte
+
+    def __len__(self):
+        return self.end - self.start
+
+    def clear(self):
+        """Drop all audio and restart offsets at 0 (a new stream)."""
+        self.start = 0
+        self.end = 0
+
+    def append(self, data):
+        """Append bytes, overwriting the oldest audio once the buffer is full."""
+        data = memoryview(data).cast("B")
+        n = len(data)
+        if n >= self.capacity:
+            data = data[n - self.capacity :]
+            self.start = self.end + n - self.capacity
+            self.end += n
+            pos = self.start % self.capacity
+            first = self.capacity - pos
+            self._buf[pos:] = data[:first]
+            self._buf[: self.capacity - first] = data[first:]
+            return
+        pos = self.end % self.capacity
+        first = min(n, self.capacity - pos)
+        self._buf[pos : pos + first] = data[:first]
+        self._buf[: n - first] = data[first:]
+        self.end += n
+        self.start = max(self.start, self.end - self.capacity)
+
+    def views(self, beg, end=None):
+        """Zero-copy memoryviews covering [beg, end), clamped to the held audio.
+
+        Returns one view, or two when the range wraps around the buffer end.
+        """
+        end = self.end if end is None else min(end, self.end)
+        beg = max(beg, self.start)
+        if beg >= end:
+            return []
+        view = memoryview(self._buf)
+        pos = beg % self.capacity
+        n = end - beg
+        if pos + n <= self.capacity:
+            return [view[pos : pos + n]]
+        return [view[pos:], view[: pos + n - self.capacity]]
+
+    def read(self, beg, end=None):
+        """Copy [beg, end) out as bytes (the form model.generate() accepts)."""
+        return b"".join(self.views(beg, end))
@@ -7,6 +7,21 @@ import tracemalloc
 import numpy as np
 import argparse
 import ssl
+import io
+import struct
+
+from audio_buffer import AudioRingBuffer
+from inference_pool import InferencePool, StreamingBatcher
+
+# optional codecs for compressed audio transport ("audio_codec" in the start message)
+try:
+    import soundfile
+except ImportError:
+    soundfile = None
+try:
+    import opuslib
+except Exception:
+    opuslib = None
 
 
 parser = argparse.ArgumentParser()
@@ -60,10 +75,47 @@ parser.add_argument(
     required=False,
     help="keyfile for ssl",
 )
+parser.add_argument(
+    "--resume_grace",
+    type=int,
+    default=300,
+    help="seconds to keep the checkpoint of an interrupted upload for resuming",
+)
+parser.add_argument("--vad_workers", type=int, default=1, help="inference threads for vad")
+parser.add_argument(
+    "--asr_workers", type=int, default=1, help="inference threads for offline asr"
+)
+parser.add_argument(
+    "--asr_online_workers", type=int, default=1, help="inference threads for streaming asr"
+)
+parser.add_argument("--punc_workers", type=int, default=1, help="inference threads for punc")
+parser.add_argument(
+    "--max_pending",
+    type=int,
+    default=32,
+    help="max queued inference requests per model, further requests wait (backpressure)",
+)
+parser.add_argument(
+    "--stream_batch_window_ms",
+    type=float,
+    default=0,
+    help="experimental: window for batching streaming asr chunks of all sessions, 0 disables",
+)
+parser.add_argument(
+    "--stream_max_batch", type=int, default=16, help="max streaming chunks per batched run"
+)
+parser.add_argument(
+    "--max_segment_seconds",
+    type=float,
+    default=70,
+    help="per-connection audio buffer length, bounds the longest speech segment with pre-roll",
+)
 args = parser.parse_args()
 
 
 websocket_users = set()
+# session_id -> {"offset", "results", "expires"} of interrupted resumable uploads
+resume_sessions = {}
 
 print("model loading")
 from funasr import AutoModel
@@ -114,7 +166,60 @@ else:
     model_punc = None
 
 
-print("model loaded! only support one client at the same time now!!!!")
+vad_pool = InferencePool("vad", model_vad, args.vad_workers, args.max_pending)
+asr_pool = InferencePool("asr", model_asr, args.asr_workers, args.max_pending)
+asr_online_pool = InferencePool(
+    "asr_online", model_asr_streaming, args.asr_online_workers, args.max_pending
+)
+punc_pool = (
+    InferencePool("punc", model_punc, args.punc_workers, args.max_pending)
+    if model_punc is not None
+    else None
+)
+# experimental: streaming chunks go through the micro-batcher only if --stream_batch_window_ms > 0
+asr_online_batcher = (
+    StreamingBatcher(asr_online_pool, args.stream_batch_window_ms, args.stream_max_batch)
+    if args.stream_batch_window_ms > 0
+    else asr_online_pool
+)
+
+print("model loaded! inference runs on per-model worker pools, concurrent clients are supported")
+
+
+class FlacFrameDecoder:
+    """Each binary message is a self-contained FLAC stream."""
+
+    def decode(self, message):
+        samples, _ = soundfile.read(io.BytesIO(message), dtype="int16")
+        return samples.astype("<i2").tobytes()
+
+
+class OpusFrameDecoder:
+    """Each binary message holds [2-byte big-endian length][opus packet] records
+    of 20 ms frames; the decoder is stateful, so messages are decoded in order."""
+
+    def __init__(self, audio_fs=16000):
+        self.frame_samples = audio_fs * 20 // 1000
+        self.decoder = opuslib.Decoder(audio_fs, 1)
+
+    def decode(self, message):
+        pcm = []
+        pos = 0
+        while pos + 2 <= len(message):
+            (length,) = struct.unpack_from(">H", message, pos)
+            pos += 2
+            pcm.append(self.decoder.decode(message[pos : pos + length], self.frame_samples))
+            pos += length
+        return b"".join(pcm)
+
+
+def create_audio_decoder(codec, audio_fs=16000):
+    """Return (accepted_codec, decoder); unsupported codecs fall back to pcm."""
+    if codec == "flac" and soundfile is not None:
+        return "flac", FlacFrameDecoder()
+    if codec == "opus" and opuslib is not None:
+        return "opus", OpusFrameDecoder(audio_fs)
+    return "pcm", None
 
 
 async def ws_reset(websocket):
@@ -135,23 +240,58 @@ async def clear_websocket():
     websocket_users.clear()
 
 
+def save_resume_session(websocket):
+    """Keep the confirmed segments of an interrupted upload for --resume_grace seconds."""
+    now = time.time()
+    for sid in [sid for sid, s in resume_sessions.items() if s["expires"] < now]:
+        del resume_sessions[sid]
+    if websocket.session_id and websocket.checkpoint > 0 and websocket.is_speaking:
+        resume_sessions[websocket.session_id] = {
+            "offset": websocket.checkpoint,
+            "results": websocket.session_results,
+            "expires": now + args.resume_grace,
+        }
+
+
+def load_resume_session(session_id):
+    """Pop the saved state of a session; expired or unknown sessions restart from 0."""
+    state = resume_sessions.pop(session_id, None)
+    if state is None or state["expires"] < time.time():
+        return 0, []
+    return state["offset"], state["results"]
+
+
 async def ws_serve(websocket, path):
-    frames = []
-    frames_asr = []
-    frames_asr_online = []
+    # audio of this connection, addressed by byte offset since the start of the stream
+    audio = AudioRingBuffer(int(args.max_segment_seconds * 32000))
+    asr_beg = None  # offset where the current speech segment (with pre-roll) starts
+    online_beg = 0  # offset where the pending streaming chunk starts
+    online_count = 0  # messages in the pending streaming chunk
     global websocket_users
     # await clear_websocket()
     websocket_users.add(websocket)
     websocket.status_dict_asr = {}
-    websocket.status_dict_asr_online = {"cache": {}, "is_final": False}
+    websocket.status_dict_asr_online = {"cache": {}, "is_final": False, "chunk_size": [5, 10, 5]}
     websocket.status_dict_vad = {"cache": {}, "is_final": False}
     websocket.status_dict_punc = {"cache": {}}
     websocket.chunk_interval = 10
     websocket.vad_pre_idx = 0
-    speech_start = False
     speech_end_i = -1
     websocket.wav_name = "microphone"
     websocket.mode = "2pass"
+    websocket.audio_decoder = None
+    websocket.is_speaking = True
+    # resumable upload: pcm bytes received / confirmed for the current session
+    websocket.session_id = None
+    websocket.received_bytes = 0
+    websocket.checkpoint = 0
+    websocket.segment_end = 0  # end of the last vad segment, confirmed once its result is sent
+    websocket.segment_lost = False  # a segment failed: later audio is no longer confirmed
+    websocket.session_results = []
+    # pipelined offline mode: one ordered result per vad segment while the upload continues
+    websocket.pipeline = False
+    websocket.segment_count = 0
+    websocket.segment_offset_ms = 0
     print("new user connected", flush=True)
 
     try:
@@ -183,65 +323,135 @@ async def ws_serve(websocket, path):
                     websocket.status_dict_asr["hotword"] = messagejson["hotwords"]
                 if "mode" in messagejson:
                     websocket.mode = messagejson["mode"]
+                    websocket.pipeline = bool(messagejson.get("pipeline", False))
+                    websocket.segment_count = 0
+                    # every start message begins a new utterance, resumable or not
+                    websocket.session_id = None
+                    websocket.received_bytes = 0
+                    websocket.checkpoint = 0
+                    websocket.segment_end = 0
+                    websocket.segment_lost = False
+                    websocket.session_results = []
+                    if "audio_codec" not in messagejson:
+                        websocket.audio_decoder = None
+                if "audio_codec" in messagejson:
+                    codec, websocket.audio_decoder = create_audio_decoder(
+                        messagejson["audio_codec"], int(messagejson.get("audio_fs", 16000))
+                    )
+                    await websocket.send(
+                        json.dumps({"codec_ack": codec, "wav_name": websocket.wav_name})
+                    )
+                if "session_id" in messagejson:
+                    # online results are not kept per segment, so online uploads restart from 0
+                    resumable = websocket.mode != "online"
+                    websocket.session_id = messagejson["session_id"] if resumable else None
+                    offset, results = 0, []
+                    if messagejson.get("resume"):
+                        if resumable:
+                            offset, results = load_resume_session(websocket.session_id)
+                        await websocket.send(
+                            json.dumps(
+                                {
+                                    "resume_offset": offset,
+                                    "session_id": messagejson["session_id"],
+                                    "wav_name": websocket.wav_name,
+                                    "results": results,
+                                }
+                            )
+                        )
+                    websocket.received_bytes = offset
+                    websocket.checkpoint = offset
+                    websocket.segment_end = offset
+                    websocket.session_results = list(results)
+                    websocket.segment_count = len(results)
+            elif websocket.audio_decoder is not None:
+                # compressed transport: decode each frame message to pcm before vad/asr
+                try:
+                    message = websocket.audio_decoder.decode(message)
+                except Exception as e:
+                    print(f"error in audio decoding, {e}")
+                    message = b""
+                if not message:
+                    continue
 
             websocket.status_dict_vad["chunk_size"] = int(
                 websocket.status_dict_asr_online["chunk_size"][1] * 60 / websocket.chunk_interval
             )
-            if len(frames_asr_online) > 0 or len(frames_asr) >= 0 or not isinstance(message, str):
-                if not isinstance(message, str):
-                    frames.append(message)
-                    duration_ms = len(message) // 32
-                    websocket.vad_pre_idx += duration_ms
-
-                    # asr online
-                    frames_asr_online.append(message)
-                    websocket.status_dict_asr_online["is_final"] = speech_end_i != -1
-                    if (
-                        len(frames_asr_online) % websocket.chunk_interval == 0
-                        or websocket.status_dict_asr_online["is_final"]
-                    ):
-                        if websocket.mode == "2pass" or websocket.mode == "online":
-                            audio_in = b"".join(frames_asr_online)
-                            try:
-                                await async_asr_online(websocket, audio_in)
-                            except:
-                                print(f"error in asr streaming, {websocket.status_dict_asr_online}")
-                        frames_asr_online = []
-                    if speech_start:
-                        frames_asr.append(message)
-                    # vad online
-                    try:
-                        speech_start_i, speech_end_i = await async_vad(websocket, message)
-                    except:
-                        print("error in vad")
-                    if speech_start_i != -1:
-                        speech_start = True
-                        beg_bias = (websocket.vad_pre_idx - speech_start_i) // duration_ms
-                        frames_pre = frames[-beg_bias:]
-                        frames_asr = []
-                        frames_asr.extend(frames_pre)
-                # asr punc offline
-                if speech_end_i != -1 or not websocket.is_speaking:
-                    # print("vad end point")
-                    if websocket.mode == "2pass" or websocket.mode == "offline":
-                        audio_in = b"".join(frames_asr)
+            if not isinstance(message, str):
+                # vad timestamps count from the first byte of the current utterance
+                vad_base = websocket.received_bytes - websocket.vad_pre_idx * 32
+                websocket.received_bytes += len(message)
+                audio.append(message)
+                duration_ms = len(message) // 32
+                websocket.vad_pre_idx += duration_ms
+
+                # asr online
+                online_count += 1
+                websocket.status_dict_asr_online["is_final"] = speech_end_i != -1
+                if (
+                    online_count % websocket.chunk_interval == 0
+                    or websocket.status_dict_asr_online["is_final"]
+                ):
+                    if websocket.mode == "2pass" or websocket.mode == "online":
+                        audio_in = audio.read(online_beg)
                         try:
-                            await async_asr(websocket, audio_in)
+                            await async_asr_online(websocket, audio_in)
                         except:
-                            print("error in asr offline")
-                    frames_asr = []
-                    speech_start = False
-                    frames_asr_online = []
-                    websocket.status_dict_asr_online["cache"] = {}
-                    if not websocket.is_speaking:
-                        websocket.vad_pre_idx = 0
-                        frames = []
-                        websocket.status_dict_vad["cache"] = {}
-                    else:
-                        frames = frames[-20:]
+                            print(f"error in asr streaming, {websocket.status_dict_asr_online}")
+                    online_beg, online_count = audio.end, 0
+                # vad online
+                try:
+                    speech_start_i, speech_end_i = await async_vad(websocket, message)
+                except:
+                    print("error in vad")
+                if speech_end_i != -1:
+                    # audio up to the segment end is confirmed once its result is sent
+                    websocket.segment_end = vad_base + speech_end_i * 32
+                if speech_start_i != -1:
+                    # the segment (with its pre-roll) is an offset range of the ring buffer
+                    vad_origin = audio.end - websocket.vad_pre_idx * 32
+                    asr_beg = max(audio.start, vad_origin + speech_start_i * 32)
+                    websocket.segment_offset_ms = vad_base // 32 + (asr_beg - vad_origin) // 32
+            # asr punc offline
+            if speech_end_i != -1 or not websocket.is_speaking:
+                # print("vad end point")
+                if websocket.mode == "2pass" or websocket.mode == "offline":
+                    audio_in = b""
+                    if asr_beg is not None:
+                        if asr_beg < audio.start:
+                            print(f"segment longer than {args.max_segment_seconds}s, truncated")
+                        audio_in = audio.read(asr_beg)
+                    try:
+                        await async_asr(websocket, audio_in)
+                    except:
+                        print("error in asr offline")
+                        # keep the checkpoint before the failed segment, so a resume resends it
+                        websocket.segment_lost = True
+                    if websocket.pipeline and not websocket.is_speaking:
+                        await websocket.send(
+                            json.dumps(
+                                {
+                                    "mode": websocket.mode,
+                                    "text": "",
+                                    "wav_name": websocket.wav_name,
+                                    "is_final": True,
+                                    "segments_done": True,
+                                    "segment_count": websocket.segment_count,
+                                }
+                            )
+                        )
+                asr_beg = None
+                websocket.status_dict_asr_online["cache"] = {}
+                if not websocket.is_speaking:
+                    websocket.vad_pre_idx = 0
+                    audio.clear()
+                    websocket.status_dict_vad["cache"] = {}
+                    websocket.session_id = None
+                online_beg, online_count = audio.end, 0
 
     except websockets.ConnectionClosed:
         print("ConnectionClosed...", websocket_users, flush=True)
+        save_resume_session(websocket)
         await ws_reset(websocket)
         websocket_users.remove(websocket)
     except websockets.InvalidState:
@@ -252,7 +462,9 @@ async def ws_serve(websocket, path):
 
 async def async_vad(websocket, audio_in):
 
-    segments_result = model_vad.generate(input=audio_in, **websocket.status_dict_vad)[0]["value"]
+    segments_result = (await vad_pool.generate(input=audio_in, **websocket.status_dict_vad))[0][
+        "value"
+    ]
     # print(segments_result)
 
     speech_start = -1
@@ -268,30 +480,45 @@ async def async_vad(websocket, audio_in):
 
 
 async def async_asr(websocket, audio_in):
+    pipeline = websocket.pipeline and websocket.mode == "offline"
     if len(audio_in) > 0:
         # print(len(audio_in))
-        rec_result = model_asr.generate(input=audio_in, **websocket.status_dict_asr)[0]
+        rec_result = (await asr_pool.generate(input=audio_in, **websocket.status_dict_asr))[0]
         # print("offline_asr, ", rec_result)
-        if model_punc is not None and len(rec_result["text"]) > 0:
+        timestamp = rec_result.get("timestamp")
+        if punc_pool is not None and len(rec_result["text"]) > 0:
             # print("offline, before punc", rec_result, "cache", websocket.status_dict_punc)
-            rec_result = model_punc.generate(
-                input=rec_result["text"], **websocket.status_dict_punc
+            rec_result = (
+                await punc_pool.generate(input=rec_result["text"], **websocket.status_dict_punc)
             )[0]
             # print("offline, after punc", rec_result)
         if len(rec_result["text"]) > 0:
             # print("offline", rec_result)
             mode = "2pass-offline" if "2pass" in websocket.mode else websocket.mode
-            message = json.dumps(
-                {
-                    "mode": mode,
-                    "text": rec_result["text"],
-                    "wav_name": websocket.wav_name,
-                    "is_final": websocket.is_speaking,
-                }
-            )
-            await websocket.send(message)
-
-    else:
+            message = {
+                "mode": mode,
+                "text": rec_result["text"],
+                "wav_name": websocket.wav_name,
+                "is_final": websocket.is_speaking,
+            }
+            if pipeline:
+                # ordered segment result; the segments_done marker follows the last one
+                message["is_final"] = False
+                message["segment"] = websocket.segment_count
+                if timestamp:
+                    offset_ms = websocket.segment_offset_ms
+                    message["timestamp"] = [[b + offset_ms, e + offset_ms] for b, e in timestamp]
+            websocket.segment_count += 1
+            if websocket.session_id and websocket.is_speaking:
+                # resumable session: the saved segment result confirms audio up to its end;
+                # after a failed segment the checkpoint stays before it
+                if not websocket.segment_lost:
+                    websocket.checkpoint = websocket.segment_end
+                    websocket.session_results.append(message)
+                message["checkpoint"] = websocket.checkpoint
+            await websocket.send(json.dumps(message))
+
+    elif not pipeline:
         mode = "2pass-offline" if "2pass" in websocket.mode else websocket.mode
         message = json.dumps(
             {
@@ -306,8 +533,8 @@ async def async_asr(websocket, audio_in):
 async def async_asr_online(websocket, audio_in):
     if len(audio_in) > 0:
         # print(websocket.status_dict_asr_online.get("is_final", False))
-        rec_result = model_asr_streaming.generate(
-            input=audio_in, **websocket.status_dict_asr_online
+        rec_result = (
+            await asr_online_batcher.generate(input=audio_in, **websocket.status_dict_asr_online)
         )[0]
         # print("online, ", rec_result)
         if websocket.mode == "2pass" and websocket.status_dict_asr_online.get("is_final", False):
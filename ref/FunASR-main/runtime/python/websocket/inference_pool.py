@@ -0,0 +1,144 @@
+"""Inference scheduling for funasr_wss_server.py.
+
+InferencePool runs model.generate() on a bounded per-model thread pool so the
+event loop keeps serving every connection; StreamingBatcher (experimental, off
+by default) collects streaming chunks of all sessions into micro-batches on top
+of a pool.
+"""
+
+import asyncio
+import functools
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class InferencePool:
+    """Run model.generate() on a bounded per-model thread pool.
+
+    Inference never blocks the event loop, so frames, pings and sends of other
+    connections keep flowing while a long offline decode runs. At most
+    `max_pending` requests are queued per model; further callers wait before
+    submitting, which stops reading their socket and pushes back on the client.
+    Per-connection state (status_dict_*) is passed in by each caller and a
+    connection awaits its own requests in order, so it is never shared.
+    """
+
+    def __init__(self, name, model, workers, max_pending):
+        self.name = name
+        self.model = model
+        self.workers = max(1, workers)
+        self.executor = ThreadPoolExecutor(
+            max_workers=self.workers, thread_name_prefix=f"infer-{name}"
+        )
+        self.slots = asyncio.Semaphore(max(1, max_pending))
+
+    async def generate(self, **kwargs):
+        return await self.run(functools.partial(self.model.generate, **kwargs))
+
+    async def run(self, fn):
+        queued = time.perf_counter()
+        async with self.slots:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, self._timed, queued, fn)
+
+    def _timed(self, queued, fn):
+        wait_ms = (time.perf_counter() - queued) * 1000
+        if wait_ms > 100:
+            logging.info(f"{self.name} inference waited {wait_ms:.0f} ms in queue")
+        return fn()
+
+
+class StreamingBatcher:
+    """Cross-session micro-batching for streaming asr (experimental).
+
+    Chunks that become ready on any connection within `window_ms` (or until
+    `max_batch` chunks are waiting) are collected and split across the workers
+    of the streaming pool, and each result is scattered back to its caller.
+    Every chunk keeps its own connection's cache (status_dict_asr_online).
+
+    The streaming paraformer decodes one utterance per call (its inference
+    asserts a single sample), so each worker job runs its share of the batch
+    back to back. This saves one executor round trip per chunk while every
+    worker of the pool stays in use; a connection awaits its own chunk before
+    sending the next, so no cache is ever in two jobs. Queue wait and batch
+    size are reported every `report_every` batches.
+
+    There is no stacked forward across sessions, so every chunk waits up to
+    `window_ms` for at most one saved round trip; the server leaves it off
+    unless --stream_batch_window_ms is set.
+    """
+
+    def __init__(self, pool, window_ms, max_batch, report_every=100):
+        self.pool = pool
+        self.window = max(0.0, window_ms) / 1000
+        self.max_batch = max(1, max_batch)
+        self.report_every = report_every
+        self.queue = []  # (kwargs, future, enqueue time)
+        self.timer = None
+        self.batches = 0
+        self.chunks = 0
+        self.wait_ms_total = 0.0
+        self.wait_ms_max = 0.0
+
+    async def generate(self, **kwargs):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.queue.append((kwargs, future, time.perf_counter()))
+        if len(self.queue) >= self.max_batch:
+            self._flush()
+        elif self.timer is None:
+            self.timer = loop.call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self):
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        while self.queue:
+            batch, self.queue = self.queue[: self.max_batch], self.queue[self.max_batch :]
+            asyncio.ensure_future(self._run(batch))
+
+    async def _run(self, batch):
+        started = time.perf_counter()
+        waits = [(started - enqueued) * 1000 for _, _, enqueued in batch]
+        self._report(waits)
+        jobs = min(self.pool.workers, len(batch))
+        await asyncio.gather(*(self._run_part(batch[i::jobs]) for i in range(jobs)))
+
+    async def _run_part(self, part):
+        try:
+            results = await self.pool.run(
+                functools.partial(self._generate_batch, [kwargs for kwargs, _, _ in part])
+            )
+        except Exception as e:
+            results = [e] * len(part)
+        for (_, future, _), result in zip(part, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    def _generate_batch(self, batch):
+        results = []
+        for kwargs in batch:
+            try:
+                results.append(self.pool.model.generate(**kwargs))
+            except Exception as e:
+                results.append(e)
+        return results
+
+    def _report(self, waits):
+        self.batches += 1
+        self.chunks += len(waits)
+        self.wait_ms_total += sum(waits)
+        self.wait_ms_max = max(self.wait_ms_max, max(waits))
+        if self.batches % self.report_every == 0:
+            logging.info(
+                f"streaming batches: {self.batches}, "
+                f"mean size {self.chunks / self.batches:.1f}, "
+                f"queue wait mean {self.wait_ms_total / self.chunks:.1f} ms, "
+                f"max {self.wait_ms_max:.1f} ms"
+            )
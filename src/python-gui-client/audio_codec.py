@@ -0,0 +1,236 @@
+"""音频压缩传输编码
+
+在 WebSocket 上以压缩帧代替原始 pcm 发送音频，降低上行带宽占用
+（16kHz 16bit 单声道 pcm 为 256kbps）。
+
+核心功能：
+1. flac：无损压缩，每条二进制消息是一段完整的 FLAC 流，可独立解码
+2. opus：有损语音编码（20ms 一帧），适合 online/2pass 实时场景；
+   每条二进制消息包含若干 [2字节大端长度][opus 包]
+3. 协商：开始消息携带 "audio_codec"，服务端回复 {"codec_ack": 实际采用的编码}；
+   旧服务端不回复时客户端回退为 pcm（见 transcribe_session）
+
+说明：
+- flac 依赖 soundfile（libsndfile），opus 依赖 opuslib（libopus），均为可选依赖，
+  未安装时对应编码不可用，自动回退为 pcm
+- 编码器内部缓存不足一个采样/一帧的尾部数据，flush 时补齐输出
+
+版本: 3.0
+日期: 2026-10-17
+"""
+
+import io
+import logging
+import struct
+from typing import Any, List, Optional, Protocol
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+try:
+    import numpy as np
+    import soundfile
+except ImportError:  # 可选依赖
+    np = None  # type: ignore[assignment]
+    soundfile = None
+
+try:
+    import opuslib
+except Exception:  # 可选依赖（缺少 libopus 时导入同样失败）
+    opuslib = None
+
+# 编码名称
+CODEC_PCM = "pcm"
+CODEC_FLAC = "flac"
+CODEC_OPUS = "opus"
+AUDIO_CODECS = (CODEC_PCM, CODEC_FLAC, CODEC_OPUS)
+
+# opus 参数：20ms 一帧，语音码率
+OPUS_FRAME_MS = 20
+OPUS_BITRATE = 24000
+
+# 等待服务端编码确认的超时（秒），超时视为不支持
+CODEC_ACK_TIMEOUT = 2.0
+
+_SAMPLE_WIDTH = 2  # 16bit
+_PACKET_HEADER = struct.Struct(">H")
+
+
+class FrameEncoder(Protocol):
+    """编码器接口：输入 pcm 字节，输出一条二进制消息的内容（可能为空）"""
+
+    def encode(self, pcm: bytes) -> bytes: ...
+
+    def flush(self) -> bytes: ...
+
+
+class FrameDecoder(Protocol):
+    """解码器接口：输入一条二进制消息，输出 pcm 字节"""
+
+    def decode(self, message: bytes) -> bytes: ...
+
+
+def available_codecs() -> List[str]:
+    """本机可用的编码列表（pcm 始终可用）"""
+    codecs = [CODEC_PCM]
+    if soundfile is not None:
+        codecs.append(CODEC_FLAC)
+    if opuslib is not None:
+        codecs.append(CODEC_OPUS)
+    return codecs
+
+
+def is_codec_available(codec: str) -> bool:
+    """判断编码在本机是否可用"""
+    return codec in available_codecs()
+
+
+class FlacFrameEncoder:
+    """FLAC 编码器：每次调用输出一段完整的 FLAC 流"""
+
+    def __init__(self, sample_rate: int):
+        if soundfile is None:
+            raise RuntimeError("flac 编码需要安装 soundfile")
+        self.sample_rate = sample_rate
+        self._pending = b""
+
+    def encode(self, pcm: bytes) -> bytes:
+        data = self._pending + bytes(pcm)
+        usable = len(data) - len(data) % _SAMPLE_WIDTH
+        self._pending = data[usable:]
+        return self._encode_samples(data[:usable])
+
+    def flush(self) -> bytes:
+        # 不足一个采样的尾字节无法构成有效音频，直接丢弃
+        self._pending = b""
+        return b""
+
+    def _encode_samples(self, data: bytes) -> bytes:
+        if not data:
+            return b""
+        samples = np.frombuffer(data, dtype="<i2")
+        buffer = io.BytesIO()
+        soundfile.write(
+            buffer, samples, self.sample_rate, format="FLAC", subtype="PCM_16"
+        )
+        return buffer.getvalue()
+
+
+class FlacFrameDecoder:
+    """FLAC 解码器：每条消息独立解码"""
+
+    def __init__(self, sample_rate: int):
+        if soundfile is None:
+            raise RuntimeError("flac 解码需要安装 soundfile")
+        self.sample_rate = sample_rate
+
+    def decode(self, message: bytes) -> bytes:
+        if not message:
+            return b""
+        samples, _ = soundfile.read(io.BytesIO(message), dtype="int16")
+        return bytes(samples.astype("<i2").tobytes())
+
+
+class OpusFrameEncoder:
+    """Opus 编码器：按 20ms 分帧，输出长度前缀的包序列"""
+
+    def __init__(self, sample_rate: int, bitrate: int = OPUS_BITRATE):
+        if opuslib is None:
+            raise RuntimeError("opus 编码需要安装 opuslib")
+        self.sample_rate = sample_rate
+        self.frame_samples = sample_rate * OPUS_FRAME_MS // 1000
+        self.frame_bytes = self.frame_samples * _SAMPLE_WIDTH
+        self._encoder: Any = opuslib.Encoder(sample_rate, 1, opuslib.APPLICATION_VOIP)
+        self._encoder.bitrate = bitrate
+        self._pending = b""
+
+    def encode(self, pcm: bytes) -> bytes:
+        data = self._pending + bytes(pcm)
+        usable = len(data) - len(data) % self.frame_bytes
+        self._pending = data[usable:]
+        return self._encode_frames(data[:usable])
+
+    def flush(self) -> bytes:
+        if not self._pending:
+            return b""
+        # 最后不足一帧时补静音
+        data = self._pending + b"\x00" * (self.frame_bytes - len(self._pending))
+        self._pending = b""
+        return self._encode_frames(data)
+
+    def _encode_frames(self, data: bytes) -> bytes:
+        packets = []
+        for beg in range(0, len(data), self.frame_bytes):
+            packet = self._encoder.encode(
+                data[beg : beg + self.frame_bytes], self.frame_samples
+            )
+            packets.append(_PACKET_HEADER.pack(len(packet)) + packet)
+        return b"".join(packets)
+
+
+class OpusFrameDecoder:
+    """Opus 解码器：按长度前缀拆包后逐帧解码（有状态，需按顺序输入）"""
+
+    def __init__(self, sample_rate: int):
+        if opuslib is None:
+            raise RuntimeError("opus 解码需要安装 opuslib")
+        self.frame_samples = sample_rate * OPUS_FRAME_MS // 1000
+        self._decoder: Any = opuslib.Decoder(sample_rate, 1)
+
+    def decode(self, message: bytes) -> bytes:
+        pcm = []
+        pos = 0
+        while pos + _PACKET_HEADER.size <= len(message):
+            (length,) = _PACKET_HEADER.unpack_from(message, pos)
+            pos += _PACKET_HEADER.size
+            pcm.append(
+                self._decoder.decode(message[pos : pos + length], self.frame_samples)
+            )
+            pos += length
+        return b"".join(pcm)
+
+
+def create_encoder(codec: str, sample_rate: int) -> Optional[FrameEncoder]:
+    """创建编码器（pcm 返回 None，表示原样发送）
+
+    Raises:
+        ValueError: 未知编码
+        RuntimeError: 编码依赖未安装
+    """
+    if codec == CODEC_PCM:
+        return None
+    if codec == CODEC_FLAC:
+        return FlacFrameEncoder(sample_rate)
+    if codec == CODEC_OPUS:
+        return OpusFrameEncoder(sample_rate)
+    raise ValueError(f"未知的音频编码: {codec}")
+
+
+def create_decoder(codec: str, sample_rate: int) -> Optional[FrameDecoder]:
+    """创建解码器（pcm 返回 None）
+
+    Raises:
+        ValueError: 未知编码
+        RuntimeError: 编码依赖未安装
+    """
+    if codec == CODEC_PCM:
+        return None
+    if codec == CODEC_FLAC:
+        return FlacFrameDecoder(sample_rate)
+    if codec == CODEC_OPUS:
+        return OpusFrameDecoder(sample_rate)
+    raise ValueError(f"未知的音频编码: {codec}")
+
+
+def resolve_codec(requested: str, wav_format: str) -> str:
+    """确定本次上传实际请求的编码
+
+    只有 pcm 数据可以压缩（others 为原始容器数据，由服务端解码）；
+    本机缺少编码依赖时回退为 pcm。
+    """
+    if requested == CODEC_PCM or wav_format != "pcm":
+        return CODEC_PCM
+    if not is_codec_available(requested):
+        logger.warning(f"音频编码 {requested} 不可用（缺少依赖），使用 pcm 传输")
+        return CODEC_PCM
+    return requested
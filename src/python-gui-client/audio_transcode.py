@@ -0,0 +1,285 @@
+"""客户端音频转码
+
+上传前通过 ffmpeg 管道把 mp4/mp3/m4a 等容器格式解码为 16kHz 单声道 s16le，
+以 pcm 格式发送，避免把视频轨道、封面等与识别无关的数据整包上传。
+
+核心功能：
+1. 转码判定：仅对压缩/容器格式转码，wav/pcm 保持原样
+2. 管道流式：ffmpeg 输出按块读取并发送，内存占用与文件大小无关，无临时文件
+3. 体积估算：按媒体时长估算转码后大小，用于上传进度与上传耗时预估
+4. 压缩比：发送完成后统计 原始大小 / 实际发送大小
+
+说明：
+- 需要系统 PATH 中可找到 ffmpeg；找不到时自动回退为原样上传（wav_format=others）
+- 转码在上传过程中进行，解码速度通常远高于上传带宽，不会成为瓶颈
+
+版本: 3.0
+日期: 2026-10-17
+"""
+
+import asyncio
+import logging
+import os
+import shutil
+import subprocess
+from functools import lru_cache
+from typing import AsyncGenerator, List, Optional, Union
+
+from audio_stream import AudioSource, iter_audio_chunks, open_audio_source
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# 需要转码的格式（其余格式保持原有处理方式）
+TRANSCODE_EXTENSIONS = (
+    ".mp4",
+    ".mp3",
+    ".m4a",
+    ".aac",
+    ".flac",
+    ".ogg",
+    ".opus",
+    ".wma",
+    ".webm",
+    ".mkv",
+    ".mov",
+    ".avi",
+)
+
+# 转码输出：16kHz 单声道 16bit（FunASR 模型输入格式）
+TRANSCODE_SAMPLE_RATE = 16000
+TRANSCODE_BYTES_PER_SECOND = TRANSCODE_SAMPLE_RATE * 2
+
+# Windows 下启动 ffmpeg 时不弹出控制台窗口（其他平台为 0）
+CREATE_NO_WINDOW = getattr(subprocess, "CREATE_NO_WINDOW", 0)
+
+
+class TranscodeError(RuntimeError):
+    """转码失败（ffmpeg 无法启动或解码出错）"""
+
+
+@lru_cache(maxsize=None)
+def find_ffmpeg() -> Optional[str]:
+    """查找 ffmpeg 可执行文件
+
+    Returns:
+        ffmpeg 路径，未安装时返回 None
+    """
+    return shutil.which("ffmpeg")
+
+
+def needs_transcode(path: str) -> bool:
+    """判断文件是否属于需要转码的格式"""
+    return path.lower().endswith(TRANSCODE_EXTENSIONS)
+
+
+def probe_duration(path: str) -> Optional[float]:
+    """获取媒体时长（秒），无法获取时返回 None"""
+    try:
+        from mutagen import File
+
+        media = File(path)
+        if media is not None and getattr(media, "info", None) is not None:
+            length = getattr(media.info, "length", None)
+            if length:
+                return float(length)
+    except Exception as e:
+        logger.debug(f"mutagen 获取时长失败: {path}, {e}")
+    return None
+
+
+def estimate_transcoded_size(duration: float) -> int:
+    """估算转码后的 pcm 大小（字节）
+
+    Args:
+        duration: 媒体时长（秒）
+
+    Returns:
+        16kHz 单声道 16bit pcm 的字节数
+    """
+    return int(max(0.0, duration) * TRANSCODE_BYTES_PER_SECOND)
+
+
+def estimate_upload_size(path: str, transcode: bool = True) -> Optional[int]:
+    """估算实际需要上传的字节数
+
+    Args:
+        path: 音频文件路径
+        transcode: 是否启用转码
+
+    Returns:
+        预计上传字节数，文件不存在时返回 None
+    """
+    if not os.path.exists(path):
+        return None
+    if transcode and needs_transcode(path) and find_ffmpeg():
+        duration = probe_duration(path)
+        if duration:
+            return estimate_transcoded_size(duration)
+    return os.path.getsize(path)
+
+
+def compression_ratio(source_size: int, bytes_sent: int) -> float:
+    """压缩比：原始文件大小 / 实际发送字节数"""
+    if bytes_sent <= 0:
+        return 0.0
+    return source_size / bytes_sent
+
+
+def open_upload_source(
+    path: str, default_sample_rate: int, transcode: bool = True
+) -> AudioSource:
+    """打开待上传的音频数据源
+
+    需要转码且 ffmpeg 可用时返回转码数据源（pcm，data_size 为估算值），
+    否则与 open_audio_source 相同。
+
+    Args:
+        path: 音频文件路径
+        default_sample_rate: 默认采样率（pcm/其他格式使用）
+        transcode: 是否启用转码
+
+    Returns:
+        AudioSource 实例
+
+    Raises:
+        OSError / ValueError / wave.Error: 文件无法读取或格式非法
+    """
+    if not (transcode and needs_transcode(path)):
+        return open_audio_source(path, default_sample_rate)
+    if not find_ffmpeg():
+        logger.info("未找到 ffmpeg，按原始格式上传")
+        return open_audio_source(path, default_sample_rate)
+
+    source_size = os.path.getsize(path)
+    duration = probe_duration(path)
+    return AudioSource(
+        path=path,
+        sample_rate=TRANSCODE_SAMPLE_RATE,
+        wav_format="pcm",
+        data_size=estimate_transcoded_size(duration) if duration else 0,
+        transcode=True,
+        source_size=source_size,
+    )
+
+
+def build_ffmpeg_command(ffmpeg: str, path: str) -> List[str]:
+    """构建转码命令：丢弃视频/字幕轨，输出 16kHz 单声道 s16le 到标准输出"""
+    return [
+        ffmpeg,
+        "-nostdin",
+        "-hide_banner",
+        "-loglevel",
+        "error",
+        "-i",
+        path,
+        "-vn",
+        "-sn",
+        "-dn",
+        "-ac",
+        "1",
+        "-ar",
+        str(TRANSCODE_SAMPLE_RATE),
+        "-acodec",
+        "pcm_s16le",
+        "-f",
+        "s16le",
+        "pipe:1",
+    ]
+
+
+async def iter_transcoded_chunks(
+    path: str, stride: int, skip: int = 0
+) -> AsyncGenerator[bytes, None]:
+    """通过 ffmpeg 管道按块产出转码后的 pcm 数据
+
+    除最后一块外每块恰好 stride 字节。
+
+    Args:
+        path: 音频文件路径
+        stride: 每块字节数
+        skip: 丢弃开头的字节数（断点续传时从该位置继续）
+
+    Yields:
+        pcm 数据块
+
+    Raises:
+        TranscodeError: ffmpeg 无法启动或解码失败
+    """
+    ffmpeg = find_ffmpeg()
+    if not ffmpeg:
+        raise TranscodeError("未找到 ffmpeg")
+
+    try:
+        proc = await asyncio.create_subprocess_exec(
+            *build_ffmpeg_command(ffmpeg, path),
+            stdin=subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            creationflags=CREATE_NO_WINDOW,
+        )
+    except OSError as e:
+        raise TranscodeError(f"ffmpeg 启动失败: {e}") from e
+
+    assert proc.stdout is not None and proc.stderr is not None
+    # 并发读取错误输出，避免管道写满阻塞 ffmpeg
+    stderr_task = asyncio.ensure_future(proc.stderr.read())
+    finished = False
+    try:
+        # 转码输出无法定位，续传时解码并丢弃已确认的部分（解码远快于上传）
+        while skip > 0:
+            try:
+                skip -= len(await proc.stdout.readexactly(min(stride, skip)))
+            except asyncio.IncompleteReadError:
+                break
+        while True:
+            try:
+                chunk = await proc.stdout.readexactly(stride)
+            except asyncio.IncompleteReadError as e:
+                chunk = e.partial
+                if chunk:
+                    yield chunk
+                break
+            yield chunk
+
+        return_code = await proc.wait()
+        stderr = (await stderr_task).decode("utf-8", errors="replace").strip()
+        finished = True
+        if return_code != 0:
+            raise TranscodeError(f"ffmpeg 转码失败 (退出码 {return_code}): {stderr}")
+    finally:
+        if not finished:
+            # 发送中途取消或出错：终止 ffmpeg，避免遗留子进程
+            if proc.returncode is None:
+                try:
+                    proc.kill()
+                except ProcessLookupError:
+                    pass
+                await proc.wait()
+            stderr_task.cancel()
+
+
+async def aiter_upload_chunks(
+    source: AudioSource, stride: int, start: int = 0
+) -> AsyncGenerator[Union[bytes, memoryview], None]:
+    """按块产出待上传的音频数据（转码数据源走 ffmpeg 管道，其余零拷贝读取文件）
+
+    Args:
+        source: 音频数据源
+        stride: 每块字节数
+        start: 从音频数据的第几个字节开始（断点续传）
+
+    Yields:
+        音频数据块
+    """
+    if source.transcode:
+        chunks = iter_transcoded_chunks(source.path, stride, start)
+        try:
+            async for chunk in chunks:
+                yield chunk
+        finally:
+            # 外层提前关闭时同步关闭管道，及时终止 ffmpeg
+            await chunks.aclose()
+    else:
+        for view in iter_audio_chunks(source, stride, start):
+            yield view
@@ -22,6 +22,12 @@ import traceback
 from queue import Queue  # For thread-safe GUI updates from logging handler
 from tkinter import filedialog, messagebox, scrolledtext, ttk
 
+# 压缩传输：可选的 pcm 传输编码
+from audio_codec import AUDIO_CODECS
+
+# 客户端转码：按转码后的实际上传大小预估上传时长
+from audio_transcode import compression_ratio, estimate_upload_size
+
 # 配置工具函数（避免配置写回丢数据）
 from config_utils import (
     ensure_backup_file,
@@ -31,6 +37,30 @@ from config_utils import (
     write_json_file_atomic,
 )
 
+# 结构化进度事件：替代对子进程中文 stdout 的文本解析
+from progress_events import (
+    EVENT_ERROR,
+    EVENT_FINAL_RESULT,
+    EVENT_RESULT,
+    EVENT_RESULT_FILE,
+    EVENT_UPLOAD_END,
+    EVENT_UPLOAD_PROGRESS,
+    EVENT_UPLOAD_START,
+    ProgressEventListener,
+)
+
+# 结果缓存：同一音频以相同参数再次识别时直接返回已保存的结果
+from result_cache import ResultCache, cache_params, results_from_records
+
+# 进程内转写引擎：替代每个文件启动一次子进程
+from transcribe_engine import (
+    RESULT_FILE_ID,
+    EngineRequest,
+    TranscribeEngine,
+    write_result_files,
+)
+from transcribe_session import SessionConfig, load_hotwords
+
 # 抑制 macOS 上的 NSOpenPanel 警告
 if sys.platform == "darwin":  # macOS
     import warnings
@@ -1071,10 +1101,12 @@ class TranscribeTimeManager:
         # 当前文件信息
         self.current_file_duration = None  # 秒
         self.current_file_size = None  # 字节
+        self.current_upload_size = None  # 实际上传字节数（转码后为 pcm 大小）
 
         # 计算结果
         self.transcribe_wait_timeout = 1200  # 系统超时时长（秒）- 兜底默认值20分钟
         self.transcribe_estimate_time = None  # 用户预估时长（秒）
+        self.upload_estimate_time = None  # 上传预估时长（秒）
 
     def set_speed_test_results(self, upload_speed_mbps, transcribe_speed_x):
         """设置测速结果"""
@@ -1100,7 +1132,22 @@ class TranscribeTimeManager:
             logging.warning(f"获取音频时长失败: {e}")
             return None
 
-    def calculate_transcribe_times(self, file_path):
+    def calculate_upload_time(self, file_path, transcode=True):
+        """按实际上传字节数（启用转码时为转码后的 pcm 大小）预估上传时长。
+
+        返回: 上传预估时长（秒），未测速或无法获取文件大小时为 None
+        """
+        import math
+
+        self.current_upload_size = estimate_upload_size(file_path, transcode)
+        if not self.current_upload_size or not self.last_upload_speed:
+            self.upload_estimate_time = None
+        else:
+            upload_mb = self.current_upload_size / (1024 * 1024)
+            self.upload_estimate_time = math.ceil(upload_mb / self.last_upload_speed)
+        return self.upload_estimate_time
+
+    def calculate_transcribe_times(self, file_path, transcode=True):
         """计算转写等待时长和预估时长。
 
         返回: (wait_timeout, estimate_time) 单位为秒
@@ -1113,6 +1160,7 @@ class TranscribeTimeManager:
         self.current_file_size = (
             os.path.getsize(file_path) if os.path.exists(file_path) else None
         )
+        self.calculate_upload_time(file_path, transcode)
 
         # 如果无法获取文件时长或时长为0，使用兜底策略
         if self.current_file_duration is None or self.current_file_duration <= 0:
@@ -1164,8 +1212,10 @@ class TranscribeTimeManager:
         self.last_transcribe_speed = None
         self.current_file_duration = None
         self.current_file_size = None
+        self.current_upload_size = None
         self.transcribe_wait_timeout = 1200  # 兜底默认值：20分钟
         self.transcribe_estimate_time = None
+        self.upload_estimate_time = None
 
 
 # --- Main Application Class ---
@@ -1208,6 +1258,18 @@ class FunASRGUIClient(tk.Tk):
         # 用于在语言切换时正确更新 speed_test_status_var
         self.current_speed_test_status_key_and_args = ("not_tested", [])
 
+        # 进程内转写引擎（首次识别时启动；关闭或启动失败时回退到子进程方式）
+        self.use_inprocess_engine = True
+        self.transcribe_engine = None
+        # 容器格式（mp4/mp3/m4a 等）上传前转码为 16kHz 单声道 pcm
+        self.transcode_audio = True
+        # pcm 数据的传输编码（pcm/flac/opus），服务端不支持时自动回退为 pcm
+        self.audio_codec = "pcm"
+        # 结果缓存（按音频内容 + 识别参数命中），容量单位 MB
+        self.result_cache_enabled = True
+        self.result_cache_max_mb = 200
+        self._engine_start_failed = False
+
         # 配置文件路径设置 - 遵循架构设计文档规范
         self.current_dir = os.path.dirname(os.path.abspath(__file__))
         self.project_root = os.path.abspath(
@@ -1219,6 +1281,7 @@ class FunASRGUIClient(tk.Tk):
         self.config_dir = os.path.join(self.dev_dir, "config")
         self.logs_dir = os.path.join(self.dev_dir, "logs")
         self.output_dir = os.path.join(self.dev_dir, "output")
+        self.cache_dir = os.path.join(self.dev_dir, "cache", "results")
 
         # 确保目录存在
         os.makedirs(self.config_dir, exist_ok=True)
@@ -1226,6 +1289,8 @@ class FunASRGUIClient(tk.Tk):
         os.makedirs(self.output_dir, exist_ok=True)
 
         self.config_file = os.path.join(self.config_dir, "config.json")
+        # 索引在第一次识别时才加载
+        self.result_cache = ResultCache(self.cache_dir)
         
         # 按日期命名日志文件
         current_date = time.strftime("%Y%m%d")
@@ -2682,6 +2747,11 @@ class FunASRGUIClient(tk.Tk):
                 "use_itn": self.use_itn_var.get(),
                 "use_ssl": self.use_ssl_var.get(),
                 "hotword_path": self.hotword_path_var.get(),
+                "use_inprocess_engine": bool(getattr(self, "use_inprocess_engine", True)),
+                "transcode_audio": bool(getattr(self, "transcode_audio", True)),
+                "audio_codec": getattr(self, "audio_codec", "pcm"),
+                "result_cache": bool(getattr(self, "result_cache_enabled", True)),
+                "result_cache_max_mb": getattr(self, "result_cache_max_mb", 200),
             },
             "ui": {"language": self.lang_manager.current_lang},
             "protocol": protocol,
@@ -2736,6 +2806,19 @@ class FunASRGUIClient(tk.Tk):
                 logging.info(f"已加载热词文件配置: {hotword_path}")
             else:
                 logging.warning(f"配置中的热词文件不存在: {hotword_path}")
+        self.use_inprocess_engine = bool(options.get("use_inprocess_engine", True))
+        self.transcode_audio = bool(options.get("transcode_audio", True))
+        self.audio_codec = options.get("audio_codec", "pcm")
+        if self.audio_codec not in AUDIO_CODECS:
+            logging.warning(f"配置中的传输编码无效，使用 pcm: {self.audio_codec}")
+            self.audio_codec = "pcm"
+        self.result_cache_enabled = bool(options.get("result_cache", True))
+        try:
+            max_mb = int(options.get("result_cache_max_mb", 200))
+            self.result_cache_max_mb = max(1, max_mb)
+        except (TypeError, ValueError):
+            self.result_cache_max_mb = 200
+        self.result_cache.max_bytes = self.result_cache_max_mb * 1024 * 1024
         
         # UI 配置
         ui = config.get("ui", {})
@@ -2868,6 +2951,15 @@ class FunASRGUIClient(tk.Tk):
             # 使用StatusManager显示错误状态
             self.status_manager.set_error(f"清空失败: {e}")
 
+    @staticmethod
+    def _format_result_text(text, mode):
+        """为 2pass 结果加上阶段标记"""
+        if mode == "2pass-offline":
+            return f"[2pass离线] {text}"
+        if mode == "2pass-online":
+            return f"[2pass在线] {text}"
+        return text
+
     def _display_recognition_result(self, result_text):
         """在结果选项卡中显示识别结果"""
         try:
@@ -2906,6 +2998,10 @@ class FunASRGUIClient(tk.Tk):
             self.time_manager.clear_session_data()
             logging.debug("转写时长管理器会话数据已清除")
 
+            # 停止进程内转写引擎（取消未完成的任务）
+            if self.transcribe_engine is not None:
+                self.transcribe_engine.shutdown()
+
             self.save_config()
             self.destroy()
         except Exception as e:
@@ -3292,8 +3388,18 @@ class FunASRGUIClient(tk.Tk):
 
         # 计算转写时长
         wait_timeout, estimate_time = self.time_manager.calculate_transcribe_times(
-            audio_in
+            audio_in, transcode=self.transcode_audio
         )
+        upload_size = self.time_manager.current_upload_size
+        file_size = self.time_manager.current_file_size
+        if upload_size and file_size and upload_size != file_size:
+            logging.info(
+                f"转码上传: 原始文件 {file_size / 1024 / 1024:.2f}MB, "
+                f"预计上传 {upload_size / 1024 / 1024:.2f}MB "
+                f"(压缩比 {compression_ratio(file_size, upload_size):.1f}:1)"
+            )
+        if self.time_manager.upload_estimate_time is not None:
+            logging.info(f"上传预估时长: {self.time_manager.upload_estimate_time}秒")
 
         # 记录时长计算结果
         if (
@@ -3356,6 +3462,266 @@ class FunASRGUIClient(tk.Tk):
         )
         thread.start()
 
+    def _get_transcribe_engine(self):
+        """获取进程内转写引擎（首次使用时启动）
+
+        Returns:
+            TranscribeEngine 实例；配置中已关闭或启动失败时返回 None，
+            调用方回退到子进程方式
+        """
+        if not self.use_inprocess_engine or self._engine_start_failed:
+            return None
+        if self.transcribe_engine is None:
+            try:
+                importlib.import_module("websockets")
+                engine = TranscribeEngine()
+                engine.start()
+                self.transcribe_engine = engine
+            except Exception as e:
+                logging.warning(f"系统警告: 进程内转写引擎启动失败，回退到子进程方式: {e}")
+                self._engine_start_failed = True
+                return None
+        return self.transcribe_engine
+
+    def _build_session_config(self, ip, port, wait_timeout=600):
+        """根据当前界面设置构建转写会话配置（与子进程命令行参数保持一致）"""
+        server_type_value = ""
+        server_type = getattr(self, "server_type_value_var", None)
+        if server_type:
+            server_type_value = server_type.get()
+
+        config = SessionConfig(
+            host=ip,
+            port=int(port),
+            use_ssl=self.use_ssl_var.get() != 0,
+            use_itn=self.use_itn_var.get() != 0,
+            hotwords=load_hotwords(self.hotword_path_var.get()),
+            transcribe_timeout=wait_timeout,
+            transcode=self.transcode_audio,
+            audio_codec=self.audio_codec,
+        )
+        # public_cloud 不传递服务端类型，由 IP/端口体现
+        if server_type_value and server_type_value != "public_cloud":
+            config.server_type = server_type_value
+
+        recognition_mode = getattr(self, "recognition_mode_value_var", None)
+        if recognition_mode and recognition_mode.get():
+            config.mode = recognition_mode.get()
+
+        # SenseVoice 参数（仅当服务端类型为 funasr_main 或 auto 时传递）
+        if server_type_value in ("funasr_main", "auto"):
+            svs_lang = getattr(self, "svs_lang_var", None)
+            if svs_lang:
+                config.svs_lang = svs_lang.get()
+            svs_itn = getattr(self, "svs_itn_var", None)
+            if svs_itn:
+                config.svs_itn = bool(svs_itn.get())
+            config.enable_svs_params = server_type_value == "funasr_main"
+        return config
+
+    def _result_cache_key(self, ip, port, audio_in):
+        """计算本次识别的结果缓存键（未启用缓存或文件无法读取时返回 None）"""
+        if not self.result_cache_enabled:
+            return None
+        try:
+            params = cache_params(self._build_session_config(ip, port))
+            return self.result_cache.key_for(audio_in, params)
+        except OSError as e:
+            logging.warning(f"计算结果缓存键失败，跳过缓存: {e}")
+            return None
+
+    def _replay_cached_result(self, cache_key, audio_in, results_dir):
+        """命中缓存时写出结果文件并显示识别文本（在工作线程中调用）
+
+        Returns:
+            是否命中缓存
+        """
+        records = self.result_cache.get(cache_key)
+        if records is None:
+            return False
+        results = results_from_records(records)
+        try:
+            write_result_files(results_dir, audio_in, results)
+        except OSError as e:
+            logging.warning(f"写入缓存结果文件出错，重新识别: {e}")
+            return False
+        logging.info(f"命中结果缓存，跳过上传与转写: {os.path.basename(audio_in)}")
+        for result in results:
+            # 2pass 在线部分结果已被随后的离线结果覆盖，回放时只显示最终文本
+            if result.text and result.mode != "2pass-online":
+                text = self._format_result_text(result.text, result.mode)
+                self.after(0, self._display_recognition_result, text)
+        return True
+
+    def _store_cached_result(self, cache_key, audio_in, results_dir, since):
+        """把本次识别写出的结果文件存入缓存（子进程与进程内引擎写出的文件格式相同）"""
+        base_name = os.path.splitext(os.path.basename(audio_in))[0]
+        json_path = os.path.join(results_dir, f"{base_name}.{RESULT_FILE_ID}.json")
+        try:
+            if os.path.getmtime(json_path) < since:
+                return
+            with open(json_path, encoding="utf-8") as f:
+                records = json.load(f)
+        except (OSError, ValueError) as e:
+            logging.debug(f"读取结果文件失败，不写入缓存: {e}")
+            return
+        if isinstance(records, list):
+            self.result_cache.put(cache_key, records, os.path.basename(audio_in))
+
+    def _log_client_output_line(self, stripped_line):
+        """将转写客户端的一行 stdout 输出翻译为界面日志"""
+        if stripped_line.startswith(
+            "[DEBUG]"
+        ) or stripped_line.startswith(
+            self.lang_manager.get("log_tag_debug")
+        ):
+            # 统一使用翻译后的DEBUG标签
+            actual_message = (
+                stripped_line.replace("[DEBUG]", "")
+                .replace(self.lang_manager.get("log_tag_debug"), "")
+                .strip()
+            )
+            if "使用SSL连接" in actual_message:
+                logging.debug(
+                    f"{self.lang_manager.get('client_event')}: "
+                    f"{self.lang_manager.get('log_tag_debug')} "
+                    f"{self.lang_manager.get('log_use_ssl_connection')}"
+                )
+            elif actual_message.startswith("连接到 wss://"):
+                parts = actual_message.replace(
+                    "连接到 wss://", ""
+                ).split(":")
+                if len(parts) == 2:
+                    wss_msg = self.lang_manager.get(
+                        "log_connected_to_wss", parts[0], parts[1]
+                    )
+                    logging.debug(
+                        f"{self.lang_manager.get('client_event')}: "
+                        f"{self.lang_manager.get('log_tag_debug')} "
+                        f"{wss_msg}"
+                    )
+                else:
+                    logging.debug(
+                        f"{self.lang_manager.get('client_debug')}: "
+                        f"{actual_message}"
+                    )
+            elif "处理文件数:" in actual_message:
+                count = actual_message.split(":")[1].strip()
+                logging.debug(
+                    f"{self.lang_manager.get('client_event')}: "
+                    f"{self.lang_manager.get('log_tag_debug')} "
+                    f"{self.lang_manager.get('log_processed_file_count')}: "
+                    f"{count}"
+                )
+            elif "处理文件:" in actual_message:
+                f_path = actual_message.split(":")[1].strip()
+                logging.debug(
+                    f"{self.lang_manager.get('client_event')}: "
+                    f"{self.lang_manager.get('log_tag_debug')} "
+                    f"{self.lang_manager.get('log_processing_file_path')}: {f_path}"
+                )
+            elif "文件大小:" in actual_message:
+                f_size = actual_message.split(":")[1].strip()
+                logging.debug(
+                    f"{self.lang_manager.get('client_event')}: {self.lang_manager.get('log_tag_debug')} {self.lang_manager.get('log_file_size_simple')}: {f_size}"
+                )
+            elif "已读取WAV文件, 采样率:" in actual_message:
+                parts = actual_message.replace(
+                    "已读取WAV文件, 采样率:", ""
+                ).split(", 文件大小:")
+                rate = parts[0].strip()
+                size = parts[1].strip() if len(parts) > 1 else "N/A"
+                logging.debug(
+                    f"{self.lang_manager.get('client_event')}: "
+                    f"{self.lang_manager.get('log_tag_debug')} "
+                    f"{self.lang_manager.get('log_read_wav_file')}, "
+                    f"{self.lang_manager.get('log_sample_rate')}: {rate}, "
+                    f"{self.lang_manager.get('log_file_size_simple')}: {size}"
+                )
+            elif "分块数:" in actual_message:
+                parts = actual_message.replace("分块数:", "").split(
+                    ", 每块大小:"
+                )
+                count = parts[0].strip()
+                size_info = (
+                    parts[1].strip() if len(parts) > 1 else "N/A"
+                )
+                note = (
+                    self.lang_manager.get("log_offline_stride_note")
+                    if "offline模式" in actual_message
+                    else ""
+                )
+                logging.debug(
+                    f"{self.lang_manager.get('client_event')}: "
+                    f"{self.lang_manager.get('log_tag_debug')} "
+                    f"{self.lang_manager.get('log_chunk_count')}: {count}, "
+                    f"{self.lang_manager.get('log_chunk_size_info')}: {size_info} {note}"
+                )
+            elif "等待服务器处理完成" in actual_message:
+                logging.debug(
+                    f"{self.lang_manager.get('client_event')}: {self.lang_manager.get('log_tag_debug')} {self.lang_manager.get('waiting_server')}..."
+                )
+            else:
+                logging.debug(
+                    f"{self.lang_manager.get('client_debug')}: {actual_message}"
+                )
+        elif stripped_line.startswith(
+            "[指令]"
+        ) or stripped_line.startswith(
+            self.lang_manager.get("log_tag_instruction")
+        ):
+            actual_message = (
+                stripped_line.replace("[指令]", "")
+                .replace(
+                    self.lang_manager.get("log_tag_instruction"), ""
+                )
+                .strip()
+            )
+            if "发送WebSocket:" in actual_message:
+                config_part = actual_message.split("发送WebSocket:", 1)[
+                    1
+                ].strip()
+                logging.info(
+                    f"{self.lang_manager.get('client_event')}: "
+                    f"{self.lang_manager.get('log_tag_instruction')} "
+                    f"{self.lang_manager.get('log_sent_websocket_config', config_part)}"
+                )
+            else:
+                logging.info(
+                    f"{self.lang_manager.get('client_event')}: {self.lang_manager.get('log_tag_instruction')} {actual_message}"
+                )
+        elif "等待接收消息..." in stripped_line:
+            logging.info(
+                f"{self.lang_manager.get('client_event')}: {self.lang_manager.get('debug_tag')} {self.lang_manager.get('log_waiting_for_message')}"
+            )
+        elif "创建结果文件" in stripped_line:
+            # 处理创建结果文件消息
+            logging.info(
+                f"{self.lang_manager.get('client_event')}: {self.lang_manager.get('debug_tag')} {self.lang_manager.get('create_result_file')}..."
+            )
+        elif "结果文件已完成" in stripped_line:
+            # 处理结果文件完成消息
+            logging.info(
+                f"{self.lang_manager.get('client_event')}: {self.lang_manager.get('debug_tag')} {self.lang_manager.get('result_file_created')}"
+            )
+        elif (
+            "Namespace" in stripped_line or "命名空间" in stripped_line
+        ):
+            # 处理命名空间信息 (包含一些不需要翻译的参数信息)
+            logging.info(
+                f"{self.lang_manager.get('server_response')}: {self.lang_manager.get('namespace_info')}: {stripped_line.split('命名空间')[-1] if '命名空间' in stripped_line else stripped_line.split('Namespace')[-1]}"
+            )
+        elif "处理完成" in stripped_line:
+            # 处理完成消息
+            logging.info(
+                f"{self.lang_manager.get('server_response')}: {self.lang_manager.get('processing_completed')}"
+            )
+        elif not stripped_line.startswith("["):
+            # 其他未分类的输出
+            logging.info(
+                f"{self.lang_manager.get('client_event')}: {stripped_line}"
+            )
+
     def _run_script(self, ip, port, audio_in, wait_timeout=600, estimate_time=60):
         """在新线程中运行 simple_funasr_client.py 脚本。"""
         # 构造要传递给子进程的参数列表
@@ -3390,6 +3756,10 @@ class FunASRGUIClient(tk.Tk):
             args.append("--no-itn")
         if self.use_ssl_var.get() == 0:
             args.append("--no-ssl")
+        if not self.transcode_audio:
+            args.extend(["--transcode", "0"])
+        if self.audio_codec != "pcm":
+            args.extend(["--audio_codec", self.audio_codec])
         
         # 添加热词文件参数（如果已选择）
         hotword_path = self.hotword_path_var.get()
@@ -3452,6 +3822,7 @@ class FunASRGUIClient(tk.Tk):
         upload_completed = False  # 上传是否完成
         task_completed = False  # 任务是否完成
         process = None  # 子进程对象
+        engine_job = None  # 进程内引擎任务
 
         last_message_time = time.time()  # 初始化上次收到消息的时间
 
@@ -3518,275 +3889,158 @@ class FunASRGUIClient(tk.Tk):
 
         def run_in_thread():
             # 允许修改外部变量
-            nonlocal transcribe_start_time, upload_completed, task_completed, process, last_message_time
+            nonlocal task_completed, process, last_message_time
+            nonlocal engine_job
             # 添加变量以跟踪上次记录的上传进度
             last_logged_progress = -5  # 初始值设为-5，确保0%会被打印
             # 添加变量跟踪是否收到了有效的识别结果
             received_valid_result = False
-            # 记录是否明确写入了结果文件（来自子进程提示）
+            # 记录是否明确写入了结果文件（来自子进程事件）
             result_file_written = False
+            event_listener = None
+
+            def handle_progress_event(event):
+                """处理子进程的结构化进度事件（在事件通道线程中执行）"""
+                nonlocal transcribe_start_time, upload_completed, last_message_time
+                nonlocal last_logged_progress, received_valid_result, result_file_written
+                # 更新最近消息时间，供通信超时判定
+                last_message_time = time.time()
+
+                if event.event == EVENT_UPLOAD_PROGRESS:
+                    progress_value = int(event.data.get("percent", 0))
+                    # 确保0%和100%会被打印，且步进为5%
+                    if progress_value in (0, 100) or (
+                        progress_value % 5 == 0 and progress_value > last_logged_progress
+                    ):
+                        logging.info(
+                            f"{self.lang_manager.get('server_response')}: "
+                            f"{self.lang_manager.get('upload_progress')}: {progress_value}%"
+                        )
+                        if progress_value != 100:
+                            last_logged_progress = progress_value
+                elif event.event == EVENT_UPLOAD_END:
+                    if "compression_ratio" in event.data:
+                        wire_bytes = event.data.get("wire_bytes", event.data["bytes_sent"])
+                        codec = event.data.get("audio_codec", "pcm")
+                        logging.info(
+                            f"压缩上传完成({codec}): 原始 {event.data['source_bytes'] / 1024 / 1024:.2f}MB"
+                            f" -> {wire_bytes / 1024 / 1024:.2f}MB, "
+                            f"压缩比 {event.data['compression_ratio']:.1f}:1"
+                        )
+                    # 上传完成，开始转写倒计时
+                    if not upload_completed:
+                        upload_completed = True
+                        transcribe_start_time = time.time()
+                        logging.info("转写阶段开始，启动进度倒计时")
+                elif event.event == EVENT_RESULT:
+                    text = event.data.get("text", "")
+                    if not text:
+                        return
+                    received_valid_result = True
+                    text = self._format_result_text(text, event.data.get("mode", ""))
+                    self.after(0, self._display_recognition_result, text)
+                    logging.info(
+                        f"{self.lang_manager.get('server_response')}: 识别结果: {text}"
+                    )
+                elif event.event == EVENT_RESULT_FILE:
+                    logging.info(
+                        f"{self.lang_manager.get('client_event')}: {self.lang_manager.get('debug_tag')} {self.lang_manager.get('json_result_file_created')}"
+                    )
+                    result_file_written = True
+                elif event.event == EVENT_ERROR:
+                    logging.error(
+                        f"{self.lang_manager.get('client_event')}: "
+                        f"{event.wav_name} {event.data.get('message', '')}"
+                    )
 
             try:
-                logging.debug(f"调试信息: 正在执行命令: {' '.join(args)}")
-                # 记录进程启动时间，用于后续判断结果文件是否为本次运行生成
-                process_start_time = time.time()
-                # 使用 Popen 启动子进程，捕获 stdout 和 stderr
-                process = subprocess.Popen(
-                    args,
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE,
-                    text=True,
-                    encoding="utf-8",
-                    bufsize=1,
-                    creationflags=(
-                        subprocess.CREATE_NO_WINDOW if sys.platform == "win32" else 0
-                    ),
-                )
+                cache_key = self._result_cache_key(ip, port, audio_in)
+                if cache_key and self._replay_cached_result(
+                    cache_key, audio_in, results_dir
+                ):
+                    task_completed = True
+                    self.after(
+                        0,
+                        lambda: self.status_manager.set_stage(self.status_manager.STAGE_COMPLETED)
+                    )
+                    return
 
-                # 并发读取stderr，将错误即时写入日志
-                def _read_stderr_stream(stream):
+                engine = self._get_transcribe_engine()
+                if engine is not None:
+                    # 进程内引擎：不启动子进程，进度事件直接回调
+                    process_start_time = time.time()
+                    request = EngineRequest(
+                        config=self._build_session_config(ip, port, wait_timeout),
+                        audio_path=audio_in,
+                        output_dir=results_dir,
+                    )
+                    logging.debug(f"调试信息: 使用进程内引擎识别: {audio_in}")
+                    engine_job = engine.submit(request, handle_progress_event)
+                    outcome = engine_job.wait()
+                    if not outcome.success:
+                        logging.error(
+                            f"{self.lang_manager.get('client_event')}: {outcome.error}"
+                        )
+                    return_code = 0 if outcome.success else 1
+                else:
+                    # 启动进度事件通道，子进程通过 --progress_addr 连接
+                    command = list(args)
                     try:
-                        for err_line in iter(stream.readline, ""):
-                            if not err_line:
-                                break
-                            logging.error(f"{self.lang_manager.get('subprocess_error')}\n{err_line.strip()}")
-                    except Exception:
-                        pass
+                        event_listener = ProgressEventListener(handle_progress_event)
+                        command += ["--progress_addr", event_listener.address]
+                    except OSError as e:
+                        logging.warning(f"进度事件通道启动失败，将无法显示实时进度: {e}")
+
+                    logging.debug(f"调试信息: 正在执行命令: {' '.join(command)}")
+                    # 记录进程启动时间，用于后续判断结果文件是否为本次运行生成
+                    process_start_time = time.time()
+                    # 使用 Popen 启动子进程，捕获 stdout 和 stderr
+                    process = subprocess.Popen(
+                        command,
+                        stdout=subprocess.PIPE,
+                        stderr=subprocess.PIPE,
+                        text=True,
+                        encoding="utf-8",
+                        bufsize=1,
+                        creationflags=(
+                            subprocess.CREATE_NO_WINDOW if sys.platform == "win32" else 0
+                        ),
+                    )
 
-                stderr_thread = threading.Thread(
-                    target=_read_stderr_stream, args=(process.stderr,), daemon=True
-                )
-                stderr_thread.start()
+                    # 并发读取stderr，将错误即时写入日志
+                    def _read_stderr_stream(stream):
+                        try:
+                            for err_line in iter(stream.readline, ""):
+                                if not err_line:
+                                    break
+                                logging.error(f"{self.lang_manager.get('subprocess_error')}\n{err_line.strip()}")
+                        except Exception:
+                            pass
+
+                    stderr_thread = threading.Thread(
+                        target=_read_stderr_stream, args=(process.stderr,), daemon=True
+                    )
+                    stderr_thread.start()
 
-                # 实时读取 stdout
-                while True:
-                    line = process.stdout.readline()
-                    if not line and process.poll() is not None:
-                        break
-                    if line:
-                        stripped_line = line.strip()
-                        # 更新最近消息时间，供通信超时判定
-                        last_message_time = time.time()
+                    # 实时读取 stdout
+                    while True:
+                        line = process.stdout.readline()
+                        if not line and process.poll() is not None:
+                            break
+                        if line:
+                            stripped_line = line.strip()
+                            # 更新最近消息时间，供通信超时判定
+                            last_message_time = time.time()
 
-                        # 检查是否收到了有效的识别结果
-                        if (
-                            "识别结果:" in stripped_line and len(stripped_line) > 20
-                        ):  # 确保不是空结果
-                            received_valid_result = True
-                            # 提取识别结果文本并显示在结果区域
-                            result_text = stripped_line.replace("识别结果:", "").strip()
-                            self.after(0, self._display_recognition_result, result_text)
-                            logging.info(
-                                f"{self.lang_manager.get('server_response')}: "
-                                f"{stripped_line}"
-                            )
-                        elif stripped_line.startswith(
-                            "[DEBUG]"
-                        ) or stripped_line.startswith(
-                            self.lang_manager.get("log_tag_debug")
-                        ):
-                            # 统一使用翻译后的DEBUG标签
-                            actual_message = (
-                                stripped_line.replace("[DEBUG]", "")
-                                .replace(self.lang_manager.get("log_tag_debug"), "")
-                                .strip()
-                            )
-                            if "使用SSL连接" in actual_message:
-                                logging.debug(
-                                    f"{self.lang_manager.get('client_event')}: "
-                                    f"{self.lang_manager.get('log_tag_debug')} "
-                                    f"{self.lang_manager.get('log_use_ssl_connection')}"
-                                )
-                            elif actual_message.startswith("连接到 wss://"):
-                                parts = actual_message.replace(
-                                    "连接到 wss://", ""
-                                ).split(":")
-                                if len(parts) == 2:
-                                    wss_msg = self.lang_manager.get(
-                                        "log_connected_to_wss", parts[0], parts[1]
-                                    )
-                                    logging.debug(
-                                        f"{self.lang_manager.get('client_event')}: "
-                                        f"{self.lang_manager.get('log_tag_debug')} "
-                                        f"{wss_msg}"
-                                    )
-                                else:
-                                    logging.debug(
-                                        f"{self.lang_manager.get('client_debug')}: "
-                                        f"{actual_message}"
-                                    )
-                            elif "处理文件数:" in actual_message:
-                                count = actual_message.split(":")[1].strip()
-                                logging.debug(
-                                    f"{self.lang_manager.get('client_event')}: "
-                                    f"{self.lang_manager.get('log_tag_debug')} "
-                                    f"{self.lang_manager.get('log_processed_file_count')}: "
-                                    f"{count}"
-                                )
-                            elif "处理文件:" in actual_message:
-                                f_path = actual_message.split(":")[1].strip()
-                                logging.debug(
-                                    f"{self.lang_manager.get('client_event')}: "
-                                    f"{self.lang_manager.get('log_tag_debug')} "
-                                    f"{self.lang_manager.get('log_processing_file_path')}: {f_path}"
-                                )
-                            elif "文件大小:" in actual_message:
-                                f_size = actual_message.split(":")[1].strip()
-                                logging.debug(
-                                    f"{self.lang_manager.get('client_event')}: {self.lang_manager.get('log_tag_debug')} {self.lang_manager.get('log_file_size_simple')}: {f_size}"
-                                )
-                            elif "已读取WAV文件, 采样率:" in actual_message:
-                                parts = actual_message.replace(
-                                    "已读取WAV文件, 采样率:", ""
-                                ).split(", 文件大小:")
-                                rate = parts[0].strip()
-                                size = parts[1].strip() if len(parts) > 1 else "N/A"
-                                logging.debug(
-                                    f"{self.lang_manager.get('client_event')}: "
-                                    f"{self.lang_manager.get('log_tag_debug')} "
-                                    f"{self.lang_manager.get('log_read_wav_file')}, "
-                                    f"{self.lang_manager.get('log_sample_rate')}: {rate}, "
-                                    f"{self.lang_manager.get('log_file_size_simple')}: {size}"
-                                )
-                            elif "分块数:" in actual_message:
-                                parts = actual_message.replace("分块数:", "").split(
-                                    ", 每块大小:"
-                                )
-                                count = parts[0].strip()
-                                size_info = (
-                                    parts[1].strip() if len(parts) > 1 else "N/A"
-                                )
-                                note = (
-                                    self.lang_manager.get("log_offline_stride_note")
-                                    if "offline模式" in actual_message
-                                    else ""
-                                )
-                                logging.debug(
-                                    f"{self.lang_manager.get('client_event')}: "
-                                    f"{self.lang_manager.get('log_tag_debug')} "
-                                    f"{self.lang_manager.get('log_chunk_count')}: {count}, "
-                                    f"{self.lang_manager.get('log_chunk_size_info')}: {size_info} {note}"
-                                )
-                            elif "等待服务器处理完成" in actual_message:
-                                logging.debug(
-                                    f"{self.lang_manager.get('client_event')}: {self.lang_manager.get('log_tag_debug')} {self.lang_manager.get('waiting_server')}..."
-                                )
-                            else:
-                                logging.debug(
-                                    f"{self.lang_manager.get('client_debug')}: {actual_message}"
-                                )
-                        elif stripped_line.startswith(
-                            "[指令]"
-                        ) or stripped_line.startswith(
-                            self.lang_manager.get("log_tag_instruction")
-                        ):
-                            actual_message = (
-                                stripped_line.replace("[指令]", "")
-                                .replace(
-                                    self.lang_manager.get("log_tag_instruction"), ""
-                                )
-                                .strip()
-                            )
-                            if "发送WebSocket:" in actual_message:
-                                config_part = actual_message.split("发送WebSocket:", 1)[
-                                    1
-                                ].strip()
-                                logging.info(
-                                    f"{self.lang_manager.get('client_event')}: "
-                                    f"{self.lang_manager.get('log_tag_instruction')} "
-                                    f"{self.lang_manager.get('log_sent_websocket_config', config_part)}"
-                                )
-                            else:
-                                logging.info(
-                                    f"{self.lang_manager.get('client_event')}: {self.lang_manager.get('log_tag_instruction')} {actual_message}"
-                                )
-                        elif "上传进度" in stripped_line:
-                            try:
-                                import re
-
-                                progress_match = re.search(r"(\d+)%", stripped_line)
-                                if progress_match:
-                                    progress_value = int(progress_match.group(1))
-                                    # 确保0%和100%会被打印，且步进为5%
-                                    if (
-                                        progress_value == 0
-                                        or progress_value == 100
-                                        or (
-                                            progress_value % 5 == 0
-                                            and progress_value > last_logged_progress
-                                        )
-                                    ):
-                                        progress_text = f"{progress_value}%"
-                                        logging.info(
-                                            f"{self.lang_manager.get('server_response')}: "
-                                            f"{self.lang_manager.get('upload_progress')}: {progress_text}"
-                                        )
-                                        last_logged_progress = (
-                                            progress_value
-                                            if progress_value != 100
-                                            else last_logged_progress
-                                        )  # 避免100%后阻止后续可能的其他类型日志打印
-
-                                    # 检测上传完成，开始转写倒计时
-                                    if progress_value == 100 and not upload_completed:
-                                        upload_completed = True
-                                        transcribe_start_time = time.time()
-                                        logging.info("转写阶段开始，启动进度倒计时")
-                                else:
-                                    # 旧的提取逻辑作为后备
-                                    if ":" in stripped_line:
-                                        progress = stripped_line.split(":", 1)[
-                                            1
-                                        ].strip()
-                                    else:
-                                        progress = stripped_line
-                                    logging.info(
-                                        f"{self.lang_manager.get('server_response')}: {self.lang_manager.get('upload_progress')}: {progress}"
-                                    )
-                            except Exception:
-                                logging.info(
-                                    f"{self.lang_manager.get('server_response')}: {stripped_line}"
-                                )
-                        elif "等待接收消息..." in stripped_line:
-                            logging.info(
-                                f"{self.lang_manager.get('client_event')}: {self.lang_manager.get('debug_tag')} {self.lang_manager.get('log_waiting_for_message')}"
-                            )
-                        elif "创建结果文件" in stripped_line:
-                            # 处理创建结果文件消息
-                            logging.info(
-                                f"{self.lang_manager.get('client_event')}: {self.lang_manager.get('debug_tag')} {self.lang_manager.get('create_result_file')}..."
-                            )
-                        elif "结果文件已完成" in stripped_line:
-                            # 处理结果文件完成消息
-                            logging.info(
-                                f"{self.lang_manager.get('client_event')}: {self.lang_manager.get('debug_tag')} {self.lang_manager.get('result_file_created')}"
-                            )
-                        elif "JSON结果文件已写入并关闭" in stripped_line:
-                            # 处理JSON结果文件完成消息
-                            logging.info(
-                                f"{self.lang_manager.get('client_event')}: {self.lang_manager.get('debug_tag')} {self.lang_manager.get('json_result_file_created')}"
-                            )
-                            result_file_written = True
-                        elif (
-                            "Namespace" in stripped_line or "命名空间" in stripped_line
-                        ):
-                            # 处理命名空间信息 (包含一些不需要翻译的参数信息)
-                            logging.info(
-                                f"{self.lang_manager.get('server_response')}: {self.lang_manager.get('namespace_info')}: {stripped_line.split('命名空间')[-1] if '命名空间' in stripped_line else stripped_line.split('Namespace')[-1]}"
-                            )
-                        elif "处理完成" in stripped_line:
-                            # 处理完成消息
-                            logging.info(
-                                f"{self.lang_manager.get('server_response')}: {self.lang_manager.get('processing_completed')}"
-                            )
-                        elif not stripped_line.startswith("["):
-                            # 其他未分类的输出
-                            logging.info(
-                                f"{self.lang_manager.get('client_event')}: {stripped_line}"
-                            )
+                            # 上传进度、识别结果与结果文件状态来自进度事件，
+                            # stdout 仅用于转写日志显示
+                            self._log_client_output_line(stripped_line)
 
-                # 等待进程结束并获取返回码
-                return_code = process.wait()
+                    # 等待进程结束并获取返回码
+                    return_code = process.wait()
+                    # 等待进度事件全部处理完毕后再判定结果
+                    if event_listener is not None:
+                        event_listener.drain()
 
                 # 严格化成功判定：必须同时满足以下条件
                 # 1. 退出码为0（进程正常退出）
@@ -3824,6 +4078,10 @@ class FunASRGUIClient(tk.Tk):
                         )
                     )
                     task_completed = True
+                    if cache_key:
+                        self._store_cached_result(
+                            cache_key, audio_in, results_dir, process_start_time
+                        )
                     # 使用StatusManager显示完成阶段
                     self.after(
                         0,
@@ -3907,6 +4165,23 @@ class FunASRGUIClient(tk.Tk):
                 # 确保进程被终止（如果它仍在运行）
                 if process and process.poll() is None:
                     self._terminate_process_safely(process, timeout=5, process_name="识别进程")
+                if engine_job is not None and not engine_job.done():
+                    engine_job.cancel()
+                if event_listener is not None:
+                    event_listener.close()
+
+        def task_running():
+            """识别任务（子进程或进程内引擎任务）是否仍在运行"""
+            if engine_job is not None:
+                return not engine_job.done()
+            return process is not None and process.poll() is None
+
+        def stop_task(process_name):
+            """终止识别任务：取消引擎任务或终止子进程"""
+            if engine_job is not None:
+                engine_job.cancel()
+            else:
+                self._terminate_process_safely(process, timeout=5, process_name=process_name)
 
         # 启动超时监控 - 使用动态计算的wait_timeout（修复：使用绝对时间判断）
         def check_timeout():
@@ -3921,11 +4196,11 @@ class FunASRGUIClient(tk.Tk):
                 elapsed = current_time - transcribe_start_time
                 
                 if elapsed > wait_timeout:
-                    if process and process.poll() is None:
+                    if task_running():
                         logging.warning(
                             f"转写超时: 已用时{elapsed:.0f}秒，超过设定{wait_timeout}秒"
                         )
-                        self._terminate_process_safely(process, timeout=5, process_name="识别进程(超时)")
+                        stop_task("识别进程(超时)")
                         # 使用StatusManager显示错误状态
                         self.after(
                             0,
@@ -3946,12 +4221,12 @@ class FunASRGUIClient(tk.Tk):
             # 检查通信超时（基于最后消息时间）
             comm_timeout = max(600, wait_timeout // 2)  # 通信超时=max(10分钟, 系统超时的一半)
             if (current_time - last_message_time) > comm_timeout:
-                if process and process.poll() is None:
+                if task_running():
                     elapsed_comm = current_time - last_message_time
                     logging.warning(
                         f"通信超时: 距上次消息已{elapsed_comm:.0f}秒，超过设定{comm_timeout}秒"
                     )
-                    self._terminate_process_safely(process, timeout=5, process_name="识别进程(通信超时)")
+                    stop_task("识别进程(通信超时)")
                     # 使用StatusManager显示错误状态
                     self.after(
                         0,
@@ -4458,6 +4733,10 @@ class FunASRGUIClient(tk.Tk):
             args.append("--no-itn")
         if self.use_ssl_var.get() == 0:
             args.append("--no-ssl")
+        if not self.transcode_audio:
+            args.extend(["--transcode", "0"])
+        if self.audio_codec != "pcm":
+            args.extend(["--audio_codec", self.audio_codec])
 
         # === Phase 3: 添加服务端类型和识别模式参数（速度测试） ===
         # 服务端类型
@@ -4487,124 +4766,117 @@ class FunASRGUIClient(tk.Tk):
                 if server_type_value == "funasr_main":
                     args.extend(["--enable_svs_params", "1"])
 
+        # 各阶段时间点取自子进程进度事件的单调时钟时间戳（毫秒级精度，
+        # 不受 stdout 管道缓冲影响）；只在同一子进程的时间戳之间求差
         upload_start_time = None
         upload_end_time = None
         transcribe_start_time = None
         transcribe_end_time = None
+        process = None
+        event_listener = None
+        file_number = self.test_file_index + 1
 
-        try:
-            logging.debug(f"调试信息: 执行速度测试命令: {' '.join(args)}")
-            process = subprocess.Popen(
-                args,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True,
-                encoding="utf-8",
-                bufsize=1,
-                creationflags=(
-                    subprocess.CREATE_NO_WINDOW if sys.platform == "win32" else 0
-                ),
-            )
+        def handle_progress_event(event):
+            """记录速度测试各阶段的时间点（在事件通道线程中执行）"""
+            nonlocal upload_start_time, upload_end_time
+            nonlocal transcribe_start_time, transcribe_end_time
 
-            # 并发读取stderr，直接透出异常栈
-            def _read_stderr_stream(stream):
-                try:
-                    for err_line in iter(stream.readline, ""):
-                        if not err_line:
-                            break
-                        logging.error(f"{self.lang_manager.get('subprocess_error')}\n{err_line.strip()}")
-                except Exception:
-                    pass
-
-            err_thread = threading.Thread(target=_read_stderr_stream, args=(process.stderr,), daemon=True)
-            err_thread.start()
-
-            # 实时读取输出，查找上传开始、结束和转写完成的标志
-            for line in iter(process.stdout.readline, ""):
-                if not line:
-                    break
-
-                line = line.strip()
-                logging.debug(f"速度测试输出: {line}")
-
-                # 检测上传开始（匹配实际的日志输出格式）
-                if (
-                    ("发送初始化消息:" in line or "发送WebSocket:" in line)
-                    and "mode" in line
-                    and upload_start_time is None
-                ):
-                    upload_start_time = time.time()
+            if event.event == EVENT_UPLOAD_START and upload_start_time is None:
+                upload_start_time = event.t
+                logging.info(
+                    self.lang_manager.get("speed_test_upload_started", file_number)
+                )
+            elif event.event == EVENT_UPLOAD_END and upload_end_time is None:
+                upload_end_time = event.t
+                transcribe_start_time = event.t  # 上传结束即开始转写
+                # 上传速度按实际发送字节数计算（转码后远小于原始文件）
+                bytes_sent = event.data.get("bytes_sent")
+                if bytes_sent and file_number <= len(self.file_sizes):
+                    self.file_sizes[file_number - 1] = bytes_sent
+                if upload_start_time is not None:
                     logging.info(
                         self.lang_manager.get(
-                            "speed_test_upload_started", self.test_file_index + 1
+                            "speed_test_upload_completed",
+                            file_number,
+                            upload_end_time - upload_start_time,
                         )
                     )
-
-                # 检测上传进度，当进度达到100%时认为上传结束
-                if "上传进度: 100%" in line and upload_end_time is None:
-                    upload_end_time = time.time()
-                    transcribe_start_time = time.time()  # 上传结束即开始转写
-                    # 安全检查：确保upload_start_time不为None
-                    if upload_start_time is not None:
-                        logging.info(
-                            self.lang_manager.get(
-                                "speed_test_upload_completed",
-                                self.test_file_index + 1,
-                                upload_end_time - upload_start_time,
-                            )
-                        )
-                    else:
-                        logging.warning(
-                            f"速度测试警告: 文件{self.test_file_index + 1}未检测到上传开始时间，无法计算上传耗时"
+            elif event.event == EVENT_FINAL_RESULT and transcribe_end_time is None:
+                transcribe_end_time = event.t
+                if transcribe_start_time is not None:
+                    logging.info(
+                        self.lang_manager.get(
+                            "speed_test_transcription_completed",
+                            file_number,
+                            transcribe_end_time - transcribe_start_time,
                         )
+                    )
+            elif event.event == EVENT_ERROR:
+                logging.error(
+                    f"速度测试错误: 文件{file_number} {event.data.get('message', '')}"
+                )
 
-                # 兜底：如果收到 is_speaking=false 指令，也视作上传阶段结束
-                if (
-                    "发送WebSocket:" in line
-                    and '"is_speaking": false' in line.replace(" ", "").lower()
-                    and upload_end_time is None
-                ):
-                    upload_end_time = time.time()
-                    transcribe_start_time = upload_end_time
-                    if upload_start_time is not None:
-                        logging.info(
-                            self.lang_manager.get(
-                                "speed_test_upload_completed",
-                                self.test_file_index + 1,
-                                upload_end_time - upload_start_time,
-                            )
-                        )
+        try:
+            engine = self._get_transcribe_engine()
+            if engine is not None:
+                # 进程内引擎：事件时间戳取自 GUI 进程的单调时钟
+                request = EngineRequest(
+                    config=self._build_session_config(ip, port),
+                    audio_path=file_path,
+                    output_dir=results_dir,
+                    timeout=600,  # 最多等待10分钟
+                )
+                logging.debug(f"调试信息: 使用进程内引擎执行速度测试: {file_path}")
+                outcome = engine.submit(request, handle_progress_event).wait()
+                if not outcome.success:
+                    logging.warning(f"速度测试警告: {outcome.error}")
+            else:
+                event_listener = ProgressEventListener(handle_progress_event)
+                args += ["--progress_addr", event_listener.address]
 
-                # 检测转写完成（匹配实际的日志输出格式）
-                if (
-                    "离线识别完成" in line
-                    or "实时识别完成" in line
-                    or "离线模式收到非空文本" in line
-                    or "收到结束标志或完整结果" in line
-                ) and transcribe_end_time is None:
-                    transcribe_end_time = time.time()
-                    # 安全检查：确保transcribe_start_time不为None
-                    if transcribe_start_time is not None:
-                        logging.info(
-                            self.lang_manager.get(
-                                "speed_test_transcription_completed",
-                                self.test_file_index + 1,
-                                transcribe_end_time - transcribe_start_time,
-                            )
-                        )
-                    else:
-                        logging.warning(
-                            f"速度测试警告: 文件{self.test_file_index + 1}未检测到转写开始时间，无法计算转写耗时"
-                        )
+                logging.debug(f"调试信息: 执行速度测试命令: {' '.join(args)}")
+                process = subprocess.Popen(
+                    args,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.PIPE,
+                    text=True,
+                    encoding="utf-8",
+                    bufsize=1,
+                    creationflags=(
+                        subprocess.CREATE_NO_WINDOW if sys.platform == "win32" else 0
+                    ),
+                )
 
-            # 确保进程结束（设置超时避免无限等待）
-            try:
-                process.wait(timeout=600)  # 最多等待10分钟
-            except subprocess.TimeoutExpired:
-                logging.warning("速度测试警告: 子进程执行超时，正在终止进程")
-                self._terminate_process_safely(process, timeout=5, process_name="速度测试进程")
-                self.after(0, self._handle_test_error, "速度测试超时")
-                return
+                # 并发读取stderr，直接透出异常栈
+                def _read_stderr_stream(stream):
+                    try:
+                        for err_line in iter(stream.readline, ""):
+                            if not err_line:
+                                break
+                            logging.error(f"{self.lang_manager.get('subprocess_error')}\n{err_line.strip()}")
+                    except Exception:
+                        pass
+
+                err_thread = threading.Thread(target=_read_stderr_stream, args=(process.stderr,), daemon=True)
+                err_thread.start()
+
+                # stdout 仅作为调试日志，时间点由进度事件提供
+                for line in iter(process.stdout.readline, ""):
+                    if not line:
+                        break
+                    logging.debug(f"速度测试输出: {line.strip()}")
+
+                # 确保进程结束（设置超时避免无限等待）
+                try:
+                    process.wait(timeout=600)  # 最多等待10分钟
+                except subprocess.TimeoutExpired:
+                    logging.warning("速度测试警告: 子进程执行超时，正在终止进程")
+                    self._terminate_process_safely(process, timeout=5, process_name="速度测试进程")
+                    self.after(0, self._handle_test_error, "速度测试超时")
+                    return
+
+                # 等待进度事件全部处理完毕
+                event_listener.drain()
 
             # 检查是否成功获取了所有时间点
             if (
@@ -4666,6 +4938,9 @@ class FunASRGUIClient(tk.Tk):
             if process and process.poll() is None:
                 self._terminate_process_safely(process, timeout=5, process_name="速度测试进程(异常)")
             self.after(0, self._handle_test_error, str(e))
+        finally:
+            if event_listener is not None:
+                event_listener.close()
 
     def _handle_test_error(self, error_msg):
         """处理测试过程中的错误"""
@@ -0,0 +1,627 @@
+"""FunASR WebSocket 服务端负载压测
+
+以目标到达率驱动 N 个并发模拟客户端（offline / online / 2pass），对任何使用
+ProtocolAdapter 协议的服务端做端到端压测，统计逐请求延迟与整体吞吐。
+
+核心功能：
+1. 到达模型：按目标到达率（泊松或匀速间隔）生成请求；到达率为 0 时为闭环压测
+   （客户端空闲即发送下一条）
+2. 并发客户端：每个模拟客户端按模式各持有一条持久连接（TranscribeSession），
+   请求按模式与音频轮转分配
+3. 逐请求指标：排队耗时、上传耗时、首个结果耗时、最终结果耗时、上传结束后的
+   尾延迟与 RTF
+4. 汇总报告：按模式与总体统计均值、p50/p90/p95/p99、最大值与吞吐量，输出 JSON / CSV
+5. 桩服务端：基于 stub_server 的桩服务端，可模拟识别耗时与并发容量，供 CI 使用
+
+说明：
+- 指标时间取自会话的进度事件（time.perf_counter），与 GUI 使用的事件一致
+- 排队耗时从计划到达时刻算起（开环压测），服务端变慢时不会因客户端被占满而少算延迟
+- online / 2pass 默认按实时速率发送音频（模拟麦克风输入），offline 不等待
+- RTF = 最终结果耗时 / 音频时长；实时发送时 RTF 不低于 1
+
+用法示例：
+    python load_benchmark.py --stub --audio demo.wav --modes offline 2pass \\
+        --clients 8 --rate 4 --requests 200 --json report.json --csv requests.csv
+
+版本: 3.0
+日期: 2026-10-17
+"""
+
+import argparse
+import asyncio
+import csv
+import json
+import logging
+import os
+import random
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+from audio_transcode import open_upload_source
+from progress_events import (
+    EVENT_FINAL_RESULT,
+    EVENT_FIRST_PARTIAL,
+    EVENT_UPLOAD_END,
+    EVENT_UPLOAD_START,
+    ProgressEmitter,
+    ProgressEvent,
+)
+from stub_server import StubConnection, StubServer
+from transcribe_session import (
+    SessionConfig,
+    TranscribeSession,
+    UtteranceJob,
+    load_scp_jobs,
+)
+from websocket_compat import connect_websocket
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+MODES = ("offline", "online", "2pass")
+
+# 汇总报告中的百分位
+PERCENTILES = (50, 90, 95, 99)
+
+# 逐请求指标（秒；rtf 无单位）
+METRICS = (
+    "queue_seconds",
+    "upload_seconds",
+    "first_partial_seconds",
+    "final_seconds",
+    "tail_seconds",
+    "rtf",
+)
+
+
+@dataclass
+class BenchmarkConfig:
+    """压测配置"""
+
+    host: str
+    port: int
+    audio_files: List[str]  # 轮流使用的音频文件
+    use_ssl: bool = True
+    modes: List[str] = field(default_factory=lambda: ["offline"])  # 请求按模式轮转
+    clients: int = 4  # 并发模拟客户端数
+    requests: int = 20  # 请求总数
+    rate: float = 0.0  # 目标到达率（请求/秒），0 为闭环压测
+    arrival: str = "poisson"  # 到达间隔：poisson（指数分布）/ uniform（匀速）
+    realtime: bool = True  # online / 2pass 按实时速率发送音频
+    audio_fs: int = 16000
+    use_itn: bool = True
+    server_type: str = "auto"
+    chunk_size: List[int] = field(default_factory=lambda: [5, 10, 5])
+    chunk_interval: int = 10
+    transcribe_timeout: float = 600.0  # 单条请求等待结果的超时（秒）
+    seed: int = 0  # 到达间隔随机种子
+
+
+@dataclass
+class RequestRecord:
+    """一条压测请求及其指标（时间均为秒，时刻相对压测开始）"""
+
+    index: int
+    mode: str
+    wav_name: str
+    audio_path: str
+    audio_seconds: float
+    client: int = -1
+    scheduled_at: Optional[float] = None  # 计划到达时刻（闭环压测为开始时刻）
+    started_at: Optional[float] = None  # 客户端开始处理时刻
+    success: bool = False
+    error: str = ""
+    attempts: int = 0
+    queue_seconds: Optional[float] = None  # 计划到达 -> 开始处理
+    upload_seconds: Optional[float] = None  # 开始发送 -> 结束消息发出
+    first_partial_seconds: Optional[float] = None  # 开始发送 -> 首个非空结果
+    final_seconds: Optional[float] = None  # 开始发送 -> 最终结果
+    tail_seconds: Optional[float] = None  # 结束消息发出 -> 最终结果
+    rtf: Optional[float] = None  # final_seconds / audio_seconds
+    text: str = ""
+
+
+def audio_duration(path: str, audio_fs: int = 16000) -> float:
+    """计算音频上传数据的时长（秒；容器格式为转码后的估算值）"""
+    source = open_upload_source(path, audio_fs, True)
+    return source.data_size / (source.sample_rate * 2) if source.sample_rate else 0.0
+
+
+def arrival_offsets(
+    count: int, rate: float, arrival: str = "poisson", seed: int = 0
+) -> Optional[List[float]]:
+    """生成请求的计划到达时刻（相对压测开始，秒）
+
+    Args:
+        count: 请求数
+        rate: 目标到达率（请求/秒），不大于 0 时返回 None（闭环压测）
+        arrival: poisson（指数分布间隔）或 uniform（固定间隔）
+        seed: 随机种子
+
+    Returns:
+        单调不减的到达时刻列表，首个请求在 0 时刻到达
+    """
+    if rate <= 0:
+        return None
+    if arrival not in ("poisson", "uniform"):
+        raise ValueError(f"未知的到达间隔分布: {arrival}")
+    rng = random.Random(seed)
+    offsets = []
+    t = 0.0
+    for _ in range(count):
+        offsets.append(t)
+        t += rng.expovariate(rate) if arrival == "poisson" else 1.0 / rate
+    return offsets
+
+
+def plan_requests(
+    config: BenchmarkConfig, durations: Dict[str, float]
+) -> List[RequestRecord]:
+    """按模式与音频轮转生成请求列表（wav_name 唯一，用于关联进度事件）"""
+    records = []
+    for index in range(config.requests):
+        path = config.audio_files[index % len(config.audio_files)]
+        stem = os.path.splitext(os.path.basename(path))[0]
+        records.append(
+            RequestRecord(
+                index=index,
+                mode=config.modes[index % len(config.modes)],
+                wav_name=f"req{index:05d}_{stem}",
+                audio_path=path,
+                audio_seconds=durations[path],
+            )
+        )
+    return records
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """线性插值百分位（sorted_values 需已排序且非空）"""
+    pos = (len(sorted_values) - 1) * q / 100
+    lower = int(pos)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (
+        pos - lower
+    )
+
+
+def describe(values: List[float]) -> Dict[str, float]:
+    """统计均值、百分位与最大值（空列表返回空字典）"""
+    if not values:
+        return {}
+    values = sorted(values)
+    stats = {"mean": round(sum(values) / len(values), 6)}
+    for q in PERCENTILES:
+        stats[f"p{q}"] = round(percentile(values, q), 6)
+    stats["max"] = round(values[-1], 6)
+    return stats
+
+
+def summarize(records: List[RequestRecord], wall_seconds: float) -> Dict[str, Any]:
+    """按模式与总体汇总指标
+
+    Returns:
+        {"all": {...}, "<mode>": {...}}，每组含请求数、成功/失败数、吞吐与各指标统计
+    """
+    groups: Dict[str, List[RequestRecord]] = {"all": records}
+    for record in records:
+        groups.setdefault(record.mode, []).append(record)
+
+    summary: Dict[str, Any] = {}
+    for name, group in groups.items():
+        done = [r for r in group if r.success]
+        audio_seconds = sum(r.audio_seconds for r in done)
+        summary[name] = {
+            "requests": len(group),
+            "succeeded": len(done),
+            "failed": len(group) - len(done),
+            "audio_seconds": round(audio_seconds, 3),
+            "throughput_rps": round(len(done) / wall_seconds, 4) if wall_seconds else 0,
+            # 每秒处理的音频秒数（即相对实时的倍数）
+            "audio_throughput": (
+                round(audio_seconds / wall_seconds, 4) if wall_seconds else 0
+            ),
+            "metrics": {
+                metric: describe(
+                    [getattr(r, metric) for r in done if getattr(r, metric) is not None]
+                )
+                for metric in METRICS
+            },
+        }
+    return summary
+
+
+class LoadBenchmark:
+    """负载压测执行器
+
+    用法示例：
+        report = await LoadBenchmark(config).run()
+        write_json_report(report, "report.json")
+    """
+
+    def __init__(
+        self, config: BenchmarkConfig, connect: Callable[..., Any] = connect_websocket
+    ):
+        """初始化压测
+
+        Args:
+            config: 压测配置
+            connect: 连接工厂（默认使用兼容层，测试时可替换）
+        """
+        if not config.audio_files:
+            raise ValueError("至少需要一个音频文件")
+        for mode in config.modes:
+            if mode not in MODES:
+                raise ValueError(f"未知的识别模式: {mode}")
+        self.config = config
+        self._connect = connect
+        self._events: Dict[str, Dict[str, float]] = {}
+        self._emitter = ProgressEmitter(on_event=self._on_event)
+        self.records: List[RequestRecord] = []
+
+    def _on_event(self, event: ProgressEvent) -> None:
+        """记录各请求的事件时刻（开始发送与首个结果取首次，其余取最后一次）"""
+        times = self._events.setdefault(event.wav_name, {})
+        if event.event in (EVENT_UPLOAD_START, EVENT_FIRST_PARTIAL):
+            times.setdefault(event.event, event.t)
+        elif event.event in (EVENT_UPLOAD_END, EVENT_FINAL_RESULT):
+            times[event.event] = event.t
+
+    def _session_config(self, mode: str) -> SessionConfig:
+        config = self.config
+        return SessionConfig(
+            host=config.host,
+            port=config.port,
+            use_ssl=config.use_ssl,
+            mode=mode,
+            audio_fs=config.audio_fs,
+            use_itn=config.use_itn,
+            server_type=config.server_type,
+            chunk_size=list(config.chunk_size),
+            chunk_interval=config.chunk_interval,
+            send_without_sleep=mode == "offline" or not config.realtime,
+            transcribe_timeout=config.transcribe_timeout,
+        )
+
+    def _fill_metrics(self, record: RequestRecord) -> None:
+        """由事件时刻计算请求指标"""
+        times = self._events.pop(record.wav_name, {})
+        upload_start = times.get(EVENT_UPLOAD_START)
+        if upload_start is None:
+            return
+        upload_end = times.get(EVENT_UPLOAD_END)
+        first_partial = times.get(EVENT_FIRST_PARTIAL)
+        final = times.get(EVENT_FINAL_RESULT)
+        if upload_end is not None:
+            record.upload_seconds = upload_end - upload_start
+        if first_partial is not None:
+            record.first_partial_seconds = first_partial - upload_start
+        if final is not None:
+            record.final_seconds = final - upload_start
+            if upload_end is not None:
+                record.tail_seconds = final - upload_end
+            if record.audio_seconds > 0:
+                record.rtf = record.final_seconds / record.audio_seconds
+
+    async def _client(
+        self, client_id: int, queue: "asyncio.Queue[Optional[RequestRecord]]", t0: float
+    ) -> None:
+        """模拟客户端：从队列取请求，按模式使用各自的持久连接转写"""
+        sessions: Dict[str, TranscribeSession] = {}
+        try:
+            while True:
+                record = await queue.get()
+                if record is None:
+                    return
+                started = time.perf_counter()
+                record.client = client_id
+                record.started_at = started - t0
+                if record.scheduled_at is None:
+                    record.scheduled_at = record.started_at
+                record.queue_seconds = max(0.0, record.started_at - record.scheduled_at)
+
+                session = sessions.get(record.mode)
+                if session is None:
+                    session = TranscribeSession(
+                        self._session_config(record.mode),
+                        connect=self._connect,
+                        emitter=self._emitter,
+                    )
+                    sessions[record.mode] = session
+                job = UtteranceJob(wav_name=record.wav_name, wav_path=record.audio_path)
+                try:
+                    outcome = await session.transcribe(job)
+                    record.success = outcome.success
+                    record.error = outcome.error or ""
+                    record.attempts = outcome.attempts
+                    record.text = outcome.text
+                except Exception as e:
+                    record.error = f"压测请求异常: {e}"
+                self._fill_metrics(record)
+        finally:
+            for session in sessions.values():
+                await session.close()
+
+    async def run(self) -> Dict[str, Any]:
+        """执行压测
+
+        Returns:
+            报告字典：config、wall_seconds、achieved_rate、summary 与逐请求 requests
+        """
+        config = self.config
+        durations = {
+            path: audio_duration(path, config.audio_fs)
+            for path in dict.fromkeys(config.audio_files)
+        }
+        self.records = plan_requests(config, durations)
+        offsets = arrival_offsets(
+            len(self.records), config.rate, config.arrival, config.seed
+        )
+        queue: "asyncio.Queue[Optional[RequestRecord]]" = asyncio.Queue()
+        num_clients = max(1, config.clients)
+
+        t0 = time.perf_counter()
+        clients = [
+            asyncio.create_task(self._client(i, queue, t0)) for i in range(num_clients)
+        ]
+        try:
+            for k, record in enumerate(self.records):
+                if offsets is not None:
+                    record.scheduled_at = offsets[k]
+                    delay = t0 + offsets[k] - time.perf_counter()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                queue.put_nowait(record)
+            for _ in clients:
+                queue.put_nowait(None)
+            await asyncio.gather(*clients)
+        finally:
+            for task in clients:
+                task.cancel()
+        wall_seconds = time.perf_counter() - t0
+
+        last_arrival = offsets[-1] if offsets else 0.0
+        return {
+            "config": asdict(config),
+            "wall_seconds": round(wall_seconds, 6),
+            "achieved_rate": (
+                round((len(self.records) - 1) / last_arrival, 4)
+                if last_arrival > 0
+                else None
+            ),
+            "summary": summarize(self.records, wall_seconds),
+            "requests": [asdict(r) for r in self.records],
+        }
+
+
+def write_json_report(report: Dict[str, Any], path: str) -> None:
+    """写出 JSON 报告"""
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+def write_csv_report(report: Dict[str, Any], path: str) -> None:
+    """写出逐请求 CSV（字段与 RequestRecord 一致）"""
+    fieldnames = list(RequestRecord.__dataclass_fields__)
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerows(report["requests"])
+
+
+def format_summary(report: Dict[str, Any]) -> str:
+    """格式化汇总表（延迟单位为毫秒）"""
+
+    def ms(stats: Dict[str, float], key: str) -> str:
+        return f"{stats[key] * 1000:.0f}" if key in stats else "-"
+
+    lines = [
+        f"{'模式':<8}{'成功/总数':>10}{'请求/秒':>9}{'实时倍数':>9}"
+        f"{'首结果p50':>10}{'首结果p95':>10}{'最终p50':>9}{'最终p95':>9}"
+        f"{'最终p99':>9}{'RTF p50':>9}"
+    ]
+    for name, group in report["summary"].items():
+        metrics = group["metrics"]
+        rtf = metrics["rtf"]
+        lines.append(
+            f"{name:<8}{group['succeeded']:>6}/{group['requests']:<4}"
+            f"{group['throughput_rps']:>9.2f}{group['audio_throughput']:>9.2f}"
+            f"{ms(metrics['first_partial_seconds'], 'p50'):>10}"
+            f"{ms(metrics['first_partial_seconds'], 'p95'):>10}"
+            f"{ms(metrics['final_seconds'], 'p50'):>9}"
+            f"{ms(metrics['final_seconds'], 'p95'):>9}"
+            f"{ms(metrics['final_seconds'], 'p99'):>9}"
+            f"{format(rtf['p50'], '.3f') if rtf else '-':>9}"
+        )
+    return "\n".join(lines)
+
+
+class BenchmarkStubServer(StubServer):
+    """模拟识别耗时与并发容量的桩服务端（供 CI 与本地压测使用，不做真实识别）
+
+    - offline：收到结束消息后按 rtf 模拟识别耗时，回复一条 offline 结果
+    - online：每收到 partial_seconds 的音频回复一条 online 中间结果，结束时回复 is_final=True
+    - 2pass：中间结果为 2pass-online，结束后按 rtf 模拟识别耗时回复 2pass-offline
+    workers 限制同时进行的模拟识别数（0 为不限），用于观察服务端饱和时的排队
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        rtf: float = 0.05,
+        partial_seconds: float = 0.6,
+        workers: int = 0,
+        sample_rate: int = 16000,
+    ):
+        super().__init__(host=host, port=port)
+        self.rtf = rtf
+        self.partial_bytes = max(2, int(partial_seconds * sample_rate) * 2)
+        self.workers = workers
+        self.sample_rate = sample_rate
+        self.utterances = 0
+        self._decode_slots: Optional[asyncio.Semaphore] = None
+
+    async def _decode(self, audio_seconds: float) -> None:
+        """模拟识别耗时"""
+        if self._decode_slots is None:
+            await asyncio.sleep(audio_seconds * self.rtf)
+            return
+        async with self._decode_slots:
+            await asyncio.sleep(audio_seconds * self.rtf)
+
+    async def on_audio(self, conn: StubConnection, message: bytes) -> None:
+        if conn.mode == "offline":
+            return
+        # 每跨过一个 partial_bytes 边界回复一条中间结果
+        first = (conn.received - len(message)) // self.partial_bytes + 1
+        for index in range(first, conn.received // self.partial_bytes + 1):
+            seconds = index * self.partial_bytes / (2 * self.sample_rate)
+            await conn.send(
+                {
+                    "mode": "online" if conn.mode == "online" else "2pass-online",
+                    "wav_name": conn.wav_name,
+                    "text": f"stub {seconds:.1f}s",
+                    "is_final": False,
+                }
+            )
+
+    async def on_end(self, conn: StubConnection, data: Dict[str, Any]) -> None:
+        mode = conn.mode
+        audio_seconds = conn.received / (2 * self.sample_rate)
+        final = {
+            "wav_name": conn.wav_name,
+            "text": f"stub {audio_seconds:.2f}s",
+            "is_final": mode == "online",
+        }
+        if mode == "online":
+            final["mode"] = "online"
+        else:
+            await self._decode(audio_seconds)
+            final["mode"] = "offline" if mode == "offline" else "2pass-offline"
+        self.utterances += 1
+        await conn.send(final)
+
+    async def start(self) -> int:
+        if self.workers > 0:
+            self._decode_slots = asyncio.Semaphore(self.workers)
+        return await super().start()
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description="FunASR WebSocket 服务端负载压测")
+    parser.add_argument("--host", type=str, default="localhost", help="服务器地址")
+    parser.add_argument("--port", type=int, default=10095, help="服务器端口")
+    parser.add_argument(
+        "--ssl", type=int, default=1, help="是否启用SSL连接：1=启用, 0=禁用"
+    )
+    parser.add_argument(
+        "--no-ssl", action="store_false", dest="ssl", default=None, help="禁用SSL"
+    )
+    parser.add_argument(
+        "--audio",
+        nargs="+",
+        required=True,
+        help="音频文件（可多个，轮流使用）或 .scp 列表",
+    )
+    parser.add_argument("--audio_fs", type=int, default=16000, help="音频采样率")
+    parser.add_argument(
+        "--modes", nargs="+", default=["offline"], choices=MODES, help="识别模式"
+    )
+    parser.add_argument("--clients", type=int, default=4, help="并发模拟客户端数")
+    parser.add_argument("--requests", type=int, default=20, help="请求总数")
+    parser.add_argument(
+        "--rate", type=float, default=0.0, help="目标到达率（请求/秒），0 为闭环压测"
+    )
+    parser.add_argument(
+        "--arrival", default="poisson", choices=["poisson", "uniform"], help="到达间隔"
+    )
+    parser.add_argument(
+        "--no-realtime",
+        action="store_false",
+        dest="realtime",
+        help="online/2pass 不按实时速率发送",
+    )
+    parser.add_argument(
+        "--server_type",
+        type=str,
+        default="auto",
+        choices=["auto", "legacy", "funasr_main"],
+        help="服务端类型",
+    )
+    parser.add_argument("--chunk_size", type=str, default="5, 10, 5", help="分块大小")
+    parser.add_argument("--chunk_interval", type=int, default=10, help="分块间隔")
+    parser.add_argument(
+        "--timeout", type=float, default=600.0, help="单条请求等待结果的超时（秒）"
+    )
+    parser.add_argument("--seed", type=int, default=0, help="到达间隔随机种子")
+    parser.add_argument("--json", type=str, default=None, help="JSON 报告输出路径")
+    parser.add_argument("--csv", type=str, default=None, help="逐请求 CSV 输出路径")
+    parser.add_argument(
+        "--stub",
+        action="store_true",
+        help="启动本地桩服务端并对其压测（忽略 host/port）",
+    )
+    parser.add_argument(
+        "--stub_rtf", type=float, default=0.05, help="桩服务端模拟的识别 RTF"
+    )
+    parser.add_argument(
+        "--stub_workers", type=int, default=0, help="桩服务端并发识别数，0 为不限"
+    )
+    return parser.parse_args(argv)
+
+
+def config_from_args(args: argparse.Namespace) -> BenchmarkConfig:
+    """由命令行参数构建压测配置（.scp 列表展开为音频文件）"""
+    audio_files: List[str] = []
+    for path in args.audio:
+        if path.endswith(".scp"):
+            audio_files.extend(job.wav_path for job in load_scp_jobs(path))
+        else:
+            audio_files.append(path)
+    return BenchmarkConfig(
+        host=args.host,
+        port=args.port,
+        audio_files=audio_files,
+        use_ssl=bool(args.ssl),
+        modes=list(args.modes),
+        clients=args.clients,
+        requests=args.requests,
+        rate=args.rate,
+        arrival=args.arrival,
+        realtime=args.realtime,
+        audio_fs=args.audio_fs,
+        server_type=args.server_type,
+        chunk_size=[int(x) for x in args.chunk_size.split(",")],
+        chunk_interval=args.chunk_interval,
+        transcribe_timeout=args.timeout,
+        seed=args.seed,
+    )
+
+
+async def run_benchmark(args: argparse.Namespace) -> Dict[str, Any]:
+    """按命令行参数执行压测（--stub 时先启动桩服务端）"""
+    config = config_from_args(args)
+    if not args.stub:
+        return await LoadBenchmark(config).run()
+    stub = BenchmarkStubServer(rtf=args.stub_rtf, workers=args.stub_workers)
+    async with stub:
+        config.host, config.port, config.use_ssl = stub.host, stub.port, False
+        return await LoadBenchmark(config).run()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.WARNING)
+    report = asyncio.run(run_benchmark(args))
+    print(format_summary(report))
+    print(f"总耗时 {report['wall_seconds']:.2f} 秒")
+    if args.json:
+        write_json_report(report, args.json)
+    if args.csv:
+        write_csv_report(report, args.csv)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,323 @@
+"""转写进度事件通道
+
+在转写子进程与 GUI 之间传递结构化进度事件，替代对中文 stdout 文本的正则解析。
+
+核心功能：
+1. 事件格式：每行一个 JSON 对象（NDJSON），带单调时钟时间戳
+2. 发送端：子进程通过本地 TCP 套接字逐行发送事件；也可直接回调（进程内使用）
+3. 接收端：GUI 在 127.0.0.1 上监听随机端口，后台线程逐行解析并回调
+
+事件示例：
+    {"event": "upload_end", "t": 12345.678901, "wav_name": "a.wav", "bytes_sent": 1024}
+
+说明：
+- 时间戳 t 取自子进程的 time.perf_counter（单调、毫秒级以上精度），
+  只用于同一发送端内事件之间的差值计算，不与墙上时钟比较
+- 使用本地套接字而非额外的文件描述符，Windows 下同样可用
+- 通道不可用时发送端自动降级为空操作，不影响转写本身
+
+版本: 3.0
+日期: 2026-10-17
+"""
+
+import json
+import logging
+import socket
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# 事件类型
+EVENT_UPLOAD_START = "upload_start"  # 开始发送（开始消息发出前）
+EVENT_UPLOAD_PROGRESS = "upload_progress"  # 已发送字节数
+EVENT_UPLOAD_END = "upload_end"  # 结束消息已发出
+EVENT_FIRST_PARTIAL = "first_partial"  # 收到首个非空识别结果
+EVENT_RESULT = "result"  # 每条非空识别结果
+EVENT_FINAL_RESULT = "final_result"  # 单个文件识别完成
+EVENT_RESULT_FILE = "result_file"  # 结果文件已写出
+EVENT_ERROR = "error"  # 错误
+
+# 连接接收端的超时（秒）
+CONNECT_TIMEOUT = 3.0
+
+
+@dataclass
+class ProgressEvent:
+    """一条进度事件"""
+
+    event: str  # 事件类型
+    t: float  # 发送端单调时钟（秒）
+    wav_name: str = ""  # 关联的音频标识
+    data: Dict[str, Any] = field(default_factory=dict)  # 事件附加字段
+
+    def to_line(self) -> bytes:
+        """序列化为一行 NDJSON（UTF-8，含换行符）"""
+        payload: Dict[str, Any] = {
+            "event": self.event,
+            "t": round(self.t, 6),
+            "wav_name": self.wav_name,
+        }
+        payload.update(self.data)
+        return (json.dumps(payload, ensure_ascii=False) + "\n").encode("utf-8")
+
+    @classmethod
+    def from_line(cls, line: Any) -> Optional["ProgressEvent"]:
+        """从一行 NDJSON 解析事件
+
+        Args:
+            line: bytes 或 str
+
+        Returns:
+            ProgressEvent，格式非法时返回 None
+        """
+        try:
+            if isinstance(line, bytes):
+                line = line.decode("utf-8")
+            payload = json.loads(line)
+            if not isinstance(payload, dict):
+                return None
+            event = payload.pop("event")
+            t = float(payload.pop("t"))
+            wav_name = str(payload.pop("wav_name", ""))
+        except (ValueError, KeyError, TypeError, UnicodeDecodeError):
+            return None
+        return cls(event=event, t=t, wav_name=wav_name, data=payload)
+
+
+class ProgressEmitter:
+    """进度事件发送端
+
+    - address 为 "host:port" 时通过本地套接字发送（子进程使用）
+    - on_event 不为空时直接回调（进程内使用）
+    - 两者都为空或连接失败时为空操作
+    """
+
+    def __init__(
+        self,
+        address: Optional[str] = None,
+        on_event: Optional[Callable[[ProgressEvent], None]] = None,
+        clock: Callable[[], float] = time.perf_counter,
+    ):
+        """初始化发送端
+
+        Args:
+            address: 接收端地址 "host:port"
+            on_event: 进程内事件回调
+            clock: 时钟函数（默认 time.perf_counter）
+        """
+        self.on_event = on_event
+        self._clock = clock
+        self._sock: Optional[socket.socket] = None
+        self._lock = threading.Lock()
+        self._last_percent: Dict[str, int] = {}
+
+        if address:
+            try:
+                host, port = address.rsplit(":", 1)
+                self._sock = socket.create_connection(
+                    (host, int(port)), timeout=CONNECT_TIMEOUT
+                )
+                self._sock.settimeout(None)
+                self._sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            except (OSError, ValueError) as e:
+                logger.warning(f"进度事件通道连接失败，已禁用: {address}, {e}")
+                self._sock = None
+
+    @property
+    def enabled(self) -> bool:
+        """通道是否可用"""
+        return self._sock is not None or self.on_event is not None
+
+    def emit(
+        self, event: str, wav_name: str = "", t: Optional[float] = None, **data: Any
+    ) -> None:
+        """发送一条事件
+
+        Args:
+            event: 事件类型
+            wav_name: 关联的音频标识
+            t: 事件时间（默认取当前时钟）
+            **data: 附加字段（需可 JSON 序列化）
+        """
+        if not self.enabled:
+            return
+        progress_event = ProgressEvent(
+            event=event,
+            t=self._clock() if t is None else t,
+            wav_name=wav_name,
+            data=data,
+        )
+
+        if self.on_event is not None:
+            try:
+                self.on_event(progress_event)
+            except Exception as e:
+                logger.warning(f"进度事件回调出错: {e}")
+
+        if self._sock is not None:
+            line = progress_event.to_line()
+            with self._lock:
+                try:
+                    self._sock.sendall(line)
+                except OSError as e:
+                    logger.warning(f"进度事件发送失败，已禁用: {e}")
+                    self._close_socket()
+
+    def emit_upload_progress(
+        self, wav_name: str, bytes_sent: int, total_bytes: int
+    ) -> None:
+        """发送上传进度（同一音频仅在整数百分比变化时发送）"""
+        if not self.enabled:
+            return
+        percent = int(bytes_sent * 100 / total_bytes) if total_bytes else 100
+        if self._last_percent.get(wav_name) == percent:
+            return
+        self._last_percent[wav_name] = percent
+        self.emit(
+            EVENT_UPLOAD_PROGRESS,
+            wav_name,
+            bytes_sent=bytes_sent,
+            total_bytes=total_bytes,
+            percent=percent,
+        )
+
+    def now(self) -> float:
+        """发送端当前时钟（用于事后补发事件时指定时间）"""
+        return self._clock()
+
+    def close(self) -> None:
+        """关闭通道（接收端随后读到 EOF）"""
+        with self._lock:
+            self._close_socket()
+
+    def _close_socket(self) -> None:
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            except OSError:
+                pass
+            self._sock = None
+
+
+class ProgressEventListener:
+    """进度事件接收端（GUI 使用）
+
+    在 127.0.0.1 随机端口监听，每个连接一个读取线程，逐行解析后回调 on_event。
+    回调在后台线程中执行，涉及界面更新时需自行切回主线程。
+
+    用法示例：
+        listener = ProgressEventListener(handle_event)
+        cmd += ["--progress_addr", listener.address]
+        ...
+        listener.close()
+    """
+
+    def __init__(
+        self, on_event: Callable[[ProgressEvent], None], host: str = "127.0.0.1"
+    ):
+        """初始化并开始监听
+
+        Args:
+            on_event: 事件回调
+            host: 监听地址（仅本机）
+
+        Raises:
+            OSError: 无法监听本地端口
+        """
+        self.on_event = on_event
+        self._server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._server.bind((host, 0))
+        self._server.listen(8)
+        self._server.settimeout(0.2)
+        self.address = f"{host}:{self._server.getsockname()[1]}"
+
+        self._closed = threading.Event()
+        self._connections: List[socket.socket] = []
+        self._readers: List[threading.Thread] = []
+        self._lock = threading.Lock()
+        self._acceptor = threading.Thread(target=self._accept_loop, daemon=True)
+        self._acceptor.start()
+
+    def _accept_loop(self) -> None:
+        while not self._closed.is_set():
+            try:
+                conn, _ = self._server.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                return
+            self._start_reader(conn)
+
+        # 停止前取走已在队列中的连接，避免丢失已退出子进程的事件
+        self._server.settimeout(0)
+        while True:
+            try:
+                conn, _ = self._server.accept()
+            except OSError:
+                return
+            self._start_reader(conn)
+
+    def _start_reader(self, conn: socket.socket) -> None:
+        conn.settimeout(None)
+        reader = threading.Thread(target=self._read_loop, args=(conn,), daemon=True)
+        with self._lock:
+            self._connections.append(conn)
+            self._readers.append(reader)
+        reader.start()
+
+    def _read_loop(self, conn: socket.socket) -> None:
+        try:
+            with conn.makefile("rb") as stream:
+                for line in stream:
+                    progress_event = ProgressEvent.from_line(line)
+                    if progress_event is None:
+                        logger.debug(f"忽略非法进度事件: {line!r}")
+                        continue
+                    try:
+                        self.on_event(progress_event)
+                    except Exception as e:
+                        logger.warning(f"进度事件处理出错: {e}")
+        except (OSError, ValueError):
+            pass
+        finally:
+            try:
+                conn.close()
+            except OSError:
+                pass
+
+    def drain(self, timeout: float = 5.0) -> None:
+        """停止接收新连接，并等待已连接的发送端全部关闭、事件处理完毕
+
+        子进程退出后调用，保证判定结果前所有事件都已回调。
+        """
+        self._stop_accepting()
+        deadline = time.monotonic() + timeout
+        with self._lock:
+            readers = list(self._readers)
+        for reader in readers:
+            reader.join(max(0.0, deadline - time.monotonic()))
+
+    def close(self) -> None:
+        """停止监听并关闭所有连接"""
+        self._stop_accepting()
+        with self._lock:
+            connections = list(self._connections)
+        for conn in connections:
+            try:
+                conn.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def _stop_accepting(self) -> None:
+        if self._closed.is_set() and not self._acceptor.is_alive():
+            return
+        self._closed.set()
+        self._acceptor.join(1.0)
+        try:
+            self._server.close()
+        except OSError:
+            pass
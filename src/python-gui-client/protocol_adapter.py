@@ -58,6 +58,14 @@ class MessageProfile:
     # 音频格式参数
     wav_format: str = "pcm"
     audio_fs: int = 16000
+    audio_codec: str = "pcm"  # 传输编码：pcm / flac / opus（见 audio_codec）
+
+    # 断点续传参数
+    session_id: str = ""  # 续传会话标识（为空时不启用续传）
+    resume: bool = False  # 是否请求从服务端保存的检查点继续
+
+    # 离线流水线：服务端边接收边按 VAD 分段识别，逐段返回结果（仅 offline 模式）
+    pipeline: bool = False
 
     # 功能开关
     use_itn: bool = True  # 是否启用逆文本正则化
@@ -98,6 +106,13 @@ class ParsedResult:
     timestamp: Optional[List] = None
     stamp_sents: Optional[List] = None
 
+    # 续传检查点：服务端已确认处理完的音频字节数（仅续传会话的分段结果携带）
+    checkpoint: Optional[int] = None
+
+    # 离线流水线：分段序号（从 0 开始）与"全部分段完成"标志
+    segment: Optional[int] = None
+    segments_done: bool = False
+
     # 原始数据（用于调试和兜底）
     raw: Optional[Dict[str, Any]] = None
     raw_string: Optional[str] = None
@@ -148,6 +163,20 @@ class ProtocolAdapter:
         if profile.hotwords:
             msg["hotwords"] = profile.hotwords
 
+        # 压缩传输：仅在请求压缩时下发，pcm 保持原有消息格式
+        if profile.audio_codec != "pcm":
+            msg["audio_codec"] = profile.audio_codec
+
+        # 断点续传：同样仅在启用时下发
+        if profile.session_id:
+            msg["session_id"] = profile.session_id
+            if profile.resume:
+                msg["resume"] = True
+
+        # 离线流水线：旧服务端忽略该字段，仍在结束后返回单条结果
+        if profile.pipeline and profile.mode == RecognitionMode.OFFLINE:
+            msg["pipeline"] = True
+
         # 2pass/online 模式需要 chunk 参数
         if profile.mode in [RecognitionMode.ONLINE, RecognitionMode.TWOPASS]:
             msg["chunk_size"] = profile.chunk_size
@@ -212,6 +241,9 @@ class ProtocolAdapter:
         result.is_final = self._coerce_bool(data.get("is_final", False))
         result.timestamp = data.get("timestamp")
         result.stamp_sents = data.get("stamp_sents")
+        result.checkpoint = self._coerce_int(data.get("checkpoint"), "checkpoint")
+        result.segment = self._coerce_int(data.get("segment"), "segment")
+        result.segments_done = self._coerce_bool(data.get("segments_done", False))
 
         # 文本提取（兼容多种格式）
         result.text = self._extract_text(data)
@@ -226,6 +258,50 @@ class ProtocolAdapter:
 
         return result
 
+    def parse_codec_ack(self, raw_msg: Any) -> Optional[str]:
+        """解析服务端的编码确认消息
+
+        支持压缩传输的服务端在收到带 audio_codec 的开始消息后回复
+        {"codec_ack": "flac"}（不支持时回复 "pcm"）。该消息不是识别结果，
+        应在 parse_result 之前过滤。
+
+        Args:
+            raw_msg: 原始消息
+
+        Returns:
+            服务端实际采用的编码，非确认消息返回 None
+        """
+        data = self._parse_control(raw_msg, "codec_ack")
+        return None if data is None else str(data["codec_ack"])
+
+    def parse_resume_ack(self, raw_msg: Any) -> Optional[Dict[str, Any]]:
+        """解析服务端的续传确认消息
+
+        支持续传的服务端在收到 resume=true 的开始消息后回复
+        {"resume_offset": 字节数, "results": [已确认的分段结果...]}，
+        没有保存该会话（或已过期）时 resume_offset 为 0。该消息不是识别结果，
+        应在 parse_result 之前过滤。
+
+        Args:
+            raw_msg: 原始消息
+
+        Returns:
+            确认消息内容，非确认消息返回 None
+        """
+        return self._parse_control(raw_msg, "resume_offset")
+
+    def _parse_control(self, raw_msg: Any, key: str) -> Optional[Dict[str, Any]]:
+        """解析以 key 字段标识的控制消息（非控制消息返回 None）"""
+        if not isinstance(raw_msg, str) or key not in raw_msg:
+            return None
+        try:
+            data = json.loads(raw_msg)
+        except json.JSONDecodeError:
+            return None
+        if not isinstance(data, dict) or key not in data:
+            return None
+        return data
+
     def _extract_text(self, data: Dict[str, Any]) -> str:
         """从响应数据中提取文本
 
@@ -274,6 +350,8 @@ class ProtocolAdapter:
         - 2pass：收到 2pass-offline 即认为"最终纠错结果"已到达
                  （即便 text 为空也应结束，避免静音卡死）
         - 其他：优先遵循 is_final=True 的明确结束标志
+        - 离线流水线：以 segments_done 标志结束；分段结果（带 segment 或
+                     续传 checkpoint）之后还有分段，不结束等待
 
         Args:
             data: 解析后的JSON数据
@@ -284,6 +362,14 @@ class ProtocolAdapter:
         mode = data.get("mode", "")
         is_final = self._coerce_bool(data.get("is_final", False))
 
+        # 情况0：离线流水线/续传会话的分段结果，以"全部分段完成"标志结束
+        if self._coerce_bool(data.get("segments_done", False)):
+            logger.debug("结束判定: segments_done=True，全部分段完成")
+            return True
+        if data.get("segment") is not None or data.get("checkpoint") is not None:
+            logger.debug("结束判定: 分段结果，继续等待")
+            return False
+
         # 情况1：服务端明确标记完成
         if is_final:
             logger.debug("结束判定: is_final=True，明确结束标志")
@@ -308,6 +394,17 @@ class ProtocolAdapter:
 
         return False
 
+    @staticmethod
+    def _coerce_int(value: Any, name: str) -> Optional[int]:
+        """将可选的整数字段宽容转换（缺失或格式错误时返回 None）"""
+        if value is None:
+            return None
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            logger.warning(f"{name} 字段格式错误: {value}")
+            return None
+
     @staticmethod
     def _coerce_bool(value: Any) -> bool:
         """将 is_final 等字段做宽容布尔转换。
@@ -0,0 +1,301 @@
+"""转写结果本地缓存
+
+以音频内容哈希 + 识别参数为键缓存识别结果，同一音频以相同参数再次识别时
+直接返回已保存的结果，无需重新上传与转写。
+
+核心功能：
+1. 内容寻址：流式计算音频文件 SHA-256（内存占用与文件大小无关），
+   与影响识别结果的参数（服务端类型、模式、ITN、热词、SenseVoice 参数、
+   传输编码、转码开关）一起构成缓存键
+2. 哈希复用：按 路径 + 大小 + 修改时间 记住已计算的哈希，重复打开同一文件时无需重读
+3. LRU 淘汰：按总大小与条目数上限淘汰最久未使用的结果
+4. 延迟加载：索引文件在第一次查询/写入时才读取，不影响启动速度
+
+说明：
+- 缓存目录结构：index.json（索引）+ entries/{key}.json（每条结果一个文件）
+- 结果以服务端原始回包保存，读取时经协议适配层重新解析
+- 索引损坏或结果文件缺失时视为未命中，不影响正常识别
+
+版本: 3.0
+日期: 2026-10-17
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from config_utils import read_json_file, write_json_file_atomic
+from protocol_adapter import ParsedResult, ProtocolAdapter
+from transcribe_session import SessionConfig
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+CACHE_INDEX_FILE = "index.json"
+CACHE_INDEX_VERSION = 1
+CACHE_ENTRIES_DIR = "entries"
+
+# 默认容量：200MB / 2000 条
+DEFAULT_MAX_BYTES = 200 * 1024 * 1024
+DEFAULT_MAX_ENTRIES = 2000
+
+# 流式哈希的读取块大小
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# 影响识别结果的参数（SessionConfig 字段）
+CACHE_PARAM_FIELDS = (
+    "server_type",
+    "mode",
+    "use_itn",
+    "hotwords",
+    "enable_svs_params",
+    "svs_lang",
+    "svs_itn",
+    "audio_codec",
+    "transcode",
+)
+
+
+def hash_audio_file(path: str, chunk_size: int = HASH_CHUNK_SIZE) -> str:
+    """流式计算音频文件的 SHA-256
+
+    Args:
+        path: 音频文件路径
+        chunk_size: 每次读取的字节数
+
+    Returns:
+        十六进制哈希值
+
+    Raises:
+        OSError: 文件无法读取
+    """
+    digest = hashlib.sha256()
+    buffer = bytearray(chunk_size)
+    view = memoryview(buffer)
+    with open(path, "rb") as f:
+        while True:
+            n = f.readinto(buffer)
+            if not n:
+                break
+            digest.update(view[:n])
+    return digest.hexdigest()
+
+
+def cache_params(config: SessionConfig) -> Dict[str, Any]:
+    """提取会话配置中影响识别结果的参数"""
+    return {name: getattr(config, name) for name in CACHE_PARAM_FIELDS}
+
+
+def build_cache_key(audio_hash: str, params: Dict[str, Any]) -> str:
+    """由音频哈希与识别参数生成缓存键"""
+    payload = json.dumps(
+        {"audio": audio_hash, "params": params}, sort_keys=True, ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def results_from_records(records: List[Dict[str, Any]]) -> List[ParsedResult]:
+    """把缓存中的原始回包重新解析为 ParsedResult"""
+    adapter = ProtocolAdapter()
+    return [
+        adapter.parse_result(json.dumps(record, ensure_ascii=False))
+        for record in records
+    ]
+
+
+class ResultCache:
+    """转写结果缓存（线程安全）
+
+    用法示例：
+        cache = ResultCache(cache_dir)
+        key = cache.key_for(audio_path, cache_params(config))
+        records = cache.get(key)
+        if records is None:
+            ...识别...
+            cache.put(key, [r.raw for r in results], audio_name)
+    """
+
+    def __init__(
+        self,
+        cache_dir: str,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+    ):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._index_path = os.path.join(cache_dir, CACHE_INDEX_FILE)
+        self._entries_dir = os.path.join(cache_dir, CACHE_ENTRIES_DIR)
+        # 键 -> {"size", "last_used", "audio_name"}，按最近使用排序（末尾最新）
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        # "路径|大小|修改时间" -> 音频哈希
+        self._hashes: "OrderedDict[str, str]" = OrderedDict()
+        self._total_bytes = 0
+        self._loaded = False
+        self._lock = threading.RLock()
+
+    @property
+    def total_bytes(self) -> int:
+        """缓存结果占用的总字节数"""
+        with self._lock:
+            self._ensure_loaded()
+            return self._total_bytes
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._ensure_loaded()
+            return len(self._entries)
+
+    def _ensure_loaded(self) -> None:
+        """首次使用时读取索引"""
+        if self._loaded:
+            return
+        self._loaded = True
+        index = read_json_file(self._index_path)
+        if index.get("version") != CACHE_INDEX_VERSION:
+            if index:
+                logger.info("结果缓存索引版本不匹配，忽略旧索引")
+            return
+        entries = index.get("entries", {})
+        for key, meta in sorted(
+            entries.items(), key=lambda item: item[1].get("last_used", 0)
+        ):
+            self._entries[key] = meta
+            self._total_bytes += int(meta.get("size", 0))
+        self._hashes.update(index.get("hashes", {}))
+        logger.debug(f"结果缓存索引已加载: {len(self._entries)} 条")
+
+    def _save_index(self) -> None:
+        try:
+            write_json_file_atomic(
+                self._index_path,
+                {
+                    "version": CACHE_INDEX_VERSION,
+                    "entries": dict(self._entries),
+                    "hashes": dict(self._hashes),
+                },
+            )
+        except OSError as e:
+            logger.warning(f"写入结果缓存索引失败: {e}")
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self._entries_dir, f"{key}.json")
+
+    def audio_hash(self, path: str) -> str:
+        """获取音频文件哈希（文件未变化时复用已计算的值）
+
+        Raises:
+            OSError: 文件无法读取
+        """
+        stat = os.stat(path)
+        signature = f"{os.path.abspath(path)}|{stat.st_size}|{stat.st_mtime_ns}"
+        with self._lock:
+            self._ensure_loaded()
+            cached = self._hashes.get(signature)
+            if cached is not None:
+                self._hashes.move_to_end(signature)
+                return cached
+
+        # 计算哈希不持有锁，避免大文件阻塞其他线程
+        audio_hash = hash_audio_file(path)
+        with self._lock:
+            self._hashes[signature] = audio_hash
+            while len(self._hashes) > self.max_entries:
+                self._hashes.popitem(last=False)
+        return audio_hash
+
+    def key_for(self, path: str, params: Dict[str, Any]) -> str:
+        """计算音频文件在给定识别参数下的缓存键
+
+        Raises:
+            OSError: 文件无法读取
+        """
+        return build_cache_key(self.audio_hash(path), params)
+
+    def get(self, key: str) -> Optional[List[Dict[str, Any]]]:
+        """查询缓存
+
+        Returns:
+            原始回包列表，未命中时返回 None
+        """
+        with self._lock:
+            self._ensure_loaded()
+            if key not in self._entries:
+                return None
+            data = read_json_file(self._entry_path(key))
+            records = data.get("results")
+            if not isinstance(records, list):
+                logger.warning(f"结果缓存文件缺失或损坏，移除: {key}")
+                self._remove(key)
+                self._save_index()
+                return None
+            self._entries[key]["last_used"] = time.time()
+            self._entries.move_to_end(key)
+            self._save_index()
+            return records
+
+    def put(
+        self, key: str, records: List[Dict[str, Any]], audio_name: str = ""
+    ) -> None:
+        """写入缓存（超出容量时淘汰最久未使用的条目）
+
+        Args:
+            key: 缓存键
+            records: 原始回包列表
+            audio_name: 音频文件名（仅用于排查）
+        """
+        if not records:
+            return
+        path = self._entry_path(key)
+        with self._lock:
+            self._ensure_loaded()
+            try:
+                write_json_file_atomic(
+                    path, {"audio_name": audio_name, "results": records}
+                )
+                size = os.path.getsize(path)
+            except OSError as e:
+                logger.warning(f"写入结果缓存失败: {e}")
+                return
+            if key in self._entries:
+                self._total_bytes -= int(self._entries[key].get("size", 0))
+            self._entries[key] = {
+                "size": size,
+                "last_used": time.time(),
+                "audio_name": audio_name,
+            }
+            self._entries.move_to_end(key)
+            self._total_bytes += size
+            self._evict()
+            self._save_index()
+
+    def clear(self) -> None:
+        """清空缓存"""
+        with self._lock:
+            self._ensure_loaded()
+            for key in list(self._entries):
+                self._remove(key)
+            self._hashes.clear()
+            self._save_index()
+
+    def _evict(self) -> None:
+        while self._entries and (
+            self._total_bytes > self.max_bytes or len(self._entries) > self.max_entries
+        ):
+            key = next(iter(self._entries))
+            logger.debug(f"淘汰结果缓存: {self._entries[key].get('audio_name', key)}")
+            self._remove(key)
+
+    def _remove(self, key: str) -> None:
+        meta = self._entries.pop(key, None)
+        if meta is not None:
+            self._total_bytes -= int(meta.get("size", 0))
+        try:
+            os.remove(self._entry_path(key))
+        except OSError:
+            pass
@@ -0,0 +1,132 @@
+"""FunASR 协议桩服务端
+
+不做真实识别的本地 WebSocket 服务端，供压测工具（load_benchmark --stub）与测试共用。
+
+核心功能：
+1. 监听与消息分派：区分开始消息 / 音频 / 结束消息，记录连接数与开始消息，
+   按连接维护 wav_name、识别模式与已收字节数
+2. 处理钩子：回复由 on_start / on_audio / on_end 决定，使用方按需继承覆盖
+3. 默认行为：最小化的离线协议，结束时回复一条文本为收到字节数的 offline 结果；
+   可模拟压缩传输确认、断线与不回复结果
+
+版本: 3.0
+日期: 2026-10-17
+"""
+
+import json
+from typing import Any, Dict, List, Optional, Sequence
+
+
+class StubConnection:
+    """一条连接的状态，钩子可在其上保存自己的字段"""
+
+    def __init__(self, ws: Any):
+        self.ws = ws
+        self.wav_name = ""
+        self.mode = "offline"  # 开始消息中的识别模式
+        self.received = 0  # 本条语音已收到的音频字节数
+        self.closed = False
+
+    async def send(self, payload: Dict[str, Any]) -> None:
+        await self.ws.send(json.dumps(payload))
+
+    async def close(self) -> None:
+        """断开连接，之后不再处理该连接的消息"""
+        self.closed = True
+        await self.ws.close()
+
+
+class StubServer:
+    """最小化的 FunASR 离线协议桩服务端
+
+    每收到 is_speaking=false，回复一条带 wav_name 的 offline 结果，文本为收到的字节数。
+    accept_codecs 不为 None 时模拟支持压缩传输的服务端，对 audio_codec 回复 codec_ack。
+    drop_after_first_end 为 True 时第一次收到结束消息即断开连接；silent 为 True 时不回复结果。
+    """
+
+    def __init__(
+        self,
+        drop_after_first_end: bool = False,
+        silent: bool = False,
+        accept_codecs: Optional[Sequence[str]] = None,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ):
+        self.drop_after_first_end = drop_after_first_end
+        self.silent = silent
+        self.accept_codecs = accept_codecs
+        self.host = host
+        self.port = port
+        self.connections = 0
+        self.start_messages: List[Dict[str, Any]] = []
+        self._dropped = False
+        self._server: Any = None
+
+    async def on_start(self, conn: StubConnection, data: Dict[str, Any]) -> None:
+        """收到开始消息（wav_name、mode 与已收字节数已更新）"""
+        if self.accept_codecs is not None and "audio_codec" in data:
+            codec = data["audio_codec"]
+            if codec not in self.accept_codecs:
+                codec = "pcm"
+            await conn.send({"codec_ack": codec, "wav_name": conn.wav_name})
+
+    async def on_audio(self, conn: StubConnection, message: bytes) -> None:
+        """收到一块音频（已计入 conn.received）"""
+
+    async def on_end(self, conn: StubConnection, data: Dict[str, Any]) -> None:
+        """收到 is_speaking=false 结束消息"""
+        if self.drop_after_first_end and not self._dropped:
+            self._dropped = True
+            await conn.close()
+            return
+        if not self.silent:
+            await conn.send(
+                {
+                    "mode": "offline",
+                    "wav_name": conn.wav_name,
+                    "text": f"bytes={conn.received}",
+                    "is_final": False,
+                }
+            )
+
+    async def handler(self, ws: Any, *args: Any) -> None:
+        self.connections += 1
+        conn = StubConnection(ws)
+        async for message in ws:
+            if isinstance(message, str):
+                data = json.loads(message)
+                if data.get("is_speaking") is False:
+                    await self.on_end(conn, data)
+                else:
+                    self.start_messages.append(data)
+                    conn.wav_name = data.get("wav_name", "")
+                    conn.mode = data.get("mode", "offline")
+                    conn.received = 0
+                    await self.on_start(conn, data)
+            else:
+                conn.received += len(message)
+                await self.on_audio(conn, message)
+            if conn.closed:
+                return
+
+    async def start(self) -> int:
+        """启动服务端，返回实际监听端口"""
+        import websockets
+
+        self._server = await websockets.serve(self.handler, self.host, self.port)
+        self.port = list(self._server.sockets)[0].getsockname()[1]
+        return self.port
+
+    async def stop(self) -> None:
+        """停止服务端"""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def __aenter__(self) -> "StubServer":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc: Any) -> None:
+        await self.stop()
@@ -0,0 +1,282 @@
+"""进程内转写引擎
+
+在 GUI 进程内常驻一个后台 asyncio 事件循环，直接调用转写会话完成识别，
+避免每个文件都启动一次 Python 子进程（解释器启动、依赖导入、参数解析）。
+
+核心功能：
+1. 常驻事件循环：后台守护线程运行，首次使用时启动，关闭窗口时停止
+2. 任务提交：线程安全地提交转写任务，返回可等待/可取消的任务句柄
+3. 进度回调：复用 progress_events 的事件格式，与子进程事件通道一致
+4. 单任务超时：超时后取消任务并返回失败结果
+5. 结果文件：与子进程单文件模式相同的命名与格式写出 text/json 结果
+
+说明：
+- 子进程方式（simple_funasr_client.py）仍保留，作为崩溃隔离的兜底方案
+- 事件回调在引擎线程中执行，涉及界面更新时需自行切回主线程
+
+版本: 3.0
+日期: 2026-10-17
+"""
+
+import asyncio
+import concurrent.futures
+import logging
+import os
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+from progress_events import (
+    EVENT_ERROR,
+    EVENT_RESULT_FILE,
+    ProgressEmitter,
+    ProgressEvent,
+)
+from protocol_adapter import ParsedResult
+from transcribe_session import (
+    SessionConfig,
+    TranscribeSession,
+    UtteranceJob,
+    UtteranceResult,
+    format_result_line,
+    result_json_record,
+    write_result_json,
+)
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# 结果文件编号，与子进程单文件模式（ws_client 的 "{id}_{i}"）保持一致
+RESULT_FILE_ID = "0_0"
+
+
+def write_result_files(
+    output_dir: str, audio_path: str, results: List[ParsedResult]
+) -> Optional[str]:
+    """写出结果文件（text.{id} 追加文本，{base}.{id}.json 保存全部回包）
+
+    Args:
+        output_dir: 输出目录
+        audio_path: 音频文件路径（用于 JSON 文件命名）
+        results: 回包列表
+
+    Returns:
+        JSON 文件路径，没有可写内容时返回 None
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    json_results: List[Dict[str, Any]] = []
+    with open(
+        os.path.join(output_dir, f"text.{RESULT_FILE_ID}"), "a", encoding="utf-8"
+    ) as ibest_writer:
+        for result in results:
+            if not result.text and not result.timestamp:
+                continue
+            if result.text:
+                ibest_writer.write(format_result_line(result))
+            record = result_json_record(result)
+            if record is not None:
+                json_results.append(record)
+
+    if not json_results:
+        return None
+
+    base_name = os.path.splitext(os.path.basename(audio_path))[0]
+    json_file_path = os.path.join(output_dir, f"{base_name}.{RESULT_FILE_ID}.json")
+    write_result_json(json_file_path, json_results)
+    return json_file_path
+
+
+@dataclass
+class EngineRequest:
+    """一次转写请求"""
+
+    config: SessionConfig  # 连接与识别参数
+    audio_path: str  # 音频文件路径
+    output_dir: Optional[str] = None  # 结果输出目录（为空时不写文件）
+    timeout: Optional[float] = None  # 整个任务的超时（秒），为空时不限制
+    wav_name: str = ""  # 音频标识（为空时使用文件名）
+
+
+class EngineJob:
+    """已提交任务的句柄（可在任意线程中等待或取消）"""
+
+    def __init__(self, request: EngineRequest):
+        self.request = request
+        self.result_path: Optional[str] = None  # 写出的 JSON 结果文件
+        self._future: Optional["concurrent.futures.Future[UtteranceResult]"] = None
+
+    def _attach(self, future: "concurrent.futures.Future[UtteranceResult]") -> None:
+        self._future = future
+
+    def done(self) -> bool:
+        """任务是否已结束（含取消）"""
+        return self._future is not None and self._future.done()
+
+    def cancel(self) -> bool:
+        """取消任务（连接会被关闭）
+
+        Returns:
+            是否成功发出取消请求
+        """
+        return self._future is not None and self._future.cancel()
+
+    def wait(self, timeout: Optional[float] = None) -> UtteranceResult:
+        """阻塞等待任务结束
+
+        取消或出错时同样返回失败的 UtteranceResult，不抛出异常。
+
+        Args:
+            timeout: 最长等待时间（秒）
+
+        Returns:
+            转写结果
+
+        Raises:
+            concurrent.futures.TimeoutError: 在 timeout 内未结束
+        """
+        assert self._future is not None
+        job = UtteranceJob(
+            wav_name=self.request.wav_name, wav_path=self.request.audio_path
+        )
+        try:
+            return self._future.result(timeout)
+        except concurrent.futures.CancelledError:
+            return UtteranceResult(job=job, error="任务已取消")
+        except concurrent.futures.TimeoutError:
+            raise
+        except Exception as e:
+            return UtteranceResult(job=job, error=f"转写失败: {e}")
+
+
+class TranscribeEngine:
+    """进程内转写引擎
+
+    用法示例：
+        engine = TranscribeEngine()
+        job = engine.submit(EngineRequest(config, "a.wav", output_dir), on_event)
+        outcome = job.wait()
+        ...
+        engine.shutdown()
+    """
+
+    def __init__(self) -> None:
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        """事件循环是否在运行"""
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        """启动后台事件循环（已启动时直接返回）"""
+        with self._lock:
+            if self.running:
+                return
+            loop = asyncio.new_event_loop()
+            ready = threading.Event()
+
+            def _run() -> None:
+                asyncio.set_event_loop(loop)
+                loop.call_soon(ready.set)
+                try:
+                    loop.run_forever()
+                finally:
+                    loop.close()
+
+            self._loop = loop
+            self._thread = threading.Thread(
+                target=_run, name="TranscribeEngine", daemon=True
+            )
+            self._thread.start()
+            ready.wait()
+            logger.info("进程内转写引擎已启动")
+
+    def submit(
+        self,
+        request: EngineRequest,
+        on_event: Optional[Callable[[ProgressEvent], None]] = None,
+    ) -> EngineJob:
+        """提交转写任务（线程安全）
+
+        Args:
+            request: 转写请求
+            on_event: 进度事件回调（在引擎线程中执行）
+
+        Returns:
+            EngineJob 任务句柄
+        """
+        self.start()
+        assert self._loop is not None
+        if not request.wav_name:
+            request.wav_name = os.path.basename(request.audio_path)
+        engine_job = EngineJob(request)
+        emitter = ProgressEmitter(on_event=on_event)
+        engine_job._attach(
+            asyncio.run_coroutine_threadsafe(
+                self._run_job(engine_job, emitter), self._loop
+            )
+        )
+        return engine_job
+
+    async def _run_job(
+        self, engine_job: EngineJob, emitter: ProgressEmitter
+    ) -> UtteranceResult:
+        request = engine_job.request
+        job = UtteranceJob(wav_name=request.wav_name, wav_path=request.audio_path)
+        session = TranscribeSession(request.config, emitter=emitter)
+        try:
+            if request.timeout:
+                outcome = await asyncio.wait_for(
+                    session.transcribe(job), request.timeout
+                )
+            else:
+                outcome = await session.transcribe(job)
+        except asyncio.TimeoutError:
+            message = f"任务超时 ({request.timeout}秒)"
+            emitter.emit(EVENT_ERROR, job.wav_name, message=message)
+            return UtteranceResult(job=job, error=message)
+        finally:
+            await session.close()
+
+        if request.output_dir and outcome.results:
+            try:
+                engine_job.result_path = write_result_files(
+                    request.output_dir, request.audio_path, outcome.results
+                )
+            except OSError as e:
+                emitter.emit(
+                    EVENT_ERROR, job.wav_name, message=f"写入结果文件出错: {e}"
+                )
+            if engine_job.result_path:
+                emitter.emit(EVENT_RESULT_FILE, path=engine_job.result_path)
+        return outcome
+
+    def shutdown(self, timeout: float = 5.0) -> None:
+        """取消所有任务并停止事件循环"""
+        with self._lock:
+            loop = self._loop
+            thread = self._thread
+            self._loop = None
+            self._thread = None
+        if loop is None or thread is None:
+            return
+
+        async def _cancel_all() -> None:
+            tasks = [
+                task
+                for task in asyncio.all_tasks()
+                if task is not asyncio.current_task()
+            ]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        try:
+            asyncio.run_coroutine_threadsafe(_cancel_all(), loop).result(timeout)
+        except Exception as e:
+            logger.debug(f"取消引擎任务时出错: {e}")
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout)
+        logger.info("进程内转写引擎已停止")
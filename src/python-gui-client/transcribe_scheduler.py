@@ -0,0 +1,212 @@
+"""多文件转写调度器
+
+用共享任务队列 + N 个并发 asyncio 会话替代“按进程静态切片”的多文件转写方式。
+
+核心功能：
+1. 共享队列：空闲会话主动领取下一个文件，慢文件不会拖住其他文件
+2. 最长优先：按音频时长从长到短排队（LPT），使总耗时接近 总工作量 / N
+3. 并发控制：会话数（连接数）与每条连接的在途条数均可配置，
+   单个服务端的在途上限 = 会话数 × 每连接在途条数
+
+说明：
+- 每个会话是一条持久连接（见 transcribe_session），会话之间互不阻塞
+- 客户端只做文件读取与网络发送，属于 I/O 密集，单进程事件循环即可跑满并发
+
+版本: 3.0
+日期: 2026-10-17
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Tuple
+
+from audio_stream import open_audio_source
+from progress_events import ProgressEmitter
+from protocol_adapter import ParsedResult, ProtocolAdapter, ServerType
+from transcribe_session import (
+    SessionConfig,
+    TranscribeSession,
+    UtteranceJob,
+    UtteranceResult,
+)
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# 无法解析时长的压缩格式按 128kbps 估算（仅用于排序）
+FALLBACK_BYTES_PER_SECOND = 16000
+
+
+def estimate_audio_duration(path: str, default_sample_rate: int = 16000) -> float:
+    """估算音频时长（秒），仅用于调度排序
+
+    wav/pcm 按数据区长度计算；其他格式优先使用 mutagen，失败时按文件大小估算。
+
+    Args:
+        path: 音频文件路径
+        default_sample_rate: pcm 文件的采样率
+
+    Returns:
+        估算时长（秒），文件不可读时返回 0
+    """
+    try:
+        source = open_audio_source(path, default_sample_rate)
+    except Exception:
+        return 0.0
+
+    if source.wav_format == "pcm":
+        return source.data_size / (source.sample_rate * 2)
+
+    try:
+        from mutagen import File
+
+        media = File(path)
+        if media is not None and getattr(media, "info", None) is not None:
+            length = getattr(media.info, "length", None)
+            if length:
+                return float(length)
+    except Exception as e:
+        logger.debug(f"mutagen 获取时长失败: {path}, {e}")
+
+    return source.data_size / FALLBACK_BYTES_PER_SECOND
+
+
+def order_longest_first(
+    jobs: List[UtteranceJob], default_sample_rate: int = 16000
+) -> List[Tuple[int, UtteranceJob, float]]:
+    """按估算时长从长到短排序
+
+    Args:
+        jobs: 待转写音频列表
+        default_sample_rate: pcm 文件的采样率
+
+    Returns:
+        (原始序号, 任务, 估算时长) 列表，时长相同时保持原始顺序
+    """
+    entries = [
+        (index, job, estimate_audio_duration(job.wav_path, default_sample_rate))
+        for index, job in enumerate(jobs)
+    ]
+    entries.sort(key=lambda entry: (-entry[2], entry[0]))
+    return entries
+
+
+@dataclass
+class ScheduleStats:
+    """调度统计"""
+
+    makespan_seconds: float = 0.0  # 全部文件完成的总耗时
+    total_work_seconds: float = 0.0  # 各文件耗时之和
+    total_audio_seconds: float = 0.0  # 估算的音频总时长
+    concurrency: int = 1  # 会话数
+
+    @property
+    def ideal_makespan_seconds(self) -> float:
+        """理想总耗时：总工作量 / 会话数"""
+        return self.total_work_seconds / max(1, self.concurrency)
+
+
+class TranscribeScheduler:
+    """共享队列调度器
+
+    用法示例：
+        scheduler = TranscribeScheduler(config, concurrency=4)
+        results = await scheduler.run(jobs)
+    """
+
+    def __init__(
+        self,
+        config: SessionConfig,
+        concurrency: int = 1,
+        on_result: Optional[Callable[[UtteranceJob, ParsedResult], None]] = None,
+        on_upload_progress: Optional[Callable[[UtteranceJob, int, int], None]] = None,
+        on_done: Optional[Callable[[UtteranceResult], None]] = None,
+        session_factory: Optional[Callable[..., TranscribeSession]] = None,
+        emitter: Optional[ProgressEmitter] = None,
+    ):
+        """初始化调度器
+
+        Args:
+            config: 会话配置（config.max_inflight 为每条连接的在途条数）
+            concurrency: 并发会话数（即同一服务端的连接数）
+            on_result: 每收到一条回包时的回调
+            on_upload_progress: 上传进度回调
+            on_done: 每个文件完成时的回调
+            session_factory: 会话工厂（默认 TranscribeSession，测试时可替换）
+            emitter: 结构化进度事件发送端（所有会话共享）
+        """
+        self.config = config
+        self.concurrency = max(1, concurrency)
+        self.on_result = on_result
+        self.on_upload_progress = on_upload_progress
+        self.on_done = on_done
+        self._session_factory = session_factory or TranscribeSession
+        self.emitter = emitter
+        self.stats = ScheduleStats(concurrency=self.concurrency)
+        self.connect_count = 0
+
+    async def run(self, jobs: List[UtteranceJob]) -> List[UtteranceResult]:
+        """调度执行全部文件
+
+        Args:
+            jobs: 待转写音频列表
+
+        Returns:
+            与 jobs 顺序一致的结果列表
+        """
+        ordered = order_longest_first(jobs, self.config.audio_fs)
+        self.stats.total_audio_seconds = sum(entry[2] for entry in ordered)
+
+        queue: "asyncio.Queue[Tuple[int, UtteranceJob, float]]" = asyncio.Queue()
+        for entry in ordered:
+            queue.put_nowait(entry)
+
+        results: List[Optional[UtteranceResult]] = [None] * len(jobs)
+        per_session = max(1, self.config.max_inflight)
+        sessions = [
+            self._session_factory(
+                self.config,
+                adapter=ProtocolAdapter(self._server_type()),
+                on_result=self.on_result,
+                on_upload_progress=self.on_upload_progress,
+                emitter=self.emitter,
+            )
+            for _ in range(min(self.concurrency, len(jobs)))
+        ]
+
+        async def _consume(session: TranscribeSession) -> None:
+            # 空闲即领取下一个文件，直到队列为空
+            while True:
+                try:
+                    index, job, _ = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                outcome = await session.transcribe(job)
+                results[index] = outcome
+                self.stats.total_work_seconds += outcome.total_seconds
+                if self.on_done is not None:
+                    self.on_done(outcome)
+
+        start_time = time.monotonic()
+        try:
+            await asyncio.gather(
+                *(_consume(session) for session in sessions for _ in range(per_session))
+            )
+        finally:
+            for session in sessions:
+                await session.close()
+                self.connect_count += session.connect_count
+        self.stats.makespan_seconds = time.monotonic() - start_time
+
+        return [
+            result if result is not None else UtteranceResult(job=job, error="未执行")
+            for job, result in zip(jobs, results)
+        ]
+
+    def _server_type(self) -> ServerType:
+        try:
+            return ServerType(self.config.server_type)
+        except ValueError:
+            return ServerType.AUTO
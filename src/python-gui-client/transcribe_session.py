@@ -0,0 +1,860 @@
+"""FunASR 持久连接转写会话
+
+在一条 WebSocket 连接上连续转写多条音频，避免每个文件重复建立连接（含 TLS 握手）。
+
+核心功能：
+1. 连接复用：一条已建立的连接依次承载多条音频的 开始消息/音频/结束消息
+2. 流水线：可配置同时在途的音频条数（默认 1，即逐条等待结果）
+3. 结果关联：按 wav_name 将服务端回包路由到对应音频
+4. 自动重连：连接断开时重建连接并重发未完成的音频；
+   服务端支持续传时从最后确认的检查点继续，已确认的分段不再重传
+5. 进度事件：上传开始/结束、已发送字节、首个结果、最终结果与错误（见 progress_events）
+6. 离线流水线：offline 模式请求服务端边接收边按 VAD 分段识别，上传过程中即可收到
+   分段结果；收到"全部分段完成"标志后按分段序号排序结束
+7. 公共工具：热词文件加载与结果文件格式（命令行客户端与进程内引擎共用）
+
+说明：
+- 协议适配器与热词在会话内只构建一次，所有音频共享
+- 音频数据通过 audio_stream 按块读取，内存占用与文件大小无关；
+  容器格式（mp4/mp3/m4a 等）经 audio_transcode 转码为 pcm 后上传
+
+版本: 3.0
+日期: 2026-10-17
+"""
+
+import asyncio
+import json
+import logging
+import os
+import ssl
+import time
+import uuid
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+from audio_codec import CODEC_ACK_TIMEOUT, CODEC_PCM, create_encoder, resolve_codec
+from audio_stream import AudioSource
+from audio_transcode import (
+    TranscodeError,
+    aiter_upload_chunks,
+    compression_ratio,
+    open_upload_source,
+)
+from progress_events import (
+    EVENT_ERROR,
+    EVENT_FINAL_RESULT,
+    EVENT_FIRST_PARTIAL,
+    EVENT_RESULT,
+    EVENT_UPLOAD_END,
+    EVENT_UPLOAD_START,
+    ProgressEmitter,
+)
+from protocol_adapter import (
+    MessageProfile,
+    ParsedResult,
+    ProtocolAdapter,
+    RecognitionMode,
+    ServerType,
+)
+from websocket_compat import connect_websocket
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# 离线模式的上传分块大小（字节）
+OFFLINE_STRIDE = 65536
+
+# online 模式没有明确的结束回包，结束消息发出后静默该时长即视为完成（秒）
+ONLINE_IDLE_SECONDS = 2.0
+
+# 等待服务端续传确认的超时（秒），超时视为不支持续传，从头重传
+RESUME_ACK_TIMEOUT = 2.0
+
+# 超过该大小的回包只保留关键字段写入 JSON 结果文件
+MAX_RAW_RESULT_CHARS = 1000000
+
+
+def compute_stride(
+    mode: str, chunk_size: List[int], chunk_interval: int, sample_rate: int
+) -> int:
+    """计算上传分块大小（字节）
+
+    Args:
+        mode: 识别模式
+        chunk_size: 分块配置，如 [5, 10, 5]
+        chunk_interval: 分块间隔
+        sample_rate: 采样率
+
+    Returns:
+        每块字节数
+    """
+    if mode == "offline":
+        return OFFLINE_STRIDE
+    return int(60 * chunk_size[1] / chunk_interval / 1000 * sample_rate * 2)
+
+
+def is_connection_error(e: BaseException) -> bool:
+    """判断异常是否由连接断开引起（可通过重连恢复）"""
+    if isinstance(e, (ConnectionError, OSError)):
+        return True
+    return "ConnectionClosed" in str(type(e))
+
+
+@dataclass
+class UtteranceJob:
+    """一条待转写的音频"""
+
+    wav_name: str  # 音频标识（用于结果关联）
+    wav_path: str  # 音频文件路径
+
+
+@dataclass
+class UtteranceResult:
+    """一条音频的转写结果"""
+
+    job: UtteranceJob
+    success: bool = False
+    results: List[ParsedResult] = field(default_factory=list)
+    error: Optional[str] = None
+    attempts: int = 0  # 实际尝试次数（含重连重发）
+    upload_seconds: float = 0.0  # 上传耗时
+    total_seconds: float = 0.0  # 从开始发送到结果完成的耗时
+
+    @property
+    def text(self) -> str:
+        """拼接后的识别文本
+
+        2pass 模式只取最终纠错结果（2pass-offline），其余模式拼接全部文本。
+        """
+        final_parts = [r.text for r in self.results if r.mode == "2pass-offline"]
+        if final_parts:
+            return "".join(final_parts)
+        return "".join(r.text for r in self.results if r.text)
+
+
+@dataclass
+class SessionConfig:
+    """会话配置"""
+
+    host: str
+    port: int
+    use_ssl: bool = True
+    mode: str = "offline"
+    audio_fs: int = 16000
+    use_itn: bool = True
+    hotwords: str = ""
+    server_type: str = "auto"
+    enable_svs_params: bool = False
+    svs_lang: str = "auto"
+    svs_itn: bool = True
+    chunk_size: List[int] = field(default_factory=lambda: [5, 10, 5])
+    chunk_interval: int = 10
+    send_without_sleep: bool = True
+    transcribe_timeout: float = 600.0  # 单条音频等待结果的超时（秒）
+    max_inflight: int = 1  # 同一连接上同时在途的音频条数
+    max_attempts: int = 3  # 单条音频的最大尝试次数（含首次）
+    reconnect_backoff: float = 1.0  # 重连退避基数（秒）
+    transcode: bool = True  # 容器格式上传前转码为 16kHz 单声道 pcm（需要 ffmpeg）
+    audio_codec: str = CODEC_PCM  # 传输编码：pcm / flac / opus（需服务端确认）
+    resumable: bool = True  # 断线重连后从服务端检查点续传（仅 pcm 数据，需服务端支持）
+    pipeline: bool = True  # offline 模式请求服务端逐段返回结果（旧服务端忽略）
+
+    @property
+    def uri(self) -> str:
+        """WebSocket 地址"""
+        scheme = "wss" if self.use_ssl else "ws"
+        return f"{scheme}://{self.host}:{self.port}"
+
+
+@dataclass
+class _ResumeState:
+    """一条音频的续传状态（跨重连保留）"""
+
+    session_id: str
+    offset: int = 0  # 服务端已确认处理完的音频字节数
+    results: List[ParsedResult] = field(default_factory=list)  # 检查点之前的结果
+
+
+class _PendingUtterance:
+    """在途音频的结果收集状态"""
+
+    def __init__(self, job: UtteranceJob, loop: asyncio.AbstractEventLoop):
+        self.job = job
+        self.results: List[ParsedResult] = []
+        self.future: "asyncio.Future[None]" = loop.create_future()
+        self.end_sent = False
+        self.first_partial_sent = False
+        self.last_message_time = time.monotonic()
+        self.resume: Optional[_ResumeState] = None
+        self.resume_ack: Optional["asyncio.Future[Dict[str, Any]]"] = None
+
+
+class TranscribeSession:
+    """持久连接转写会话
+
+    用法示例：
+        session = TranscribeSession(config)
+        try:
+            results = await session.run_batch(jobs)
+        finally:
+            await session.close()
+    """
+
+    def __init__(
+        self,
+        config: SessionConfig,
+        adapter: Optional[ProtocolAdapter] = None,
+        on_result: Optional[Callable[[UtteranceJob, ParsedResult], None]] = None,
+        on_upload_progress: Optional[Callable[[UtteranceJob, int, int], None]] = None,
+        connect: Callable[..., Any] = connect_websocket,
+        emitter: Optional[ProgressEmitter] = None,
+    ):
+        """初始化会话
+
+        Args:
+            config: 会话配置
+            adapter: 协议适配器（为空时按 config.server_type 创建）
+            on_result: 每收到一条回包时的回调
+            on_upload_progress: 上传进度回调 (job, bytes_sent, total_bytes)
+            connect: 连接工厂（默认使用兼容层，测试时可替换）
+            emitter: 结构化进度事件发送端（为空时不发送事件）
+        """
+        self.config = config
+        self.adapter = adapter or ProtocolAdapter(self._parse_server_type())
+        self.on_result = on_result
+        self.on_upload_progress = on_upload_progress
+        self.emitter = emitter or ProgressEmitter()
+        self._connect = connect
+
+        self._ws: Any = None
+        self._ws_ctx: Any = None
+        self._ws_broken = False  # 当前连接是否已断开（等待重连）
+        self._codec: Optional[str] = None  # 当前连接协商出的传输编码（None 为未协商）
+        self._codec_ack: Optional["asyncio.Future[str]"] = None
+        self._receiver: Optional["asyncio.Task[None]"] = None
+        self._connect_lock: Optional[asyncio.Lock] = None
+        self._send_lock: Optional[asyncio.Lock] = None
+        self._inflight: Optional[asyncio.Semaphore] = None
+        # wav_name -> 在途音频队列（同名音频按发送顺序排队）
+        self._pending: Dict[str, Deque[_PendingUtterance]] = {}
+        self._pending_order: Deque[_PendingUtterance] = deque()
+        self.connect_count = 0  # 建立连接的次数（含重连）
+
+    def _parse_server_type(self) -> ServerType:
+        try:
+            return ServerType(self.config.server_type)
+        except ValueError:
+            return ServerType.AUTO
+
+    def _ensure_primitives(self) -> None:
+        """在事件循环内惰性创建同步原语"""
+        if self._connect_lock is None:
+            self._connect_lock = asyncio.Lock()
+            self._send_lock = asyncio.Lock()
+            self._inflight = asyncio.Semaphore(max(1, self.config.max_inflight))
+
+    @property
+    def connected(self) -> bool:
+        """连接是否可用"""
+        return self._ws is not None and not self._ws_broken
+
+    async def connect(self) -> None:
+        """建立连接（已连接时直接返回，连接已断开时重建）"""
+        self._ensure_primitives()
+        assert self._connect_lock is not None
+        async with self._connect_lock:
+            if self.connected:
+                return
+            await self._release_connection()
+
+            ssl_context = None
+            if self.config.use_ssl:
+                ssl_context = ssl.create_default_context()
+                ssl_context.check_hostname = False
+                ssl_context.verify_mode = ssl.CERT_NONE
+
+            logger.info(f"连接到 {self.config.uri}")
+            ctx = self._connect(
+                self.config.uri,
+                subprotocols=["binary"],
+                ping_interval=None,
+                ssl=ssl_context,
+                close_timeout=60,
+                max_size=1024 * 1024 * 1024,
+            )
+            ws = await ctx.__aenter__()
+            self._ws_ctx = ctx
+            self._ws = ws
+            self._ws_broken = False
+            self._codec = None
+            self.connect_count += 1
+            self._receiver = asyncio.create_task(self._receive_loop(ws))
+
+    async def close(self) -> None:
+        """关闭连接"""
+        await self._release_connection()
+        self._fail_all_pending(ConnectionError("会话已关闭"))
+
+    async def _release_connection(self) -> None:
+        """释放当前连接与接收任务"""
+        ws_ctx = self._ws_ctx
+        receiver = self._receiver
+        self._ws = None
+        self._ws_ctx = None
+        self._receiver = None
+        self._ws_broken = False
+        if ws_ctx is not None:
+            try:
+                await ws_ctx.__aexit__(None, None, None)
+            except Exception as e:
+                logger.debug(f"关闭连接时出错: {e}")
+        if receiver is not None and not receiver.done():
+            receiver.cancel()
+            try:
+                await receiver
+            except (asyncio.CancelledError, Exception):
+                pass
+
+    def _mark_broken(self, ws: Any, reason: str = "连接已断开") -> None:
+        """标记连接已断开（仅当其仍为当前连接时），下次使用前重建"""
+        if ws is not None and self._ws is ws:
+            self._ws_broken = True
+            # 该连接上的其他在途音频同样需要重发
+            self._fail_all_pending(ConnectionError(reason))
+
+    async def _receive_loop(self, ws: Any) -> None:
+        """接收回包并按 wav_name 路由到在途音频"""
+        error: BaseException = ConnectionError("连接已关闭")
+        try:
+            while True:
+                raw_msg = await ws.recv()
+                self._dispatch(raw_msg)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            error = e
+            logger.debug(f"接收循环结束: {e}")
+        self._mark_broken(ws, f"连接已断开: {error}")
+
+    def _dispatch(self, raw_msg: Any) -> None:
+        """处理一条回包"""
+        codec_ack = self.adapter.parse_codec_ack(raw_msg)
+        if codec_ack is not None:
+            if self._codec_ack is not None and not self._codec_ack.done():
+                self._codec_ack.set_result(codec_ack)
+            return
+
+        resume_ack = self.adapter.parse_resume_ack(raw_msg)
+        if resume_ack is not None:
+            pending = self._find_pending(str(resume_ack.get("wav_name", "")))
+            if pending is not None and pending.resume_ack is not None:
+                if not pending.resume_ack.done():
+                    pending.resume_ack.set_result(resume_ack)
+            return
+
+        result = self.adapter.parse_result(raw_msg)
+        if result.error:
+            logger.warning(f"消息解析错误: {result.error}")
+            return
+
+        pending = self._find_pending(result.wav_name)
+        if pending is None:
+            logger.warning(f"收到无法关联的回包: wav_name={result.wav_name}")
+            return
+
+        if result.mode == "offline":
+            self.adapter.record_is_final_semantics(result.is_final, result.mode)
+
+        pending.results.append(result)
+        pending.last_message_time = time.monotonic()
+        if result.checkpoint is not None and pending.resume is not None:
+            # 检查点之前的音频与结果已由服务端保存，重连后从这里继续
+            pending.resume.offset = result.checkpoint
+            pending.resume.results = list(pending.results)
+        if result.text:
+            wav_name = pending.job.wav_name
+            if not pending.first_partial_sent:
+                pending.first_partial_sent = True
+                self.emitter.emit(EVENT_FIRST_PARTIAL, wav_name, mode=result.mode)
+            self.emitter.emit(
+                EVENT_RESULT,
+                wav_name,
+                text=result.text,
+                mode=result.mode,
+                is_complete=result.is_complete,
+            )
+        if self.on_result is not None:
+            try:
+                self.on_result(pending.job, result)
+            except Exception as e:
+                logger.warning(f"结果回调出错: {e}")
+
+        if result.is_complete:
+            self._finish(pending)
+
+    def _find_pending(self, wav_name: str) -> Optional[_PendingUtterance]:
+        """按 wav_name 查找在途音频；缺少 wav_name 时按发送顺序取最早的一条"""
+        queue = self._pending.get(wav_name)
+        if queue:
+            return queue[0]
+        if not wav_name and self._pending_order:
+            return self._pending_order[0]
+        return None
+
+    def _register(self, job: UtteranceJob) -> _PendingUtterance:
+        pending = _PendingUtterance(job, asyncio.get_running_loop())
+        self._pending.setdefault(job.wav_name, deque()).append(pending)
+        self._pending_order.append(pending)
+        return pending
+
+    def _unregister(self, pending: _PendingUtterance) -> None:
+        queue = self._pending.get(pending.job.wav_name)
+        if queue is not None:
+            try:
+                queue.remove(pending)
+            except ValueError:
+                pass
+            if not queue:
+                self._pending.pop(pending.job.wav_name, None)
+        try:
+            self._pending_order.remove(pending)
+        except ValueError:
+            pass
+
+    def _finish(self, pending: _PendingUtterance) -> None:
+        self._unregister(pending)
+        # 分段结果按序号排列（无序号的结果保持原顺序排在最后）
+        pending.results.sort(key=lambda r: (r.segment is None, r.segment or 0))
+        if not pending.future.done():
+            pending.future.set_result(None)
+
+    def _fail_all_pending(self, error: BaseException) -> None:
+        for pending in list(self._pending_order):
+            self._unregister(pending)
+            if not pending.future.done():
+                pending.future.set_exception(error)
+                # 标记异常已被读取：发送阶段失败时该 future 可能无人等待
+                pending.future.exception()
+            if pending.resume_ack is not None and not pending.resume_ack.done():
+                pending.resume_ack.set_exception(error)
+                pending.resume_ack.exception()
+
+    def _build_profile(
+        self, job: UtteranceJob, source: AudioSource, codec: str = CODEC_PCM
+    ) -> MessageProfile:
+        """构建开始消息配置"""
+        return MessageProfile(
+            server_type=self.adapter.server_type,
+            mode=RecognitionMode(self.config.mode),
+            wav_name=job.wav_name,
+            wav_format=source.wav_format,
+            audio_fs=source.sample_rate,
+            audio_codec=codec,
+            use_itn=self.config.use_itn,
+            use_ssl=self.config.use_ssl,
+            hotwords=self.config.hotwords,
+            enable_svs_params=self.config.enable_svs_params,
+            svs_lang=self.config.svs_lang,
+            svs_itn=self.config.svs_itn,
+            chunk_size=self.config.chunk_size,
+            chunk_interval=self.config.chunk_interval,
+            pipeline=self.config.pipeline,
+        )
+
+    async def _send_utterance(
+        self, ws: Any, pending: _PendingUtterance, source: AudioSource
+    ) -> None:
+        """发送一条音频：开始消息、音频数据、结束消息
+
+        续传时先等待服务端确认检查点，再从检查点之后发送。
+        """
+        job = pending.job
+        resume = pending.resume
+        resuming = resume is not None and resume.offset > 0
+        if resuming:
+            pending.resume_ack = asyncio.get_running_loop().create_future()
+        codec = resolve_codec(self.config.audio_codec, source.wav_format)
+        if self._codec == CODEC_PCM:
+            # 当前连接的服务端不支持压缩传输
+            codec = CODEC_PCM
+        negotiate = codec != CODEC_PCM and self._codec is None
+        if negotiate:
+            self._codec_ack = asyncio.get_running_loop().create_future()
+
+        profile = self._build_profile(job, source, codec)
+        if resume is not None:
+            profile.session_id = resume.session_id
+            profile.resume = resuming
+
+        self.emitter.emit(
+            EVENT_UPLOAD_START,
+            job.wav_name,
+            total_bytes=source.data_size,
+            wav_format=source.wav_format,
+        )
+        await ws.send(self.adapter.build_start_message(profile))
+        if negotiate:
+            codec = await self._wait_codec_ack(codec)
+        start = await self._wait_resume_ack(pending) if resuming else 0
+        encoder = create_encoder(codec, source.sample_rate)
+
+        stride = compute_stride(
+            self.config.mode,
+            self.config.chunk_size,
+            self.config.chunk_interval,
+            source.sample_rate,
+        )
+        sleep_duration = 0.0
+        if not self.config.send_without_sleep and self.config.mode != "offline":
+            sleep_duration = (
+                60 * self.config.chunk_size[1] / self.config.chunk_interval / 1000
+            )
+
+        bytes_sent = start  # 已发送的音频数据量（编码前，含续传跳过的部分）
+        wire_bytes = 0  # 实际发送的字节数（编码后）
+        async for data in aiter_upload_chunks(source, stride, start):
+            payload = encoder.encode(data) if encoder is not None else data
+            if payload:
+                await ws.send(payload)
+                wire_bytes += len(payload)
+            bytes_sent += len(data)
+            # 转码数据源的总大小为估算值，以实际发送量为下限
+            total_bytes = max(source.data_size, bytes_sent)
+            self.emitter.emit_upload_progress(job.wav_name, bytes_sent, total_bytes)
+            if self.on_upload_progress is not None:
+                self.on_upload_progress(job, bytes_sent, total_bytes)
+            if sleep_duration > 0:
+                await asyncio.sleep(sleep_duration)
+
+        if encoder is not None:
+            tail = encoder.flush()
+            if tail:
+                await ws.send(tail)
+                wire_bytes += len(tail)
+
+        await ws.send(self.adapter.build_end_message())
+        extra: Dict[str, Any] = {"wire_bytes": wire_bytes, "audio_codec": codec}
+        if start:
+            extra["resume_offset"] = start
+        if source.transcode or encoder is not None:
+            ratio = compression_ratio(source.source_size, wire_bytes)
+            extra.update(source_bytes=source.source_size, compression_ratio=ratio)
+            logger.info(
+                f"{job.wav_name} 压缩上传({codec}): 原始"
+                f" {source.source_size / 1024 / 1024:.2f}MB"
+                f" -> {wire_bytes / 1024 / 1024:.2f}MB, 压缩比 {ratio:.1f}:1"
+            )
+        self.emitter.emit(
+            EVENT_UPLOAD_END, job.wav_name, bytes_sent=bytes_sent, **extra
+        )
+
+    async def _wait_codec_ack(self, codec: str) -> str:
+        """等待服务端确认压缩编码，超时或被拒绝时本连接回退为 pcm"""
+        assert self._codec_ack is not None
+        try:
+            ack = await asyncio.wait_for(
+                asyncio.shield(self._codec_ack), CODEC_ACK_TIMEOUT
+            )
+        except asyncio.TimeoutError:
+            logger.info(f"服务端未确认 {codec} 压缩传输，回退为 pcm")
+            ack = CODEC_PCM
+        finally:
+            self._codec_ack = None
+        self._codec = codec if ack == codec else CODEC_PCM
+        return self._codec
+
+    async def _wait_resume_ack(self, pending: _PendingUtterance) -> int:
+        """等待服务端确认续传检查点
+
+        以服务端保存的检查点与分段结果为准；超时（服务端不支持或已重启）
+        或服务端没有该会话时从头重传。
+
+        Returns:
+            开始发送的音频字节偏移
+        """
+        assert pending.resume is not None and pending.resume_ack is not None
+        try:
+            ack = await asyncio.wait_for(
+                asyncio.shield(pending.resume_ack), RESUME_ACK_TIMEOUT
+            )
+        except asyncio.TimeoutError:
+            ack = {}
+        finally:
+            pending.resume_ack = None
+
+        try:
+            offset = max(0, int(ack.get("resume_offset", 0)))
+        except (TypeError, ValueError):
+            offset = 0
+        resume = pending.resume
+        if offset <= 0:
+            logger.info(f"{pending.job.wav_name} 服务端未保存续传检查点，从头重传")
+            resume.offset = 0
+            resume.results = []
+            pending.results = []
+            return 0
+
+        records = ack.get("results")
+        if isinstance(records, list):
+            resume.results = [
+                self.adapter.parse_result(json.dumps(record, ensure_ascii=False))
+                for record in records
+                if isinstance(record, dict)
+            ]
+        resume.offset = offset
+        pending.results = list(resume.results)
+        logger.info(
+            f"{pending.job.wav_name} 从检查点续传: {offset} 字节，"
+            f"已确认分段 {len(resume.results)} 条"
+        )
+        return offset
+
+    async def _wait_result(self, pending: _PendingUtterance) -> None:
+        """等待结果完成
+
+        online 模式没有明确的结束回包，结束消息发出后静默 ONLINE_IDLE_SECONDS 即视为完成。
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.config.transcribe_timeout
+        while not pending.future.done():
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                raise asyncio.TimeoutError()
+            wait = remaining
+            if self.config.mode == "online":
+                wait = min(remaining, ONLINE_IDLE_SECONDS)
+            try:
+                await asyncio.wait_for(asyncio.shield(pending.future), wait)
+            except asyncio.TimeoutError:
+                idle = time.monotonic() - pending.last_message_time
+                if self.config.mode == "online" and idle >= ONLINE_IDLE_SECONDS:
+                    self._finish(pending)
+        pending.future.result()
+
+    async def transcribe(self, job: UtteranceJob) -> UtteranceResult:
+        """转写一条音频（连接断开时自动重连并重发）
+
+        Args:
+            job: 待转写音频
+
+        Returns:
+            UtteranceResult 转写结果（失败时 success=False 并带 error）
+        """
+        outcome = await self._transcribe(job)
+        if outcome.success:
+            self.emitter.emit(
+                EVENT_FINAL_RESULT,
+                job.wav_name,
+                text=outcome.text,
+                upload_seconds=round(outcome.upload_seconds, 6),
+                total_seconds=round(outcome.total_seconds, 6),
+            )
+        else:
+            self.emitter.emit(
+                EVENT_ERROR, job.wav_name, message=outcome.error or "未知错误"
+            )
+        return outcome
+
+    async def _transcribe(self, job: UtteranceJob) -> UtteranceResult:
+        """转写一条音频（不发送最终事件）"""
+        self._ensure_primitives()
+        assert self._send_lock is not None and self._inflight is not None
+        outcome = UtteranceResult(job=job)
+
+        try:
+            source = open_upload_source(
+                job.wav_path, self.config.audio_fs, self.config.transcode
+            )
+        except Exception as e:
+            outcome.error = f"读取音频文件失败: {e}"
+            return outcome
+
+        resume: Optional[_ResumeState] = None
+        if (
+            self.config.resumable
+            and source.wav_format == "pcm"
+            and self.config.mode != "online"
+        ):
+            # 容器格式无法从中间解码，只有 pcm 数据支持续传；
+            # online 模式的结果不按分段保存，断线后从头重传
+            resume = _ResumeState(session_id=uuid.uuid4().hex)
+
+        max_attempts = max(1, self.config.max_attempts)
+        failures = 0  # 连续未取得进展的失败次数
+        attempt = 0
+        while failures < max_attempts:
+            attempt += 1
+            outcome.attempts = attempt
+            checkpoint_before = resume.offset if resume is not None else 0
+            async with self._inflight:
+                ws: Any = None
+                pending: Optional[_PendingUtterance] = None
+                try:
+                    await self.connect()
+                    ws = self._ws
+                    start_time = time.monotonic()
+                    pending = self._register(job)
+                    pending.resume = resume
+                    async with self._send_lock:
+                        await self._send_utterance(ws, pending, source)
+                    pending.end_sent = True
+                    pending.last_message_time = time.monotonic()
+                    outcome.upload_seconds = time.monotonic() - start_time
+                    try:
+                        await self._wait_result(pending)
+                    except asyncio.TimeoutError:
+                        self._unregister(pending)
+                        outcome.results = pending.results
+                        outcome.error = (
+                            f"等待结果超时 ({self.config.transcribe_timeout}秒)"
+                        )
+                        return outcome
+                    outcome.total_seconds = time.monotonic() - start_time
+                    outcome.results = pending.results
+                    outcome.success = True
+                    outcome.error = None
+                    return outcome
+                except Exception as e:
+                    if pending is not None:
+                        self._unregister(pending)
+                    if isinstance(e, TranscodeError):
+                        # 服务端已收到部分音频，该连接不能再承载下一条
+                        self._mark_broken(ws, f"转码失败: {e}")
+                    if not is_connection_error(e):
+                        outcome.error = f"转写失败: {e}"
+                        return outcome
+                    outcome.error = f"连接异常: {e}"
+                    logger.warning(f"{job.wav_name} 第{attempt}次尝试连接异常: {e}")
+                    self._mark_broken(ws)
+            if resume is not None and resume.offset > checkpoint_before:
+                # 本次尝试推进了检查点：失败代价只是一个分段，不计入重试次数
+                failures = 0
+            else:
+                failures += 1
+            if failures < max_attempts:
+                await asyncio.sleep(self.config.reconnect_backoff * max(1, failures))
+
+        return outcome
+
+    async def run_batch(
+        self,
+        jobs: List[UtteranceJob],
+        on_done: Optional[Callable[[UtteranceResult], None]] = None,
+    ) -> List[UtteranceResult]:
+        """在同一连接上转写一批音频
+
+        同时在途条数受 config.max_inflight 限制；结果按输入顺序返回。
+
+        Args:
+            jobs: 待转写音频列表
+            on_done: 每条音频完成时的回调
+
+        Returns:
+            与 jobs 顺序一致的结果列表
+        """
+
+        async def _run_one(job: UtteranceJob) -> UtteranceResult:
+            result = await self.transcribe(job)
+            if on_done is not None:
+                on_done(result)
+            return result
+
+        if self.config.max_inflight <= 1:
+            # 逐条执行，保证发送与完成顺序一致
+            return [await _run_one(job) for job in jobs]
+        return list(await asyncio.gather(*(_run_one(job) for job in jobs)))
+
+
+def load_scp_jobs(scp_path: str) -> List[UtteranceJob]:
+    """读取 scp 列表（每行 "name path" 或仅 "path"）
+
+    Args:
+        scp_path: scp 文件路径
+
+    Returns:
+        UtteranceJob 列表
+    """
+    jobs = []
+    with open(scp_path, encoding="utf-8") as f_scp:
+        for line in f_scp:
+            parts = line.strip().split()
+            if not parts:
+                continue
+            if len(parts) > 1:
+                jobs.append(UtteranceJob(wav_name=parts[0], wav_path=parts[1]))
+            else:
+                jobs.append(
+                    UtteranceJob(wav_name=os.path.basename(parts[0]), wav_path=parts[0])
+                )
+    return jobs
+
+
+def load_hotwords(
+    hotword_path: str, warn: Callable[[str], None] = logger.warning
+) -> str:
+    """加载热词文件（每行 "词语 权重"）
+
+    Args:
+        hotword_path: 热词文件路径
+        warn: 跳过无效行或读取失败时的提示输出
+
+    Returns:
+        JSON 格式的热词字符串，无有效热词时返回空字符串
+    """
+    if not hotword_path or not hotword_path.strip():
+        return ""
+    if not os.path.exists(hotword_path):
+        warn(f"热词文件不存在: {hotword_path}")
+        return ""
+
+    fst_dict: Dict[str, int] = {}
+    try:
+        with open(hotword_path, encoding="utf-8") as f:
+            for line in f:
+                words = line.strip().split()
+                if len(words) < 2:
+                    if words:
+                        warn(f"热词格式错误，跳过: {line.strip()}")
+                    continue
+                try:
+                    fst_dict[" ".join(words[:-1])] = int(words[-1])
+                except ValueError:
+                    warn(f"热词权重格式错误，跳过: {line.strip()}")
+    except Exception as e:
+        warn(f"读取热词文件失败: {e}")
+        return ""
+
+    return json.dumps(fst_dict, ensure_ascii=False) if fst_dict else ""
+
+
+def format_result_line(result: ParsedResult) -> str:
+    """文本结果文件（text.{id}）中的一行：wav_name [时间戳] 文本"""
+    if result.timestamp:
+        timestamp = json.dumps(result.timestamp, ensure_ascii=False)
+        return f"{result.wav_name}\t{timestamp}\t{result.text}\n"
+    return f"{result.wav_name}\t{result.text}\n"
+
+
+def result_json_record(result: ParsedResult) -> Optional[Dict[str, Any]]:
+    """JSON 结果文件中保存的回包，超大回包只保留关键字段；无原始回包时返回 None"""
+    if not result.raw:
+        return None
+    if len(json.dumps(result.raw)) <= MAX_RAW_RESULT_CHARS:
+        return result.raw
+    logger.info("消息太大，只保留关键字段")
+    record: Dict[str, Any] = {
+        "wav_name": result.wav_name,
+        "text": result.text,
+        "is_final": result.is_final,
+        "is_complete": result.is_complete,
+    }
+    if result.timestamp:
+        record["timestamp"] = result.timestamp
+    return record
+
+
+def write_result_json(json_file_path: str, records: List[Dict[str, Any]]) -> None:
+    """写出 JSON 结果文件（{base}.{id}.json）"""
+    with open(json_file_path, "w", encoding="utf-8") as f:
+        json.dump(records, f, ensure_ascii=False, indent=2)
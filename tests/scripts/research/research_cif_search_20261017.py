@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+funasr_onnx 流式 Paraformer CIF 搜索耗时预研脚本
+
+目标：对比 Paraformer.cif_search 原逐帧循环与向量化 cif_integrate 的单块耗时
+方法：
+- 按流式默认 chunk_size [5, 10, 5] 构造一块 encoder 输出：20 帧 + 1 帧缓存 + 1 帧尾部
+- alphas 取 0~0.6 均匀分布（约每 3 帧触发一个 token），hidden 维度 512
+- legacy：按 batch、按帧的双层 Python 循环（原实现）
+- vectorized：cumsum 定位触发帧，权重矩阵乘 hidden 得到嵌入
+
+对比维度：
+1. batch 1 / 8 / 32 下每块耗时（毫秒）
+2. 两种实现的 token 数是否完全一致
+
+说明：仅依赖 numpy，不需要 onnxruntime 与模型文件
+
+用法：
+    python research_cif_search_20261017.py --repeat 200
+
+创建时间：2026-10-17
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+# 添加 funasr_onnx 工具目录到路径
+project_root = Path(__file__).parent.parent.parent.parent
+sys.path.insert(
+    0,
+    str(
+        project_root
+        / "ref"
+        / "FunASR-main"
+        / "runtime"
+        / "python"
+        / "onnxruntime"
+        / "funasr_onnx"
+        / "utils"
+    ),
+)
+
+from cif import cif_integrate  # noqa: E402
+
+CHUNK_FRAMES = 22  # 5 + 10 + 5 帧，加缓存帧与尾部帧
+HIDDEN_SIZE = 512
+
+
+def legacy_cif(hidden, alphas, threshold=1.0):
+    """原 Paraformer.cif_search 的逐帧循环（numpy 标量运算，原样保留）"""
+    batch_size, len_time, hidden_size = hidden.shape
+    token_length = []
+    list_frames = []
+    cache_alphas = []
+    cache_hiddens = []
+    for b in range(batch_size):
+        integrate = 0.0
+        frames = np.zeros(hidden_size).astype(np.float32)
+        list_frame = []
+        list_fire = []
+        for t in range(len_time):
+            alpha = alphas[b][t]
+            if alpha + integrate < threshold:
+                integrate += alpha
+                list_fire.append(integrate)
+                frames += alpha * hidden[b][t]
+            else:
+                frames += (threshold - integrate) * hidden[b][t]
+                list_frame.append(frames)
+                integrate += alpha
+                list_fire.append(integrate)
+                integrate -= threshold
+                frames = integrate * hidden[b][t]
+        cache_alphas.append(integrate)
+        cache_hiddens.append(frames / integrate if integrate > 0.0 else frames)
+        token_length.append(len(list_frame))
+        list_frames.append(list_frame)
+
+    max_token_len = max(token_length)
+    list_ls = []
+    for b in range(batch_size):
+        pad_frames = np.zeros((max_token_len - token_length[b], hidden_size)).astype(
+            np.float32
+        )
+        if token_length[b] == 0:
+            list_ls.append(pad_frames)
+        else:
+            list_ls.append(np.concatenate((list_frames[b], pad_frames), axis=0))
+    return np.stack(list_ls, axis=0).astype(np.float32), np.array(token_length)
+
+
+def per_call_ms(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - start) / repeat * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CIF 搜索耗时对比")
+    parser.add_argument("--repeat", type=int, default=200, help="每种批大小重复次数")
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("funasr_onnx 流式 Paraformer cif_search 耗时对比（legacy vs vectorized）")
+    print(f"单块 {CHUNK_FRAMES} 帧 x {HIDDEN_SIZE} 维, 重复 {args.repeat} 次")
+    print("=" * 70)
+
+    rng = np.random.default_rng(0)
+    print(
+        f"\n{'batch':<8}{'legacy(ms)':>12}{'vectorized(ms)':>16}{'加速':>8}  token 数一致"
+    )
+    for batch_size in (1, 8, 32):
+        hidden = rng.standard_normal((batch_size, CHUNK_FRAMES, HIDDEN_SIZE)).astype(
+            np.float32
+        )
+        alphas = rng.uniform(0.0, 0.6, (batch_size, CHUNK_FRAMES)).astype(np.float32)
+        legacy_ms, legacy = per_call_ms(lambda: legacy_cif(hidden, alphas), args.repeat)
+        fast_ms, fast = per_call_ms(
+            lambda: cif_integrate(hidden, alphas, 1.0), args.repeat
+        )
+        same = np.array_equal(legacy[1], fast[1])
+        print(
+            f"{batch_size:<8}{legacy_ms:>12.3f}{fast_ms:>16.3f}"
+            f"{legacy_ms / fast_ms:>7.1f}x  {'是' if same else '否'}"
+        )
+
+
+if __name__ == "__main__":
+    main()
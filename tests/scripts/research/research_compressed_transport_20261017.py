@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+压缩音频传输（FLAC/Opus）预研脚本
+
+目标：对比 pcm / flac / opus 三种传输编码的上行字节数与端到端耗时
+方法：
+- 本地启动支持压缩传输的桩服务端（回复 codec_ack，逐条解码为 pcm）
+- 桩服务端按 --uplink_kbps 模拟上行带宽（按收到的字节数等待）
+- 客户端使用 TranscribeSession 上传同一段合成语音（正弦 + 噪声）
+
+对比维度：
+1. 上行字节数（wire_bytes）与压缩比
+2. 端到端耗时（开始上传到收到结果），含编码/解码开销
+3. 解码后 pcm 长度（flac 应与原始完全一致）
+
+说明：flac 需要 soundfile，opus 需要 opuslib；未安装的编码自动跳过
+
+用法：
+    python research_compressed_transport_20261017.py --seconds 60 --uplink_kbps 2000
+
+创建时间：2026-10-17
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import struct
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# 添加客户端源码目录到路径
+project_root = Path(__file__).parent.parent.parent.parent
+sys.path.insert(0, str(project_root / "src" / "python-gui-client"))
+
+import websockets  # noqa: E402
+from audio_codec import AUDIO_CODECS, available_codecs, create_decoder  # noqa: E402
+from progress_events import EVENT_UPLOAD_END, ProgressEmitter  # noqa: E402
+from transcribe_session import (  # noqa: E402
+    SessionConfig,
+    TranscribeSession,
+    UtteranceJob,
+)
+
+
+class CodecServer:
+    """支持压缩传输的桩服务端：解码每条消息，结束时回复解码后的 pcm 字节数"""
+
+    def __init__(self, uplink_kbps: float):
+        self.uplink_bytes_per_second = uplink_kbps * 1000 / 8
+        self.port = 0
+        self._server = None
+
+    async def handler(self, ws, *args):
+        decoder = None
+        wav_name = ""
+        decoded = 0
+        async for message in ws:
+            if isinstance(message, str):
+                data = json.loads(message)
+                if data.get("is_speaking") is False:
+                    await ws.send(
+                        json.dumps(
+                            {
+                                "mode": "offline",
+                                "wav_name": wav_name,
+                                "text": f"pcm_bytes={decoded}",
+                                "is_final": False,
+                            }
+                        )
+                    )
+                    decoded = 0
+                    continue
+                wav_name = data.get("wav_name", "")
+                if "audio_codec" in data:
+                    codec = data["audio_codec"]
+                    if codec not in available_codecs():
+                        codec = "pcm"
+                    decoder = create_decoder(codec, data.get("audio_fs", 16000))
+                    await ws.send(
+                        json.dumps({"codec_ack": codec, "wav_name": wav_name})
+                    )
+                elif "mode" in data:
+                    decoder = None
+            else:
+                if self.uplink_bytes_per_second > 0:
+                    await asyncio.sleep(len(message) / self.uplink_bytes_per_second)
+                pcm = decoder.decode(message) if decoder is not None else message
+                decoded += len(pcm)
+
+    async def __aenter__(self):
+        self._server = await websockets.serve(
+            self.handler, "127.0.0.1", 0, max_size=None
+        )
+        self.port = list(self._server.sockets)[0].getsockname()[1]
+        return self
+
+    async def __aexit__(self, *exc):
+        self._server.close()
+        await self._server.wait_closed()
+
+
+def make_speech_like_pcm(path: str, seconds: float, sample_rate: int = 16000):
+    """生成类语音的测试音频：多个谐波叠加幅度包络与少量噪声"""
+    rng = random.Random(0)
+    total = int(seconds * sample_rate)
+    with open(path, "wb") as f:
+        block = []
+        for i in range(total):
+            t = i / sample_rate
+            envelope = 0.5 + 0.5 * math.sin(2 * math.pi * 3 * t)
+            value = envelope * (
+                4000 * math.sin(2 * math.pi * 180 * t)
+                + 2000 * math.sin(2 * math.pi * 360 * t)
+                + 1000 * math.sin(2 * math.pi * 720 * t)
+            )
+            block.append(int(value + rng.gauss(0, 200)))
+            if len(block) == sample_rate:
+                f.write(struct.pack(f"<{len(block)}h", *block))
+                block = []
+        if block:
+            f.write(struct.pack(f"<{len(block)}h", *block))
+
+
+async def run_codec(audio_path: str, codec: str, uplink_kbps: float) -> dict:
+    """以指定编码上传一次，返回字节数与耗时"""
+    async with CodecServer(uplink_kbps) as server:
+        events = []
+        config = SessionConfig(
+            host="127.0.0.1",
+            port=server.port,
+            use_ssl=False,
+            audio_codec=codec,
+            transcribe_timeout=600,
+        )
+        session = TranscribeSession(
+            config, emitter=ProgressEmitter(on_event=events.append)
+        )
+        start = time.perf_counter()
+        try:
+            outcome = await session.transcribe(
+                UtteranceJob(wav_name=codec, wav_path=audio_path)
+            )
+        finally:
+            await session.close()
+        elapsed = time.perf_counter() - start
+
+    end = [e for e in events if e.event == EVENT_UPLOAD_END][0]
+    return {
+        "codec": end.data.get("audio_codec", codec),
+        "pcm_bytes": end.data["bytes_sent"],
+        "wire_bytes": end.data.get("wire_bytes", end.data["bytes_sent"]),
+        "decoded": outcome.text,
+        "elapsed": elapsed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="压缩音频传输对比")
+    parser.add_argument("--seconds", type=float, default=30.0, help="测试音频时长")
+    parser.add_argument(
+        "--uplink_kbps", type=float, default=2000.0, help="模拟上行带宽，0 为不限"
+    )
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("压缩音频传输对比（pcm / flac / opus）")
+    print(f"音频时长: {args.seconds:.0f}s, 模拟上行带宽: {args.uplink_kbps:.0f}kbps")
+    print(f"本机可用编码: {', '.join(available_codecs())}")
+    print("=" * 70)
+
+    with tempfile.TemporaryDirectory() as d:
+        audio_path = os.path.join(d, "speech.pcm")
+        make_speech_like_pcm(audio_path, args.seconds)
+
+        results = []
+        for codec in AUDIO_CODECS:
+            if codec not in available_codecs():
+                print(f"  ⏭️  跳过 {codec}（缺少依赖）")
+                continue
+            results.append(asyncio.run(run_codec(audio_path, codec, args.uplink_kbps)))
+
+    baseline = results[0]
+    print(
+        f"\n{'编码':<8}{'上行字节':>14}{'压缩比':>10}{'耗时(s)':>12}{'相对 pcm':>12}  解码结果"
+    )
+    for r in results:
+        ratio = r["pcm_bytes"] / r["wire_bytes"] if r["wire_bytes"] else 0.0
+        speedup = baseline["elapsed"] / r["elapsed"] if r["elapsed"] else 0.0
+        print(
+            f"{r['codec']:<8}{r['wire_bytes']:>14,}{ratio:>9.1f}x"
+            f"{r['elapsed']:>12.2f}{speedup:>11.1f}x  {r['decoded']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+runtime/python/utils/compute_wer.py 评分耗时预研脚本
+
+目标：对比原逐格动态规划 compute_wer_by_line 与批量向量化评分引擎的耗时
+方法：
+- 随机生成 --utts 句中文字符级 hyp/ref（约 20% 错误率），句长分档
+- legacy：原实现，Python 双层循环逐格填 int16 代价矩阵后回溯
+- batched：score_pairs，按长度分批，每行一次 numpy 运算（行内删除用前缀最小值），
+  回溯时整批同步前进
+- pool：score_items 分块交给进程池（n_jobs > 1 时）
+
+对比维度：
+1. 不同句长下每千句耗时（秒）与加速比
+2. 两种实现的 cor/ins/del/sub 是否完全一致
+
+说明：仅依赖 numpy；进程池的加速取决于 CPU 核数
+
+用法：
+    python research_compute_wer_20261017.py --utts 2000 --n_jobs 4
+
+创建时间：2026-10-17
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+# 添加 runtime/python/utils 目录到路径
+project_root = Path(__file__).parent.parent.parent.parent
+sys.path.insert(
+    0, str(project_root / "ref" / "FunASR-main" / "runtime" / "python" / "utils")
+)
+
+import compute_wer  # noqa: E402
+
+ALPHABET = list("今天天气很好我们去公园散步吧明后年月日时分秒")
+
+
+def legacy_wer_by_line(hyp, ref):
+    """原 compute_wer_by_line（逐格填表，回溯逻辑等价，只统计计数）"""
+    len_hyp, len_ref = len(hyp), len(ref)
+    cost = np.zeros((len_hyp + 1, len_ref + 1), dtype=np.int16)
+    ops = np.zeros((len_hyp + 1, len_ref + 1), dtype=np.int8)
+    for i in range(len_hyp + 1):
+        cost[i][0] = i
+    for j in range(len_ref + 1):
+        cost[0][j] = j
+    for i in range(1, len_hyp + 1):
+        for j in range(1, len_ref + 1):
+            if hyp[i - 1] == ref[j - 1]:
+                cost[i][j] = cost[i - 1][j - 1]
+            else:
+                compare_val = [
+                    cost[i - 1][j - 1] + 1,
+                    cost[i - 1][j] + 1,
+                    cost[i][j - 1] + 1,
+                ]
+                min_val = min(compare_val)
+                cost[i][j] = min_val
+                ops[i][j] = compare_val.index(min_val) + 1
+    counts = [0, 0, 0, 0]
+    i, j = len_hyp, len_ref
+    while i > 0 and j > 0:
+        op = ops[i][j]
+        counts[op] += 1
+        i -= op != 3
+        j -= op != 2
+    return counts[0], counts[2] + i, counts[3] + j, counts[1]
+
+
+def make_pairs(rng, num, min_len, max_len):
+    pairs = []
+    for _ in range(num):
+        ref = [rng.choice(ALPHABET) for _ in range(rng.randint(min_len, max_len))]
+        hyp = []
+        for token in ref:
+            r = rng.random()
+            if r < 0.07:
+                continue
+            hyp.append(rng.choice(ALPHABET) if r < 0.14 else token)
+            if r > 0.94:
+                hyp.append(rng.choice(ALPHABET))
+        pairs.append((hyp, ref))
+    return pairs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="compute_wer 评分耗时对比")
+    parser.add_argument("--utts", type=int, default=1000, help="每档句数")
+    parser.add_argument("--n_jobs", type=int, default=1, help="进程池进程数")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    buckets = [(5, 15), (15, 40), (40, 100), (100, 300)]
+    print("=" * 70)
+    print(f"compute_wer 评分：legacy vs batched（每档 {args.utts} 句）")
+    print("=" * 70)
+    print(
+        f"\n{'句长':<10}{'legacy(s)':>11}{'batched(s)':>12}{'加速':>8}"
+        f"{'pool(s)':>10}  结果一致"
+    )
+    for min_len, max_len in buckets:
+        pairs = make_pairs(rng, args.utts, min_len, max_len)
+
+        start = time.perf_counter()
+        legacy = [legacy_wer_by_line(hyp, ref) for hyp, ref in pairs]
+        legacy_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        batched = compute_wer.score_pairs(pairs)
+        batched_s = time.perf_counter() - start
+
+        items = ((str(k), hyp, ref) for k, (hyp, ref) in enumerate(pairs))
+        start = time.perf_counter()
+        pooled = [r[3] for r in compute_wer.score_items(items, args.n_jobs, 200)]
+        pool_s = time.perf_counter() - start
+
+        same = pooled == batched and legacy == [
+            (r["cor"], r["ins"], r["del"], r["sub"]) for r in batched
+        ]
+        print(
+            f"{min_len:>3}-{max_len:<6}{legacy_s:>11.2f}{batched_s:>12.3f}"
+            f"{legacy_s / batched_s:>7.0f}x{pool_s:>10.3f}  {'是' if same else '否'}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+funasr_onnx 前端 fbank 提取耗时预研脚本
+
+目标：对比 WavFrontend.fbank / fbank_online 原实现与批量实现的耗时
+方法：
+- 合成音频（白噪声），dither=0 保证两种实现输出可逐位比较
+- legacy：waveform.tolist() 送入 kaldi-native-fbank，逐帧 get_frame 写入 float64 矩阵再转 float32；
+  流式每次调用都从第 0 帧重新读取全部特征
+- bulk：float32 连续缓冲（memoryview）送入，逐帧写入预分配的 float32 输出；
+  流式只读取新增帧并 pop 已输出的帧
+
+对比维度：
+1. 离线 fbank 耗时，折算为每小时音频的秒数
+2. 流式 fbank_online（按 --chunk_ms 分块）耗时，折算为每小时音频的秒数
+3. 两种实现的特征是否完全一致
+
+说明：需要 kaldi-native-fbank（pip install kaldi-native-fbank）
+
+用法：
+    python research_fbank_bulk_20261017.py --minutes 5 --chunk_ms 600
+
+创建时间：2026-10-17
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+# 添加 funasr_onnx 工具目录到路径
+project_root = Path(__file__).parent.parent.parent.parent
+sys.path.insert(
+    0,
+    str(
+        project_root
+        / "ref"
+        / "FunASR-main"
+        / "runtime"
+        / "python"
+        / "onnxruntime"
+        / "funasr_onnx"
+        / "utils"
+    ),
+)
+
+try:
+    import kaldi_native_fbank as knf
+    from frontend import WavFrontend
+except ImportError:
+    knf = None
+
+SAMPLE_RATE = 16000
+
+
+def legacy_fbank(front, waveform):
+    """原离线实现"""
+    waveform = waveform * (1 << 15)
+    fbank_fn = knf.OnlineFbank(front.opts)
+    fbank_fn.accept_waveform(front.opts.frame_opts.samp_freq, waveform.tolist())
+    frames = fbank_fn.num_frames_ready
+    mat = np.empty([frames, front.opts.mel_opts.num_bins])
+    for i in range(frames):
+        mat[i, :] = fbank_fn.get_frame(i)
+    return mat.astype(np.float32)
+
+
+def legacy_fbank_online(front, fbank_fn, waveform):
+    """原流式实现：每次都从第 0 帧重新读取"""
+    waveform = waveform * (1 << 15)
+    fbank_fn.accept_waveform(front.opts.frame_opts.samp_freq, waveform.tolist())
+    frames = fbank_fn.num_frames_ready
+    mat = np.empty([frames, front.opts.mel_opts.num_bins])
+    for i in range(frames):
+        mat[i, :] = fbank_fn.get_frame(i)
+    return mat.astype(np.float32)
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def run_online(front, waveform, chunk_samples, legacy):
+    front.reset_status()
+    fbank_fn = knf.OnlineFbank(front.opts)
+    feat = None
+    for beg in range(0, len(waveform), chunk_samples):
+        chunk = waveform[beg : beg + chunk_samples]
+        if legacy:
+            feat = legacy_fbank_online(front, fbank_fn, chunk)
+        else:
+            feat, _ = front.fbank_online(chunk)
+    return feat
+
+
+def main():
+    parser = argparse.ArgumentParser(description="fbank 批量提取耗时对比")
+    parser.add_argument(
+        "--minutes", type=float, default=5.0, help="离线测试音频时长（分钟）"
+    )
+    parser.add_argument(
+        "--online_seconds", type=float, default=60.0, help="流式测试音频时长（秒）"
+    )
+    parser.add_argument("--chunk_ms", type=int, default=600, help="流式分块时长")
+    args = parser.parse_args()
+
+    if knf is None:
+        print("未安装 kaldi-native-fbank，跳过")
+        return
+
+    print("=" * 70)
+    print("funasr_onnx WavFrontend fbank 提取耗时对比（legacy vs bulk）")
+    print(
+        f"离线: {args.minutes:.1f} 分钟, 流式: {args.online_seconds:.0f}s / "
+        f"{args.chunk_ms}ms 分块（结果折算为每小时音频）"
+    )
+    print("=" * 70)
+
+    rng = np.random.default_rng(0)
+    front = WavFrontend(dither=0.0)
+    waveform = (rng.standard_normal(int(args.minutes * 60 * SAMPLE_RATE)) * 0.1).astype(
+        np.float32
+    )
+    scale = 60.0 / args.minutes
+    legacy, legacy_s = timed(lambda: legacy_fbank(front, waveform))
+    (bulk, _), bulk_s = timed(lambda: front.fbank(waveform))
+
+    online_wave = waveform[: int(args.online_seconds * SAMPLE_RATE)]
+    chunk = args.chunk_ms * SAMPLE_RATE // 1000
+    online_scale = 3600.0 / args.online_seconds
+    legacy_on, legacy_on_s = timed(lambda: run_online(front, online_wave, chunk, True))
+    bulk_on, bulk_on_s = timed(lambda: run_online(front, online_wave, chunk, False))
+
+    print(f"\n{'场景':<10}{'legacy(s/h)':>14}{'bulk(s/h)':>14}{'加速':>8}  特征一致")
+    rows = (
+        ("offline", legacy_s * scale, bulk_s * scale, np.array_equal(legacy, bulk)),
+        (
+            "online",
+            legacy_on_s * online_scale,
+            bulk_on_s * online_scale,
+            np.array_equal(legacy_on, bulk_on),
+        ),
+    )
+    for name, before, after, same in rows:
+        speedup = before / after if after else 0.0
+        print(
+            f"{name:<10}{before:>14.2f}{after:>14.2f}{speedup:>7.1f}x  "
+            f"{'是' if same else '否'}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+fun_text_processing ITN 冷启动耗时预研脚本
+
+目标：对比 InverseNormalizer 现场构图与从预编译语法库加载的进程冷启动耗时
+方法：
+- 每次测量都启动新的 Python 子进程（模拟 worker 重启），分别计时
+  import（pynini 等模块导入，两种方式相同）与 构造 InverseNormalizer + 首句 normalize
+- build：use_grammar_store=False，每个进程都用 pynini 现场构建 ClassifyFst/VerbalizeFinalFst
+- store：先用 export_grammars 预编译到临时语法库，再从 .far 归档加载
+- 另记录预编译（export）本身的耗时，即只需付一次的成本
+
+对比维度：
+1. 每种语言 build / store 构图（或加载）+ 首句耗时及 import 耗时（多次取中位数）
+2. 预编译耗时与归档大小
+3. 两种方式首句输出是否一致
+
+说明：需要 pynini、regex、inflect 等 fun_text_processing 依赖
+
+用法：
+    python research_itn_cold_start_20261017.py --languages zh en --repeat 3
+
+创建时间：2026-10-17
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent.parent.parent
+funasr_root = project_root / "ref" / "FunASR-main"
+
+FIRST_SENTENCE = {"zh": "三点五", "en": "two point five kilograms"}
+
+WORKER = """
+import json, sys
+from time import perf_counter
+start = perf_counter()
+from fun_text_processing.inverse_text_normalization import inverse_normalize
+imported = perf_counter()
+lang, mode, grammar_dir, text = sys.argv[1:5]
+normalizer = inverse_normalize.InverseNormalizer(
+    lang=lang, use_grammar_store=mode == "store", grammar_dir=grammar_dir
+)
+output = normalizer.normalize(text, verbose=False)
+end = perf_counter()
+result = {"import": imported - start, "grammar": end - imported, "output": output}
+print(json.dumps(result))
+"""
+
+EXPORT = """
+import sys
+from time import perf_counter
+from fun_text_processing.inverse_text_normalization.grammar_store import export_grammars
+start = perf_counter()
+far_file = export_grammars(sys.argv[1], sys.argv[2])
+print(perf_counter() - start)
+print(far_file)
+"""
+
+
+def run_python(code, *args):
+    env = dict(os.environ, PYTHONPATH=str(funasr_root))
+    result = subprocess.run(
+        [sys.executable, "-c", code, *args],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return result.stdout.strip().splitlines()
+
+
+def cold_start(lang, mode, grammar_dir, repeat):
+    text = FIRST_SENTENCE.get(lang, "one")
+    runs = [
+        json.loads(run_python(WORKER, lang, mode, grammar_dir, text)[-1])
+        for _ in range(repeat)
+    ]
+    return (
+        statistics.median(r["grammar"] for r in runs),
+        statistics.median(r["import"] for r in runs),
+        runs[0]["output"],
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ITN 冷启动耗时对比")
+    parser.add_argument("--languages", nargs="+", default=["zh", "en"], help="语言")
+    parser.add_argument("--repeat", type=int, default=3, help="每项测量的子进程次数")
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("fun_text_processing InverseNormalizer 冷启动耗时（build vs store）")
+    print(f"语言: {', '.join(args.languages)}, 每项 {args.repeat} 次取中位数")
+    print("=" * 70)
+
+    header = (
+        f"\n{'语言':<6}{'import(ms)':>11}{'build(s)':>10}{'store(ms)':>11}{'加速':>9}"
+        f"{'预编译(s)':>11}{'归档(MB)':>10}  输出一致"
+    )
+    print(header)
+    with tempfile.TemporaryDirectory() as grammar_dir:
+        for lang in args.languages:
+            export_s, far_file = run_python(EXPORT, lang, grammar_dir)[-2:]
+            build_s, _, build_out = cold_start(lang, "build", grammar_dir, args.repeat)
+            store_s, import_s, store_out = cold_start(
+                lang, "store", grammar_dir, args.repeat
+            )
+            size_mb = os.path.getsize(far_file) / 1e6
+            print(
+                f"{lang:<6}{import_s * 1000:>11.0f}{build_s:>10.2f}"
+                f"{store_s * 1000:>11.1f}"
+                f"{build_s / store_s:>8.0f}x{float(export_s):>11.2f}{size_mb:>10.1f}  "
+                f"{'是' if build_out == store_out else '否'}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+fun_text_processing Normalizer 排列搜索与缓存耗时预研脚本
+
+目标：对比 Normalizer.normalize 原全排列搜索与有界搜索 + LRU 缓存的逐句延迟
+方法：
+- 语料：--lang zh 为合成的数字密集中文 ASR 文本（小数、百分比、日期、时间、金额、度量，
+  逗号连接）；--lang ja 为含 1~8 个分数的合成日文（分数 token 需调换分子分母字段顺序，
+  原实现的候选数随分数个数指数增长）；其他语言读取仓库自带的 <lang>_itn_test_input.txt
+- legacy：逐个尝试 generate_permutations 的全部排列直到 verbalizer 接受（原实现）
+- bounded：按解析顺序序列化，被拒绝时逐 token 有界搜索（cache_size=0，关闭缓存）
+- bounded+memo：同上并启用 LRU 缓存（语料按 --rounds 重复，模拟线上重复片段）
+
+对比维度：
+1. 每句延迟 p50 / p90 / p99 / max（毫秒）
+2. 总耗时
+3. 三种方式输出是否完全一致
+
+说明：需要 pynini、regex、inflect 等 fun_text_processing 依赖；
+      语法从语法库加载（首次运行会构建并保存）
+
+用法：
+    python research_itn_permutation_20261017.py --lang zh --sentences 300 --rounds 2
+
+创建时间：2026-10-17
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+# 添加 FunASR 源码目录到路径
+project_root = Path(__file__).parent.parent.parent.parent
+funasr_root = project_root / "ref" / "FunASR-main"
+sys.path.insert(0, str(funasr_root))
+
+import pynini  # noqa: E402
+from fun_text_processing.inverse_text_normalization import (  # noqa: E402
+    inverse_normalize,
+)
+from fun_text_processing.text_normalization.normalize import SPACE_DUP  # noqa: E402
+
+DIGITS = "零一二三四五六七八九"
+
+
+def legacy_normalize(normalizer, text):
+    """原实现：逐个尝试 generate_permutations 的全部排列"""
+    text = pynini.escape(text.strip())
+    normalizer.parser(normalizer.select_tag(normalizer.find_tags(text)))
+    tokens = normalizer.parser.parse()
+    output = ""
+    for split in normalizer._split_tokens_to_reduce_number_of_permutations(tokens):
+        for tagged_text in normalizer.generate_permutations(split):
+            lattice = normalizer.find_verbalizer(pynini.escape(tagged_text))
+            if lattice.num_states() != 0:
+                break
+        output += " " + normalizer.select_verbalizer(lattice)
+    return SPACE_DUP.sub(" ", output[1:])
+
+
+def zh_corpus(count, rng):
+    def num():
+        return "".join(rng.choice(DIGITS) for _ in range(rng.randint(1, 4)))
+
+    patterns = [
+        lambda: f"{num()}点{num()}",
+        lambda: f"百分之{num()}",
+        lambda: f"{rng.choice(['三', '十二', '五'])}月{rng.choice(['五', '二十'])}号",
+        lambda: f"二零二{rng.choice(DIGITS)}年",
+        lambda: f"下午{rng.choice(['三', '十一', '两'])}点{rng.choice(['十五', '半'])}分",
+        lambda: f"{rng.choice(['一百二十三', '三千五百', '十二'])}块{rng.choice(['五毛', '三分'])}",
+        lambda: f"{rng.choice(['五', '十', '二十'])}公斤",
+        lambda: rng.choice(["今天天气不错", "好的", "我们下周再讨论"]),
+    ]
+    return [
+        "，".join(rng.choice(patterns)() for _ in range(rng.randint(2, 6)))
+        for _ in range(count)
+    ]
+
+
+def ja_corpus(count, rng):
+    kanji = DIGITS[1:]
+    return [
+        "、".join(
+            f"{rng.choice(kanji)}分の{rng.choice(kanji)}"
+            for _ in range(rng.randint(1, 8))
+        )
+        + "です"
+        for _ in range(count)
+    ]
+
+
+def file_corpus(lang):
+    path = (
+        funasr_root
+        / "fun_text_processing"
+        / "inverse_text_normalization"
+        / lang
+        / f"{lang}_itn_test_input.txt"
+    )
+    with open(path, encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def run(fn, corpus):
+    latencies = []
+    outputs = []
+    for sentence in corpus:
+        start = time.perf_counter()
+        outputs.append(fn(sentence))
+        latencies.append((time.perf_counter() - start) * 1000)
+    return outputs, np.array(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Normalizer 排列搜索耗时对比")
+    parser.add_argument(
+        "--lang", default="zh", help="zh/ja 使用合成语料，其他语言读测试文件"
+    )
+    parser.add_argument("--sentences", type=int, default=300, help="合成语料句数")
+    parser.add_argument("--rounds", type=int, default=2, help="语料重复轮数")
+    parser.add_argument("--grammar_dir", default=None, help="语法库目录")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    if args.lang == "zh":
+        base = zh_corpus(args.sentences, rng)
+    elif args.lang == "ja":
+        base = ja_corpus(args.sentences, rng)
+    else:
+        base = file_corpus(args.lang)
+    corpus = base * args.rounds
+
+    print("=" * 70)
+    print("fun_text_processing Normalizer 逐句延迟（全排列 vs 有界搜索 + 缓存）")
+    print(f"语言: {args.lang}, {len(base)} 句 x {args.rounds} 轮")
+    print("=" * 70)
+
+    InverseNormalizer = inverse_normalize.InverseNormalizer
+    legacy = InverseNormalizer(lang=args.lang, grammar_dir=args.grammar_dir)
+    bounded = InverseNormalizer(
+        lang=args.lang, grammar_dir=args.grammar_dir, cache_size=0
+    )
+    memo = InverseNormalizer(lang=args.lang, grammar_dir=args.grammar_dir)
+    legacy.normalize(base[0])  # 首次访问加载语法，不计入
+
+    results = {
+        "legacy": run(lambda s: legacy_normalize(legacy, s), corpus),
+        "bounded": run(bounded.normalize, corpus),
+        "bounded+memo": run(memo.normalize, corpus),
+    }
+
+    print(
+        f"\n{'实现':<14}{'p50(ms)':>9}{'p90(ms)':>9}{'p99(ms)':>9}"
+        f"{'max(ms)':>10}{'总计(s)':>9}"
+    )
+    for name, (_, lat) in results.items():
+        p50, p90, p99 = np.percentile(lat, [50, 90, 99])
+        print(
+            f"{name:<14}{p50:>9.2f}{p90:>9.2f}{p99:>9.2f}"
+            f"{lat.max():>10.1f}{lat.sum() / 1000:>9.2f}"
+        )
+    same = all(outputs == results["legacy"][0] for outputs, _ in results.values())
+    print(f"\n输出一致: {'是' if same else '否'}")
+
+
+if __name__ == "__main__":
+    main()
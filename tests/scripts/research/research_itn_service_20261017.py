@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+fun_text_processing 常驻进程池归一化服务预研脚本
+
+目标：对比 joblib normalize_list 与常驻进程池 NormalizerPool 处理多批句子的耗时
+方法：
+- 语料：中文 ITN 典型句子循环扩展到 --sentences 句，切成 --batches 批依次提交
+  （模拟服务端对多个批量任务做后处理）
+- sequential：单进程逐句 normalize
+- joblib：每批调用 InverseNormalizer.normalize_list(n_jobs, batch_size=chunk)，
+  每个任务都要序列化 normalizer，整批完成后才返回
+- pool：NormalizerPool 启动一次（fork 时语法在父进程加载后被子进程共享），
+  各批通过 imap 流式提交，结果按序逐块返回
+- 语法均从临时预编译语法库加载
+
+对比维度：
+1. 启动耗时（pool 为进程池创建，其余为 0）
+2. 首批首个结果的延迟
+3. 全部批次总耗时与吞吐（句/秒）
+4. 输出是否与逐句结果一致
+
+说明：需要 pynini、regex、inflect、joblib 等 fun_text_processing 依赖；
+      多进程的加速取决于 CPU 核数，单核机器上只能体现启动与流式返回的差异
+
+用法：
+    python research_itn_service_20261017.py --n_jobs 4 --sentences 2000 --batches 10
+
+创建时间：2026-10-17
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+from functools import partial
+from pathlib import Path
+from time import perf_counter
+
+project_root = Path(__file__).parent.parent.parent.parent
+sys.path.insert(0, str(project_root / "ref" / "FunASR-main"))
+
+from fun_text_processing.inverse_text_normalization import (  # noqa: E402
+    grammar_store,
+    inverse_normalize,
+)
+from fun_text_processing.text_normalization.normalize_service import (  # noqa: E402
+    NormalizerPool,
+)
+
+BASE_SENTENCES = [
+    "三点五",
+    "百分之五十六点七",
+    "下午三点十五分开会",
+    "我有十二个梨",
+    "二零二六年十月十七日",
+    "一千二百三十四元",
+    "零下五度",
+    "电话是一三八零零一三八零零零",
+]
+
+
+def make_batches(num_sentences, num_batches):
+    texts = [BASE_SENTENCES[i % len(BASE_SENTENCES)] for i in range(num_sentences)]
+    size = max(1, -(-num_sentences // num_batches))
+    return [texts[i : i + size] for i in range(0, num_sentences, size)]
+
+
+def run_sequential(factory, batches):
+    normalizer = factory()
+    start = perf_counter()
+    first = None
+    outputs = []
+    for batch in batches:
+        for text in batch:
+            outputs.append(normalizer.normalize(text))
+            first = first or perf_counter() - start
+    return 0.0, first, perf_counter() - start, outputs
+
+
+def run_joblib(factory, batches, n_jobs, chunk_size):
+    normalizer = factory()
+    start = perf_counter()
+    first = None
+    outputs = []
+    for batch in batches:
+        outputs.extend(
+            normalizer.normalize_list(batch, batch_size=chunk_size, n_jobs=n_jobs)
+        )
+        first = first or perf_counter() - start
+    return 0.0, first, perf_counter() - start, outputs
+
+
+def run_pool(factory, batches, n_jobs, chunk_size):
+    start = perf_counter()
+    with NormalizerPool(factory, n_jobs=n_jobs, chunk_size=chunk_size) as pool:
+        startup = perf_counter() - start
+        start = perf_counter()
+        first = None
+        outputs = []
+        for batch in batches:
+            for output in pool.imap(batch):
+                outputs.append(output)
+                first = first or perf_counter() - start
+        total = perf_counter() - start
+    return startup, first, total, outputs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="常驻进程池归一化服务耗时对比")
+    parser.add_argument("--n_jobs", type=int, default=2, help="工作进程数")
+    parser.add_argument("--sentences", type=int, default=2000, help="句子总数")
+    parser.add_argument("--batches", type=int, default=10, help="批次数")
+    parser.add_argument("--chunk_size", type=int, default=16, help="每块句数")
+    args = parser.parse_args()
+
+    batches = make_batches(args.sentences, args.batches)
+    print("=" * 70)
+    print("fun_text_processing 中文 ITN：joblib normalize_list vs NormalizerPool")
+    print(
+        f"句子: {args.sentences}, 批次: {len(batches)}, n_jobs: {args.n_jobs}, "
+        f"chunk: {args.chunk_size}, CPU: {os.cpu_count()}"
+    )
+    print("=" * 70)
+    print(
+        f"\n{'方式':<12}{'启动(ms)':>10}{'首结果(ms)':>12}{'总耗时(s)':>11}"
+        f"{'句/秒':>9}  输出一致"
+    )
+
+    with tempfile.TemporaryDirectory() as grammar_dir:
+        grammar_store.export_grammars("zh", grammar_dir)
+        factory = partial(
+            inverse_normalize.InverseNormalizer, lang="zh", grammar_dir=grammar_dir
+        )
+        runs = [
+            ("sequential", run_sequential(factory, batches)),
+            ("joblib", run_joblib(factory, batches, args.n_jobs, args.chunk_size)),
+            ("pool", run_pool(factory, batches, args.n_jobs, args.chunk_size)),
+        ]
+        reference = runs[0][1][3]
+        for name, (startup, first, total, outputs) in runs:
+            print(
+                f"{name:<12}{startup * 1000:>10.0f}{first * 1000:>12.1f}{total:>11.2f}"
+                f"{args.sentences / total:>9.0f}  "
+                f"{'是' if outputs == reference else '否'}"
+            )
+
+
+if __name__ == "__main__":
+    main()
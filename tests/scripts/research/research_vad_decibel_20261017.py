@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+FSMN VAD 后处理耗时预研脚本（分贝计算、帧状态判定与分段记账）
+
+目标：对比 E2EVadModel 后处理中逐帧/逐采样 Python 循环与向量化实现的耗时
+方法：
+- 合成类语音音频（3s 语音段 + 1s 静音交替）及对应的帧级静音概率（代替 ONNX 模型输出）
+- 按 funasr_onnx.vad_bin.Fsmn_vad 的方式以 6000 帧为一块驱动 E2EVadModel
+- legacy：逐帧 np.square().sum() + math.log10，逐帧 GetFrameState，
+  PopDataToOutputBuf 逐采样计数、连续语音帧逐帧出栈（原实现）
+- vectorized：当前实现（整块计算分贝与帧状态，分段按偏移 O(1) 记账，仅状态机逐帧）
+
+对比维度：
+1. ComputeDecibel 单独耗时，折算为每小时音频的秒数
+2. VAD 后处理总耗时（不含 ONNX 推理），折算为每小时音频的秒数
+3. 两种实现输出的语音段是否完全一致
+
+说明：仅依赖 numpy，不需要 onnxruntime 与模型文件
+
+用法：
+    python research_vad_decibel_20261017.py --minutes 10
+
+创建时间：2026-10-17
+"""
+
+import argparse
+import math
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+# 添加 funasr_onnx 工具目录到路径（e2e_vad 只依赖 numpy）
+project_root = Path(__file__).parent.parent.parent.parent
+sys.path.insert(
+    0,
+    str(
+        project_root
+        / "ref"
+        / "FunASR-main"
+        / "runtime"
+        / "python"
+        / "onnxruntime"
+        / "funasr_onnx"
+        / "utils"
+    ),
+)
+
+from e2e_vad import (  # noqa: E402
+    E2EVadFrameProb,
+    E2EVadModel,
+    FrameState,
+    VadStateMachine,
+)
+
+SAMPLE_RATE = 16000
+FRAME_SHIFT = 160
+FRAME_LENGTH = 400
+BLOCK_FRAMES = 6000  # 与 Fsmn_vad 一致
+
+
+class TimedVadModel(E2EVadModel):
+    """统计 ComputeDecibel 累计耗时"""
+
+    def __init__(self, vad_post_args):
+        self.decibel_seconds = 0.0
+        super().__init__(vad_post_args)
+
+    def ComputeDecibel(self) -> None:
+        start = time.perf_counter()
+        super().ComputeDecibel()
+        self.decibel_seconds += time.perf_counter() - start
+
+
+class LegacyVadModel(TimedVadModel):
+    """原逐帧实现：每帧一次 np.square().sum() + math.log10，逐帧判定帧状态"""
+
+    def ComputeDecibel(self) -> None:
+        start = time.perf_counter()
+        if self.data_buf_all_size == 0:
+            self.data_buf_all_size = len(self.waveform[0])
+            self.data_buf_size = self.data_buf_all_size
+        else:
+            self.data_buf_all_size += len(self.waveform[0])
+        decibel = []
+        for offset in range(0, self.waveform.shape[1] - FRAME_LENGTH + 1, FRAME_SHIFT):
+            decibel.append(
+                10
+                * math.log10(
+                    np.square((self.waveform[0][offset : offset + FRAME_LENGTH])).sum()
+                    + 0.000001
+                )
+            )
+        self.AppendDecibel(np.array(decibel))
+        self.decibel_seconds += time.perf_counter() - start
+
+    def GetFrameState(self, t: int):
+        frame_state = FrameState.kFrameStateInvalid
+        cur_decibel = float(self.decibel[t])
+        cur_snr = cur_decibel - self.noise_average_decibel
+        if cur_decibel < self.vad_opts.decibel_thres:
+            frame_state = FrameState.kFrameStateSil
+            self.DetectOneFrame(frame_state, t, False)
+            return frame_state
+
+        sum_score = 0.0
+        noise_prob = 0.0
+        if len(self.sil_pdf_ids) > 0:
+            sil_pdf_scores = [
+                self.scores[0][t - self.idx_pre_chunk][sil_pdf_id]
+                for sil_pdf_id in self.sil_pdf_ids
+            ]
+            sum_score = sum(sil_pdf_scores)
+            noise_prob = math.log(sum_score) * self.vad_opts.speech_2_noise_ratio
+            total_score = 1.0
+            sum_score = total_score - sum_score
+        speech_prob = math.log(sum_score)
+        if self.vad_opts.output_frame_probs:
+            frame_prob = E2EVadFrameProb()
+            frame_prob.noise_prob = noise_prob
+            frame_prob.speech_prob = speech_prob
+            frame_prob.score = sum_score
+            frame_prob.frame_id = t
+            self.frame_probs.append(frame_prob)
+        if math.exp(speech_prob) >= math.exp(noise_prob) + self.speech_noise_thres:
+            if (
+                cur_snr >= self.vad_opts.snr_thres
+                and cur_decibel >= self.vad_opts.decibel_thres
+            ):
+                frame_state = FrameState.kFrameStateSpeech
+            else:
+                frame_state = FrameState.kFrameStateSil
+        else:
+            frame_state = FrameState.kFrameStateSil
+            if self.noise_average_decibel < -99.9:
+                self.noise_average_decibel = cur_decibel
+            else:
+                frames = self.vad_opts.noise_frame_num_used_for_snr
+                self.noise_average_decibel = (
+                    cur_decibel + self.noise_average_decibel * (frames - 1)
+                ) / frames
+        return frame_state
+
+    def DetectCommonFrames(self, frame_states=None) -> int:
+        if self.vad_state_machine == VadStateMachine.kVadInStateEndPointDetected:
+            return 0
+        for i in range(self.vad_opts.nn_eval_block_size - 1, -1, -1):
+            frame_state = self.GetFrameState(self.frm_cnt - 1 - i)
+            self.DetectOneFrame(frame_state, self.frm_cnt - 1 - i, False)
+        self.idx_pre_chunk += self.scores.shape[1]
+        return 0
+
+    def DetectLastFrames(self, frame_states=None) -> int:
+        if self.vad_state_machine == VadStateMachine.kVadInStateEndPointDetected:
+            return 0
+        for i in range(self.vad_opts.nn_eval_block_size - 1, -1, -1):
+            frame_state = self.GetFrameState(self.frm_cnt - 1 - i)
+            self.DetectOneFrame(frame_state, self.frm_cnt - 1 - i, i == 0)
+        return 0
+
+    def OnVoiceDetectedRange(self, start_frame: int, end_frame: int) -> None:
+        for t in range(start_frame, end_frame):
+            self.OnVoiceDetected(t)
+
+    def PopDataToOutputBuf(
+        self,
+        start_frm: int,
+        frm_cnt: int,
+        first_frm_is_start_point: bool,
+        last_frm_is_end_point: bool,
+        end_point_is_sent_end: bool,
+    ) -> None:
+        # 原实现按采样逐个计数（每帧 160 次空循环），分段起止由父类实现计算
+        data_to_pop = frm_cnt * FRAME_SHIFT
+        if last_frm_is_end_point:
+            data_to_pop += FRAME_LENGTH - FRAME_SHIFT
+        out_pos = 0
+        for _ in range(0, data_to_pop):
+            out_pos += 1
+        super().PopDataToOutputBuf(
+            start_frm,
+            frm_cnt,
+            first_frm_is_start_point,
+            last_frm_is_end_point,
+            end_point_is_sent_end,
+        )
+
+
+def make_speech_like(seconds: float, seed: int = 0):
+    """合成音频与帧级静音概率：3s 语音（sil 概率 0.05）与 1s 静音（0.95）交替"""
+    rng = np.random.default_rng(seed)
+    samples = int(seconds * SAMPLE_RATE)
+    t = np.arange(samples) / SAMPLE_RATE
+    speech = (t % 4.0) < 3.0
+    waveform = rng.standard_normal(samples).astype(np.float32) * 0.001
+    waveform[speech] += (
+        0.3 * np.sin(2 * np.pi * 220 * t[speech]) * rng.uniform(0.5, 1.0, speech.sum())
+    ).astype(np.float32)
+
+    frames = (samples - FRAME_LENGTH) // FRAME_SHIFT + 1
+    frame_speech = speech[np.arange(frames) * FRAME_SHIFT + FRAME_LENGTH // 2]
+    scores = np.empty((1, frames, 2), dtype=np.float32)
+    scores[0, :, 0] = np.where(frame_speech, 0.05, 0.95)
+    scores[0, :, 1] = 1.0 - scores[0, :, 0]
+    return waveform[None, :], scores
+
+
+def run_vad(model_cls, waveform, scores):
+    """按 Fsmn_vad.__call__ 的分块方式驱动后处理，返回 (语音段, 总耗时, 分贝耗时)"""
+    vad = model_cls({})
+    frames = scores.shape[1]
+    segments = []
+    start = time.perf_counter()
+    for t_offset in range(0, frames, BLOCK_FRAMES):
+        step = min(BLOCK_FRAMES, frames - t_offset)
+        is_final = t_offset + step >= frames - 1
+        waveform_package = waveform[
+            :,
+            t_offset
+            * FRAME_SHIFT : min(
+                waveform.shape[-1], (t_offset + step - 1) * FRAME_SHIFT + FRAME_LENGTH
+            ),
+        ]
+        part = vad(
+            scores[:, t_offset : t_offset + step, :],
+            waveform_package,
+            is_final=is_final,
+        )
+        if part:
+            segments += part[0]
+        if is_final:
+            break
+    return segments, time.perf_counter() - start, vad.decibel_seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description="FSMN VAD 分贝计算耗时对比")
+    parser.add_argument(
+        "--minutes", type=float, default=10.0, help="测试音频时长（分钟）"
+    )
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("FSMN VAD 后处理耗时对比（逐帧循环 vs 向量化）")
+    print(f"音频时长: {args.minutes:.1f} 分钟（结果折算为每小时音频）")
+    print("=" * 70)
+
+    waveform, scores = make_speech_like(args.minutes * 60)
+    scale = 60.0 / args.minutes
+
+    results = {}
+    for name, model_cls in (("legacy", LegacyVadModel), ("vectorized", TimedVadModel)):
+        results[name] = run_vad(model_cls, waveform, scores)
+
+    print(f"\n{'实现':<12}{'分贝计算(s/h)':>16}{'后处理总计(s/h)':>18}{'语音段数':>10}")
+    for name, (segments, total, decibel) in results.items():
+        row = f"{decibel * scale:>16.2f}{total * scale:>18.2f}{len(segments):>10}"
+        print(f"{name:<12}{row}")
+
+    legacy, vectorized = results["legacy"], results["vectorized"]
+    speedup = legacy[2] / vectorized[2] if vectorized[2] else 0.0
+    print(f"\n分贝计算加速: {speedup:.1f}x")
+    print(f"后处理总计加速: {legacy[1] / vectorized[1]:.1f}x")
+    print(f"语音段一致: {'是' if legacy[0] == vectorized[0] else '否'}")
+
+
+if __name__ == "__main__":
+    main()
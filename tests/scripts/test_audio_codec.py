@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""压缩音频传输测试
+
+测试 audio_codec.py 与压缩传输协商：
+1. 协议适配：开始消息携带 audio_codec，codec_ack 消息的识别
+2. 编码选择：仅 pcm 数据压缩，缺少依赖时回退为 pcm
+3. 会话协商：服务端确认后按编码发送，旧服务端不确认/拒绝时回退为 pcm
+4. 真实编解码（已安装 soundfile/opuslib 时）：FLAC 无损往返，Opus 长度一致
+
+日期: 2026-10-17
+"""
+
+import asyncio
+import json
+import math
+import os
+import struct
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+# 添加源码目录到路径
+sys.path.insert(
+    0, os.path.join(os.path.dirname(__file__), "../../src/python-gui-client")
+)
+
+import audio_codec  # noqa: E402
+import transcribe_session  # noqa: E402
+from audio_codec import (  # noqa: E402
+    CODEC_FLAC,
+    CODEC_OPUS,
+    CODEC_PCM,
+    create_decoder,
+    create_encoder,
+    resolve_codec,
+)
+from progress_events import EVENT_UPLOAD_END, ProgressEmitter  # noqa: E402
+from protocol_adapter import (  # noqa: E402
+    MessageProfile,
+    ProtocolAdapter,
+    RecognitionMode,
+    ServerType,
+)
+from stub_server import StubServer  # noqa: E402
+from transcribe_session import (  # noqa: E402
+    SessionConfig,
+    TranscribeSession,
+    UtteranceJob,
+)
+
+
+class HalfEncoder:
+    """测试用编码器：只保留每块的前一半字节，便于从桩服务端的字节数判断是否编码"""
+
+    def encode(self, pcm):
+        data = bytes(pcm)
+        return data[: len(data) // 2]
+
+    def flush(self):
+        return b""
+
+
+def _sine_pcm(seconds, sample_rate=16000):
+    samples = [
+        int(8000 * math.sin(2 * math.pi * 440 * i / sample_rate))
+        for i in range(int(seconds * sample_rate))
+    ]
+    return struct.pack(f"<{len(samples)}h", *samples)
+
+
+class TestCodecProtocol(unittest.TestCase):
+    """测试开始消息与编码确认消息"""
+
+    def setUp(self):
+        self.adapter = ProtocolAdapter(ServerType.LEGACY)
+
+    def test_start_message_codec_field(self):
+        """测试仅在请求压缩时下发 audio_codec"""
+
+        def build(**kwargs):
+            profile = MessageProfile(
+                server_type=ServerType.LEGACY,
+                mode=RecognitionMode.OFFLINE,
+                wav_name="a",
+                **kwargs,
+            )
+            return json.loads(self.adapter.build_start_message(profile))
+
+        self.assertNotIn("audio_codec", build())
+        flac_msg = build(audio_codec=CODEC_FLAC)
+        self.assertEqual(flac_msg["audio_codec"], CODEC_FLAC)
+
+    def test_parse_codec_ack(self):
+        """测试识别编码确认消息，识别结果不被误判"""
+        self.assertEqual(
+            self.adapter.parse_codec_ack('{"codec_ack": "opus", "wav_name": "a"}'),
+            CODEC_OPUS,
+        )
+        self.assertIsNone(self.adapter.parse_codec_ack('{"text": "codec_ack"}'))
+        self.assertIsNone(self.adapter.parse_codec_ack('{"mode": "offline"}'))
+        self.assertIsNone(self.adapter.parse_codec_ack(b"codec_ack"))
+
+    def test_resolve_codec(self):
+        """测试仅 pcm 数据压缩，缺少依赖时回退"""
+        with mock.patch.object(audio_codec, "is_codec_available", return_value=True):
+            self.assertEqual(resolve_codec(CODEC_FLAC, "pcm"), CODEC_FLAC)
+            self.assertEqual(resolve_codec(CODEC_FLAC, "others"), CODEC_PCM)
+        with mock.patch.object(audio_codec, "is_codec_available", return_value=False):
+            self.assertEqual(resolve_codec(CODEC_OPUS, "pcm"), CODEC_PCM)
+        self.assertIsNone(create_encoder(CODEC_PCM, 16000))
+        with self.assertRaises(ValueError):
+            create_decoder("mp3", 16000)
+
+
+class TestCodecNegotiation(unittest.TestCase):
+    """测试会话中的编码协商（以测试编码器代替真实编码）"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.jobs = []
+        for i in range(2):
+            path = os.path.join(self.temp_dir.name, f"a{i}.pcm")
+            with open(path, "wb") as f:
+                f.write(b"\x00" * 64000)
+            self.jobs.append(UtteranceJob(wav_name=f"utt{i}", wav_path=path))
+        patchers = [
+            mock.patch.object(
+                transcribe_session, "resolve_codec", lambda codec, fmt: codec
+            ),
+            mock.patch.object(
+                transcribe_session,
+                "create_encoder",
+                lambda codec, rate: None if codec == CODEC_PCM else HalfEncoder(),
+            ),
+            mock.patch.object(transcribe_session, "CODEC_ACK_TIMEOUT", 0.3),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _run(self, **server_kwargs):
+        async def run_test():
+            async with StubServer(**server_kwargs) as server:
+                events = []
+                config = SessionConfig(
+                    host="127.0.0.1",
+                    port=server.port,
+                    use_ssl=False,
+                    audio_codec=CODEC_FLAC,
+                )
+                session = TranscribeSession(
+                    config, emitter=ProgressEmitter(on_event=events.append)
+                )
+                try:
+                    outcomes = [await session.transcribe(job) for job in self.jobs]
+                finally:
+                    await session.close()
+                return server, outcomes, events
+
+        return asyncio.run(run_test())
+
+    def test_accepted_codec(self):
+        """测试服务端确认后按编码发送，同一连接只协商一次"""
+        server, outcomes, events = self._run(accept_codecs=(CODEC_FLAC,))
+
+        self.assertEqual([o.text for o in outcomes], ["bytes=32000"] * 2)
+        self.assertEqual(server.start_messages[0]["audio_codec"], CODEC_FLAC)
+        ends = [e for e in events if e.event == EVENT_UPLOAD_END]
+        self.assertEqual(ends[0].data["audio_codec"], CODEC_FLAC)
+        self.assertEqual(ends[0].data["wire_bytes"], 32000)
+        self.assertEqual(ends[0].data["bytes_sent"], 64000)
+
+    def test_old_server_falls_back_to_pcm(self):
+        """测试旧服务端不回复确认时回退为 pcm，后续任务不再协商"""
+        server, outcomes, events = self._run()
+
+        self.assertEqual([o.text for o in outcomes], ["bytes=64000"] * 2)
+        self.assertIn("audio_codec", server.start_messages[0])
+        self.assertNotIn("audio_codec", server.start_messages[1])
+        ends = [e for e in events if e.event == EVENT_UPLOAD_END]
+        self.assertEqual(ends[0].data["audio_codec"], CODEC_PCM)
+
+    def test_rejected_codec(self):
+        """测试服务端回复 pcm 时按 pcm 发送"""
+        server, outcomes, _ = self._run(accept_codecs=())
+        self.assertEqual([o.text for o in outcomes], ["bytes=64000"] * 2)
+
+
+@unittest.skipUnless(audio_codec.soundfile is not None, "未安装 soundfile")
+class TestFlacCodec(unittest.TestCase):
+    """使用 soundfile 的 FLAC 往返测试"""
+
+    def test_lossless_round_trip(self):
+        """测试分块编码后逐条解码与原始 pcm 完全一致"""
+        pcm = _sine_pcm(1.0)
+        encoder = create_encoder(CODEC_FLAC, 16000)
+        decoder = create_decoder(CODEC_FLAC, 16000)
+        messages = [encoder.encode(pcm[i : i + 9601]) for i in range(0, len(pcm), 9601)]
+        messages.append(encoder.flush())
+
+        decoded = b"".join(decoder.decode(m) for m in messages if m)
+        self.assertEqual(decoded, pcm)
+        self.assertLess(sum(len(m) for m in messages), len(pcm))
+
+
+@unittest.skipUnless(audio_codec.opuslib is not None, "未安装 opuslib")
+class TestOpusCodec(unittest.TestCase):
+    """使用 opuslib 的 Opus 往返测试"""
+
+    def test_round_trip_length(self):
+        """测试解码长度为整帧，码率远低于 pcm"""
+        pcm = _sine_pcm(1.01)
+        encoder = create_encoder(CODEC_OPUS, 16000)
+        decoder = create_decoder(CODEC_OPUS, 16000)
+        messages = [encoder.encode(pcm[i : i + 6400]) for i in range(0, len(pcm), 6400)]
+        messages.append(encoder.flush())
+
+        decoded = b"".join(decoder.decode(m) for m in messages if m)
+        self.assertEqual(len(decoded), 51 * 640)
+        self.assertLess(sum(len(m) for m in messages) * 5, len(pcm))
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
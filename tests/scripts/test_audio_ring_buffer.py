@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""参考服务端音频环形缓冲测试
+
+测试 ref/FunASR-main/runtime/python/websocket/audio_buffer.py：
+1. 按绝对偏移写入与读取，跨越缓冲末尾时返回两段零拷贝视图
+2. 写满后覆盖最旧的数据，内存占用固定
+3. 读取范围自动截取到仍保留的数据，clear 后偏移从 0 重新开始
+
+日期: 2026-10-17
+"""
+
+import os
+import sys
+import unittest
+
+# 添加参考服务端目录到路径
+sys.path.insert(
+    0,
+    os.path.join(
+        os.path.dirname(__file__), "../../ref/FunASR-main/runtime/python/websocket"
+    ),
+)
+
+from audio_buffer import AudioRingBuffer  # noqa: E402
+
+
+def _stream(n, start=0):
+    return bytes((start + i) % 251 for i in range(n))
+
+
+class TestAudioRingBuffer(unittest.TestCase):
+    """测试环形缓冲"""
+
+    def test_append_and_read(self):
+        """测试按偏移读取，未回绕时为单段视图"""
+        ring = AudioRingBuffer(100)
+        ring.append(_stream(30))
+        ring.append(_stream(30, 30))
+
+        self.assertEqual(ring.read(10, 50), _stream(40, 10))
+        self.assertEqual(len(ring.views(0)), 1)
+        self.assertEqual((ring.start, ring.end, len(ring)), (0, 60, 60))
+
+    def test_wrap_and_overwrite(self):
+        """测试写满后覆盖最旧数据，跨越末尾时返回两段视图"""
+        ring = AudioRingBuffer(100)
+        data = _stream(250)
+        for beg in range(0, 250, 30):
+            ring.append(data[beg : beg + 30])
+
+        self.assertEqual((ring.start, ring.end), (150, 250))
+        self.assertEqual(ring.read(0), data[150:])
+        self.assertEqual(ring.read(190, 230), data[190:230])
+        self.assertEqual(len(ring.views(190, 230)), 2)
+        self.assertEqual(len(ring._buf), 100)
+
+    def test_append_larger_than_capacity(self):
+        """测试单次写入超过容量时只保留最后 capacity 字节"""
+        ring = AudioRingBuffer(100)
+        ring.append(_stream(40))
+        data = _stream(230, 40)
+        ring.append(data)
+
+        self.assertEqual((ring.start, ring.end), (170, 270))
+        self.assertEqual(ring.read(ring.start), data[-100:])
+
+    def test_clamp_and_clear(self):
+        """测试读取范围截取与 clear"""
+        ring = AudioRingBuffer(100)
+        ring.append(_stream(50))
+        self.assertEqual(ring.read(40, 500), _stream(10, 40))
+        self.assertEqual(ring.read(60), b"")
+
+        ring.clear()
+        self.assertEqual((ring.start, ring.end), (0, 0))
+        ring.append(memoryview(_stream(10)))
+        self.assertEqual(ring.read(0), _stream(10))
+
+        with self.assertRaises(ValueError):
+            AudioRingBuffer(0)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
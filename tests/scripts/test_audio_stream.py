@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""音频流式读取单元测试
+
+测试 audio_stream.py 与 simple_funasr_client.send_audio_data 的流式上传路径：
+1. pcm / wav / 其他格式的数据源解析
+2. 分块内容与原始数据逐字节一致（零拷贝切片）
+3. 边界条件：空文件、分块大于文件、非法 WAV
+4. 流式发送：结束标志在最后一块之后发送
+
+日期: 2026-10-17
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import types
+import unittest
+import wave
+
+# 添加源码目录到路径
+sys.path.insert(
+    0, os.path.join(os.path.dirname(__file__), "../../src/python-gui-client")
+)
+
+from audio_stream import (  # noqa: E402
+    AudioSource,
+    find_wav_data_chunk,
+    iter_audio_chunks,
+    open_audio_source,
+)
+
+
+def _write_wav(path: str, frames: bytes, sample_rate: int = 16000) -> None:
+    """写入单声道 16bit WAV 测试文件"""
+    with wave.open(path, "wb") as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(sample_rate)
+        wav_file.writeframes(frames)
+
+
+class TestOpenAudioSource(unittest.TestCase):
+    """测试数据源解析"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.dir = self.temp_dir.name
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_pcm_source(self):
+        """测试 pcm 文件：整个文件都是音频数据"""
+        path = os.path.join(self.dir, "a.pcm")
+        with open(path, "wb") as f:
+            f.write(b"\x01\x02" * 1000)
+
+        source = open_audio_source(path, 16000)
+        self.assertEqual(source.wav_format, "pcm")
+        self.assertEqual(source.sample_rate, 16000)
+        self.assertEqual(source.data_offset, 0)
+        self.assertEqual(source.data_size, 2000)
+
+    def test_wav_source_skips_header(self):
+        """测试 wav 文件：数据区偏移跳过文件头，采样率来自文件"""
+        path = os.path.join(self.dir, "a.wav")
+        frames = bytes(range(256)) * 10
+        _write_wav(path, frames, sample_rate=8000)
+
+        source = open_audio_source(path, 16000)
+        self.assertEqual(source.wav_format, "pcm")
+        self.assertEqual(source.sample_rate, 8000)
+        self.assertEqual(source.data_size, len(frames))
+
+        with open(path, "rb") as f:
+            f.seek(source.data_offset)
+            self.assertEqual(f.read(source.data_size), frames)
+
+    def test_other_format_source(self):
+        """测试其他格式：原样上传，格式为 others"""
+        path = os.path.join(self.dir, "a.mp3")
+        with open(path, "wb") as f:
+            f.write(b"ID3" + b"\x00" * 100)
+
+        source = open_audio_source(path, 16000)
+        self.assertEqual(source.wav_format, "others")
+        self.assertEqual(source.data_size, 103)
+
+    def test_invalid_wav_raises(self):
+        """测试非法 WAV 文件抛出异常"""
+        path = os.path.join(self.dir, "bad.wav")
+        with open(path, "wb") as f:
+            f.write(b"not a wav file at all")
+
+        with self.assertRaises(Exception):
+            open_audio_source(path, 16000)
+
+    def test_find_data_chunk_with_extra_chunks(self):
+        """测试 data 块之前存在其他块（如 LIST）时的定位"""
+        path = os.path.join(self.dir, "list.wav")
+        payload = b"\x10\x20" * 50
+        fmt = (
+            b"fmt "
+            + (16).to_bytes(4, "little")
+            + (1).to_bytes(2, "little")
+            + (1).to_bytes(2, "little")
+            + (16000).to_bytes(4, "little")
+            + (32000).to_bytes(4, "little")
+            + (2).to_bytes(2, "little")
+            + (16).to_bytes(2, "little")
+        )
+        # 奇数长度的 LIST 块，验证 2 字节对齐处理
+        extra = b"LIST" + (3).to_bytes(4, "little") + b"abc" + b"\x00"
+        data = b"data" + len(payload).to_bytes(4, "little") + payload
+        body = b"WAVE" + fmt + extra + data
+        with open(path, "wb") as f:
+            f.write(b"RIFF" + len(body).to_bytes(4, "little") + body)
+
+        with open(path, "rb") as f:
+            offset, size = find_wav_data_chunk(f)
+            f.seek(offset)
+            self.assertEqual(f.read(size), payload)
+
+
+class TestIterAudioChunks(unittest.TestCase):
+    """测试分块读取"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temp_dir.name, "a.pcm")
+        self.data = os.urandom(10000)
+        with open(self.path, "wb") as f:
+            f.write(self.data)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_chunks_match_source(self):
+        """测试拼接后的分块与原始数据一致"""
+        source = open_audio_source(self.path, 16000)
+        collected = bytearray()
+        sizes = []
+        for chunk in iter_audio_chunks(source, 4096):
+            self.assertIsInstance(chunk, memoryview)
+            collected += chunk
+            sizes.append(len(chunk))
+
+        self.assertEqual(bytes(collected), self.data)
+        self.assertEqual(sizes, [4096, 4096, 1808])
+        self.assertEqual(source.chunk_count(4096), 3)
+
+    def test_chunks_with_offset(self):
+        """测试带偏移的数据源只产出数据区"""
+        source = AudioSource(
+            path=self.path,
+            sample_rate=16000,
+            wav_format="pcm",
+            data_offset=100,
+            data_size=500,
+        )
+        collected = b"".join(bytes(c) for c in iter_audio_chunks(source, 128))
+        self.assertEqual(collected, self.data[100:600])
+
+    def test_stride_larger_than_file(self):
+        """测试分块大于文件时只产出一块"""
+        source = open_audio_source(self.path, 16000)
+        chunks = [bytes(c) for c in iter_audio_chunks(source, 1 << 20)]
+        self.assertEqual(len(chunks), 1)
+        self.assertEqual(chunks[0], self.data)
+
+    def test_empty_file(self):
+        """测试空文件不产出任何块（且不会因 mmap 空文件报错）"""
+        empty = os.path.join(self.temp_dir.name, "empty.pcm")
+        open(empty, "wb").close()
+        source = open_audio_source(empty, 16000)
+        self.assertEqual(list(iter_audio_chunks(source, 1024)), [])
+        self.assertEqual(source.chunk_count(1024), 0)
+
+    def test_early_close_releases_mapping(self):
+        """测试提前结束迭代时资源被正确释放"""
+        source = open_audio_source(self.path, 16000)
+        gen = iter_audio_chunks(source, 1000)
+        first = next(gen)
+        self.assertEqual(bytes(first), self.data[:1000])
+        gen.close()  # 不应抛出 BufferError
+
+    def test_invalid_stride(self):
+        """测试非法分块大小"""
+        source = open_audio_source(self.path, 16000)
+        with self.assertRaises(ValueError):
+            list(iter_audio_chunks(source, 0))
+
+
+class _FakeWebSocket:
+    """记录发送内容的伪 WebSocket"""
+
+    def __init__(self):
+        self.sent = []
+
+    async def send(self, data):
+        # 复制数据：真实连接在 send 返回前已完成帧编码
+        self.sent.append(data if isinstance(data, str) else bytes(data))
+
+
+class TestSendAudioData(unittest.TestCase):
+    """测试 simple_funasr_client 的流式发送"""
+
+    def setUp(self):
+        import simple_funasr_client
+
+        self.client = simple_funasr_client
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.fake_ws = _FakeWebSocket()
+        self.client.websocket = self.fake_ws
+        self.client.adapter = self.client.create_adapter("auto")
+        self.client.args = types.SimpleNamespace(
+            send_without_sleep=True, mode="offline", chunk_size=[5, 10, 5]
+        )
+
+    def tearDown(self):
+        self.client.websocket = None
+        self.client.adapter = None
+        self.client.args = None
+        self.temp_dir.cleanup()
+
+    def test_stream_then_end_message(self):
+        """测试音频分块依次发送，最后发送结束标志"""
+        path = os.path.join(self.temp_dir.name, "a.pcm")
+        data = os.urandom(3000)
+        with open(path, "wb") as f:
+            f.write(data)
+
+        source = open_audio_source(path, 16000)
+        asyncio.run(self.client.send_audio_data(source, 1024))
+
+        self.assertEqual(len(self.fake_ws.sent), 4)
+        self.assertEqual(b"".join(self.fake_ws.sent[:3]), data)
+        self.assertIn('"is_speaking": false', self.fake_ws.sent[-1])
+
+    def test_empty_source_still_sends_end_message(self):
+        """测试空音频也发送结束标志，避免服务端一直等待"""
+        path = os.path.join(self.temp_dir.name, "empty.pcm")
+        open(path, "wb").close()
+
+        source = open_audio_source(path, 16000)
+        asyncio.run(self.client.send_audio_data(source, 1024))
+
+        self.assertEqual(len(self.fake_ws.sent), 1)
+        self.assertIn('"is_speaking": false', self.fake_ws.sent[0])
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
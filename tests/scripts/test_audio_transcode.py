@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""客户端音频转码测试
+
+测试 audio_transcode.py 与转码上传路径：
+1. 转码判定、转码后大小估算与压缩比
+2. 数据源：未启用转码或找不到 ffmpeg 时回退为原样上传
+3. 管道读取：按 stride 分块，转码失败时抛出 TranscodeError
+4. 会话上传：以 pcm 格式发送，上传结束事件带压缩比
+5. 真实 ffmpeg（已安装时）：mp3 解码为 16kHz 单声道 pcm
+
+日期: 2026-10-17
+"""
+
+import asyncio
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+import wave
+from unittest import mock
+
+# 添加源码目录到路径
+sys.path.insert(
+    0, os.path.join(os.path.dirname(__file__), "../../src/python-gui-client")
+)
+
+import audio_transcode  # noqa: E402
+from audio_transcode import (  # noqa: E402
+    TRANSCODE_BYTES_PER_SECOND,
+    TRANSCODE_SAMPLE_RATE,
+    TranscodeError,
+    aiter_upload_chunks,
+    compression_ratio,
+    estimate_transcoded_size,
+    estimate_upload_size,
+    iter_transcoded_chunks,
+    needs_transcode,
+    open_upload_source,
+)
+from progress_events import EVENT_UPLOAD_END, ProgressEmitter  # noqa: E402
+from stub_server import StubServer  # noqa: E402
+from transcribe_session import (  # noqa: E402
+    SessionConfig,
+    TranscribeSession,
+    UtteranceJob,
+)
+
+
+def _fake_ffmpeg_command(output_size: int, exit_code: int = 0):
+    """用 Python 子进程代替 ffmpeg：向标准输出写入固定字节数后退出"""
+    script = (
+        "import sys\n"
+        f"sys.stdout.buffer.write(b'\\x01' * {output_size})\n"
+        "sys.stderr.write('decode error')\n"
+        f"sys.exit({exit_code})\n"
+    )
+    return lambda ffmpeg, path: [sys.executable, "-c", script]
+
+
+async def _collect(chunks):
+    return [bytes(chunk) async for chunk in chunks]
+
+
+class TestTranscodeHelpers(unittest.TestCase):
+    """测试转码判定与大小估算"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.dir = self.temp_dir.name
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _write(self, name, size):
+        path = os.path.join(self.dir, name)
+        with open(path, "wb") as f:
+            f.write(b"\x00" * size)
+        return path
+
+    def test_needs_transcode(self):
+        """测试仅容器/压缩格式需要转码"""
+        for name in ["a.mp4", "a.MP3", "a.m4a", "a.webm"]:
+            self.assertTrue(needs_transcode(name), name)
+        for name in ["a.wav", "a.pcm", "a.txt"]:
+            self.assertFalse(needs_transcode(name), name)
+
+    def test_estimate_sizes(self):
+        """测试转码后大小与压缩比"""
+        self.assertEqual(TRANSCODE_BYTES_PER_SECOND, 32000)
+        self.assertEqual(estimate_transcoded_size(1800), 57600000)
+        self.assertEqual(estimate_transcoded_size(-1), 0)
+        self.assertAlmostEqual(compression_ratio(500, 100), 5.0)
+        self.assertEqual(compression_ratio(500, 0), 0.0)
+
+    def test_fallback_without_ffmpeg(self):
+        """测试找不到 ffmpeg 时原样上传"""
+        path = self._write("a.mp4", 1000)
+        with mock.patch.object(audio_transcode, "find_ffmpeg", return_value=None):
+            source = open_upload_source(path, 16000)
+            self.assertEqual(estimate_upload_size(path), 1000)
+        self.assertFalse(source.transcode)
+        self.assertEqual(source.wav_format, "others")
+
+    def test_transcode_disabled(self):
+        """测试关闭转码时原样上传，wav/pcm 不转码"""
+        path = self._write("a.mp4", 1000)
+        with mock.patch.object(audio_transcode, "find_ffmpeg", return_value="ffmpeg"):
+            self.assertFalse(open_upload_source(path, 16000, transcode=False).transcode)
+            self.assertFalse(
+                open_upload_source(self._write("a.pcm", 10), 16000).transcode
+            )
+            self.assertEqual(estimate_upload_size(path, transcode=False), 1000)
+
+    def test_transcoded_source(self):
+        """测试转码数据源：pcm 格式，大小按时长估算"""
+        path = self._write("a.mp4", 5000000)
+        with (
+            mock.patch.object(audio_transcode, "find_ffmpeg", return_value="ffmpeg"),
+            mock.patch.object(audio_transcode, "probe_duration", return_value=10.0),
+        ):
+            source = open_upload_source(path, 8000)
+            self.assertEqual(estimate_upload_size(path), 320000)
+
+        self.assertTrue(source.transcode)
+        self.assertEqual(source.wav_format, "pcm")
+        self.assertEqual(source.sample_rate, TRANSCODE_SAMPLE_RATE)
+        self.assertEqual(source.data_size, 320000)
+        self.assertEqual(source.source_size, 5000000)
+
+
+class TestTranscodePipe(unittest.TestCase):
+    """测试 ffmpeg 管道读取（以 Python 子进程代替 ffmpeg）"""
+
+    def setUp(self):
+        patcher = mock.patch.object(
+            audio_transcode, "find_ffmpeg", return_value="ffmpeg"
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_chunks_have_stride_size(self):
+        """测试除最后一块外每块恰好 stride 字节"""
+        with mock.patch.object(
+            audio_transcode, "build_ffmpeg_command", _fake_ffmpeg_command(10000)
+        ):
+            chunks = asyncio.run(_collect(iter_transcoded_chunks("a.mp4", 4096)))
+
+        self.assertEqual([len(c) for c in chunks], [4096, 4096, 1808])
+        self.assertEqual(b"".join(chunks), b"\x01" * 10000)
+
+    def test_ffmpeg_failure_raises(self):
+        """测试 ffmpeg 非零退出时抛出 TranscodeError，并带错误输出"""
+        with mock.patch.object(
+            audio_transcode, "build_ffmpeg_command", _fake_ffmpeg_command(10, 1)
+        ):
+            with self.assertRaises(TranscodeError) as ctx:
+                asyncio.run(_collect(iter_transcoded_chunks("a.mp4", 4096)))
+        self.assertIn("decode error", str(ctx.exception))
+
+    def test_ffmpeg_not_startable(self):
+        """测试 ffmpeg 无法启动时抛出 TranscodeError（而非连接类错误）"""
+        with mock.patch.object(
+            audio_transcode,
+            "build_ffmpeg_command",
+            lambda ffmpeg, path: ["/nonexistent/ffmpeg"],
+        ):
+            with self.assertRaises(TranscodeError):
+                asyncio.run(_collect(iter_transcoded_chunks("a.mp4", 4096)))
+
+    def test_early_close_stops_ffmpeg(self):
+        """测试提前停止读取时关闭管道"""
+
+        async def run_test():
+            source = audio_transcode.AudioSource(
+                path="a.mp4", sample_rate=16000, wav_format="pcm", transcode=True
+            )
+            chunks = aiter_upload_chunks(source, 1024)
+            first = await chunks.__anext__()
+            await chunks.aclose()
+            return first
+
+        with mock.patch.object(
+            audio_transcode, "build_ffmpeg_command", _fake_ffmpeg_command(10000000)
+        ):
+            self.assertEqual(len(asyncio.run(run_test())), 1024)
+
+    def test_session_uploads_transcoded_pcm(self):
+        """测试会话上传转码数据：开始消息为 pcm，上传结束事件带压缩比"""
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, "a.mp4")
+            with open(path, "wb") as f:
+                f.write(b"\x00" * 800000)
+
+            async def run_test():
+                async with StubServer() as server:
+                    events = []
+                    config = SessionConfig(
+                        host="127.0.0.1", port=server.port, use_ssl=False
+                    )
+                    session = TranscribeSession(
+                        config, emitter=ProgressEmitter(on_event=events.append)
+                    )
+                    try:
+                        outcome = await session.transcribe(
+                            UtteranceJob(wav_name="a", wav_path=path)
+                        )
+                    finally:
+                        await session.close()
+                    return server, outcome, events
+
+            with (
+                mock.patch.object(
+                    audio_transcode, "build_ffmpeg_command", _fake_ffmpeg_command(40000)
+                ),
+                mock.patch.object(audio_transcode, "probe_duration", return_value=None),
+            ):
+                server, outcome, events = asyncio.run(run_test())
+
+        self.assertTrue(outcome.success, outcome.error)
+        self.assertEqual(outcome.text, "bytes=40000")
+        self.assertEqual(server.start_messages[0]["wav_format"], "pcm")
+        self.assertEqual(server.start_messages[0]["audio_fs"], TRANSCODE_SAMPLE_RATE)
+        end = [e for e in events if e.event == EVENT_UPLOAD_END][0]
+        self.assertEqual(end.data["bytes_sent"], 40000)
+        self.assertEqual(end.data["source_bytes"], 800000)
+        self.assertAlmostEqual(end.data["compression_ratio"], 20.0)
+
+
+@unittest.skipUnless(shutil.which("ffmpeg"), "未安装 ffmpeg")
+class TestRealFfmpeg(unittest.TestCase):
+    """使用真实 ffmpeg 的转码测试"""
+
+    def test_decode_mp3_to_16k_mono(self):
+        """测试 44.1kHz 双声道 mp3 解码为 16kHz 单声道 pcm"""
+        with tempfile.TemporaryDirectory() as d:
+            wav_path = os.path.join(d, "a.wav")
+            with wave.open(wav_path, "wb") as wav_file:
+                wav_file.setnchannels(2)
+                wav_file.setsampwidth(2)
+                wav_file.setframerate(44100)
+                wav_file.writeframes(b"\x00\x01" * 2 * 44100 * 2)
+            mp3_path = os.path.join(d, "a.mp3")
+            subprocess.run(
+                ["ffmpeg", "-loglevel", "error", "-i", wav_path, mp3_path],
+                check=True,
+            )
+
+            source = open_upload_source(mp3_path, 16000)
+            chunks = asyncio.run(_collect(aiter_upload_chunks(source, 65536)))
+
+        total = sum(len(c) for c in chunks)
+        self.assertTrue(source.transcode)
+        # 2 秒音频，允许编码器引入的少量首尾填充
+        self.assertAlmostEqual(total / TRANSCODE_BYTES_PER_SECOND, 2.0, delta=0.2)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
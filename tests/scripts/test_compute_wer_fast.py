@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""runtime/python/utils/compute_wer.py 快速编辑距离评分测试
+
+测试 ref/FunASR-main/runtime/python/utils/compute_wer.py：
+1. 批量向量化对齐与原逐格动态规划的 cor/ins/del/sub/wrong 完全一致（含空句、大小写）
+2. 超过 int16 范围的长句不再溢出
+3. 文件评分：内存模式、流式模式与多进程模式输出的 cer_detail 完全一致，
+   汇总行与逐句原算法累加结果一致，缺少参考文本的句子计入 not present
+4. 流式模式要求按 key 排序，乱序时抛出 ValueError
+
+日期: 2026-10-17
+"""
+
+import os
+import random
+import sys
+import tempfile
+import unittest
+
+import numpy as np
+
+# 添加 runtime/python/utils 目录到路径（compute_wer 只依赖 numpy）
+sys.path.insert(
+    0,
+    os.path.join(
+        os.path.dirname(__file__), "../../ref/FunASR-main/runtime/python/utils"
+    ),
+)
+
+import compute_wer  # noqa: E402
+
+
+def legacy_wer_by_line(hyp, ref):
+    """原 compute_wer_by_line 的逐格动态规划与回溯（代价矩阵改为 int64）"""
+    hyp = [x.lower() for x in hyp]
+    ref = [x.lower() for x in ref]
+    len_hyp, len_ref = len(hyp), len(ref)
+    cost = np.zeros((len_hyp + 1, len_ref + 1), dtype=np.int64)
+    ops = np.zeros((len_hyp + 1, len_ref + 1), dtype=np.int8)
+    cost[:, 0] = np.arange(len_hyp + 1)
+    cost[0, :] = np.arange(len_ref + 1)
+    for i in range(1, len_hyp + 1):
+        for j in range(1, len_ref + 1):
+            if hyp[i - 1] == ref[j - 1]:
+                cost[i][j] = cost[i - 1][j - 1]
+            else:
+                compare_val = [
+                    cost[i - 1][j - 1] + 1,
+                    cost[i - 1][j] + 1,
+                    cost[i][j - 1] + 1,
+                ]
+                cost[i][j] = min(compare_val)
+                ops[i][j] = compare_val.index(cost[i][j]) + 1
+    rst = {"nwords": len_ref, "cor": 0, "ins": 0, "del": 0, "sub": 0}
+    i, j = len_hyp, len_ref
+    while i > 0 and j > 0:
+        op = ops[i][j]
+        if op == 0:
+            rst["cor"] += 1
+            i, j = i - 1, j - 1
+        elif op == 1:
+            rst["sub"] += 1
+            i, j = i - 1, j - 1
+        elif op == 2:
+            rst["ins"] += 1
+            i -= 1
+        else:
+            rst["del"] += 1
+            j -= 1
+    rst["ins"] += i
+    rst["del"] += j
+    rst["wrong"] = int(cost[len_hyp][len_ref])
+    return rst
+
+
+def random_tokens(rng, alphabet, max_len):
+    return [rng.choice(alphabet) for _ in range(rng.randint(0, max_len))]
+
+
+class TestComputeWerFast(unittest.TestCase):
+    """测试快速编辑距离评分"""
+
+    def test_batch_matches_legacy(self):
+        """测试批量对齐与逐格算法一致"""
+        rng = random.Random(0)
+        pairs = []
+        for _ in range(600):
+            alphabet = rng.choice(["ab", "abc", "aBcDe", "abcdefghijklmnop"])
+            pairs.append(
+                (random_tokens(rng, alphabet, 14), random_tokens(rng, alphabet, 14))
+            )
+        for (hyp, ref), out_item in zip(pairs, compute_wer.score_pairs(pairs)):
+            self.assertEqual(out_item, legacy_wer_by_line(hyp, ref), (hyp, ref))
+        self.assertEqual(
+            compute_wer.compute_wer_by_line(["A", "b"], ["a", "c", "b"]),
+            {"nwords": 3, "cor": 2, "wrong": 1, "ins": 0, "del": 1, "sub": 0},
+        )
+
+    def test_long_utterance_no_overflow(self):
+        """测试长句不溢出"""
+        hyp = ["x"] * 33000
+        out_item = compute_wer.compute_wer_by_line(hyp, ["y"])
+        self.assertEqual(out_item["wrong"], 33000)
+        self.assertEqual((out_item["sub"], out_item["ins"]), (1, 32999))
+
+    def test_file_modes_identical(self):
+        """测试内存、流式与多进程模式输出一致"""
+        rng = random.Random(1)
+        keys = sorted(f"utt{k:04d}" for k in range(300))
+        alphabet = list("今天天气很好我们去公园散步吧")
+        with tempfile.TemporaryDirectory() as tmp:
+            ref_file = os.path.join(tmp, "text.ref")
+            hyp_file = os.path.join(tmp, "text.hyp")
+            refs, hyps = {}, {}
+            with open(ref_file, "w") as fr, open(hyp_file, "w") as fh:
+                for k, key in enumerate(keys):
+                    refs[key] = random_tokens(rng, alphabet, 30) or ["好"]
+                    hyps[key] = random_tokens(rng, alphabet, 30)
+                    if k % 7:
+                        fr.write(" ".join([key] + refs[key]) + "\n")
+                    fh.write(" ".join([key] + hyps[key]) + "\n")
+
+            outputs = []
+            for kwargs in [{}, {"streaming": True}, {"n_jobs": 2, "streaming": True}]:
+                wer_file = os.path.join(tmp, f"text.wer{len(outputs)}")
+                compute_wer.compute_wer(ref_file, hyp_file, wer_file, **kwargs)
+                with open(wer_file) as f:
+                    outputs.append(f.read())
+            self.assertEqual(outputs[0], outputs[1])
+            self.assertEqual(outputs[0], outputs[2])
+
+            scored = [
+                legacy_wer_by_line(hyps[k], refs[k])
+                for i, k in enumerate(keys)
+                if i % 7
+            ]
+            wrong = sum(r["wrong"] for r in scored)
+            nwords = sum(r["nwords"] for r in scored)
+            ins, dele, sub = (
+                sum(r[op] for r in scored) for op in ("ins", "del", "sub")
+            )
+            self.assertIn(
+                f"%WER {round(wrong * 100 / nwords, 2)} [ {wrong} / {nwords}, "
+                f"{ins} ins, {dele} del, {sub} sub ]",
+                outputs[0],
+            )
+            self.assertIn(
+                f"Scored {len(keys)} sentences, {len(keys) - len(scored)} not present",
+                outputs[0],
+            )
+
+    def test_streaming_requires_sorted(self):
+        """测试流式模式检查排序"""
+        with tempfile.TemporaryDirectory() as tmp:
+            ref_file = os.path.join(tmp, "text.ref")
+            hyp_file = os.path.join(tmp, "text.hyp")
+            with open(ref_file, "w") as f:
+                f.write("b 你 好\na 再 见\n")
+            with open(hyp_file, "w") as f:
+                f.write("a 再 见\nb 你 好\n")
+            wer_file = os.path.join(tmp, "text.wer")
+            with self.assertRaises(ValueError):
+                compute_wer.compute_wer(ref_file, hyp_file, wer_file, streaming=True)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""funasr_onnx 前端 fbank 批量提取测试
+
+测试 ref/FunASR-main/runtime/python/onnxruntime/funasr_onnx/utils/frontend.py：
+1. 离线 fbank 以 float32 连续缓冲送入，结果与 tolist + 逐帧 float64 矩阵的原实现一致
+2. 可写入预分配的 float32 输出缓冲
+3. 流式 fbank_online 只读取新增帧，累计结果与离线一次提取一致，已输出的帧不被改写
+
+说明：frontend 依赖 kaldi_native_fbank，未安装时跳过
+
+日期: 2026-10-17
+"""
+
+import os
+import sys
+import unittest
+
+import numpy as np
+
+# 添加 funasr_onnx 工具目录到路径
+sys.path.insert(
+    0,
+    os.path.join(
+        os.path.dirname(__file__),
+        "../../ref/FunASR-main/runtime/python/onnxruntime/funasr_onnx/utils",
+    ),
+)
+
+try:
+    import frontend  # noqa: E402
+    import kaldi_native_fbank as knf
+except ImportError:
+    frontend = None
+
+
+@unittest.skipUnless(frontend is not None, "未安装 kaldi_native_fbank")
+class TestBulkFbank(unittest.TestCase):
+    """测试批量 fbank 提取"""
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.waveform = (rng.standard_normal(16000 * 3) * 0.1).astype(np.float32)
+        self.front = frontend.WavFrontend(dither=0.0)
+
+    def _reference(self, waveform):
+        fbank_fn = knf.OnlineFbank(self.front.opts)
+        fbank_fn.accept_waveform(16000, (waveform * (1 << 15)).tolist())
+        mat = np.empty([fbank_fn.num_frames_ready, 80])
+        for i in range(fbank_fn.num_frames_ready):
+            mat[i, :] = fbank_fn.get_frame(i)
+        return mat.astype(np.float32)
+
+    def test_offline_matches_reference(self):
+        """测试离线提取结果与原实现一致（float32/float64 输入）"""
+        expected = self._reference(self.waveform)
+        feat, feat_len = self.front.fbank(self.waveform)
+        self.assertEqual(feat.dtype, np.float32)
+        self.assertEqual(int(feat_len), expected.shape[0])
+        np.testing.assert_array_equal(feat, expected)
+
+        feat64, _ = self.front.fbank(self.waveform.astype(np.float64))
+        np.testing.assert_array_equal(feat64, expected)
+
+    def test_preallocated_output(self):
+        """测试写入预分配输出缓冲，缓冲不足时另行分配"""
+        buffer = np.zeros((500, 80), dtype=np.float32)
+        feat, _ = self.front.fbank(self.waveform, out=buffer)
+        self.assertIs(feat.base, buffer)
+        np.testing.assert_array_equal(feat, self._reference(self.waveform))
+
+        small = np.zeros((10, 80), dtype=np.float32)
+        feat, _ = self.front.fbank(self.waveform, out=small)
+        self.assertEqual(feat.shape[0], 298)
+        self.assertFalse(small.any())
+
+    def test_online_incremental(self):
+        """测试流式提取累计结果与离线一致，已输出的帧不被改写"""
+        expected = self._reference(self.waveform)
+        self.front.reset_status()
+        earlier = []
+        for chunk in np.array_split(self.waveform, 17):
+            feat, feat_len = self.front.fbank_online(chunk)
+            self.assertEqual(self.front.fbank_beg_idx, int(feat_len))
+            earlier.append((feat, feat.copy()))
+
+        np.testing.assert_array_equal(feat, expected)
+        for view, snapshot in earlier:
+            np.testing.assert_array_equal(view, snapshot)
+
+        self.front.reset_status()
+        self.assertEqual(self.front.fbank_beg_idx, 0)
+        feat, _ = self.front.fbank_online(self.waveform[:8000])
+        np.testing.assert_array_equal(feat, self._reference(self.waveform[:8000]))
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""funasr_onnx 前端 LFR/CMVN 测试
+
+测试 ref/FunASR-main/runtime/python/onnxruntime/funasr_onnx/utils/frontend.py：
+1. 跨步视图实现的 LFR 拼帧与逐帧拼接（首帧左填充、末帧重复补齐）结果一致
+2. 流式 LFR：非最后一块只输出完整窗口，拼接缓存与位置与逐帧实现一致
+3. CMVN 按广播计算、输出 float32，可写入给定的输出缓冲
+
+说明：frontend 依赖 kaldi_native_fbank，未安装时跳过
+
+日期: 2026-10-17
+"""
+
+import itertools
+import os
+import sys
+import unittest
+
+import numpy as np
+
+# 添加 funasr_onnx 工具目录到路径
+sys.path.insert(
+    0,
+    os.path.join(
+        os.path.dirname(__file__),
+        "../../ref/FunASR-main/runtime/python/onnxruntime/funasr_onnx/utils",
+    ),
+)
+
+try:
+    import frontend  # noqa: E402
+except ImportError:
+    frontend = None
+
+
+def _reference_lfr(inputs, lfr_m, lfr_n, T_lfr, left_padding, is_final=True):
+    """逐帧拼接的参考实现，返回 (输出, 截止的窗口序号)"""
+    inputs = np.vstack([np.tile(inputs[0], (left_padding, 1)), inputs])
+    T = inputs.shape[0]
+    rows = []
+    for i in range(T_lfr):
+        if lfr_m <= T - i * lfr_n:
+            rows.append(inputs[i * lfr_n : i * lfr_n + lfr_m].reshape(-1))
+        elif is_final:
+            frame = inputs[i * lfr_n :].reshape(-1)
+            for _ in range(lfr_m - (T - i * lfr_n)):
+                frame = np.hstack((frame, inputs[-1]))
+            rows.append(frame)
+        else:
+            return np.array(rows, dtype=np.float32), i
+    return np.array(rows, dtype=np.float32), T_lfr
+
+
+@unittest.skipUnless(frontend is not None, "未安装 kaldi_native_fbank")
+class TestLfr(unittest.TestCase):
+    """测试 LFR 拼帧"""
+
+    CASES = list(itertools.product([1, 2, 5, 7, 50, 101], [1, 5, 7], [1, 6]))
+
+    def test_offline_matches_reference(self):
+        """测试离线 LFR 与逐帧实现一致"""
+        rng = np.random.default_rng(0)
+        for T, lfr_m, lfr_n in self.CASES:
+            with self.subTest(T=T, lfr_m=lfr_m, lfr_n=lfr_n):
+                x = rng.standard_normal((T, 4)).astype(np.float32)
+                expected, _ = _reference_lfr(
+                    x, lfr_m, lfr_n, int(np.ceil(T / lfr_n)), (lfr_m - 1) // 2
+                )
+                actual = frontend.WavFrontend.apply_lfr(x, lfr_m, lfr_n)
+                self.assertEqual(actual.dtype, np.float32)
+                self.assertEqual(actual.shape, (expected.shape[0], lfr_m * 4))
+                np.testing.assert_array_equal(actual, expected)
+
+    def test_online_matches_reference(self):
+        """测试流式 LFR 的输出、拼接缓存与截止位置与逐帧实现一致"""
+        rng = np.random.default_rng(1)
+        for (T, lfr_m, lfr_n), is_final in itertools.product(self.CASES, (False, True)):
+            if T < lfr_m:
+                continue
+            with self.subTest(T=T, lfr_m=lfr_m, lfr_n=lfr_n, is_final=is_final):
+                x = rng.standard_normal((T, 4)).astype(np.float32)
+                T_lfr = int(np.ceil((T - (lfr_m - 1) // 2) / lfr_n))
+                expected, splice = _reference_lfr(x, lfr_m, lfr_n, T_lfr, 0, is_final)
+                splice = min(T - 1, splice * lfr_n)
+
+                outputs, cache, splice_idx = frontend.WavFrontendOnline.apply_lfr(
+                    x, lfr_m, lfr_n, is_final
+                )
+                np.testing.assert_array_equal(outputs, expected)
+                self.assertEqual(splice_idx, splice)
+                np.testing.assert_array_equal(cache, x[splice:])
+
+
+@unittest.skipUnless(frontend is not None, "未安装 kaldi_native_fbank")
+class TestCmvn(unittest.TestCase):
+    """测试 CMVN"""
+
+    def setUp(self):
+        rng = np.random.default_rng(2)
+        self.front = frontend.WavFrontend()
+        self.front.cmvn = np.stack([rng.standard_normal(12), rng.uniform(0.5, 2.0, 12)])
+        self.front.cmvn_f32 = self.front.cmvn.astype(np.float32)
+        self.inputs = rng.standard_normal((30, 8)).astype(np.float32)
+
+    def test_broadcast_matches_tile(self):
+        """测试广播结果与逐帧平铺均值/方差一致，且只使用前 dim 维"""
+        cmvn = self.front.cmvn
+        expected = (self.inputs + np.tile(cmvn[0:1, :8], (30, 1))) * np.tile(
+            cmvn[1:2, :8], (30, 1)
+        )
+        actual = self.front.apply_cmvn(self.inputs)
+        self.assertEqual(actual.dtype, np.float32)
+        np.testing.assert_allclose(actual, expected, rtol=1e-5, atol=1e-5)
+
+    def test_in_place_output(self):
+        """测试写入给定的输出缓冲"""
+        expected = self.front.apply_cmvn(self.inputs)
+        buffer = self.inputs.copy()
+        result = self.front.apply_cmvn(buffer, out=buffer)
+        self.assertIs(result, buffer)
+        np.testing.assert_array_equal(buffer, expected)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""参考服务端推理调度测试
+
+测试 ref/FunASR-main/runtime/python/websocket/inference_pool.py（使用假模型，不依赖 FunASR）：
+1. InferencePool：推理在线程池中执行，不阻塞事件循环
+2. StreamingBatcher：时间窗口内的多个会话分块合并为一次运行，结果回到各自调用方
+3. StreamingBatcher：超过最大批大小时拆分，单个分块出错只影响自身
+4. StreamingBatcher：多工作线程时一批分块分散到各线程并行运行
+
+日期: 2026-10-17
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+import unittest
+
+# 添加参考服务端目录到路径
+sys.path.insert(
+    0,
+    os.path.join(
+        os.path.dirname(__file__), "../../ref/FunASR-main/runtime/python/websocket"
+    ),
+)
+
+from inference_pool import InferencePool, StreamingBatcher  # noqa: E402
+
+
+class FakeModel:
+    """假模型：记录调用线程，返回输入；input 为 "bad" 时抛出异常"""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.threads = set()
+        self.calls = 0
+
+    def generate(self, input, cache=None, **kwargs):
+        self.calls += 1
+        self.threads.add(threading.get_ident())
+        if self.delay:
+            time.sleep(self.delay)
+        if input == "bad":
+            raise ValueError("bad chunk")
+        if cache is not None:
+            cache["seen"] = cache.get("seen", 0) + 1
+        return [{"text": input}]
+
+
+class TestInferencePool(unittest.TestCase):
+    """测试推理线程池"""
+
+    def test_event_loop_not_blocked(self):
+        """测试推理期间事件循环仍在运行其他任务"""
+        model = FakeModel(delay=0.2)
+        pool = InferencePool("asr", model, workers=1, max_pending=4)
+
+        async def run_test():
+            ticks = 0
+
+            async def ticker():
+                nonlocal ticks
+                while True:
+                    ticks += 1
+                    await asyncio.sleep(0.01)
+
+            task = asyncio.ensure_future(ticker())
+            result = await pool.generate(input="a")
+            task.cancel()
+            return result, ticks
+
+        result, ticks = asyncio.run(run_test())
+        self.assertEqual(result, [{"text": "a"}])
+        self.assertGreater(ticks, 5)
+        self.assertNotIn(threading.get_ident(), model.threads)
+
+
+class TestStreamingBatcher(unittest.TestCase):
+    """测试跨会话微批"""
+
+    def _run(self, batcher, inputs):
+        async def run_test():
+            caches = [{} for _ in inputs]
+            results = await asyncio.gather(
+                *(
+                    batcher.generate(input=value, cache=cache)
+                    for value, cache in zip(inputs, caches)
+                ),
+                return_exceptions=True,
+            )
+            return results, caches
+
+        return asyncio.run(run_test())
+
+    def test_chunks_in_window_run_together(self):
+        """测试窗口内的分块合并为一次运行，结果与缓存各归各的会话"""
+        model = FakeModel()
+        batcher = StreamingBatcher(
+            InferencePool("asr_online", model, 1, 8), window_ms=20, max_batch=16
+        )
+        results, caches = self._run(batcher, ["a", "b", "c", "d", "e"])
+
+        self.assertEqual([r[0]["text"] for r in results], ["a", "b", "c", "d", "e"])
+        self.assertEqual(caches, [{"seen": 1}] * 5)
+        self.assertEqual(batcher.batches, 1)
+        self.assertEqual(batcher.chunks, 5)
+        self.assertGreaterEqual(batcher.wait_ms_max, 0.0)
+
+    def test_max_batch_splits(self):
+        """测试超过最大批大小时拆分为多次运行"""
+        model = FakeModel()
+        batcher = StreamingBatcher(
+            InferencePool("asr_online", model, 1, 8), window_ms=50, max_batch=2
+        )
+        results, _ = self._run(batcher, ["a", "b", "c", "d", "e"])
+
+        self.assertEqual([r[0]["text"] for r in results], ["a", "b", "c", "d", "e"])
+        self.assertEqual(batcher.batches, 3)
+        self.assertEqual(model.calls, 5)
+
+    def test_batch_spread_across_workers(self):
+        """测试一批分块分散到线程池的各个工作线程，而不是在一个线程中串行"""
+        model = FakeModel(delay=0.05)
+        batcher = StreamingBatcher(
+            InferencePool("asr_online", model, 2, 8), window_ms=20, max_batch=16
+        )
+        started = time.perf_counter()
+        results, caches = self._run(batcher, ["a", "b", "c", "d"])
+        elapsed = time.perf_counter() - started
+
+        self.assertEqual([r[0]["text"] for r in results], ["a", "b", "c", "d"])
+        self.assertEqual(caches, [{"seen": 1}] * 4)
+        self.assertEqual(batcher.batches, 1)
+        self.assertEqual(len(model.threads), 2)
+        self.assertLess(elapsed, 0.19)
+
+    def test_error_isolated(self):
+        """测试单个分块出错只影响其调用方"""
+        batcher = StreamingBatcher(
+            InferencePool("asr_online", FakeModel(), 1, 8), window_ms=10, max_batch=8
+        )
+        results, _ = self._run(batcher, ["a", "bad", "c"])
+
+        self.assertEqual(results[0][0]["text"], "a")
+        self.assertIsInstance(results[1], ValueError)
+        self.assertEqual(results[2][0]["text"], "c")
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""fun_text_processing ITN 预编译语法库测试
+
+测试 ref/FunASR-main/fun_text_processing/inverse_text_normalization/grammar_store.py：
+1. 归档文件名包含语言、库版本与语法源码哈希，哈希稳定
+2. export_grammars 导出后，从语法库加载的 InverseNormalizer 与现场构图结果一致
+3. 语法库缺少归档且 build_missing=False 时抛出 FileNotFoundError
+4. StoredGrammar 构造时不加载、序列化不携带 fst，反序列化后可正常使用
+5. 源码哈希覆盖实际导入的模块及其语言目录的数据文件（de 依赖 en 的 tagger）
+
+说明：依赖 pynini、regex、inflect 等 fun_text_processing 依赖，未安装时跳过；
+      首次构建中文语法约需数秒
+
+日期: 2026-10-17
+"""
+
+import os
+import pickle
+import sys
+import tempfile
+import unittest
+
+# 添加 FunASR 源码目录到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "../../ref/FunASR-main"))
+
+try:
+    from fun_text_processing.inverse_text_normalization import grammar_store
+    from fun_text_processing.inverse_text_normalization.inverse_normalize import (
+        InverseNormalizer,
+    )
+except ImportError:
+    grammar_store = None
+
+SENTENCES = ["三点五", "百分之五十六点七", "下午三点十五分", "我有十二个梨"]
+
+
+@unittest.skipUnless(grammar_store, "未安装 pynini 等 fun_text_processing 依赖")
+class TestGrammarStore(unittest.TestCase):
+    """测试 ITN 预编译语法库"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.grammar_dir = cls.tmp.name
+        cls.far_file = grammar_store.export_grammars("zh", cls.grammar_dir)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp.cleanup()
+
+    def test_versioned_archive_name(self):
+        """测试归档按语言、版本与源码哈希命名"""
+        source_hash = grammar_store.grammar_source_hash("zh")
+        self.assertEqual(source_hash, grammar_store.grammar_source_hash("zh"))
+        self.assertNotEqual(source_hash, grammar_store.grammar_source_hash("en"))
+        self.assertEqual(
+            os.path.basename(self.far_file),
+            f"zh_itn_v{grammar_store.STORE_VERSION}_{source_hash}.far",
+        )
+        self.assertTrue(os.path.exists(self.far_file))
+        # 已存在时直接复用，不重新构建
+        self.assertEqual(
+            grammar_store.export_grammars("zh", self.grammar_dir), self.far_file
+        )
+
+    def test_stored_matches_built(self):
+        """测试从语法库加载的结果与现场构图一致"""
+        stored = InverseNormalizer(lang="zh", grammar_dir=self.grammar_dir)
+        built = InverseNormalizer(lang="zh", use_grammar_store=False)
+        for sentence in SENTENCES:
+            self.assertEqual(
+                stored.normalize(sentence, verbose=False),
+                built.normalize(sentence, verbose=False),
+            )
+        self.assertEqual(stored.normalize("三点五", verbose=False), "3.5")
+
+    def test_sources_follow_imports(self):
+        """测试源码清单包含跨语言导入的模块与数据文件"""
+        package_dir = os.path.dirname(os.path.dirname(grammar_store.__file__))
+        sources = {
+            os.path.relpath(path, package_dir).replace(os.sep, "/")
+            for path in grammar_store._grammar_sources("de")
+        }
+        self.assertIn("inverse_text_normalization/en/taggers/word.py", sources)
+        self.assertIn("text_normalization/en/graph_utils.py", sources)
+        self.assertTrue(
+            any(p.startswith("inverse_text_normalization/en/data/") for p in sources)
+        )
+        self.assertFalse(
+            any(p.startswith("inverse_text_normalization/zh/") for p in sources)
+        )
+
+    def test_missing_archive(self):
+        """测试不允许构建时缺少归档抛出异常"""
+        with tempfile.TemporaryDirectory() as empty_dir:
+            with self.assertRaises(FileNotFoundError):
+                grammar_store.load_grammars("zh", empty_dir, build_missing=False)
+            self.assertEqual(os.listdir(empty_dir), [])
+
+    def test_stored_grammar_pickle(self):
+        """测试 StoredGrammar 序列化不携带 fst"""
+        grammar = grammar_store.StoredGrammar(
+            "zh", grammar_store.TAGGER_KEY, self.grammar_dir
+        )
+        data = pickle.dumps(grammar)
+        self.assertLess(len(data), 1024)
+        restored = pickle.loads(data)
+        self.assertGreater(restored.fst.num_states(), 0)
+        self.assertIs(restored.fst, grammar.fst)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""fun_text_processing Normalizer 排列搜索与缓存测试
+
+测试 ref/FunASR-main/fun_text_processing/text_normalization/normalize.py：
+1. 惰性 _iter_permute 与原 _permute 生成的序列化及顺序一致
+2. verbalize_tokens 与原 generate_permutations 全排列搜索的结果一致
+3. 重复输入命中 LRU 缓存，不再调用 verbalizer；LRUCache 按最近使用淘汰
+4. 排列预算内都无法 verbalize 时抛出 ValueError
+5. 超长输入按句（含中文句末标点）切分后逐句处理
+
+说明：依赖 pynini、regex、inflect 等 fun_text_processing 依赖，未安装时跳过；
+      首次构建中文语法约需数秒
+
+日期: 2026-10-17
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+from collections import OrderedDict
+from unittest import mock
+
+# 添加 FunASR 源码目录到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "../../ref/FunASR-main"))
+
+try:
+    import pynini
+    from fun_text_processing.inverse_text_normalization.inverse_normalize import (
+        InverseNormalizer,
+    )
+    from fun_text_processing.text_normalization.normalize import SPACE_DUP, LRUCache
+    from fun_text_processing.text_normalization.token_parser import PRESERVE_ORDER_KEY
+except ImportError:
+    InverseNormalizer = None
+
+SENTENCES = [
+    "三点五",
+    "百分之五十六点七",
+    "二零二四年三月五号下午三点十五分",
+    "我有十二个梨，一百二十三块五毛",
+    "今天天气不错",
+    "五公斤，三千五百块",
+]
+
+
+def legacy_normalize(normalizer, text):
+    """原实现：逐个尝试 generate_permutations 的全部排列"""
+    text = pynini.escape(text.strip())
+    normalizer.parser(normalizer.select_tag(normalizer.find_tags(text)))
+    tokens = normalizer.parser.parse()
+    output = ""
+    for split in normalizer._split_tokens_to_reduce_number_of_permutations(tokens):
+        for tagged_text in normalizer.generate_permutations(split):
+            lattice = normalizer.find_verbalizer(pynini.escape(tagged_text))
+            if lattice.num_states() != 0:
+                break
+        output += " " + normalizer.select_verbalizer(lattice)
+    return SPACE_DUP.sub(" ", output[1:])
+
+
+@unittest.skipUnless(InverseNormalizer, "未安装 pynini 等 fun_text_processing 依赖")
+class TestNormalizeMemo(unittest.TestCase):
+    """测试排列搜索与缓存"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.grammar_dir = cls.tmp.name
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp.cleanup()
+
+    def setUp(self):
+        self.normalizer = InverseNormalizer(lang="zh", grammar_dir=self.grammar_dir)
+
+    def test_iter_permute_order(self):
+        """测试惰性排列与原 _permute 一致"""
+        token = OrderedDict(
+            [
+                ("money", OrderedDict([("integer_part", "5"), ("currency", "$")])),
+                ("a", "1"),
+                ("b", True),
+            ]
+        )
+        self.assertEqual(
+            list(self.normalizer._iter_permute(token)), self.normalizer._permute(token)
+        )
+        ordered = OrderedDict([("x", "1"), ("y", "2"), (PRESERVE_ORDER_KEY, True)])
+        self.assertEqual(
+            list(self.normalizer._iter_permute(ordered)),
+            self.normalizer._permute(ordered),
+        )
+
+    def test_matches_permutation_search(self):
+        """测试与全排列搜索结果一致"""
+        for sentence in SENTENCES:
+            self.assertEqual(
+                self.normalizer.normalize(sentence),
+                legacy_normalize(self.normalizer, sentence),
+            )
+
+    def test_memo_skips_verbalizer(self):
+        """测试重复输入命中缓存"""
+        first = self.normalizer.normalize(SENTENCES[3])
+        entries = len(self.normalizer._verbalize_cache)
+        with mock.patch.object(
+            self.normalizer, "find_verbalizer", wraps=self.normalizer.find_verbalizer
+        ) as find_verbalizer:
+            self.assertEqual(self.normalizer.normalize(SENTENCES[3]), first)
+            find_verbalizer.assert_not_called()
+        self.assertEqual(len(self.normalizer._verbalize_cache), entries)
+
+        cache = LRUCache(maxsize=2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        self.assertEqual(cache.get("a"), 1)
+        cache.put("c", 3)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual((cache.get("a"), cache.get("c"), len(cache)), (1, 3, 2))
+
+    def test_permutation_budget(self):
+        """测试预算内无法 verbalize 时抛出 ValueError"""
+        self.normalizer.max_permutations = 2
+        token = {"tokens": OrderedDict([("unknown", "x"), ("other", "y"), ("z", "w")])}
+        with self.assertRaises(ValueError):
+            self.normalizer.verbalize_tokens([token])
+
+    def test_long_input_split(self):
+        """测试超长输入按句切分"""
+        pieces = self.normalizer.split_long_text("三点五。五公斤！好的 Next one. Done")
+        self.assertEqual(
+            pieces,
+            [
+                ("三点五。", ""),
+                ("五公斤！", ""),
+                ("好的 Next one.", " "),
+                ("Done", ""),
+            ],
+        )
+
+        self.normalizer.max_input_chars = 20
+        text = "。".join(SENTENCES) + "。"
+        expected = "".join(self.normalizer.normalize(s + "。") for s in SENTENCES)
+        self.assertEqual(self.normalizer.normalize(text), expected)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""fun_text_processing 常驻进程池归一化服务测试
+
+测试 ref/FunASR-main/fun_text_processing/text_normalization/normalize_service.py：
+1. NormalizerPool.imap 按输入顺序返回结果，与逐句 normalize 一致
+2. 背压：首个结果产出前，惰性输入最多被读取 chunk_size * max_pending 句
+3. spawn 启动方式（Windows 默认）下工作进程通过 factory 自行加载语法
+4. 空输入返回空结果，normalize_list 与 imap 结果一致
+
+说明：依赖 pynini、regex、inflect 等 fun_text_processing 依赖，未安装时跳过；
+      语法从临时语法库加载，首次构建中文语法约需数秒
+
+日期: 2026-10-17
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+from functools import partial
+
+# 添加 FunASR 源码目录到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "../../ref/FunASR-main"))
+
+try:
+    from fun_text_processing.inverse_text_normalization import grammar_store
+    from fun_text_processing.inverse_text_normalization.inverse_normalize import (
+        InverseNormalizer,
+    )
+    from fun_text_processing.text_normalization.normalize_service import NormalizerPool
+except ImportError:
+    NormalizerPool = None
+
+SENTENCES = [
+    "三点五",
+    "百分之五十六点七",
+    "下午三点十五分",
+    "我有十二个梨",
+    "二零二六年十月十七日",
+    "一千二百三十四",
+    "负五度",
+] * 3
+
+
+@unittest.skipUnless(NormalizerPool, "未安装 pynini 等 fun_text_processing 依赖")
+class TestNormalizerPool(unittest.TestCase):
+    """测试常驻进程池归一化服务"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.TemporaryDirectory()
+        grammar_store.export_grammars("zh", cls.tmp.name)
+        cls.factory = partial(InverseNormalizer, lang="zh", grammar_dir=cls.tmp.name)
+        normalizer = cls.factory()
+        cls.expected = [normalizer.normalize(text) for text in SENTENCES]
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp.cleanup()
+
+    def test_ordered_results(self):
+        """测试结果按输入顺序返回"""
+        with NormalizerPool(self.factory, n_jobs=2, chunk_size=3) as pool:
+            self.assertEqual(list(pool.imap(iter(SENTENCES))), self.expected)
+
+    def test_backpressure(self):
+        """测试首个结果产出前输入只被有限读取"""
+        consumed = []
+
+        def source():
+            for text in SENTENCES:
+                consumed.append(text)
+                yield text
+
+        with NormalizerPool(
+            self.factory, n_jobs=1, chunk_size=2, max_pending=2
+        ) as pool:
+            results = pool.imap(source())
+            first = next(results)
+            self.assertEqual(first, self.expected[0])
+            self.assertLessEqual(len(consumed), 4)
+            self.assertEqual([first] + list(results), self.expected)
+        self.assertEqual(len(consumed), len(SENTENCES))
+
+    def test_spawn_start_method(self):
+        """测试 spawn 启动方式下工作进程自行加载语法"""
+        with NormalizerPool(
+            self.factory, n_jobs=1, chunk_size=4, start_method="spawn"
+        ) as pool:
+            self.assertEqual(pool.start_method, "spawn")
+            self.assertEqual(pool.normalize_list(SENTENCES[:7]), self.expected[:7])
+
+    def test_empty_input(self):
+        """测试空输入"""
+        with NormalizerPool(self.factory, n_jobs=1) as pool:
+            self.assertEqual(list(pool.imap([])), [])
+            self.assertEqual(pool.normalize_list(SENTENCES), self.expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
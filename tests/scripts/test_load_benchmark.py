@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""WebSocket 服务端负载压测测试
+
+测试 load_benchmark.py（使用内置桩服务端，不依赖真实 FunASR 服务）：
+1. 到达时刻：泊松间隔可复现且均值接近 1/rate，匀速间隔固定，rate=0 为闭环
+2. 百分位统计：线性插值百分位、均值与最大值
+3. 端到端：offline / online / 2pass 混合请求全部成功，逐请求指标与按模式汇总正确
+4. 报告输出：命令行 --stub 模式写出 JSON 与 CSV
+
+日期: 2026-10-17
+"""
+
+import asyncio
+import csv
+import json
+import os
+import sys
+import tempfile
+import unittest
+import wave
+
+# 添加源码目录到路径
+sys.path.insert(
+    0, os.path.join(os.path.dirname(__file__), "../../src/python-gui-client")
+)
+
+from load_benchmark import (  # noqa: E402
+    BenchmarkConfig,
+    BenchmarkStubServer,
+    LoadBenchmark,
+    arrival_offsets,
+    describe,
+    main,
+)
+
+
+def write_wav(path: str, seconds: float, sample_rate: int = 16000) -> None:
+    with wave.open(path, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(sample_rate)
+        f.writeframes(b"\x00\x01" * int(seconds * sample_rate))
+
+
+class TestHelpers(unittest.TestCase):
+    """测试到达时刻与统计函数"""
+
+    def test_arrival_offsets(self):
+        """测试到达时刻生成"""
+        self.assertIsNone(arrival_offsets(10, 0))
+        self.assertEqual(arrival_offsets(3, 4, "uniform"), [0.0, 0.25, 0.5])
+
+        offsets = arrival_offsets(2000, 10, "poisson", seed=1)
+        self.assertEqual(offsets, arrival_offsets(2000, 10, "poisson", seed=1))
+        self.assertEqual(offsets[0], 0.0)
+        self.assertEqual(offsets, sorted(offsets))
+        self.assertAlmostEqual(offsets[-1] / 1999, 0.1, delta=0.01)
+
+        with self.assertRaises(ValueError):
+            arrival_offsets(3, 1, "burst")
+
+    def test_describe(self):
+        """测试百分位统计"""
+        stats = describe([float(v) for v in range(100, 0, -1)])
+        self.assertEqual(stats["mean"], 50.5)
+        self.assertEqual(stats["p50"], 50.5)
+        self.assertAlmostEqual(stats["p99"], 99.01)
+        self.assertEqual(stats["max"], 100.0)
+        self.assertEqual(describe([]), {})
+
+
+class TestLoadBenchmark(unittest.TestCase):
+    """测试对桩服务端的端到端压测"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.wav_path = os.path.join(self.temp_dir.name, "a.wav")
+        write_wav(self.wav_path, 1.5)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_mixed_modes(self):
+        """测试三种模式混合压测"""
+
+        async def run_test():
+            async with BenchmarkStubServer(rtf=0.02) as stub:
+                config = BenchmarkConfig(
+                    host="127.0.0.1",
+                    port=stub.port,
+                    audio_files=[self.wav_path],
+                    use_ssl=False,
+                    modes=["offline", "online", "2pass"],
+                    clients=3,
+                    requests=9,
+                    rate=30,
+                    arrival="uniform",
+                    realtime=False,
+                )
+                benchmark = LoadBenchmark(config)
+                report = await benchmark.run()
+                return report, benchmark.records, stub
+
+        report, records, stub = asyncio.run(run_test())
+        self.assertEqual(stub.utterances, 9)
+        # 每个客户端每种模式一条持久连接
+        self.assertLessEqual(stub.connections, 9)
+        self.assertEqual(report["achieved_rate"], 30.0)
+
+        for record in records:
+            self.assertTrue(record.success, record.error)
+            self.assertEqual(record.audio_seconds, 1.5)
+            self.assertEqual(
+                record.mode, ["offline", "online", "2pass"][record.index % 3]
+            )
+            self.assertAlmostEqual(record.scheduled_at, record.index / 30)
+            self.assertGreaterEqual(record.queue_seconds, 0)
+            self.assertLessEqual(record.upload_seconds, record.final_seconds)
+            self.assertLessEqual(record.first_partial_seconds, record.final_seconds)
+            self.assertAlmostEqual(record.rtf, record.final_seconds / 1.5)
+        offline = [r for r in records if r.mode == "offline"]
+        # offline 结果在模拟识别后返回
+        self.assertTrue(all(r.tail_seconds >= 1.5 * 0.02 for r in offline))
+
+        summary = report["summary"]
+        self.assertEqual(set(summary), {"all", "offline", "online", "2pass"})
+        self.assertEqual(summary["all"]["succeeded"], 9)
+        self.assertEqual(summary["2pass"]["requests"], 3)
+        self.assertAlmostEqual(summary["all"]["audio_seconds"], 13.5)
+        final = summary["all"]["metrics"]["final_seconds"]
+        self.assertLessEqual(final["p50"], final["p99"])
+        self.assertLessEqual(final["p99"], final["max"])
+        self.assertEqual(len(report["requests"]), 9)
+
+    def test_command_line_with_stub(self):
+        """测试命令行 --stub 模式输出报告"""
+        json_path = os.path.join(self.temp_dir.name, "report.json")
+        csv_path = os.path.join(self.temp_dir.name, "requests.csv")
+        main(
+            [
+                "--stub",
+                "--audio",
+                self.wav_path,
+                "--modes",
+                "offline",
+                "2pass",
+                "--clients",
+                "2",
+                "--requests",
+                "4",
+                "--no-realtime",
+                "--stub_rtf",
+                "0.01",
+                "--json",
+                json_path,
+                "--csv",
+                csv_path,
+            ]
+        )
+        with open(json_path, encoding="utf-8") as f:
+            report = json.load(f)
+        self.assertEqual(report["summary"]["all"]["succeeded"], 4)
+        self.assertIsNone(report["achieved_rate"])
+        self.assertEqual(report["config"]["modes"], ["offline", "2pass"])
+        with open(csv_path, encoding="utf-8", newline="") as f:
+            rows = list(csv.DictReader(f))
+        self.assertEqual([row["mode"] for row in rows], ["offline", "2pass"] * 2)
+        self.assertTrue(all(row["success"] == "True" for row in rows))
+        # 闭环压测没有排队
+        self.assertTrue(all(float(row["queue_seconds"]) == 0 for row in rows))
+
+
+if __name__ == "__main__":
+    unittest.main()
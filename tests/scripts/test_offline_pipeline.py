@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""离线流水线测试
+
+测试 offline 模式下服务端边接收边分段返回结果：
+1. 协议适配：开始消息携带 pipeline（仅 offline），分段结果不结束等待，
+   segments_done 标志结束等待
+2. 会话：上传过程中即收到分段结果，结束后按分段序号排序
+3. 兼容旧服务端：忽略 pipeline 字段、只返回单条结果时照常结束
+
+日期: 2026-10-17
+"""
+
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+# 添加源码目录到路径
+sys.path.insert(
+    0, os.path.join(os.path.dirname(__file__), "../../src/python-gui-client")
+)
+
+from progress_events import (  # noqa: E402
+    EVENT_FIRST_PARTIAL,
+    EVENT_RESULT,
+    ProgressEmitter,
+)
+from protocol_adapter import (  # noqa: E402
+    MessageProfile,
+    ProtocolAdapter,
+    RecognitionMode,
+    ServerType,
+)
+from stub_server import StubServer  # noqa: E402
+from transcribe_session import (  # noqa: E402
+    SessionConfig,
+    TranscribeSession,
+    UtteranceJob,
+)
+
+
+class PipelineServer(StubServer):
+    """流水线桩服务端：每收满 segment_bytes 字节返回一个分段结果
+
+    结束时返回最后一个分段与 segments_done 标志；swap_last 为 True 时
+    暂缓发送上传期间的最后一个分段，使其晚于结束时的分段到达，用于验证客户端按序号排序。
+    """
+
+    def __init__(self, segment_bytes: int, swap_last: bool = False):
+        super().__init__()
+        self.segment_bytes = segment_bytes
+        self.swap_last = swap_last
+
+    @staticmethod
+    def _segment(wav_name, index):
+        return {
+            "mode": "offline",
+            "wav_name": wav_name,
+            "text": f"seg{index}",
+            "is_final": False,
+            "segment": index,
+            "timestamp": [[index * 1000, index * 1000 + 500]],
+        }
+
+    async def on_start(self, conn, data):
+        conn.count = 0
+        conn.held = None
+
+    async def on_audio(self, conn, message):
+        while conn.received >= self.segment_bytes:
+            conn.received -= self.segment_bytes
+            segment = self._segment(conn.wav_name, conn.count)
+            conn.count += 1
+            if conn.held is not None:
+                await conn.send(conn.held)
+            conn.held = segment
+            if not self.swap_last:
+                await conn.send(conn.held)
+                conn.held = None
+
+    async def on_end(self, conn, data):
+        tail = [self._segment(conn.wav_name, conn.count)]
+        if conn.held is not None:
+            tail.append(conn.held)
+            conn.held = None
+        for segment in tail:
+            await conn.send(segment)
+        await conn.send(
+            {
+                "mode": "offline",
+                "wav_name": conn.wav_name,
+                "text": "",
+                "is_final": True,
+                "segments_done": True,
+                "segment_count": conn.count + 1,
+            }
+        )
+
+
+class TestPipelineProtocol(unittest.TestCase):
+    """测试流水线相关的协议消息"""
+
+    def setUp(self):
+        self.adapter = ProtocolAdapter(ServerType.LEGACY)
+
+    def test_start_message_pipeline_field(self):
+        """测试仅 offline 模式下发 pipeline"""
+
+        def build(mode):
+            profile = MessageProfile(
+                server_type=ServerType.LEGACY, mode=mode, wav_name="a", pipeline=True
+            )
+            return json.loads(self.adapter.build_start_message(profile))
+
+        self.assertTrue(build(RecognitionMode.OFFLINE)["pipeline"])
+        self.assertNotIn("pipeline", build(RecognitionMode.TWOPASS))
+
+    def test_segment_and_done_marker(self):
+        """测试分段结果继续等待，segments_done 结束等待"""
+        segment = self.adapter.parse_result(
+            '{"mode": "offline", "text": "a", "is_final": false, "segment": 2}'
+        )
+        self.assertEqual(segment.segment, 2)
+        self.assertFalse(segment.is_complete)
+
+        done = self.adapter.parse_result(
+            '{"mode": "offline", "text": "", "is_final": true, "segments_done": true}'
+        )
+        self.assertTrue(done.segments_done)
+        self.assertTrue(done.is_complete)
+
+        bad = self.adapter.parse_result('{"mode": "offline", "segment": "x"}')
+        self.assertIsNone(bad.segment)
+
+
+class TestPipelineSession(unittest.TestCase):
+    """测试会话中的流水线结果"""
+
+    SIZE = 6 * 65536
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        path = os.path.join(self.temp_dir.name, "long.pcm")
+        with open(path, "wb") as f:
+            f.write(b"\x00" * self.SIZE)
+        self.job = UtteranceJob(wav_name="long", wav_path=path)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _run(self, server):
+        async def run_test():
+            async with server:
+                events = []
+                config = SessionConfig(
+                    host="127.0.0.1", port=server.port, use_ssl=False
+                )
+                session = TranscribeSession(
+                    config, emitter=ProgressEmitter(on_event=events.append)
+                )
+                try:
+                    outcome = await session.transcribe(self.job)
+                finally:
+                    await session.close()
+                return outcome, events
+
+        return asyncio.run(run_test())
+
+    def test_segments_until_done_marker(self):
+        """测试上传期间到达的分段不提前结束等待，直到 segments_done"""
+        server = PipelineServer(2 * 65536)
+        outcome, events = self._run(server)
+
+        self.assertTrue(outcome.success, outcome.error)
+        self.assertTrue(server.start_messages[0]["pipeline"])
+        self.assertEqual(outcome.text, "seg0seg1seg2seg3")
+        self.assertEqual(outcome.results[1].timestamp, [[1000, 1500]])
+        names = [e.event for e in events]
+        self.assertEqual(names.count(EVENT_FIRST_PARTIAL), 1)
+        self.assertEqual(names.count(EVENT_RESULT), 4)
+
+    def test_results_sorted_by_segment(self):
+        """测试分段乱序到达时按序号排序"""
+        outcome, _ = self._run(PipelineServer(2 * 65536, swap_last=True))
+
+        self.assertTrue(outcome.success, outcome.error)
+        self.assertEqual([r.segment for r in outcome.results if r.text], [0, 1, 2, 3])
+        self.assertTrue(outcome.results[-1].segments_done)
+
+    def test_old_server_single_result(self):
+        """测试旧服务端忽略 pipeline 字段时仍以单条结果结束"""
+        outcome, _ = self._run(StubServer())
+        self.assertTrue(outcome.success, outcome.error)
+        self.assertEqual(outcome.text, f"bytes={self.SIZE}")
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""funasr_onnx Paraformer 按时长分桶批处理测试
+
+测试 ref/FunASR-main/runtime/python/onnxruntime/funasr_onnx/utils/batching.py：
+1. 每个输入恰好出现在一个批次中，批次按时长升序，可还原原始顺序
+2. 批次的填充后长度（最长 × 条数）不超过预算
+3. 达到 single_threshold 的输入单独成批
+4. 超出预算的单条输入仍单独成批，空输入返回空列表
+
+日期: 2026-10-17
+"""
+
+import os
+import sys
+import unittest
+
+import numpy as np
+
+# 添加 funasr_onnx 工具目录到路径（batching 无第三方依赖）
+sys.path.insert(
+    0,
+    os.path.join(
+        os.path.dirname(__file__),
+        "../../ref/FunASR-main/runtime/python/onnxruntime/funasr_onnx/utils",
+    ),
+)
+
+from batching import plan_length_buckets  # noqa: E402
+
+SAMPLE_RATE = 16000
+
+
+class TestPlanLengthBuckets(unittest.TestCase):
+    """测试按时长分桶的批次规划"""
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.lengths = [
+            int(x) for x in rng.uniform(0.5, 20.0, 200) * SAMPLE_RATE
+        ]  # 0.5~20s 的 scp 列表
+        self.budget = 60 * SAMPLE_RATE
+
+    def test_covers_every_input_in_length_order(self):
+        """测试每个输入只出现一次，批次按时长升序"""
+        batches = plan_length_buckets(self.lengths, self.budget)
+        flat = [i for batch in batches for i in batch]
+        self.assertEqual(sorted(flat), list(range(len(self.lengths))))
+        ordered = [self.lengths[i] for i in flat]
+        self.assertEqual(ordered, sorted(self.lengths))
+
+        # 按索引写回即可还原原始顺序
+        restored = [None] * len(self.lengths)
+        for i in flat:
+            restored[i] = self.lengths[i]
+        self.assertEqual(restored, self.lengths)
+
+    def test_padded_size_within_budget(self):
+        """测试每批填充后长度不超过预算，且比固定条数批处理填充更少"""
+        batches = plan_length_buckets(self.lengths, self.budget)
+        for batch in batches:
+            longest = max(self.lengths[i] for i in batch)
+            self.assertLessEqual(longest * len(batch), self.budget)
+
+        def padding(groups):
+            return sum(
+                max(self.lengths[i] for i in g) * len(g)
+                - sum(self.lengths[i] for i in g)
+                for g in groups
+            )
+
+        fixed = [list(range(b, min(b + 8, 200))) for b in range(0, 200, 8)]
+        self.assertLess(padding(batches), padding(fixed))
+
+    def test_threshold_runs_alone(self):
+        """测试达到阈值的长音频单独成批"""
+        lengths = [SAMPLE_RATE * s for s in (3, 70, 2, 65, 4)]
+        batches = plan_length_buckets(lengths, 300 * SAMPLE_RATE, 60 * SAMPLE_RATE)
+        self.assertEqual(batches, [[2, 0, 4], [3], [1]])
+
+    def test_oversize_and_empty(self):
+        """测试超出预算的输入单独成批，空输入返回空列表"""
+        lengths = [SAMPLE_RATE * 5, SAMPLE_RATE * 400, SAMPLE_RATE]
+        batches = plan_length_buckets(lengths, 300 * SAMPLE_RATE)
+        self.assertEqual(batches, [[2, 0], [1]])
+        self.assertEqual(plan_length_buckets([], 300 * SAMPLE_RATE), [])
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
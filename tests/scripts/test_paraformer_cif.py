@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""funasr_onnx 流式 Paraformer CIF 搜索测试
+
+测试 ref/FunASR-main/runtime/python/onnxruntime/funasr_onnx/utils/cif.py：
+1. 向量化 cif_integrate 与原逐帧循环的 token 数完全一致，嵌入与缓存数值一致
+2. 单帧 alpha 超过阈值时与逐帧循环一样每帧只触发一次
+3. 缓存 cif_alphas / cif_hidden 拼接到下一块前部后可续接搜索
+4. 无触发时返回 (batch, 0, dim) 的空嵌入
+
+日期: 2026-10-17
+"""
+
+import os
+import sys
+import unittest
+
+import numpy as np
+
+# 添加 funasr_onnx 工具目录到路径（cif 只依赖 numpy）
+sys.path.insert(
+    0,
+    os.path.join(
+        os.path.dirname(__file__),
+        "../../ref/FunASR-main/runtime/python/onnxruntime/funasr_onnx/utils",
+    ),
+)
+
+from cif import cif_integrate  # noqa: E402
+
+THRESHOLD = 1.0
+
+
+def legacy_cif(hidden, alphas, threshold=THRESHOLD):
+    """原 Paraformer.cif_search 的逐帧循环（缓存按 (batch, 1) 返回）"""
+    batch_size, len_time, hidden_size = hidden.shape
+    token_length, list_frames, cache_alphas, cache_hiddens = [], [], [], []
+    for b in range(batch_size):
+        integrate = 0.0
+        frames = np.zeros(hidden_size).astype(np.float32)
+        list_frame = []
+        for t in range(len_time):
+            alpha = float(alphas[b][t])
+            if alpha + integrate < threshold:
+                integrate += alpha
+                frames += alpha * hidden[b][t]
+            else:
+                frames += (threshold - integrate) * hidden[b][t]
+                list_frame.append(frames)
+                integrate += alpha
+                integrate -= threshold
+                frames = integrate * hidden[b][t]
+        cache_alphas.append(integrate)
+        cache_hiddens.append(frames / integrate if integrate > 0.0 else frames)
+        token_length.append(len(list_frame))
+        list_frames.append(list_frame)
+
+    embeds = np.zeros((batch_size, max(token_length), hidden_size), np.float32)
+    for b, list_frame in enumerate(list_frames):
+        for k, frame in enumerate(list_frame):
+            embeds[b, k] = frame
+    return (
+        embeds,
+        np.array(token_length),
+        np.array(cache_alphas)[:, None],
+        np.stack(cache_hiddens)[:, None, :],
+    )
+
+
+def make_chunk(rng, batch_size, len_time=22, hidden_size=32):
+    hidden = rng.standard_normal((batch_size, len_time, hidden_size)).astype(np.float32)
+    alphas = rng.uniform(0.0, 0.6, (batch_size, len_time)).astype(np.float32)
+    alphas[rng.uniform(size=alphas.shape) < 0.2] = 0.0
+    return hidden, alphas
+
+
+class TestCifIntegrate(unittest.TestCase):
+    """测试向量化 CIF 搜索"""
+
+    def assert_matches_legacy(self, hidden, alphas):
+        embeds, token_num, cache_alphas, cache_hidden = cif_integrate(
+            hidden, alphas, THRESHOLD
+        )
+        expected = legacy_cif(hidden, alphas)
+        np.testing.assert_array_equal(token_num, expected[1])
+        self.assertEqual(token_num.dtype, np.int32)
+        self.assertEqual(embeds.dtype, np.float32)
+        np.testing.assert_allclose(embeds, expected[0], atol=1e-4)
+        np.testing.assert_allclose(cache_alphas, expected[2], atol=1e-5)
+        np.testing.assert_allclose(cache_hidden, expected[3], atol=1e-3)
+
+    def test_matches_legacy(self):
+        """测试多种批大小下与逐帧循环一致"""
+        rng = np.random.default_rng(0)
+        for batch_size in (1, 3, 8, 32):
+            for _ in range(20):
+                self.assert_matches_legacy(*make_chunk(rng, batch_size))
+
+    def test_quantised_and_large_alphas(self):
+        """测试恰好达到阈值与超过阈值的 alpha"""
+        rng = np.random.default_rng(1)
+        hidden, _ = make_chunk(rng, 4, len_time=12)
+        quantised = np.tile(
+            np.array([0.25, 0.5, 0.25, 1.0, 0.0, 0.5], np.float32), (4, 2)
+        )
+        self.assert_matches_legacy(hidden, quantised)
+
+        large = rng.uniform(0.0, 2.5, (4, 12)).astype(np.float32)
+        self.assert_matches_legacy(hidden, large)
+
+    def test_cache_resumes_search(self):
+        """测试缓存续接：分块处理的 token 数与逐帧循环一致"""
+        rng = np.random.default_rng(2)
+        batch_size = 4
+        cache_alphas = np.zeros((batch_size, 1), np.float32)
+        cache_hidden = np.zeros((batch_size, 1, 32), np.float32)
+        legacy_alphas, legacy_hidden = cache_alphas, cache_hidden
+        for _ in range(10):
+            hidden, alphas = make_chunk(rng, batch_size)
+            _, token_num, cache_alphas, cache_hidden = cif_integrate(
+                np.concatenate((cache_hidden, hidden), axis=1),
+                np.concatenate((cache_alphas, alphas), axis=1),
+                THRESHOLD,
+            )
+            _, expected, legacy_alphas, legacy_hidden = legacy_cif(
+                np.concatenate((legacy_hidden, hidden), axis=1),
+                np.concatenate((legacy_alphas, alphas), axis=1),
+            )
+            np.testing.assert_array_equal(token_num, expected)
+            self.assertEqual(cache_alphas.shape, (batch_size, 1))
+            self.assertEqual(cache_hidden.shape, (batch_size, 1, 32))
+
+    def test_no_fire(self):
+        """测试整块都未触发时返回空嵌入"""
+        hidden = np.ones((2, 5, 8), np.float32)
+        alphas = np.full((2, 5), 0.1, np.float32)
+        embeds, token_num, cache_alphas, cache_hidden = cif_integrate(
+            hidden, alphas, THRESHOLD
+        )
+        self.assertEqual(embeds.shape, (2, 0, 8))
+        np.testing.assert_array_equal(token_num, [0, 0])
+        np.testing.assert_allclose(cache_alphas, [[0.5], [0.5]], atol=1e-6)
+        np.testing.assert_allclose(cache_hidden, np.ones((2, 1, 8)), atol=1e-6)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
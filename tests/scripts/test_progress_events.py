@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""结构化进度事件通道测试
+
+测试 progress_events.py 以及 simple_funasr_client 的事件输出：
+1. 事件序列化/反序列化（NDJSON），非法行被忽略
+2. 发送端：空操作、进程内回调、上传进度按百分比去重、连接失败自动禁用
+3. 接收端：本地套接字逐行接收，drain 后事件全部回调
+4. 子进程端到端：单文件与 scp 批量模式均输出完整事件序列，stdout 不再打印进度行
+
+日期: 2026-10-17
+"""
+
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import unittest
+
+# 添加源码目录到路径
+sys.path.insert(
+    0, os.path.join(os.path.dirname(__file__), "../../src/python-gui-client")
+)
+
+from progress_events import (  # noqa: E402
+    EVENT_FINAL_RESULT,
+    EVENT_FIRST_PARTIAL,
+    EVENT_RESULT,
+    EVENT_RESULT_FILE,
+    EVENT_UPLOAD_END,
+    EVENT_UPLOAD_PROGRESS,
+    EVENT_UPLOAD_START,
+    ProgressEmitter,
+    ProgressEvent,
+    ProgressEventListener,
+)
+from stub_server import StubServer  # noqa: E402
+
+CLIENT_SCRIPT = os.path.join(
+    os.path.dirname(__file__), "../../src/python-gui-client/simple_funasr_client.py"
+)
+
+
+class TestProgressEvent(unittest.TestCase):
+    """测试事件格式"""
+
+    def test_round_trip(self):
+        """测试序列化后可还原，附加字段平铺在顶层"""
+        event = ProgressEvent(
+            event=EVENT_UPLOAD_END, t=12.3456789, wav_name="音频", data={"bytes": 5}
+        )
+        line = event.to_line()
+        self.assertTrue(line.endswith(b"\n"))
+        self.assertIn(b'"bytes": 5', line)
+
+        parsed = ProgressEvent.from_line(line)
+        self.assertEqual(parsed.event, EVENT_UPLOAD_END)
+        self.assertAlmostEqual(parsed.t, 12.345679)
+        self.assertEqual(parsed.wav_name, "音频")
+        self.assertEqual(parsed.data, {"bytes": 5})
+
+    def test_invalid_lines(self):
+        """测试非法行返回 None"""
+        for line in [b"", b"not json\n", b"[1, 2]\n", b'{"t": 1}\n', b"\xff\xfe\n"]:
+            self.assertIsNone(ProgressEvent.from_line(line), line)
+
+
+class TestProgressEmitter(unittest.TestCase):
+    """测试发送端"""
+
+    def test_disabled_is_noop(self):
+        """测试未配置地址与回调时为空操作"""
+        emitter = ProgressEmitter()
+        self.assertFalse(emitter.enabled)
+        emitter.emit(EVENT_UPLOAD_START, "a")
+        emitter.close()
+
+    def test_in_process_callback(self):
+        """测试进程内回调与自定义时钟"""
+        events = []
+        emitter = ProgressEmitter(on_event=events.append, clock=lambda: 1.5)
+        emitter.emit(EVENT_UPLOAD_START, "a", total_bytes=10)
+        emitter.emit(EVENT_UPLOAD_END, "a", t=2.0)
+
+        self.assertEqual(
+            [e.event for e in events], [EVENT_UPLOAD_START, EVENT_UPLOAD_END]
+        )
+        self.assertEqual([e.t for e in events], [1.5, 2.0])
+        self.assertEqual(events[0].data, {"total_bytes": 10})
+
+    def test_upload_progress_deduplicated(self):
+        """测试上传进度仅在整数百分比变化时发送"""
+        events = []
+        emitter = ProgressEmitter(on_event=events.append)
+        for sent in [1, 2, 3, 500, 501, 1000]:
+            emitter.emit_upload_progress("a", sent, 1000)
+
+        self.assertEqual([e.data["percent"] for e in events], [0, 50, 100])
+        self.assertEqual(events[-1].data["bytes_sent"], 1000)
+
+    def test_connection_refused_disables(self):
+        """测试接收端不可达时自动禁用"""
+        with socket.socket() as s:
+            s.bind(("127.0.0.1", 0))
+            port = s.getsockname()[1]
+        emitter = ProgressEmitter(f"127.0.0.1:{port}")
+        self.assertFalse(emitter.enabled)
+        emitter.emit(EVENT_UPLOAD_START, "a")
+
+
+class TestProgressEventListener(unittest.TestCase):
+    """测试接收端"""
+
+    def test_socket_delivery_in_order(self):
+        """测试事件经本地套接字按顺序送达，drain 后全部处理完毕"""
+        received = []
+        listener = ProgressEventListener(received.append)
+        try:
+            emitter = ProgressEmitter(listener.address)
+            self.assertTrue(emitter.enabled)
+            for i in range(200):
+                emitter.emit(EVENT_UPLOAD_PROGRESS, "a", index=i)
+            emitter.close()
+            listener.drain(timeout=5)
+        finally:
+            listener.close()
+
+        self.assertEqual([e.data["index"] for e in received], list(range(200)))
+        times = [e.t for e in received]
+        self.assertEqual(times, sorted(times))
+
+    def test_multiple_senders(self):
+        """测试多个发送端（多进程切片模式）同时连接"""
+        received = []
+        lock = threading.Lock()
+
+        def on_event(event):
+            with lock:
+                received.append(event.wav_name)
+
+        listener = ProgressEventListener(on_event)
+        try:
+            emitters = [ProgressEmitter(listener.address) for _ in range(3)]
+            for i, emitter in enumerate(emitters):
+                emitter.emit(EVENT_UPLOAD_START, f"w{i}")
+                emitter.close()
+            listener.drain(timeout=5)
+        finally:
+            listener.close()
+
+        self.assertEqual(sorted(received), ["w0", "w1", "w2"])
+
+
+class TestClientEvents(unittest.TestCase):
+    """测试 simple_funasr_client 子进程的事件输出"""
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.server = StubServer()
+        self.loop.run_until_complete(self.server.__aenter__())
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+        self.temp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(timeout=5)
+        self.loop.run_until_complete(self.server.__aexit__(None, None, None))
+        self.loop.close()
+        self.temp_dir.cleanup()
+
+    def _run_client(self, audio_in):
+        received = []
+        listener = ProgressEventListener(received.append)
+        try:
+            proc = subprocess.run(
+                [
+                    sys.executable,
+                    CLIENT_SCRIPT,
+                    "--host",
+                    "127.0.0.1",
+                    "--port",
+                    str(self.server.port),
+                    "--no-ssl",
+                    "--audio_in",
+                    audio_in,
+                    "--output_dir",
+                    self.temp_dir.name,
+                    "--progress_addr",
+                    listener.address,
+                ],
+                capture_output=True,
+                text=True,
+                encoding="utf-8",
+                timeout=60,
+            )
+            listener.drain(timeout=5)
+        finally:
+            listener.close()
+        self.assertEqual(proc.returncode, 0, proc.stdout + proc.stderr)
+        return proc, received
+
+    def _write_pcm(self, name, size):
+        path = os.path.join(self.temp_dir.name, name)
+        with open(path, "wb") as f:
+            f.write(b"\x00" * size)
+        return path
+
+    def _assert_file_sequence(self, events, wav_name, size):
+        names = [e.event for e in events if e.wav_name == wav_name]
+        self.assertEqual(names[0], EVENT_UPLOAD_START)
+        self.assertLess(names.index(EVENT_UPLOAD_END), names.index(EVENT_FIRST_PARTIAL))
+        self.assertLess(names.index(EVENT_FIRST_PARTIAL), names.index(EVENT_RESULT))
+        self.assertEqual(names[-1], EVENT_FINAL_RESULT)
+
+        by_name = {e.event: e for e in events if e.wav_name == wav_name}
+        self.assertEqual(by_name[EVENT_UPLOAD_START].data["total_bytes"], size)
+        self.assertEqual(by_name[EVENT_UPLOAD_PROGRESS].data["percent"], 100)
+        self.assertEqual(by_name[EVENT_UPLOAD_END].data["bytes_sent"], size)
+        self.assertEqual(by_name[EVENT_FINAL_RESULT].data["text"], f"bytes={size}")
+        self.assertLessEqual(
+            by_name[EVENT_UPLOAD_START].t, by_name[EVENT_FINAL_RESULT].t
+        )
+
+    def test_single_file_events(self):
+        """测试单文件模式：完整事件序列，stdout 不再打印进度与结果行"""
+        path = self._write_pcm("a.pcm", 200000)
+        proc, events = self._run_client(path)
+
+        self._assert_file_sequence(events, "a.pcm", 200000)
+        self.assertIn(EVENT_RESULT_FILE, [e.event for e in events])
+        self.assertNotIn("上传进度", proc.stdout)
+        self.assertNotIn("识别结果:", proc.stdout)
+
+    def test_scp_batch_events(self):
+        """测试 scp 批量模式：每个文件都有完整事件序列"""
+        scp = os.path.join(self.temp_dir.name, "wav.scp")
+        with open(scp, "w", encoding="utf-8") as f:
+            for i, size in enumerate([100, 70000]):
+                f.write(f"utt{i} {self._write_pcm(f'a{i}.pcm', size)}\n")
+
+        _, events = self._run_client(scp)
+
+        self._assert_file_sequence(events, "utt0", 100)
+        self._assert_file_sequence(events, "utt1", 70000)
+        self.assertEqual([e.event for e in events][-1], EVENT_RESULT_FILE)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""转写结果缓存测试
+
+测试 result_cache.py 的核心功能：
+1. 缓存键：相同内容不同路径命中同一键，识别参数变化时键不同
+2. 读写：写入后命中，结果经协议适配层重新解析
+3. LRU 淘汰：超出条目数/总大小时淘汰最久未使用的条目
+4. 延迟加载：构造时不读取索引，重新打开后索引与哈希记录仍然有效
+5. 容错：结果文件缺失时视为未命中
+
+日期: 2026-10-17
+"""
+
+import hashlib
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+# 添加源码目录到路径
+sys.path.insert(
+    0, os.path.join(os.path.dirname(__file__), "../../src/python-gui-client")
+)
+
+import result_cache  # noqa: E402
+from result_cache import (  # noqa: E402
+    ResultCache,
+    build_cache_key,
+    cache_params,
+    hash_audio_file,
+    results_from_records,
+)
+from transcribe_session import SessionConfig  # noqa: E402
+
+
+def _records(text):
+    return [{"mode": "offline", "wav_name": "a", "text": text, "is_final": False}]
+
+
+class TestCacheKey(unittest.TestCase):
+    """测试音频哈希与缓存键"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.dir = self.temp_dir.name
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _write(self, name, data):
+        path = os.path.join(self.dir, name)
+        with open(path, "wb") as f:
+            f.write(data)
+        return path
+
+    def test_streaming_hash(self):
+        """测试分块哈希与一次性哈希一致"""
+        data = os.urandom(10000)
+        path = self._write("a.wav", data)
+        self.assertEqual(
+            hash_audio_file(path, chunk_size=4096), hashlib.sha256(data).hexdigest()
+        )
+
+    def test_params_change_key(self):
+        """测试识别参数变化时缓存键不同"""
+        config = SessionConfig(host="127.0.0.1", port=10095)
+        base = build_cache_key("h", cache_params(config))
+        self.assertEqual(base, build_cache_key("h", cache_params(config)))
+
+        for field, value in [
+            ("mode", "2pass"),
+            ("use_itn", False),
+            ("hotwords", '{"阿里巴巴": 20}'),
+            ("svs_lang", "zh"),
+            ("server_type", "legacy"),
+            ("audio_codec", "flac"),
+            ("transcode", False),
+        ]:
+            changed = SessionConfig(host="127.0.0.1", port=10095, **{field: value})
+            self.assertNotEqual(
+                base, build_cache_key("h", cache_params(changed)), field
+            )
+        # 连接参数不影响识别结果
+        other_host = SessionConfig(host="10.0.0.1", port=1, use_ssl=False)
+        self.assertEqual(base, build_cache_key("h", cache_params(other_host)))
+
+    def test_same_content_same_key(self):
+        """测试内容相同的两个文件得到相同的键"""
+        cache = ResultCache(os.path.join(self.dir, "cache"))
+        params = cache_params(SessionConfig(host="h", port=1))
+        a = self._write("a.wav", b"\x01" * 100)
+        b = self._write("b.mp3", b"\x01" * 100)
+        c = self._write("c.wav", b"\x02" * 100)
+        self.assertEqual(cache.key_for(a, params), cache.key_for(b, params))
+        self.assertNotEqual(cache.key_for(a, params), cache.key_for(c, params))
+
+    def test_hash_reused_until_file_changes(self):
+        """测试文件未变化时不重新计算哈希"""
+        cache = ResultCache(os.path.join(self.dir, "cache"))
+        path = self._write("a.wav", b"\x01" * 100)
+        with mock.patch.object(
+            result_cache, "hash_audio_file", wraps=hash_audio_file
+        ) as hasher:
+            first = cache.audio_hash(path)
+            cache.audio_hash(path)
+            self.assertEqual(hasher.call_count, 1)
+
+            with open(path, "ab") as f:
+                f.write(b"\x02")
+            self.assertNotEqual(cache.audio_hash(path), first)
+            self.assertEqual(hasher.call_count, 2)
+
+
+class TestResultCache(unittest.TestCase):
+    """测试缓存读写与淘汰"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.cache_dir = os.path.join(self.temp_dir.name, "cache")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_put_and_get(self):
+        """测试写入后命中，结果可重新解析"""
+        cache = ResultCache(self.cache_dir)
+        self.assertIsNone(cache.get("k1"))
+        cache.put("k1", _records("你好"), "a.wav")
+
+        records = cache.get("k1")
+        self.assertEqual(records, _records("你好"))
+        results = results_from_records(records)
+        self.assertEqual(results[0].text, "你好")
+        self.assertEqual(results[0].wav_name, "a")
+        self.assertEqual(len(cache), 1)
+
+    def test_lru_eviction_by_entries(self):
+        """测试超出条目数时淘汰最久未使用的条目"""
+        cache = ResultCache(self.cache_dir, max_entries=2)
+        cache.put("k1", _records("1"))
+        cache.put("k2", _records("2"))
+        cache.get("k1")  # k1 变为最近使用
+        cache.put("k3", _records("3"))
+
+        self.assertIsNone(cache.get("k2"))
+        self.assertIsNotNone(cache.get("k1"))
+        self.assertIsNotNone(cache.get("k3"))
+        self.assertFalse(
+            os.path.exists(os.path.join(self.cache_dir, "entries", "k2.json"))
+        )
+
+    def test_eviction_by_size(self):
+        """测试超出总大小时淘汰，总大小不超过上限"""
+        cache = ResultCache(self.cache_dir, max_bytes=1000)
+        for i in range(5):
+            cache.put(f"k{i}", _records("字" * 100))
+        self.assertLessEqual(cache.total_bytes, 1000)
+        self.assertIsNotNone(cache.get("k4"))
+        self.assertIsNone(cache.get("k0"))
+
+    def test_lazy_index_and_reopen(self):
+        """测试索引延迟加载，重新打开后条目与哈希记录仍然有效"""
+        path = os.path.join(self.temp_dir.name, "a.wav")
+        with open(path, "wb") as f:
+            f.write(b"\x01" * 100)
+        cache = ResultCache(self.cache_dir)
+        key = cache.key_for(path, {"mode": "offline"})
+        cache.put(key, _records("你好"))
+
+        with mock.patch.object(result_cache, "read_json_file") as reader:
+            reopened = ResultCache(self.cache_dir)
+            reader.assert_not_called()
+
+        with mock.patch.object(result_cache, "hash_audio_file") as hasher:
+            self.assertEqual(reopened.key_for(path, {"mode": "offline"}), key)
+            hasher.assert_not_called()
+        self.assertEqual(reopened.get(key), _records("你好"))
+
+    def test_missing_entry_file(self):
+        """测试结果文件被删除时视为未命中并移除索引项"""
+        cache = ResultCache(self.cache_dir)
+        cache.put("k1", _records("你好"))
+        os.remove(os.path.join(self.cache_dir, "entries", "k1.json"))
+
+        self.assertIsNone(cache.get("k1"))
+        self.assertEqual(len(cache), 0)
+        self.assertEqual(cache.total_bytes, 0)
+
+    def test_clear(self):
+        """测试清空缓存"""
+        cache = ResultCache(self.cache_dir)
+        cache.put("k1", _records("你好"))
+        cache.clear()
+        self.assertIsNone(ResultCache(self.cache_dir).get("k1"))
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
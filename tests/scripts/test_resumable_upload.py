@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""断点续传测试
+
+测试上传中断后从服务端检查点续传：
+1. 协议适配：开始消息携带 session_id/resume，续传确认消息的识别，
+   带检查点的分段结果不被判定为完成
+2. 分块读取：从指定偏移开始产出音频数据
+3. 会话续传：断线重连后只发送检查点之后的数据，检查点之前的结果保留
+4. 兼容旧服务端：不回复续传确认时从头重传
+5. online 模式不启用续传
+
+日期: 2026-10-17
+"""
+
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+# 添加源码目录到路径
+sys.path.insert(
+    0, os.path.join(os.path.dirname(__file__), "../../src/python-gui-client")
+)
+
+import transcribe_session  # noqa: E402
+from audio_stream import iter_audio_chunks, open_audio_source  # noqa: E402
+from progress_events import EVENT_UPLOAD_END, ProgressEmitter  # noqa: E402
+from protocol_adapter import (  # noqa: E402
+    MessageProfile,
+    ProtocolAdapter,
+    RecognitionMode,
+    ServerType,
+)
+from stub_server import StubServer  # noqa: E402
+from transcribe_session import (  # noqa: E402
+    SessionConfig,
+    TranscribeSession,
+    UtteranceJob,
+)
+
+
+class ResumeServer(StubServer):
+    """支持续传的桩服务端
+
+    收满 checkpoint_at 字节时回复一条带检查点的分段结果并保存会话；
+    drop_once 为 True 时随后断开一次连接。结束时回复本连接收到的字节数。
+    support_resume 为 False 时模拟旧服务端（不回复续传确认）。
+    """
+
+    def __init__(
+        self, checkpoint_at: int, drop_once: bool = True, support_resume: bool = True
+    ):
+        super().__init__()
+        self.checkpoint_at = checkpoint_at
+        self.drop_once = drop_once
+        self.support_resume = support_resume
+        self.sessions = {}
+
+    async def on_start(self, conn, data):
+        conn.session_id = data.get("session_id", "")
+        conn.offset = 0
+        if data.get("resume") and self.support_resume:
+            state = self.sessions.get(conn.session_id, {"offset": 0, "results": []})
+            conn.offset = state["offset"]
+            await conn.send(
+                {
+                    "resume_offset": conn.offset,
+                    "session_id": conn.session_id,
+                    "wav_name": conn.wav_name,
+                    "results": state["results"],
+                }
+            )
+
+    async def on_audio(self, conn, message):
+        if (
+            conn.session_id
+            and conn.offset == 0
+            and conn.session_id not in self.sessions
+            and conn.received >= self.checkpoint_at
+        ):
+            segment = {
+                "mode": "offline",
+                "wav_name": conn.wav_name,
+                "text": "seg1",
+                "is_final": True,
+                "checkpoint": self.checkpoint_at,
+            }
+            self.sessions[conn.session_id] = {
+                "offset": self.checkpoint_at,
+                "results": [segment],
+            }
+            await conn.send(segment)
+            if self.drop_once:
+                self.drop_once = False
+                await conn.close()
+
+    async def on_end(self, conn, data):
+        await conn.send(
+            {
+                "mode": "offline",
+                "wav_name": conn.wav_name,
+                "text": f"tail={conn.received}",
+                "is_final": False,
+            }
+        )
+
+
+class TestResumeProtocol(unittest.TestCase):
+    """测试续传相关的协议消息"""
+
+    def setUp(self):
+        self.adapter = ProtocolAdapter(ServerType.LEGACY)
+
+    def _start_message(self, **kwargs):
+        profile = MessageProfile(
+            server_type=ServerType.LEGACY,
+            mode=RecognitionMode.OFFLINE,
+            wav_name="a",
+            **kwargs,
+        )
+        return json.loads(self.adapter.build_start_message(profile))
+
+    def test_start_message_fields(self):
+        """测试仅在启用续传时下发 session_id，重连时附带 resume"""
+        self.assertNotIn("session_id", self._start_message())
+        first = self._start_message(session_id="s1")
+        self.assertEqual(first["session_id"], "s1")
+        self.assertNotIn("resume", first)
+        self.assertTrue(self._start_message(session_id="s1", resume=True)["resume"])
+
+    def test_parse_resume_ack(self):
+        """测试识别续传确认消息"""
+        ack = self.adapter.parse_resume_ack(
+            '{"resume_offset": 64000, "wav_name": "a", "results": []}'
+        )
+        self.assertEqual(ack["resume_offset"], 64000)
+        self.assertIsNone(self.adapter.parse_resume_ack('{"text": "resume_offset"}'))
+        self.assertIsNone(self.adapter.parse_resume_ack(b"resume_offset"))
+
+    def test_checkpointed_result_not_complete(self):
+        """测试带检查点的分段结果不结束等待（即便 is_final=True）"""
+        segment = self.adapter.parse_result(
+            '{"mode": "offline", "text": "a", "is_final": true, "checkpoint": 320}'
+        )
+        self.assertEqual(segment.checkpoint, 320)
+        self.assertFalse(segment.is_complete)
+
+        final = self.adapter.parse_result('{"mode": "offline", "text": "b"}')
+        self.assertIsNone(final.checkpoint)
+        self.assertTrue(final.is_complete)
+
+
+class TestResumeOffset(unittest.TestCase):
+    """测试从偏移开始读取音频"""
+
+    def test_iter_audio_chunks_from_offset(self):
+        """测试从指定字节开始分块，偏移超出数据时不产出"""
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, "a.pcm")
+            data = bytes(range(256)) * 4
+            with open(path, "wb") as f:
+                f.write(data)
+            source = open_audio_source(path, 16000)
+
+            chunks = [bytes(c) for c in iter_audio_chunks(source, 300, 100)]
+            self.assertEqual(b"".join(chunks), data[100:])
+            self.assertEqual(len(chunks[0]), 300)
+            self.assertEqual(list(iter_audio_chunks(source, 300, len(data))), [])
+
+
+class TestResumableSession(unittest.TestCase):
+    """测试会话断线后的续传"""
+
+    SIZE = 200000
+    CHECKPOINT = 96000
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        path = os.path.join(self.temp_dir.name, "long.pcm")
+        with open(path, "wb") as f:
+            f.write(b"\x00" * self.SIZE)
+        self.job = UtteranceJob(wav_name="long", wav_path=path)
+        patcher = mock.patch.object(transcribe_session, "RESUME_ACK_TIMEOUT", 0.3)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _run(self, server, **config_kwargs):
+        async def run_test():
+            async with server:
+                events = []
+                config = SessionConfig(
+                    host="127.0.0.1",
+                    port=server.port,
+                    use_ssl=False,
+                    reconnect_backoff=0.01,
+                    **config_kwargs,
+                )
+                session = TranscribeSession(
+                    config, emitter=ProgressEmitter(on_event=events.append)
+                )
+                try:
+                    outcome = await session.transcribe(self.job)
+                finally:
+                    await session.close()
+                return outcome, events
+
+        return asyncio.run(run_test())
+
+    def test_resume_from_checkpoint(self):
+        """测试重连后只发送检查点之后的数据，已确认的分段结果保留"""
+        server = ResumeServer(self.CHECKPOINT)
+        outcome, events = self._run(server)
+
+        self.assertTrue(outcome.success, outcome.error)
+        self.assertEqual(outcome.attempts, 2)
+        self.assertEqual(server.connections, 2)
+        self.assertEqual(
+            [r.text for r in outcome.results],
+            ["seg1", f"tail={self.SIZE - self.CHECKPOINT}"],
+        )
+        first, second = server.start_messages
+        self.assertEqual(first["session_id"], second["session_id"])
+        self.assertNotIn("resume", first)
+        self.assertTrue(second["resume"])
+
+        ends = [e for e in events if e.event == EVENT_UPLOAD_END]
+        self.assertEqual(ends[-1].data["resume_offset"], self.CHECKPOINT)
+        self.assertEqual(ends[-1].data["bytes_sent"], self.SIZE)
+
+    def test_progress_does_not_consume_attempts(self):
+        """测试推进了检查点的失败不计入重试次数"""
+        server = ResumeServer(self.CHECKPOINT)
+        outcome, _ = self._run(server, max_attempts=1)
+        self.assertTrue(outcome.success, outcome.error)
+        self.assertEqual(outcome.attempts, 2)
+
+    def test_old_server_restarts_from_zero(self):
+        """测试服务端不回复续传确认时从头重传，结果不重复"""
+        server = ResumeServer(self.CHECKPOINT, support_resume=False)
+        outcome, _ = self._run(server)
+
+        self.assertTrue(outcome.success, outcome.error)
+        self.assertEqual([r.text for r in outcome.results], [f"tail={self.SIZE}"])
+
+    def test_resume_disabled(self):
+        """测试关闭续传时不下发 session_id"""
+        server = ResumeServer(self.CHECKPOINT, drop_once=False)
+        outcome, _ = self._run(server, resumable=False)
+
+        self.assertTrue(outcome.success, outcome.error)
+        self.assertNotIn("session_id", server.start_messages[0])
+        self.assertEqual([r.text for r in outcome.results], [f"tail={self.SIZE}"])
+
+    def test_online_mode_not_resumable(self):
+        """测试 online 模式不下发 session_id（结果不按分段保存，无法续传）"""
+        server = ResumeServer(self.CHECKPOINT)
+        outcome, _ = self._run(server, mode="online")
+
+        self.assertTrue(outcome.success, outcome.error)
+        self.assertEqual(server.connections, 1)
+        self.assertNotIn("session_id", server.start_messages[0])
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
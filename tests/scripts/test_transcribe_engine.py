@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""进程内转写引擎测试
+
+测试 transcribe_engine.py 的核心功能：
+1. 任务提交：进度事件按顺序回调，结果文件与子进程单文件模式命名一致
+2. 取消与超时：取消后返回“任务已取消”，单任务超时后返回失败并发出错误事件
+3. 生命周期：停止后可再次启动
+4. 热词加载与结果文件写出
+
+日期: 2026-10-17
+"""
+
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+# 添加源码目录到路径
+sys.path.insert(
+    0, os.path.join(os.path.dirname(__file__), "../../src/python-gui-client")
+)
+
+from progress_events import (  # noqa: E402
+    EVENT_ERROR,
+    EVENT_FINAL_RESULT,
+    EVENT_RESULT_FILE,
+    EVENT_UPLOAD_END,
+    EVENT_UPLOAD_START,
+)
+from protocol_adapter import ParsedResult  # noqa: E402
+from stub_server import StubServer  # noqa: E402
+from transcribe_engine import (  # noqa: E402
+    RESULT_FILE_ID,
+    EngineRequest,
+    TranscribeEngine,
+    write_result_files,
+)
+from transcribe_session import SessionConfig, load_hotwords  # noqa: E402
+
+
+class TestEngineHelpers(unittest.TestCase):
+    """测试热词加载与结果文件写出"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.dir = self.temp_dir.name
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_load_hotwords(self):
+        """测试热词文件解析，格式错误的行被跳过"""
+        path = os.path.join(self.dir, "hotwords.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("阿里巴巴 20\nhello world 10\n坏行 abc\n单词\n")
+
+        self.assertEqual(
+            json.loads(load_hotwords(path)), {"阿里巴巴": 20, "hello world": 10}
+        )
+        self.assertEqual(load_hotwords(""), "")
+        self.assertEqual(load_hotwords(os.path.join(self.dir, "none.txt")), "")
+
+    def test_write_result_files(self):
+        """测试 text 文件追加写入，JSON 文件按音频文件名命名"""
+        results = [
+            ParsedResult(text="你好", wav_name="a", raw={"text": "你好"}),
+            ParsedResult(text="", wav_name="a", raw={"text": ""}),
+        ]
+        path = write_result_files(self.dir, "/x/a.wav", results)
+
+        self.assertEqual(path, os.path.join(self.dir, f"a.{RESULT_FILE_ID}.json"))
+        with open(path, encoding="utf-8") as f:
+            self.assertEqual(json.load(f), [{"text": "你好"}])
+        with open(
+            os.path.join(self.dir, f"text.{RESULT_FILE_ID}"), encoding="utf-8"
+        ) as f:
+            self.assertEqual(f.read(), "a\t你好\n")
+
+        self.assertIsNone(write_result_files(self.dir, "/x/b.wav", results[1:]))
+
+
+class TestTranscribeEngine(unittest.TestCase):
+    """测试引擎与本地桩服务端配合"""
+
+    def _start_server(self, **kwargs):
+        self.server_loop = asyncio.new_event_loop()
+        self.server = StubServer(**kwargs)
+        self.server_loop.run_until_complete(self.server.__aenter__())
+        self.server_thread = threading.Thread(
+            target=self.server_loop.run_forever, daemon=True
+        )
+        self.server_thread.start()
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.engine = TranscribeEngine()
+        self.server_loop = None
+
+    def tearDown(self):
+        self.engine.shutdown()
+        if self.server_loop is not None:
+            self.server_loop.call_soon_threadsafe(self.server_loop.stop)
+            self.server_thread.join(timeout=5)
+            self.server_loop.run_until_complete(self.server.__aexit__(None, None, None))
+            self.server_loop.close()
+        self.temp_dir.cleanup()
+
+    def _request(self, size=70000, **kwargs):
+        path = os.path.join(self.temp_dir.name, "a.pcm")
+        with open(path, "wb") as f:
+            f.write(b"\x00" * size)
+        config = SessionConfig(
+            host="127.0.0.1",
+            port=self.server.port,
+            use_ssl=False,
+            max_attempts=1,
+        )
+        return EngineRequest(config=config, audio_path=path, **kwargs)
+
+    def test_submit_events_and_result_file(self):
+        """测试提交任务：事件按顺序回调，写出 {base}.0_0.json"""
+        self._start_server()
+        events = []
+        request = self._request(output_dir=self.temp_dir.name)
+        job = self.engine.submit(request, events.append)
+        outcome = job.wait(timeout=30)
+
+        self.assertTrue(outcome.success, outcome.error)
+        self.assertEqual(outcome.text, "bytes=70000")
+        self.assertEqual(request.wav_name, "a.pcm")
+        names = [e.event for e in events]
+        self.assertEqual(names[0], EVENT_UPLOAD_START)
+        self.assertLess(names.index(EVENT_UPLOAD_END), names.index(EVENT_FINAL_RESULT))
+        self.assertEqual(names[-1], EVENT_RESULT_FILE)
+        self.assertEqual(
+            job.result_path,
+            os.path.join(self.temp_dir.name, f"a.{RESULT_FILE_ID}.json"),
+        )
+        self.assertTrue(os.path.exists(job.result_path))
+        self.assertTrue(job.done())
+
+    def test_sequential_jobs_share_engine(self):
+        """测试多个任务复用同一个后台事件循环"""
+        self._start_server()
+        for size in [100, 5000]:
+            outcome = self.engine.submit(self._request(size)).wait(timeout=30)
+            self.assertEqual(outcome.text, f"bytes={size}")
+        self.assertTrue(self.engine.running)
+
+    def test_cancel(self):
+        """测试取消未完成的任务"""
+        self._start_server(silent=True)
+        job = self.engine.submit(self._request())
+        time.sleep(0.2)
+        self.assertTrue(job.cancel())
+
+        outcome = job.wait(timeout=5)
+        self.assertFalse(outcome.success)
+        self.assertEqual(outcome.error, "任务已取消")
+
+    def test_job_timeout(self):
+        """测试单任务超时：返回失败并发出错误事件"""
+        self._start_server(silent=True)
+        events = []
+        job = self.engine.submit(self._request(timeout=0.5), events.append)
+
+        outcome = job.wait(timeout=10)
+        self.assertFalse(outcome.success)
+        self.assertIn("任务超时", outcome.error)
+        self.assertEqual(events[-1].event, EVENT_ERROR)
+
+    def test_restart_after_shutdown(self):
+        """测试停止后再次提交会重新启动事件循环"""
+        self._start_server()
+        self.engine.start()
+        self.engine.shutdown()
+        self.assertFalse(self.engine.running)
+
+        outcome = self.engine.submit(self._request(100)).wait(timeout=30)
+        self.assertEqual(outcome.text, "bytes=100")
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""多文件转写调度器测试
+
+测试 transcribe_scheduler.py 的核心功能：
+1. 时长估算：wav / pcm / 其他格式
+2. 最长优先排序，时长相同时保持原始顺序
+3. 共享队列：时长差异很大时总耗时接近 总工作量 / 并发数
+4. 结果按输入顺序返回，与本地桩服务端配合时每个并发会话只建立一条连接
+
+日期: 2026-10-17
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import unittest
+import wave
+
+# 添加源码目录到路径
+sys.path.insert(
+    0, os.path.join(os.path.dirname(__file__), "../../src/python-gui-client")
+)
+
+from stub_server import StubServer  # noqa: E402
+from transcribe_scheduler import (  # noqa: E402
+    FALLBACK_BYTES_PER_SECOND,
+    TranscribeScheduler,
+    estimate_audio_duration,
+    order_longest_first,
+)
+from transcribe_session import (  # noqa: E402
+    SessionConfig,
+    UtteranceJob,
+    UtteranceResult,
+)
+
+
+class _FakeSession:
+    """按文件名中的时长“转写”的伪会话，用于验证调度行为"""
+
+    instances: list = []
+
+    def __init__(self, config, adapter=None, **kwargs):
+        self.connect_count = 1
+        self.handled = []
+        self.closed = False
+        _FakeSession.instances.append(self)
+
+    async def transcribe(self, job):
+        seconds = float(job.wav_name.split("_")[1])
+        await asyncio.sleep(seconds)
+        self.handled.append(job.wav_name)
+        return UtteranceResult(job=job, success=True, total_seconds=seconds)
+
+    async def close(self):
+        self.closed = True
+
+
+class TestDurationEstimate(unittest.TestCase):
+    """测试时长估算与排序"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.dir = self.temp_dir.name
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_pcm_and_wav_duration(self):
+        """测试 pcm 与 wav 按数据区长度计算时长"""
+        pcm = os.path.join(self.dir, "a.pcm")
+        with open(pcm, "wb") as f:
+            f.write(b"\x00" * 32000)
+        wav_path = os.path.join(self.dir, "b.wav")
+        with wave.open(wav_path, "wb") as wav_file:
+            wav_file.setnchannels(1)
+            wav_file.setsampwidth(2)
+            wav_file.setframerate(8000)
+            wav_file.writeframes(b"\x00" * 8000)
+
+        self.assertAlmostEqual(estimate_audio_duration(pcm, 16000), 1.0)
+        self.assertAlmostEqual(estimate_audio_duration(wav_path, 16000), 0.5)
+
+    def test_other_format_fallback(self):
+        """测试无法解析的压缩格式按文件大小估算"""
+        path = os.path.join(self.dir, "a.xyz")
+        with open(path, "wb") as f:
+            f.write(b"\x00" * FALLBACK_BYTES_PER_SECOND * 3)
+
+        self.assertAlmostEqual(estimate_audio_duration(path), 3.0)
+
+    def test_missing_file(self):
+        """测试文件不存在时返回 0"""
+        self.assertEqual(estimate_audio_duration("/nonexistent/a.pcm"), 0.0)
+
+    def test_longest_first_order(self):
+        """测试按时长从长到短排序，时长相同保持原始顺序"""
+        jobs = []
+        for i, size in enumerate([100, 3000, 100, 2000]):
+            path = os.path.join(self.dir, f"{i}.pcm")
+            with open(path, "wb") as f:
+                f.write(b"\x00" * size)
+            jobs.append(UtteranceJob(wav_name=f"u{i}", wav_path=path))
+
+        ordered = order_longest_first(jobs)
+        self.assertEqual([entry[0] for entry in ordered], [1, 3, 0, 2])
+
+
+class TestScheduler(unittest.TestCase):
+    """测试共享队列调度"""
+
+    def setUp(self):
+        _FakeSession.instances = []
+        self.config = SessionConfig(host="127.0.0.1", port=1, use_ssl=False)
+
+    def test_skewed_durations_balance(self):
+        """测试时长差异很大时，空闲会话领取剩余文件，总耗时接近理想值"""
+        # 一个长文件 + 多个短文件：静态切片会把长文件与一半短文件分到同一进程
+        durations = [0.4] + [0.05] * 8
+        jobs = [
+            UtteranceJob(wav_name=f"u{i}_{d}", wav_path="/nonexistent")
+            for i, d in enumerate(durations)
+        ]
+        scheduler = TranscribeScheduler(
+            self.config, concurrency=2, session_factory=_FakeSession
+        )
+
+        outcomes = asyncio.run(scheduler.run(jobs))
+
+        self.assertEqual([o.job.wav_name for o in outcomes], [j.wav_name for j in jobs])
+        self.assertTrue(all(o.success for o in outcomes))
+        # 长文件独占一个会话，另一会话处理全部短文件
+        handled = sorted(len(s.handled) for s in _FakeSession.instances)
+        self.assertEqual(handled, [1, 8])
+        self.assertLess(scheduler.stats.makespan_seconds, 0.4 + 0.2)
+        self.assertAlmostEqual(scheduler.stats.total_work_seconds, 0.8)
+        self.assertTrue(all(s.closed for s in _FakeSession.instances))
+        self.assertEqual(scheduler.connect_count, 2)
+
+    def test_sessions_limited_by_job_count(self):
+        """测试文件数少于并发数时只创建所需会话"""
+        jobs = [UtteranceJob(wav_name="u0_0.01", wav_path="/nonexistent")]
+        scheduler = TranscribeScheduler(
+            self.config, concurrency=4, session_factory=_FakeSession
+        )
+
+        asyncio.run(scheduler.run(jobs))
+        self.assertEqual(len(_FakeSession.instances), 1)
+
+    def test_empty_jobs(self):
+        """测试空列表直接返回"""
+        scheduler = TranscribeScheduler(
+            self.config, concurrency=2, session_factory=_FakeSession
+        )
+        self.assertEqual(asyncio.run(scheduler.run([])), [])
+        self.assertEqual(_FakeSession.instances, [])
+
+    def test_with_stub_server(self):
+        """测试与桩服务端配合：结果按输入顺序返回，每个会话一条连接"""
+        with tempfile.TemporaryDirectory() as d:
+            jobs = []
+            for i, size in enumerate([300, 90000, 10, 5000, 70000]):
+                path = os.path.join(d, f"a{i}.pcm")
+                with open(path, "wb") as f:
+                    f.write(b"\x00" * size)
+                jobs.append(UtteranceJob(wav_name=f"utt{i}", wav_path=path))
+
+            async def run_test():
+                async with StubServer() as server:
+                    config = SessionConfig(
+                        host="127.0.0.1", port=server.port, use_ssl=False
+                    )
+                    scheduler = TranscribeScheduler(config, concurrency=2)
+                    outcomes = await scheduler.run(jobs)
+                return server, scheduler, outcomes
+
+            server, scheduler, outcomes = asyncio.run(run_test())
+
+        self.assertEqual(
+            [o.text for o in outcomes],
+            ["bytes=300", "bytes=90000", "bytes=10", "bytes=5000", "bytes=70000"],
+        )
+        self.assertEqual(server.connections, 2)
+        self.assertEqual(scheduler.connect_count, 2)
+        # 最长优先：最先发出的是最长的两个文件
+        first_two = {m["wav_name"] for m in server.start_messages[:2]}
+        self.assertEqual(first_two, {"utt1", "utt4"})
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
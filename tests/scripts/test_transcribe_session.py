@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""持久连接转写会话测试
+
+测试 transcribe_session.py 的核心功能（使用本地桩服务端，不依赖真实 FunASR 服务）：
+1. 一条连接连续转写多个文件（连接只建立一次）
+2. 回包按 wav_name 关联，流水线模式下结果顺序与输入一致
+3. 连接断开后自动重连并重发
+4. 异常情况：文件不存在、等待超时、scp 解析
+
+日期: 2026-10-17
+"""
+
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import unittest
+
+# 添加源码目录到路径
+sys.path.insert(
+    0, os.path.join(os.path.dirname(__file__), "../../src/python-gui-client")
+)
+
+from stub_server import StubServer  # noqa: E402
+from transcribe_session import (  # noqa: E402
+    SessionConfig,
+    TranscribeSession,
+    UtteranceJob,
+    compute_stride,
+    load_scp_jobs,
+)
+
+
+class TestTranscribeSession(unittest.TestCase):
+    """测试持久连接会话"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.jobs = []
+        for i, size in enumerate([1000, 70000, 3]):
+            path = os.path.join(self.temp_dir.name, f"a{i}.pcm")
+            with open(path, "wb") as f:
+                f.write(b"\x00" * size)
+            self.jobs.append(UtteranceJob(wav_name=f"utt{i}", wav_path=path))
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _config(self, port, **kwargs):
+        return SessionConfig(
+            host="127.0.0.1",
+            port=port,
+            use_ssl=False,
+            reconnect_backoff=0.01,
+            **kwargs,
+        )
+
+    def test_reuse_single_connection(self):
+        """测试多个文件复用同一条连接"""
+
+        async def run_test():
+            async with StubServer() as server:
+                session = TranscribeSession(self._config(server.port))
+                try:
+                    outcomes = await session.run_batch(self.jobs)
+                finally:
+                    await session.close()
+                return server, session, outcomes
+
+        server, session, outcomes = asyncio.run(run_test())
+        self.assertEqual(server.connections, 1)
+        self.assertEqual(session.connect_count, 1)
+        self.assertTrue(all(o.success for o in outcomes))
+        self.assertEqual(
+            [o.text for o in outcomes], ["bytes=1000", "bytes=70000", "bytes=3"]
+        )
+        self.assertEqual(
+            [m["wav_name"] for m in server.start_messages], ["utt0", "utt1", "utt2"]
+        )
+
+    def test_pipelined_results_keep_order(self):
+        """测试流水线模式：多条在途，结果仍按输入顺序并按 wav_name 关联"""
+
+        async def run_test():
+            async with StubServer() as server:
+                session = TranscribeSession(self._config(server.port, max_inflight=3))
+                try:
+                    return await session.run_batch(self.jobs)
+                finally:
+                    await session.close()
+
+        outcomes = asyncio.run(run_test())
+        self.assertEqual([o.job.wav_name for o in outcomes], ["utt0", "utt1", "utt2"])
+        self.assertEqual(
+            [o.text for o in outcomes], ["bytes=1000", "bytes=70000", "bytes=3"]
+        )
+
+    def test_reconnect_after_drop(self):
+        """测试连接断开后自动重连并重发未完成的文件"""
+
+        async def run_test():
+            async with StubServer(drop_after_first_end=True) as server:
+                session = TranscribeSession(self._config(server.port))
+                try:
+                    outcomes = await session.run_batch(self.jobs)
+                finally:
+                    await session.close()
+                return server, session, outcomes
+
+        server, session, outcomes = asyncio.run(run_test())
+        self.assertTrue(all(o.success for o in outcomes))
+        self.assertEqual(outcomes[0].attempts, 2)
+        self.assertEqual(session.connect_count, 2)
+        self.assertEqual(server.connections, 2)
+
+    def test_missing_file(self):
+        """测试文件不存在时返回失败结果而不是抛出异常"""
+
+        async def run_test():
+            async with StubServer() as server:
+                session = TranscribeSession(self._config(server.port))
+                try:
+                    return await session.transcribe(
+                        UtteranceJob(wav_name="x", wav_path="/nonexistent/x.pcm")
+                    )
+                finally:
+                    await session.close()
+
+        outcome = asyncio.run(run_test())
+        self.assertFalse(outcome.success)
+        self.assertIn("读取音频文件失败", outcome.error)
+
+    def test_timeout_without_result(self):
+        """测试服务端不回包时按超时失败"""
+
+        async def run_test():
+            async with StubServer(silent=True) as server:
+                session = TranscribeSession(
+                    self._config(server.port, transcribe_timeout=0.3)
+                )
+                try:
+                    return await session.transcribe(self.jobs[0])
+                finally:
+                    await session.close()
+
+        outcome = asyncio.run(run_test())
+        self.assertFalse(outcome.success)
+        self.assertIn("超时", outcome.error)
+
+    def test_connection_refused(self):
+        """测试服务端不可达时重试后失败"""
+
+        async def run_test():
+            session = TranscribeSession(self._config(1, max_attempts=2))
+            try:
+                return await session.transcribe(self.jobs[0])
+            finally:
+                await session.close()
+
+        outcome = asyncio.run(run_test())
+        self.assertFalse(outcome.success)
+        self.assertEqual(outcome.attempts, 2)
+
+
+class TestBatchCommandLine(unittest.TestCase):
+    """测试 simple_funasr_client 的 scp 批量模式（子进程方式运行）"""
+
+    def test_scp_batch_mode_end_to_end(self):
+        """测试 scp 批量模式：单连接转写全部文件并写出结果文件"""
+        loop = asyncio.new_event_loop()
+        server = StubServer()
+        loop.run_until_complete(server.__aenter__())
+        thread = threading.Thread(target=loop.run_forever, daemon=True)
+        thread.start()
+        try:
+            with tempfile.TemporaryDirectory() as d:
+                scp = os.path.join(d, "wav.scp")
+                with open(scp, "w", encoding="utf-8") as f:
+                    for i in range(3):
+                        path = os.path.join(d, f"a{i}.pcm")
+                        with open(path, "wb") as wav:
+                            wav.write(b"\x00" * (100 * (i + 1)))
+                        f.write(f"utt{i} {path}\n")
+
+                script = os.path.join(
+                    os.path.dirname(__file__),
+                    "../../src/python-gui-client/simple_funasr_client.py",
+                )
+                proc = subprocess.run(
+                    [
+                        sys.executable,
+                        script,
+                        "--host",
+                        "127.0.0.1",
+                        "--port",
+                        str(server.port),
+                        "--no-ssl",
+                        "--audio_in",
+                        scp,
+                        "--output_dir",
+                        d,
+                    ],
+                    capture_output=True,
+                    text=True,
+                    encoding="utf-8",
+                    timeout=60,
+                )
+                self.assertEqual(proc.returncode, 0, proc.stdout + proc.stderr)
+                with open(os.path.join(d, "wav.0.json"), encoding="utf-8") as f:
+                    results = json.load(f)
+        finally:
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join(timeout=5)
+            loop.run_until_complete(server.__aexit__(None, None, None))
+            loop.close()
+
+        self.assertEqual(server.connections, 1)
+        self.assertEqual(
+            [r["text"] for r in results], ["bytes=100", "bytes=200", "bytes=300"]
+        )
+
+
+class TestHelpers(unittest.TestCase):
+    """测试辅助函数"""
+
+    def test_compute_stride(self):
+        """测试分块大小计算"""
+        self.assertEqual(compute_stride("offline", [5, 10, 5], 10, 16000), 65536)
+        self.assertEqual(compute_stride("2pass", [5, 10, 5], 10, 16000), 1920)
+
+    def test_load_scp_jobs(self):
+        """测试 scp 解析：支持 "name path" 与仅 path，跳过空行"""
+        with tempfile.TemporaryDirectory() as d:
+            scp = os.path.join(d, "wav.scp")
+            with open(scp, "w", encoding="utf-8") as f:
+                f.write("utt1 /data/a.wav\n\n/data/b.pcm\n")
+            jobs = load_scp_jobs(scp)
+
+        self.assertEqual(len(jobs), 2)
+        self.assertEqual((jobs[0].wav_name, jobs[0].wav_path), ("utt1", "/data/a.wav"))
+        self.assertEqual((jobs[1].wav_name, jobs[1].wav_path), ("b.pcm", "/data/b.pcm"))
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
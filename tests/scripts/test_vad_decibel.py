@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""FSMN VAD 逐帧分贝计算测试
+
+测试 ref/FunASR-main/runtime/python/onnxruntime/funasr_onnx/utils/e2e_vad.py：
+1. 向量化 ComputeDecibel 与逐帧 np.square().sum() + math.log10 的结果一致
+2. 多次调用（流式分块）时按顺序追加到可增长的 float32 数组
+3. 波形短于一帧时不产生分贝值，AllResetDetection 后重新开始
+
+日期: 2026-10-17
+"""
+
+import math
+import os
+import sys
+import unittest
+
+import numpy as np
+
+# 添加 funasr_onnx 工具目录到路径（e2e_vad 只依赖 numpy）
+sys.path.insert(
+    0,
+    os.path.join(
+        os.path.dirname(__file__),
+        "../../ref/FunASR-main/runtime/python/onnxruntime/funasr_onnx/utils",
+    ),
+)
+
+from e2e_vad import E2EVadModel  # noqa: E402
+
+
+def _reference_decibel(waveform):
+    return [
+        10 * math.log10(np.square(waveform[offset : offset + 400]).sum() + 0.000001)
+        for offset in range(0, len(waveform) - 400 + 1, 160)
+    ]
+
+
+def _compute(vad, waveform):
+    vad.waveform = waveform[None, :]
+    vad.ComputeDecibel()
+
+
+class TestComputeDecibel(unittest.TestCase):
+    """测试向量化分贝计算"""
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.waveform = (rng.standard_normal(16000 * 3) * 0.1).astype(np.float32)
+        self.waveform[16000:20000] = 0.0
+
+    def test_matches_reference(self):
+        """测试与逐帧实现结果一致（含全零帧）"""
+        vad = E2EVadModel({})
+        _compute(vad, self.waveform)
+
+        expected = _reference_decibel(self.waveform)
+        self.assertEqual(vad.decibel_len, len(expected))
+        self.assertEqual(vad.decibel.dtype, np.float32)
+        np.testing.assert_allclose(vad.decibel[: vad.decibel_len], expected, atol=1e-3)
+        self.assertEqual(vad.data_buf_all_size, len(self.waveform))
+
+    def test_append_across_chunks(self):
+        """测试多次调用按顺序追加，数组按需增长"""
+        vad = E2EVadModel({})
+        chunks = np.array_split(self.waveform, 7)
+        expected = []
+        for chunk in chunks:
+            _compute(vad, chunk)
+            expected += _reference_decibel(chunk)
+
+        self.assertEqual(vad.decibel_len, len(expected))
+        self.assertGreaterEqual(len(vad.decibel), vad.decibel_len)
+        np.testing.assert_allclose(vad.decibel[: vad.decibel_len], expected, atol=1e-3)
+        self.assertEqual(vad.data_buf_all_size, len(self.waveform))
+
+    def test_short_waveform_and_reset(self):
+        """测试短于一帧的波形不产生分贝值，重置后从头开始"""
+        vad = E2EVadModel({})
+        _compute(vad, self.waveform[:399])
+        self.assertEqual(vad.decibel_len, 0)
+        self.assertEqual(vad.data_buf_all_size, 399)
+
+        _compute(vad, self.waveform[:4000])
+        vad.AllResetDetection()
+        self.assertEqual(vad.decibel_len, 0)
+        self.assertEqual(vad.data_buf_all_size, 0)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
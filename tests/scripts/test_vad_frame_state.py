@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""FSMN VAD 帧状态批量判定测试
+
+测试 ref/FunASR-main/runtime/python/onnxruntime/funasr_onnx/utils/e2e_vad.py：
+1. 整块向量化判定的语音段、噪声均值、frame_probs 与逐帧 GetFrameState 完全一致
+   （覆盖默认配置、SNR 门限生效、低分贝帧、多块流式输入）
+2. running_noise_average 闭式解与逐帧递推一致
+3. batch > 1 时每条音频的语音段与单独处理时一致
+
+日期: 2026-10-17
+"""
+
+import math
+import os
+import sys
+import unittest
+
+import numpy as np
+
+# 添加 funasr_onnx 工具目录到路径（e2e_vad 只依赖 numpy）
+sys.path.insert(
+    0,
+    os.path.join(
+        os.path.dirname(__file__),
+        "../../ref/FunASR-main/runtime/python/onnxruntime/funasr_onnx/utils",
+    ),
+)
+sys.path.insert(0, os.path.dirname(__file__))
+
+from e2e_vad import (  # noqa: E402
+    E2EVadFrameProb,
+    E2EVadModel,
+    FrameState,
+    VadStateMachine,
+    running_noise_average,
+)
+from vad_synth import make_utterance, run_vad  # noqa: E402
+
+
+class LegacyVadModel(E2EVadModel):
+    """原逐帧实现（每帧一次 math.log/math.exp 与噪声均值递推），作为对照"""
+
+    def GetFrameState(self, t: int):
+        frame_state = FrameState.kFrameStateInvalid
+        cur_decibel = float(self.decibel[t])
+        cur_snr = cur_decibel - self.noise_average_decibel
+        if cur_decibel < self.vad_opts.decibel_thres:
+            frame_state = FrameState.kFrameStateSil
+            self.DetectOneFrame(frame_state, t, False)
+            return frame_state
+
+        sum_score = 0.0
+        noise_prob = 0.0
+        if len(self.sil_pdf_ids) > 0:
+            sil_pdf_scores = [
+                self.scores[0][t - self.idx_pre_chunk][sil_pdf_id]
+                for sil_pdf_id in self.sil_pdf_ids
+            ]
+            sum_score = sum(sil_pdf_scores)
+            noise_prob = math.log(sum_score) * self.vad_opts.speech_2_noise_ratio
+            total_score = 1.0
+            sum_score = total_score - sum_score
+        speech_prob = math.log(sum_score)
+        if self.vad_opts.output_frame_probs:
+            frame_prob = E2EVadFrameProb()
+            frame_prob.noise_prob = noise_prob
+            frame_prob.speech_prob = speech_prob
+            frame_prob.score = sum_score
+            frame_prob.frame_id = t
+            self.frame_probs.append(frame_prob)
+        if math.exp(speech_prob) >= math.exp(noise_prob) + self.speech_noise_thres:
+            if (
+                cur_snr >= self.vad_opts.snr_thres
+                and cur_decibel >= self.vad_opts.decibel_thres
+            ):
+                frame_state = FrameState.kFrameStateSpeech
+            else:
+                frame_state = FrameState.kFrameStateSil
+        else:
+            frame_state = FrameState.kFrameStateSil
+            if self.noise_average_decibel < -99.9:
+                self.noise_average_decibel = cur_decibel
+            else:
+                frames = self.vad_opts.noise_frame_num_used_for_snr
+                self.noise_average_decibel = (
+                    cur_decibel + self.noise_average_decibel * (frames - 1)
+                ) / frames
+        return frame_state
+
+    def DetectCommonFrames(self, frame_states=None) -> int:
+        if self.vad_state_machine == VadStateMachine.kVadInStateEndPointDetected:
+            return 0
+        for i in range(self.vad_opts.nn_eval_block_size - 1, -1, -1):
+            frame_state = self.GetFrameState(self.frm_cnt - 1 - i)
+            self.DetectOneFrame(frame_state, self.frm_cnt - 1 - i, False)
+        self.idx_pre_chunk += self.scores.shape[1]
+        return 0
+
+    def DetectLastFrames(self, frame_states=None) -> int:
+        if self.vad_state_machine == VadStateMachine.kVadInStateEndPointDetected:
+            return 0
+        for i in range(self.vad_opts.nn_eval_block_size - 1, -1, -1):
+            frame_state = self.GetFrameState(self.frm_cnt - 1 - i)
+            self.DetectOneFrame(frame_state, self.frm_cnt - 1 - i, i == 0)
+        return 0
+
+
+class TestBatchFrameStates(unittest.TestCase):
+    """测试向量化帧状态判定与逐帧实现一致"""
+
+    CONFIGS = [
+        {},
+        {"snr_thres": 6.0, "noise_frame_num_used_for_snr": 20},
+        {"decibel_thres": -20.0, "snr_thres": 3.0},
+        {"detect_mode": 0, "max_single_segment_time": 3000},
+    ]
+
+    def test_segments_match_legacy(self):
+        """测试各配置下输出的语音段与逐帧实现完全一致"""
+        for seed, config in enumerate(self.CONFIGS):
+            with self.subTest(config=config):
+                waveform, scores = make_utterance(40, seed)
+                expected = run_vad(LegacyVadModel(config), waveform, scores)
+                actual = run_vad(E2EVadModel(config), waveform, scores)
+                self.assertEqual(actual, expected)
+                self.assertTrue(any(expected))
+
+    def test_noise_average_and_frame_probs(self):
+        """测试噪声均值与 frame_probs 与逐帧实现一致"""
+        config = {"snr_thres": 6.0, "output_frame_probs": True}
+        waveform, scores = make_utterance(20, 7)
+        legacy, vectorized = LegacyVadModel(config), E2EVadModel(config)
+        for vad in (legacy, vectorized):
+            vad.waveform = waveform
+            vad.ComputeDecibel()
+            vad.ComputeScores(scores)
+            vad.DetectCommonFrames()
+
+        self.assertAlmostEqual(
+            vectorized.noise_average_decibel, legacy.noise_average_decibel, places=6
+        )
+        self.assertEqual(
+            [p.frame_id for p in vectorized.frame_probs],
+            [p.frame_id for p in legacy.frame_probs],
+        )
+        np.testing.assert_allclose(
+            [p.speech_prob for p in vectorized.frame_probs],
+            [p.speech_prob for p in legacy.frame_probs],
+        )
+
+    def test_running_noise_average(self):
+        """测试噪声均值闭式解与逐帧递推一致"""
+        decibel = np.random.default_rng(1).uniform(-60, 0, 500)
+        for init, frames in ((-100.0, 100), (-30.0, 2), (-100.0, 1)):
+            expected = []
+            average = init
+            for d in decibel:
+                average = (
+                    d if average < -99.9 else (d + average * (frames - 1)) / frames
+                )
+                expected.append(average)
+            np.testing.assert_allclose(
+                running_noise_average(decibel, init, frames), expected, rtol=1e-9
+            )
+        self.assertEqual(len(running_noise_average(np.empty(0), -100.0, 100)), 0)
+
+
+class TestBatchVad(unittest.TestCase):
+    """测试 batch > 1"""
+
+    def test_batch_matches_single(self):
+        """测试批量处理时每条音频的语音段与单独处理一致"""
+        rows = [make_utterance(30, seed) for seed in (11, 12, 13)]
+        waveform = np.concatenate([w for w, _ in rows])
+        scores = np.concatenate([s for _, s in rows])
+
+        batch_outputs = run_vad(E2EVadModel({}), waveform, scores)
+        for b, (w, s) in enumerate(rows):
+            expected = [
+                seg
+                for part in run_vad(E2EVadModel({}), w, s)
+                if part
+                for seg in part[0]
+            ]
+            actual = [seg for part in batch_outputs for seg in part[b]]
+            self.assertEqual(actual, expected)
+            self.assertTrue(expected)
+
+    def test_batch_state_released_on_final(self):
+        """测试最后一块处理后释放每条音频的状态"""
+        rows = [make_utterance(5, seed) for seed in (21, 22)]
+        vad = E2EVadModel({})
+        run_vad(
+            vad,
+            np.concatenate([w for w, _ in rows]),
+            np.concatenate([s for _, s in rows]),
+        )
+        self.assertEqual(vad.batch_vads, [])
+        self.assertEqual(
+            vad.vad_state_machine, VadStateMachine.kVadInStateStartPointNotDetected
+        )
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
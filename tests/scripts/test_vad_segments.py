@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""FSMN VAD 语音段回归测试
+
+测试 ref/FunASR-main/runtime/python/onnxruntime/funasr_onnx/utils/e2e_vad.py 的
+分段记账（PopDataToOutputBuf 改为 O(1) 偏移计算、连续帧一次性出栈）：
+1. 固定合成音频在各配置（默认、最长段切分、单句模式、流式输出）下的
+   [start_ms, end_ms] 与改动前逐采样实现的结果完全一致
+2. 分段记录的采样数与起止时间对应，出栈偏移与帧号一致
+
+说明：仓库不附带测试音频，使用 vad_synth 中固定种子的合成音频，
+期望值由改动前的实现生成。
+
+日期: 2026-10-17
+"""
+
+import os
+import sys
+import unittest
+
+# 添加 funasr_onnx 工具目录到路径（e2e_vad 只依赖 numpy）
+sys.path.insert(
+    0,
+    os.path.join(
+        os.path.dirname(__file__),
+        "../../ref/FunASR-main/runtime/python/onnxruntime/funasr_onnx/utils",
+    ),
+)
+sys.path.insert(0, os.path.dirname(__file__))
+
+from e2e_vad import E2EVadModel  # noqa: E402
+from vad_synth import make_utterance, run_vad  # noqa: E402
+
+# (种子, 配置, 每块帧数, online, 期望语音段)
+GOLDEN_CASES = [
+    (
+        101,
+        {},
+        300,
+        False,
+        [[0, 4550], [5080, 10160], [11810, 20560], [22290, 24480], [26500, 27750]],
+    ),
+    (
+        102,
+        {"max_single_segment_time": 4000},
+        300,
+        False,
+        [
+            [0, 4010],
+            [4010, 8020],
+            [8020, 12030],
+            [13940, 16690],
+            [17860, 21870],
+            [21870, 25880],
+            [25880, 26220],
+            [27290, 29980],
+        ],
+    ),
+    (103, {"detect_mode": 0}, 300, False, [[0, 1140]]),
+    (
+        104,
+        {"max_end_silence_time": 300},
+        60,
+        True,
+        [
+            [1880, -1],
+            [-1, 3070],
+            [3780, -1],
+            [-1, 6120],
+            [7410, -1],
+            [-1, 8280],
+            [9820, -1],
+            [-1, 20710],
+            [24380, -1],
+            [-1, 27770],
+            [28830, -1],
+            [-1, 29980],
+        ],
+    ),
+]
+
+
+def _segments(seed, config, block, online):
+    waveform, scores = make_utterance(30, seed)
+    outputs = run_vad(E2EVadModel(config), waveform, scores, block, online)
+    return [segment for part in outputs if part for segment in part[0]]
+
+
+class TestVadSegmentsRegression(unittest.TestCase):
+    """测试语音段与改动前一致"""
+
+    def test_golden_segments(self):
+        """测试固定音频在各配置下输出的语音段不变"""
+        for seed, config, block, online, expected in GOLDEN_CASES:
+            with self.subTest(seed=seed, config=config, online=online):
+                self.assertEqual(_segments(seed, config, block, online), expected)
+
+    def test_segment_sample_accounting(self):
+        """测试分段采样数与起止时间对应，出栈偏移停在已处理的帧"""
+        waveform, scores = make_utterance(30, 101)
+        vad = E2EVadModel({})
+        vad(scores[:, :2000], waveform[:, : 1999 * 160 + 400])
+
+        closed = [seg for seg in vad.output_data_buf if seg.contain_seg_end_point]
+        self.assertTrue(closed)
+        for seg in closed:
+            # 每帧 160 个采样，结束帧额外计入 400 - 160 个采样
+            self.assertEqual(seg.sample_num, (seg.end_ms - seg.start_ms) * 16 + 240)
+        self.assertGreaterEqual(vad.data_buf_start_frame * 10, closed[-1].end_ms)
+        self.assertLessEqual(vad.data_buf_start_frame, 2000)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""FSMN VAD 测试用合成音频
+
+VAD 相关测试共用的工具（仓库不附带测试音频）：
+1. make_utterance：按固定种子合成语音/静音交替的音频与帧级静音概率
+2. run_vad：按 Fsmn_vad 的方式分块驱动 E2EVadModel，返回每块输出的语音段
+
+日期: 2026-10-17
+"""
+
+import numpy as np
+
+
+def make_utterance(seconds, seed):
+    """合成音频与帧级静音概率：语音段与静音段随机交替，静音段能量也随机变化"""
+    rng = np.random.default_rng(seed)
+    samples = int(seconds * 16000)
+    frames = (samples - 400) // 160 + 1
+    speech = np.zeros(samples, dtype=bool)
+    pos = 0
+    while pos < samples:
+        length = int(rng.uniform(0.3, 2.5) * 16000)
+        speech[pos : pos + length] = rng.random() < 0.6
+        pos += length
+    waveform = (rng.standard_normal(samples) * rng.uniform(0.001, 0.02)).astype(
+        np.float32
+    )
+    waveform[speech] *= 20
+    frame_speech = speech[np.arange(frames) * 160 + 200]
+    sil = np.where(frame_speech, 0.1, 0.9) + rng.uniform(-0.09, 0.09, frames)
+    scores = np.stack([sil, 1.0 - sil], axis=-1).astype(np.float32)[None]
+    return waveform[None, :], scores
+
+
+def run_vad(vad, waveform, scores, block=300, online=False):
+    """按 Fsmn_vad 的方式分块驱动，返回每块输出的语音段"""
+    outputs = []
+    frames = scores.shape[1]
+    for t_offset in range(0, frames, block):
+        step = min(block, frames - t_offset)
+        is_final = t_offset + step >= frames - 1
+        package = waveform[
+            :,
+            t_offset * 160 : min(waveform.shape[-1], (t_offset + step - 1) * 160 + 400),
+        ]
+        outputs.append(
+            vad(scores[:, t_offset : t_offset + step], package, is_final, online=online)
+        )
+        if is_final:
+            break
+    return outputs